@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+
+import numpy as np
+
+# How many pixels of the big image to add up at once, which bounds the memory that the sums take.
+CHUNK_PIXELS = 1 << 20
+
+
+def get_box_sums(cumulative, starts, ends):
+    """
+    Add up the pixels in boxes along the first axis of an image, with boxes that can start and end part of the way
+    through a pixel.
+
+    :param cumulative: The sums of the pixels before each position, with a row of zeros first, so that it has one
+        more row than the image.
+    :type cumulative: numpy array of float64.
+
+    :param starts: Where each box starts, in pixels.
+    :type starts: numpy array of float64.
+
+    :param ends: Where each box ends, in pixels.
+    :type ends: numpy array of float64.
+
+    :return: The sum of the pixels in each box, along the first axis.
+    :rtype: numpy array of float64.
+    """
+
+    # The sum up to a point part of the way through a pixel is found by interpolating between the sums at its edges.
+    def get_sums(positions):
+        below = np.clip(np.floor(positions).astype(np.int64), 0, len(cumulative) - 2)
+        fraction = (positions - below).reshape((-1,) + (1,) * (cumulative.ndim - 1))
+        return cumulative[below] * (1 - fraction) + cumulative[below + 1] * fraction
+
+    return get_sums(ends) - get_sums(starts)
+
+
+class AreaResampler:
+    def __init__(self, width, height, out_width, out_height):
+        """
+        Make an AreaResampler, which shrinks an image that arrives a band of rows at a time. Each pixel of the small
+        image is the average of the area of the big image that it covers, including parts of pixels, so any ratio of
+        sizes works. Only the rows that the next rows of the small image need are kept.
+
+        :param width: The width of the big image.
+        :type width: integer.
+
+        :param height: The height of the big image.
+        :type height: integer.
+
+        :param out_width: The width of the small image.
+        :type out_width: integer.
+
+        :param out_height: The height of the small image.
+        :type out_height: integer.
+        """
+
+        self.width = width
+        self.height = height
+        self.out_width = out_width
+        self.out_height = out_height
+        self.x_ratio = width / out_width
+        self.y_ratio = height / out_height
+
+        # The edges of the columns of the small image, in the columns of the big one.
+        self.column_edges = np.minimum(np.arange(out_width + 1) * self.x_ratio, width)
+
+        self.pending = np.zeros((0, out_width, 4), dtype=np.float64)
+        self.pending_start = 0
+        self.n_rows = 0
+        self.n_out_rows = 0
+
+    def add_rows(self, rows):
+        """
+        Add a band of rows of the big image, and return the rows of the small image that can now be worked out.
+
+        :param rows: The rows, premultiplied by alpha, so that the colours of transparent pixels do not count.
+        :type rows: numpy array of uint8, of shape (rows, width, 4).
+
+        :return: The rows of the small image, premultiplied by alpha.
+        :rtype: numpy array of uint8, of shape (rows, out_width, 4).
+        """
+
+        # Shrink the band across first, a few rows at a time, which makes it much smaller to keep.
+        chunk_rows = max(1, CHUNK_PIXELS // self.width)
+        shrunk = [self.pending]
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows[start:start + chunk_rows]
+            cumulative = np.zeros((self.width + 1, len(chunk), 4), dtype=np.float64)
+            np.cumsum(chunk.transpose(1, 0, 2), axis=0, out=cumulative[1:])
+            columns = get_box_sums(cumulative, self.column_edges[:-1], self.column_edges[1:]) / self.x_ratio
+            shrunk.append(columns.transpose(1, 0, 2))
+        self.pending = np.concatenate(shrunk)
+        self.n_rows += len(rows)
+
+        # The rows of the small image whose areas have all arrived.
+        last = self.n_rows == self.height
+        n_ready = self.out_height if last else min(self.out_height, int(self.n_rows / self.y_ratio))
+        if n_ready <= self.n_out_rows:
+            return np.zeros((0, self.out_width, 4), dtype=np.uint8)
+
+        out_rows = np.arange(self.n_out_rows, n_ready)
+        starts = out_rows * self.y_ratio - self.pending_start
+        ends = np.minimum((out_rows + 1) * self.y_ratio, self.height) - self.pending_start
+        cumulative = np.zeros((len(self.pending) + 1,) + self.pending.shape[1:], dtype=np.float64)
+        np.cumsum(self.pending, axis=0, out=cumulative[1:])
+        result = get_box_sums(cumulative, starts, ends) / self.y_ratio
+        self.n_out_rows = n_ready
+
+        # Only keep the rows from the one the next row of the small image starts in.
+        drop = int(self.n_out_rows * self.y_ratio) - self.pending_start
+        if drop > 0:
+            self.pending = self.pending[drop:]
+            self.pending_start += drop
+
+        return np.clip(np.rint(result), 0, 255).astype(np.uint8)
@@ -0,0 +1,250 @@
+#!/usr/bin/python3
+
+import argparse
+import glob
+import logging
+import os
+import random
+import time
+
+import numpy as np
+
+from level_of_detail import QUALITIES, QUALITY
+from painter_backend import PAINTER_BACKENDS, get_painter_backend
+from surveyor import Surveyor
+
+
+def time_backend(backend, display_list, scale, layers, repeats):
+    """
+    Draw a display list with a backend several times, and return the fastest time and the image.
+
+    :param backend: The painter backend.
+    :type backend: PainterBackend
+
+    :param display_list: The display list of the map.
+    :type display_list: DisplayList
+
+    :param scale: How much to scale the display list by.
+    :type scale: float
+
+    :param layers: The names of the layers to draw.
+    :type layers: set of strings.
+
+    :param repeats: How many times to draw it.
+    :type repeats: integer.
+
+    :return: The fastest time in seconds, and the image.
+    :rtype: (float, numpy array of uint8)
+    """
+
+    best_seconds = None
+    image = None
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        image = backend.render(display_list, scale=scale, layers=layers)
+        seconds = time.perf_counter() - start_time
+        if best_seconds is None or seconds < best_seconds:
+            best_seconds = seconds
+    return best_seconds, image
+
+
+def compare_images(reference, candidate, tolerance):
+    """
+    Compare two images drawn by different backends.
+
+    :param reference: The reference image, with shape (height, width, 4).
+    :type reference: numpy array of uint8.
+
+    :param candidate: The candidate image, with shape (height, width, 4).
+    :type candidate: numpy array of uint8.
+
+    :param tolerance: The largest difference in any channel that still counts as a match.
+    :type tolerance: integer.
+
+    :return: The mean and largest difference in any channel, and the percentage of pixels that do not match.
+    :rtype: (float, integer, float)
+    """
+
+    difference = np.abs(reference.astype(np.int16) - candidate.astype(np.int16)).max(axis=2)
+    return float(difference.mean()), int(difference.max(initial=0)), 100.0 * float((difference > tolerance).mean())
+
+
+def benchmark_save(save_file_path, config_file_path, tile_size, backend_names, repeats, tolerance, quality=QUALITY):
+    """
+    Record the display list of a save once, and time how long each backend takes to draw it.
+
+    :param save_file_path: The path to the save file.
+    :type save_file_path: string.
+
+    :param config_file_path: The path to the config file.
+    :type config_file_path: string.
+
+    :param tile_size: The tile size to render with.
+    :type tile_size: integer.
+
+    :param backend_names: The names of the backends to time. The first one is the reference for the others.
+    :type backend_names: list of strings.
+
+    :param repeats: How many times to draw the map with each backend.
+    :type repeats: integer.
+
+    :param tolerance: The largest difference in any channel that still counts as a match.
+    :type tolerance: integer.
+
+    :param quality: The quality to draw at, one of QUALITIES. Defaults to QUALITY.
+    :type quality: string.
+
+    :return: The number of pixels, and the time and differences from the reference for each backend.
+    :rtype: (integer, dict)
+    """
+
+    random.seed(123)
+    surveyor = Surveyor(save_file_path)
+    surveyor.ingest_data()
+    surveyor.load_settings(config_file_path, tile_size)
+
+    painter = surveyor.painter
+    display_list = painter.make_display_list()
+    scale = painter.get_display_list_scale(display_list)
+    layers = painter.get_visible_layers(display_list)
+
+    results = {}
+    reference = None
+    n_pixels = 0
+    for name in backend_names:
+        backend = get_painter_backend(name)(painter, quality=quality)
+        seconds, image = time_backend(backend, display_list, scale, layers, repeats)
+        n_pixels = image.shape[0] * image.shape[1]
+        if reference is None:
+            reference = image
+            results[name] = {"seconds": seconds}
+        else:
+            mean, largest, mismatched = compare_images(reference, image, tolerance)
+            results[name] = {"seconds": seconds, "mean": mean, "max": largest, "mismatched": mismatched}
+    return n_pixels, results
+
+
+def get_available_backends(backend_names):
+    """
+    Return the backends whose dependencies are installed.
+
+    :param backend_names: The names of the backends.
+    :type backend_names: list of strings.
+
+    :return: The names of the backends that can be used.
+    :rtype: list of strings.
+    """
+
+    available = []
+    for name in backend_names:
+        if get_painter_backend(name).is_available():
+            available.append(name)
+        else:
+            print(f"Skipping the {name} backend, as its dependencies are not installed.")
+    return available
+
+
+def print_results(results, backend_names):
+    """
+    Print a table of how long each backend took, and how far its images are from the first backend's.
+
+    :param results: A list of (label, number of pixels, results) tuples.
+    :type results: list.
+
+    :param backend_names: The names of the backends.
+    :type backend_names: list of strings.
+    """
+
+    reference_name = backend_names[0]
+
+    print(f"{'save':>20} {'pixels':>12} " + " ".join(f"{name:>12}" for name in backend_names))
+    for label, n_pixels, timings in results:
+        seconds = " ".join(f"{timings[name]['seconds']:>11.3f}s" for name in backend_names)
+        print(f"{label:>20} {n_pixels:>12} {seconds}")
+
+    if len(backend_names) < 2:
+        return
+
+    print()
+    print(f"Speed up and difference from the {reference_name} backend (mean / max per channel, % pixels mismatched):")
+    for label, n_pixels, timings in results:
+        reference_seconds = timings[reference_name]["seconds"]
+        columns = []
+        for name in backend_names[1:]:
+            timing = timings[name]
+            speed_up = reference_seconds / timing["seconds"] if timing["seconds"] > 0 else float("inf")
+            columns.append(
+                f"{name}: {speed_up:5.2f}x, {timing['mean']:.2f} / {timing['max']}, {timing['mismatched']:.2f}%")
+        print(f"{label:>20} " + "  ".join(columns))
+
+
+def main():
+    """
+    Compare how long the painter backends take to draw the bundled saves, and how close their images are.
+    """
+
+    argparser = argparse.ArgumentParser(description='Compare the painter backends on the bundled saves.')
+    argparser.add_argument(
+        "--save",
+        help="Benchmark this save file instead of the bundled ones. Can be given more than once.",
+        action="append",
+        default=[])
+    argparser.add_argument(
+        "-b", "--backends",
+        help="Comma separated list of the backends to compare. The first one is the reference.",
+        default=",".join(PAINTER_BACKENDS),
+        type=str)
+    argparser.add_argument(
+        "-c", "--config",
+        help="Path to the config file.",
+        default="config/main.json",
+        type=str)
+    argparser.add_argument(
+        "-s", "--tile_size",
+        help="Size of the tile to render with.",
+        default=5,
+        type=int)
+    argparser.add_argument(
+        "-q", "--quality",
+        help="The quality to draw with, which sets how much detail is drawn at the tile size.",
+        default=QUALITY,
+        choices=QUALITIES,
+        type=str)
+    argparser.add_argument(
+        "-r", "--repeats",
+        help="How many times to draw each map with each backend. The fastest time is kept.",
+        default=3,
+        type=int)
+    argparser.add_argument(
+        "-t", "--tolerance",
+        help="The largest difference in any channel for a pixel to still count as a match.",
+        default=16,
+        type=int)
+    argparser.add_argument(
+        "-v", "--verbose",
+        help="If set, use verbose logging.",
+        default=False,
+        action="store_true")
+    args = argparser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    backend_names = get_available_backends(args.backends.split(","))
+    if not backend_names:
+        print("None of the backends can be used.")
+        return
+
+    save_file_paths = args.save or sorted(glob.glob("example_saves/*.sav"))
+    results = []
+    for save_file_path in save_file_paths:
+        label = os.path.basename(save_file_path)
+        n_pixels, timings = benchmark_save(
+            save_file_path, args.config, args.tile_size, backend_names, args.repeats, args.tolerance, args.quality)
+        results.append((label, n_pixels, timings))
+
+    print_results(results, backend_names)
+
+
+if __name__ == '__main__':
+    main()
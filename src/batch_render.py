@@ -0,0 +1,313 @@
+#!/usr/bin/python3
+
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import png_writer
+from level_of_detail import QUALITIES, QUALITY
+from painter_backend import PAINTER_BACKENDS, import_cairo
+from png_writer import COMPRESSION_LEVEL, write_atomically
+from run import get_output_filename, get_tile_size
+from surveyor import Surveyor
+
+# The settings each worker draws with. They are loaded once, by the main process, and handed to each worker as it
+# starts, so no worker reads the config files.
+worker_settings = {}
+
+
+def find_saves(inputs):
+    """
+    Find the save files to draw.
+
+    :param inputs: Directories, which stand for all the .sav files in them, and paths or glob patterns of save files.
+    :type inputs: list of strings.
+
+    :return: The paths to the save files, without repeats, in order.
+    :rtype: list of strings.
+    """
+
+    save_file_paths = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.sav")
+        save_file_paths.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(save_file_paths)
+
+
+def read_settings(config_file_path):
+    """
+    Read a config file, and the named colours it uses, for the workers to share.
+
+    :param config_file_path: The path to the config file.
+    :type config_file_path: string.
+
+    :return: The settings, and the named colours.
+    :rtype: (dict, dict)
+    """
+
+    with open("config/rgb_values.json") as file_handle:
+        settings_rgb_values = json.load(file_handle)
+    with open(config_file_path) as file_handle:
+        settings = json.load(file_handle)
+    return settings, settings_rgb_values
+
+
+def init_worker(settings, settings_rgb_values, threads):
+    """
+    Get a worker process ready to draw: keep the settings, and import Cairo, once for all the saves it draws.
+
+    :param settings: The settings loaded from the config file.
+    :type settings: dict.
+
+    :param settings_rgb_values: The named colours loaded from config/rgb_values.json.
+    :type settings_rgb_values: dict.
+
+    :param threads: How many threads to compress each PNG file with, so the workers share the CPUs.
+    :type threads: integer.
+    """
+
+    worker_settings["settings"] = settings
+    worker_settings["settings_rgb_values"] = settings_rgb_values
+    png_writer.DEFAULT_THREADS = threads
+    import_cairo(required=False)
+
+
+def render_save(save_file_path, output_file_path, tile_size=None, mode="PNG", backend="cairo",
+                compression_level=COMPRESSION_LEVEL, indexed=False, quality=QUALITY):
+    """
+    Draw one save, in a worker process, and time it. The image is written under a temporary name and then renamed,
+    so it is never seen half written. Anything that goes wrong is caught and recorded, so that one bad save does not
+    stop the rest.
+
+    :param save_file_path: The path to the save file.
+    :type save_file_path: string.
+
+    :param output_file_path: The path to the image file.
+    :type output_file_path: string.
+
+    :param tile_size: The tile size to draw at, or None to use the one in the config. Defaults to None.
+    :type tile_size: integer.
+
+    :param mode: The image mode, one of 'PNG', 'SVG', 'SVGZ' or 'CAIRO_SVG'. Defaults to 'PNG'.
+    :type mode: string.
+
+    :param backend: The painter backend to draw PNG images with, one of PAINTER_BACKENDS. Defaults to 'cairo'.
+    :type backend: string.
+
+    :param compression_level: The zlib compression level of PNG images, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+    :type compression_level: integer.
+
+    :param indexed: If True, write PNG images with a palette of up to 256 colours. Defaults to False.
+    :type indexed: boolean.
+
+    :param quality: The quality to draw PNG images at, one of QUALITIES. Defaults to QUALITY.
+    :type quality: string.
+
+    :return: What happened: the paths, the sizes of the files, and how long each phase took, or the error.
+    :rtype: dict
+    """
+
+    result = {"save": save_file_path, "output": output_file_path, "save_bytes": os.path.getsize(save_file_path)}
+    start = time.perf_counter()
+    try:
+        random.seed(123)
+        surveyor = Surveyor(save_file_path)
+        surveyor.ingest_data()
+        ingested = time.perf_counter()
+
+        surveyor.set_settings(worker_settings["settings"], worker_settings["settings_rgb_values"], tile_size)
+        write_atomically(output_file_path, lambda path: surveyor.save_image(
+            path, mode, backend=backend, compression_level=compression_level, indexed=indexed, quality=quality
+        ))
+        result.update({
+            "status": "ok",
+            "tiles": surveyor.nrows * surveyor.ncols,
+            "ingest_seconds": ingested - start,
+            "render_seconds": time.perf_counter() - ingested,
+            "image_bytes": os.path.getsize(output_file_path),
+        })
+    except Exception as error:
+        result.update({"status": "failed", "error": f"{type(error).__name__}: {error}"})
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def render_saves(save_file_paths, output_dir, config_file_path, jobs=None, mode="PNG", **options):
+    """
+    Draw many saves on a pool of worker processes, the biggest first, so that the last ones to finish are small.
+
+    :param save_file_paths: The paths to the save files.
+    :type save_file_paths: list of strings.
+
+    :param output_dir: The directory to write the images to.
+    :type output_dir: string.
+
+    :param config_file_path: The path to the config file.
+    :type config_file_path: string.
+
+    :param jobs: How many saves to draw at once. If None, draw one for each CPU. Defaults to None.
+    :type jobs: integer.
+
+    :param mode: The image mode, one of 'PNG', 'SVG', 'SVGZ' or 'CAIRO_SVG'. Defaults to 'PNG'.
+    :type mode: string.
+
+    :param options: The other options of render_save, such as the tile size and backend.
+    :type options: dict.
+
+    :return: The result of each save, from render_save, in the order they finished.
+    :rtype: list of dicts.
+    """
+
+    settings, settings_rgb_values = read_settings(config_file_path)
+
+    output_file_paths = {}
+    for save_file_path in save_file_paths:
+        output_file_path = os.path.join(output_dir, get_output_filename(save_file_path, mode))
+        if output_file_path in output_file_paths:
+            raise ValueError(f"{save_file_path} and {output_file_paths[output_file_path]} would both be drawn to "
+                             f"{output_file_path}.")
+        output_file_paths[output_file_path] = save_file_path
+
+    jobs = jobs or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=init_worker, initargs=(settings, settings_rgb_values, threads)
+    ) as executor:
+        futures = [
+            executor.submit(render_save, save_file_path, output_file_path, mode=mode, **options)
+            for output_file_path, save_file_path in sorted(
+                output_file_paths.items(), key=lambda item: os.path.getsize(item[1]), reverse=True
+            )
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["status"] == "ok":
+                print(f"{result['save']}: {result['seconds']:.2f}s, {result['image_bytes']} bytes")
+            else:
+                print(f"{result['save']}: failed, {result['error']}")
+    return results
+
+
+def main():
+    """
+    Draw every save in some directories or glob patterns, and write a manifest of how it went.
+    """
+
+    random.seed(123)
+
+    argparser = argparse.ArgumentParser(description='Make maps of many OpenTTD saves at once.')
+    argparser.add_argument(
+        "inputs",
+        help="Directories of save files, or paths or glob patterns of save files.",
+        nargs="+",
+        type=str)
+    argparser.add_argument(
+        "-o", "--output-dir",
+        help="Path to the output directory.",
+        default="example_images",
+        type=str)
+    argparser.add_argument(
+        "-c", "--config",
+        help="Path to the config file.",
+        default="config/martin.json",
+        type=str)
+    argparser.add_argument(
+        "-m", "--mode",
+        help="Image mode, one of: ['svg', 'svgz', 'png', 'cairo_svg'].",
+        default="PNG",
+        type=str)
+    argparser.add_argument(
+        "-s", "--tile_size",
+        help="Size of the tile. Should be an odd integer. Defaults to the one in the config.",
+        default=None,
+        type=int)
+    argparser.add_argument(
+        "-j", "--jobs",
+        help="How many saves to draw at once. Defaults to one for each CPU.",
+        default=None,
+        type=int)
+    argparser.add_argument(
+        "-b", "--backend",
+        help=f"The backend to draw png images with, one of: {list(PAINTER_BACKENDS)}.",
+        default="cairo",
+        choices=list(PAINTER_BACKENDS),
+        type=str)
+    argparser.add_argument(
+        "--compression-level",
+        help="The zlib compression level of png images, from 0 to 9.",
+        default=COMPRESSION_LEVEL,
+        choices=range(10),
+        metavar="{0-9}",
+        type=int)
+    argparser.add_argument(
+        "--indexed",
+        help="If set, write png images with a palette of up to 256 colours.",
+        default=False,
+        action="store_true")
+    argparser.add_argument(
+        "--quality",
+        help="How much detail to draw png images with.",
+        default=QUALITY,
+        choices=QUALITIES,
+        type=str)
+    argparser.add_argument(
+        "--manifest",
+        help="Path to write the JSON manifest of the timings, sizes and failures to. Defaults to manifest.json in "
+             "the output directory.",
+        default=None,
+        type=str)
+    argparser.add_argument(
+        "-v", "--verbose",
+        help="If set, use verbose logging.",
+        default=False,
+        action="store_true")
+    args = argparser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    save_file_paths = find_saves(args.inputs)
+    if not save_file_paths:
+        print("No save files found.")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = args.jobs or os.cpu_count() or 1
+    print(f"Drawing {len(save_file_paths)} saves, {jobs} at a time.")
+
+    start = time.perf_counter()
+    results = render_saves(
+        save_file_paths, args.output_dir, args.config, jobs=jobs, mode=args.mode.upper(),
+        tile_size=get_tile_size(args.tile_size) if args.tile_size else None, backend=args.backend,
+        compression_level=args.compression_level, indexed=args.indexed, quality=args.quality
+    )
+    seconds = time.perf_counter() - start
+
+    n_failed = sum(result["status"] != "ok" for result in results)
+    manifest = {
+        "config": args.config,
+        "mode": args.mode.upper(),
+        "jobs": jobs,
+        "seconds": seconds,
+        "n_saves": len(results),
+        "n_failed": n_failed,
+        "saves": sorted(results, key=lambda result: result["save"]),
+    }
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.json")
+    with open(manifest_path, "w") as file_handle:
+        json.dump(manifest, file_handle, indent=2)
+
+    print(f"Drew {len(results) - n_failed} saves in {seconds:.2f}s, with {n_failed} failures. "
+          f"Wrote the manifest to {manifest_path}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+
+import numpy as np
+
+from display_list import replay
+from painter_backend import BAND_BYTES, CAIRO_MAX_SIZE, PainterBackend, get_scaled_size, import_cairo
+from png_writer import COMPRESSION_LEVEL, unpremultiply, write_png
+
+
+def surface_to_array(surface):
+    """
+    Copy the pixels of a Cairo image surface into an array.
+
+    :param surface: The surface, in FORMAT_ARGB32.
+    :type surface: cairo.ImageSurface
+
+    :return: The pixels, as RGBA premultiplied by alpha.
+    :rtype: numpy array of uint8, of shape (height, width, 4).
+    """
+
+    # Cairo keeps each pixel as a native endian 32 bit integer, with alpha in the top byte.
+    width = surface.get_width()
+    pixels = np.ndarray(
+        shape=(surface.get_height(), surface.get_stride() // 4), dtype=np.uint32, buffer=surface.get_data()
+    )[:, :width]
+    image = np.empty(pixels.shape + (4,), dtype=np.uint8)
+    for channel, shift in enumerate((16, 8, 0, 24)):
+        image[:, :, channel] = (pixels >> shift) & 255
+    return image
+
+
+def write_surface_png(surface, file_path, compression_level=COMPRESSION_LEVEL, indexed=False):
+    """
+    Save a Cairo image surface as a PNG file, compressing it in parallel rather than with Cairo's write_to_png.
+
+    :param surface: The surface, in FORMAT_ARGB32.
+    :type surface: cairo.ImageSurface
+
+    :param file_path: The path to the file.
+    :type file_path: string.
+
+    :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+    :type compression_level: integer.
+
+    :param indexed: If True, write an image with a palette of up to 256 colours. Defaults to False.
+    :type indexed: boolean.
+    """
+
+    write_png(
+        file_path, unpremultiply(surface_to_array(surface)), compression_level=compression_level, indexed=indexed
+    )
+
+
+class CairoBackend(PainterBackend):
+    """
+    A painter backend that draws with Cairo.
+    """
+
+    max_size = CAIRO_MAX_SIZE
+
+    @classmethod
+    def is_available(cls):
+        """Cairo backends need pycairo."""
+
+        return import_cairo(required=False) is not None
+
+    def draw_surface(self, display_list, scale=1.0, layers=None, x=0, y=0, width=None, height=None, indices=None,
+                     detail=None):
+        """
+        Draw a display list, or part of it, on a new Cairo surface.
+
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param scale: How much to scale the display list by. Defaults to 1.
+        :type scale: float
+
+        :param layers: The names of the layers to draw. If None, draw all the layers. Defaults to None.
+        :type layers: set of strings.
+
+        :param x: The x coordinate of the left of the region to draw, in the scaled image. Defaults to 0.
+        :type x: integer.
+
+        :param y: The y coordinate of the top of the region to draw, in the scaled image. Defaults to 0.
+        :type y: integer.
+
+        :param width: The width of the region to draw. If None, draw the whole width. Defaults to None.
+        :type width: integer.
+
+        :param height: The height of the region to draw. If None, draw the whole height. Defaults to None.
+        :type height: integer.
+
+        :param indices: The indices of the primitives that reach the region. If None, draw them all. Defaults to None.
+        :type indices: list of integers.
+
+        :param detail: How to draw the primitives: with anti-aliasing or not, and with round line caps or not. If
+            None, draw them as they were recorded. Defaults to None.
+        :type detail: DetailLevel
+
+        :return: The surface.
+        :rtype: cairo.ImageSurface
+        """
+
+        cairo = import_cairo()
+
+        full_width, full_height = get_scaled_size(display_list, scale)
+        surface = cairo.ImageSurface(
+            cairo.FORMAT_ARGB32, full_width if width is None else width, full_height if height is None else height
+        )
+        context = cairo.Context(surface)
+        if detail is not None and not detail.antialias:
+            context.set_antialias(cairo.ANTIALIAS_NONE)
+        if x or y:
+            context.translate(-x, -y)
+        replay(
+            display_list, context, scale=scale, layers=layers, indices=indices,
+            round_caps=detail is None or detail.round_caps
+        )
+        surface.flush()
+        return surface
+
+    def render_region(self, display_list, x, y, width, height, scale=1.0, layers=None, indices=None, detail=None):
+        """Draw part of a display list on a new image, with Cairo."""
+
+        return surface_to_array(self.draw_surface(
+            display_list, scale=scale, layers=layers, x=x, y=y, width=width, height=height, indices=indices,
+            detail=detail
+        ))
+
+    def write_png(self, display_list, image_file_path, scale=1.0, layers=None, band_bytes=BAND_BYTES,
+                  compression_level=COMPRESSION_LEVEL, indexed=False, resized=None):
+        """
+        Draw a display list, and save it as a PNG file. If the image fits in one band, and there are no smaller
+        copies to write, Cairo draws it in one go, otherwise it is drawn band by band.
+        """
+
+        width, height = get_scaled_size(display_list, scale)
+        if resized or max(width, height) > self.max_size or 4 * width * height > band_bytes:
+            super().write_png(
+                display_list, image_file_path, scale=scale, layers=layers, band_bytes=band_bytes,
+                compression_level=compression_level, indexed=indexed, resized=resized
+            )
+        else:
+            detail = self.choose_detail_level(display_list, scale)
+            surface = self.draw_surface(
+                display_list, scale=scale, layers=layers,
+                indices=self.find_detailed_indices(display_list, scale, detail), detail=detail
+            )
+            write_surface_png(
+                surface, image_file_path,
+                compression_level=compression_level, indexed=indexed
+            )
@@ -1,10 +1,51 @@
+import collections
+import hashlib
 import json
 import math
+import os
 import random
-import webcolors
 
 from alive_progress import alive_bar
-import cairo
+
+from cairo_backend import write_surface_png
+from compiled_style import LINE_MODES, CompiledStyle
+from display_list import DisplayList, RecordingContext, replay
+from drawing_context import FONT_SLANT_NORMAL, FONT_WEIGHT_NORMAL, LINE_CAP_BUTT, LINE_CAP_ROUND, LINE_JOIN_MITER
+from indexed_image import IndexedImage
+from level_of_detail import QUALITY
+from layer_cache import LayerCache
+from painter_backend import CAIRO_MAX_SIZE, get_painter_backend, get_scaled_size, import_cairo
+from path_stitcher import PathStitcher
+from png_writer import COMPRESSION_LEVEL
+from rectangle_mesh import merge_rectangles as merge_tile_rectangles
+from region_outlines import inset_path, make_region_outlines
+from svg_writer import SvgWriter
+from tile_scheduler import TileScheduler
+
+# The layers of the map, from the bottom up.
+LAYERS = [
+    "backgrounds",
+    "roads-outer",
+    "rails-outer",
+    "stations",
+    "tunnels-and-bridge-ramps",
+    "buildings",
+    "industries",
+    "water",
+    "roads-inner",
+    "trams",
+    "rails-inner",
+    "signals",
+    "bridges",
+    "labels",
+]
+
+# The (cos, sin) of each rotation used by transform_to_tile, kept exact so that stitched lines line up.
+ROTATIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+
+# Drafts are drawn with tiles this many times smaller than the tile size, but no smaller than DRAFT_MIN_TILE_SIZE.
+DRAFT_SHRINK = 3
+DRAFT_MIN_TILE_SIZE = 5
 
 
 def do_nothing():
@@ -24,8 +65,10 @@ class CairoPainter:
         """
 
         self.parent = parent
+        self.layer_cache = None
+        self.hidden_layers = set()
 
-        self.player_colors = [
+        self.default_player_colors = [
             (200, 0, 0),
             (0, 0, 200),
             (100, 0, 0),
@@ -54,139 +97,97 @@ class CairoPainter:
 
         self.parent.log_message(message)
 
-    def load_rgb(self, rgb_name, default_value):
+    def load_settings(self, file_path, tile_size):
         """
         Update the settings, given a config file path.
 
-        :param rgb_name: The name to look up.
-        :type rgb_name: string.
+        :param file_path: The path to the config file.
+        :type file_path: string.
 
-        :param default_value: A tuple of 3 ints for the RGB values.
-        :type default_value: (integer, integer, integer).
+        :param tile_size: Override for tile size.
+        :type tile_size: integer.
         """
 
-        value = self.load_settings.get(rgb_name, default_value)
-
-        if isinstance(value, str):
-            if value in self.load_settings_rgb_values:
-                return self.load_settings_rgb_values[value]
+        with open("config/rgb_values.json") as file_handle:
+            settings_rgb_values = json.load(file_handle)
 
-            try:
-                return webcolors.name_to_rgb(value)
-            except ValueError:
-                return (0, 0, 0)
+        with open(file_path) as file_handle:
+            settings = json.load(file_handle)
 
-        return value
+        self.set_settings(settings, settings_rgb_values, tile_size)
 
-    def load_settings(self, file_path, tile_size):
+    def set_settings(self, settings, settings_rgb_values, tile_size):
         """
-        Update the settings, given a config file path.
+        Update the settings, given settings already loaded from a config file, so that they can be loaded once and
+        used for many saves.
 
-        :param file_path: The path to the config file.
-        :type file_path: string.
+        :param settings: The settings loaded from the config file.
+        :type settings: dict.
+
+        :param settings_rgb_values: The named colours loaded from config/rgb_values.json.
+        :type settings_rgb_values: dict.
 
         :param tile_size: Override for tile size.
         :type tile_size: integer.
         """
 
-        with open("config/rgb_values.json") as file_handle:
-            self.load_settings_rgb_values = json.load(file_handle)
-
-        with open(file_path) as file_handle:
-            self.load_settings = json.load(file_handle)
+        self.settings_rgb_values = settings_rgb_values
+        self.settings = settings
 
-        self.ds = self.load_settings.get("ds", 25)
+        self.ds = self.settings.get("ds", 25)
         self.ss = 2 * self.ds
 
-        self.ocean_noise = self.load_settings.get("ocean_noise", 50)
-
-        self.height_rgb_low = self.load_rgb("height_rgb_low", (255, 255, 255))
-        self.height_rgb_high = self.load_rgb("height_rgb_high", (200, 200, 200))
-
-        self.road_tile_rgb = self.load_rgb("road_tile_rgb", (100, 100, 100))
-        self.rail_rgb = self.load_rgb("rail_rgb", (255, 255, 255))
-        self.road_rgb = self.load_rgb("road_rgb", (255, 255, 255))
-        self.tram_rgb = self.load_rgb("tram_rgb", (255, 255, 255))
-
-        self.railway_rgb = self.load_rgb("railway_rgb", (100, 100, 100))
-        self.electrified_railway_rgb = self.load_rgb("electrified_railway_rgb", (200, 200, 200))
-        self.monorail_rgb = self.load_rgb("monorail_rgb", (150, 150, 150))
-        self.maglev_rgb = self.load_rgb("maglev_rgb", (100, 100, 100))
-
-        self.town_building_rgb = self.load_rgb("town_building_rgb", (255, 255, 255))
-        self.industry_rgb = self.load_rgb("industry_rgb", (255, 165, 0))
-        self.industry_edge_rgb = self.load_rgb("industry_edge_rgb", (0, 0, 0))
-        self.torb_rgb = self.load_rgb("torb_rgb", (150, 150, 150))
-        self.objects_rgb = self.load_rgb("objects_rgb", (150, 150, 150))
-        self.torb_edge_rgb = self.load_rgb("torb_edge_rgb", (0, 100, 100))
-        self.water_edge_rgb = self.load_rgb("water_edge_rgb", (0, 0, 255))
-
-        self.station_rgb = self.load_rgb("station_rgb", (255, 0, 255))
-        self.rail_station_rgb = self.load_rgb("rail_station_rgb", (255, 0, 255))
-        self.bus_station_rgb = self.load_rgb("bus_station_rgb", (255, 0, 255))
-        self.truck_station_rgb = self.load_rgb("truck_station_rgb", (255, 0, 255))
-        self.airport_rgb = self.load_rgb("airport_rgb", (255, 255, 0))
-        self.seaport_rgb = self.load_rgb("seaport_rgb", (0, 255, 255))
-        self.heliport_rgb = self.load_rgb("heliport_rgb", (255, 255, 0))
-
-        self.rail_depot_rgb = self.load_rgb("rail_depot_rgb", (0, 100, 100))
-        self.road_depot_rgb = self.load_rgb("road_depot_rgb", (0, 100, 100))
-        self.ship_depot_rgb = self.load_rgb("ship_depot_rgb", (0, 100, 100))
-
-        self.screen_mode = self.load_settings.get("screen_mode", "normal")
-        self.player_colors = self.load_settings.get("player_colors", self.player_colors)
-        self.reverse_track_rgb = self.load_settings.get("reverse_track_rgb", False)
-
-        self.show_signals = self.load_settings.get("show_signals", True)
-        self.show_roads = self.load_settings.get("show_roads", True)
-
-        for index, rgb in enumerate(self.player_colors):
-            if not isinstance(rgb, str):
-                continue
-            if rgb in self.load_settings_rgb_values:
-                self.player_colors[index] = self.load_settings_rgb_values[rgb]
-            else:
-                try:
-                    self.player_colors[index] = webcolors.name_to_rgb(rgb)
-                except ValueError:
-                    self.player_colors[index] = (0, 0, 0)
+        self.show_signals = self.settings.get("show_signals", True)
+        self.show_roads = self.settings.get("show_roads", True)
+        self.show_labels = self.settings.get("show_labels", True)
+
+        # Every layer is recorded, and the ones that are turned off are left out when the image is drawn.
+        self.hidden_layers = set()
+        if not self.show_roads:
+            self.hidden_layers.update(["rails-outer", "roads-inner"])
+        if not self.show_signals:
+            self.hidden_layers.add("signals")
+        if not self.show_labels:
+            self.hidden_layers.add("labels")
 
         if tile_size:
             self.ss = tile_size
             self.ds = (tile_size - 1) // 2
 
-        # Thicknesses of various elements.
-        self.rail_width = self.ds / 3
-        self.road_width = self.ds / 2
-        self.tram_width = self.ds / 5
-        self.bridge_edge_width = self.ss / 10
-        self.edge_width = int(0.1 * self.ss)
-        if self.edge_width % 2 == 0:
-            self.edge_width += 1
+        self.style = self.compile_style(self.settings)
+
+    def compile_style(self, settings):
+        """
+        Compile the settings from a config file into a style, for the current tile size.
+
+        :param settings: The settings loaded from the config file.
+        :type settings: dict.
+
+        :return: The style.
+        :rtype: CompiledStyle
+        """
+
+        return CompiledStyle(settings, self.settings_rgb_values, self.default_player_colors, self.ss, self.ds)
 
     def set_rgb(self, rgb):
         """
         Set the RGB for the context.
 
-        :param rgb: The fill color, expressed as a tuple in the range (0-255, 0-255, 0-255).
-        :type rgb: (integer, integer, integer).
+        :param rgb: The fill color, expressed as a tuple in the range (0-1, 0-1, 0-1).
+        :type rgb: (float, float, float).
         """
 
-        ctx = self.context
-        (rgb_r, rgb_g, rgb_b) = rgb
-        ctx.set_source_rgb(rgb_r / 255, rgb_g / 255, rgb_b / 255)
+        self.context.set_source_rgb(*rgb)
 
     def set_rgba(self, rgba):
         """
         Set the RGBA for the context.
 
-        :param rgba: The fill color, expressed as a tuple in the range (0-255, 0-255, 0-255, 0-1).
-        :type rgba: (integer, integer, integer, integer).
+        :param rgba: The fill color, expressed as a tuple in the range (0-1, 0-1, 0-1, 0-1).
+        :type rgba: (float, float, float, float).
         """
 
-        ctx = self.context
-        (rgba_r, rgba_g, rgba_b, rgba_a) = rgba
-        ctx.set_source_rgba(rgba_r / 255, rgba_g / 255, rgba_b / 255, rgba_a)
+        self.context.set_source_rgba(*rgba)
 
     def draw_line(self, x1, y1, x2, y2, rgb, width, round_cap=True):
         """
@@ -204,8 +205,8 @@ class CairoPainter:
         :param y2: The y coordinate of the bottom right  corner.
         :type y2: float
 
-        :param rgb: The fill color, expressed as a tuple in the range (0-255, 0-255, 0-255).
-        :type rgb: (integer, integer, integer).
+        :param rgb: The fill color, expressed as a tuple in the range (0-1, 0-1, 0-1).
+        :type rgb: (float, float, float).
 
         :param width: The width of the line.
         :type width: float
@@ -220,7 +221,7 @@ class CairoPainter:
         ctx.set_line_width(width)
 
         if round_cap:
-            ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+            ctx.set_line_cap(LINE_CAP_ROUND)
 
         ctx.move_to(x1, y1)
         ctx.line_to(x2, y2)
@@ -243,11 +244,11 @@ class CairoPainter:
         :param h: The height of the rectangle.
         :type h: float
 
-        :param rgb_fill: The fill color, expressed as a tuple in the range (0-255, 0-255, 0-255).
-        :type rgb_fill: (integer, integer, integer).
+        :param rgb_fill: The fill color, expressed as a tuple in the range (0-1, 0-1, 0-1).
+        :type rgb_fill: (float, float, float).
 
-        :param rgb_stroke: The stroke color, expressed as a tuple in the range (0-255, 0-255, 0-255).
-        :type rgb_stroke: (integer, integer, integer).
+        :param rgb_stroke: The stroke color, expressed as a tuple in the range (0-1, 0-1, 0-1).
+        :type rgb_stroke: (float, float, float).
         """
 
         ctx = self.context
@@ -280,8 +281,8 @@ class CairoPainter:
         :param h: The height of the rectangle.
         :type h: float
 
-        :param rgba: The fill color, expressed as a tuple in the range (0-255, 0-255, 0-255, 0-1).
-        :type rgba: (integer, integer, integer, integer).
+        :param rgba: The fill color, expressed as a tuple in the range (0-1, 0-1, 0-1, 0-1).
+        :type rgba: (float, float, float, float).
         """
 
         ctx = self.context
@@ -311,6 +312,24 @@ class CairoPainter:
         cy = int(y + 0.5 * self.ss)
         return cx, cy
 
+    def xy_from_rc(self, row, col):
+        """
+        Get the top left corner of a tile, given its row and column.
+
+        :param row: The row of the tile.
+        :type row: integer
+
+        :param col: The column of the tile.
+        :type col: integer
+
+        :return: The coordinates of the top left corner of the tile, a tuple of floats.
+        :rtype: (float, float)
+        """
+
+        x = int((self.parent.ncols - col - 1 - 0.5) * self.ss)
+        y = int((row - 0.5) * self.ss)
+        return x, y
+
     def xy_from_tile(self, tile):
         """
         Get the top left corner of a tile.
@@ -322,9 +341,7 @@ class CairoPainter:
         :rtype: (float, float)
         """
 
-        x = int((self.parent.ncols - tile.col - 1 - 0.5) * self.ss)
-        y = int((tile.row - 0.5) * self.ss)
-        return x, y
+        return self.xy_from_rc(tile.row, tile.col)
 
     def cxy_from_tile(self, tile):
         """
@@ -363,6 +380,104 @@ class CairoPainter:
 
         self.context.restore()
 
+    def begin_layer(self, name, part=0):
+        """
+        Start a new layer of the image. Everything drawn until the next layer is part of it.
+
+        :param name: The name of the layer.
+        :type name: string.
+
+        :param part: Which part of the layer to add to. Parts are drawn in order. Defaults to 0.
+        :type part: integer.
+        """
+
+        self.context.begin_layer(name, part)
+
+    def draw_cached(self, key, draw_function, x=0, y=0):
+        """
+        Draw a shape that looks the same wherever it is drawn, at (x, y) in the current transform.
+
+        The shape is recorded once as a symbol and then placed with a transform. Native SVG images keep the symbols,
+        and other images draw the shape in full each time.
+
+        :param key: The key of the shape. Everything that changes how the shape looks should be part of it.
+        :type key: tuple.
+
+        :param draw_function: A function that draws the shape at a given point, called as draw_function(x, y).
+        :type draw_function: callable.
+
+        :param x: The x coordinate to draw the shape at. Defaults to 0.
+        :type x: float
+
+        :param y: The y coordinate to draw the shape at. Defaults to 0.
+        :type y: float
+        """
+
+        self.context.use_symbol(key, draw_function, x, y)
+
+    def add_tile_line(self, stitcher, tile, rotation, x1, y1, x2, y2, key):
+        """
+        Add a line, given in the coordinates used after transform_to_tile, to a stitcher.
+
+        :param stitcher: The stitcher to add the line to.
+        :type stitcher: PathStitcher
+
+        :param tile: The tile to consider.
+        :type tile: TileObject
+
+        :param rotation: The rotation of the line, in the range 0, 3.
+        :type rotation: integer
+
+        :param x1: The x coordinate of the start of the line.
+        :type x1: float
+
+        :param y1: The y coordinate of the start of the line.
+        :type y1: float
+
+        :param x2: The x coordinate of the end of the line.
+        :type x2: float
+
+        :param y2: The y coordinate of the end of the line.
+        :type y2: float
+
+        :param key: The style of the line, which is passed to draw_stitched_paths.
+        :type key: tuple
+        """
+
+        cx, cy = self.cxy_from_tile(tile)
+        ox = cx + 0.5
+        oy = cy + 0.5
+        (c, s) = ROTATIONS[rotation % 4]
+
+        stitcher.add(
+            ox + x1 * c - y1 * s, oy + x1 * s + y1 * c,
+            ox + x2 * c - y2 * s, oy + x2 * s + y2 * c,
+            key
+        )
+
+    def draw_stitched_paths(self, stitcher):
+        """
+        Draw the lines collected by a stitcher, with each straight run of lines stroked once.
+
+        :param stitcher: The stitcher holding the lines.
+        :type stitcher: PathStitcher
+        """
+
+        runs = stitcher.get_runs()
+        self.log_message(f"Stitched {stitcher.n_segments} lines into {len(runs)} strokes.")
+
+        for key, x1, y1, x2, y2 in runs:
+            payload = key[0]
+            if payload == "rail":
+                _, track_type, owner, line_mode, round_cap = key
+                self.draw_rail_line(x1, y1, x2, y2, track_type, line_mode=line_mode, round_cap=round_cap, owner=owner)
+            elif payload == "road":
+                _, owner, line_mode, round_cap = key
+                self.draw_road_line(x1, y1, x2, y2, line_mode=line_mode, round_cap=round_cap, owner=owner)
+            elif payload == "tram":
+                _, owner, line_mode, round_cap = key
+                self.draw_tram_line(x1, y1, x2, y2, line_mode=line_mode, round_cap=round_cap, owner=owner)
+
     def draw_square(self, tile, rgb_fill, rgb_stroke=None):
         """
         Draw a square for a given tile.
@@ -370,11 +485,11 @@ class CairoPainter:
         :param tile: The tile to consider.
         :type tile: TileObject
 
-        :param rgb: The fill color, expressed as a tuple in the range (0-255, 0-255, 0-255).
-        :type rgb: (integer, integer, integer).
+        :param rgb: The fill color, expressed as a tuple in the range (0-1, 0-1, 0-1).
+        :type rgb: (float, float, float).
 
-        :param rgb_stroke: The stroke color, expressed as a tuple in the range (0-255, 0-255, 0-255). Default is None.
-        :type rgb_stroke: (integer, integer, integer).
+        :param rgb_stroke: The stroke color, expressed as a tuple in the range (0-1, 0-1, 0-1). Default is None.
+        :type rgb_stroke: (float, float, float).
         """
 
         x, y = self.xy_from_tile(tile)
@@ -394,11 +509,10 @@ class CairoPainter:
         :type tile: TileObject
         """
 
-        if self.screen_mode == "martin":
+        if not self.style.draw_rail_backgrounds:
             return
 
-        rgb = self.player_colors[tile.owner]
-        self.draw_square(tile, rgb)
+        self.draw_square(tile, self.style.player_colors[tile.owner])
 
     def draw_rail_line(self, x1, y1, x2, y2, track_type, line_mode="outer", round_cap=False, owner=0):
         """
@@ -429,36 +543,18 @@ class CairoPainter:
         :type owner: Integer
         """
 
-        do_draw_inner = line_mode in ["inner", "both"]
-        do_draw_outer = line_mode in ["outer", "both"]
-
-        outer_rgbs = [
-                self.railway_rgb,
-                self.electrified_railway_rgb,
-                self.monorail_rgb,
-                self.maglev_rgb
-            ]
-        outer_rgb = outer_rgbs[track_type]
-        if owner is None:
-            inner_rgb = self.rail_rgb
-        else:
-            inner_rgb = self.player_colors[owner]
-
-        if self.reverse_track_rgb:
-            outer_rgb = inner_rgb
-            inner_rgb = outer_rgbs[track_type]
+        style = self.style
+        do_draw_outer, do_draw_inner = LINE_MODES[line_mode]
 
         if do_draw_outer:
-            rgb = outer_rgb
-            self.draw_line(
-                x1, y1, x2, y2, rgb, 2.5 * self.rail_width, round_cap
-            )
+            rgb = style.rail_outer_colors[track_type][owner]
+            self.draw_line(x1, y1, x2, y2, rgb, style.rail_outer_width, round_cap)
 
         if do_draw_inner:
-            rgb = inner_rgb
-            self.draw_line(x1, y1, x2, y2, rgb, self.rail_width, round_cap)
+            rgb = style.rail_inner_colors[track_type][owner]
+            self.draw_line(x1, y1, x2, y2, rgb, style.rail_width, round_cap)
 
-    def draw_rail_XY(self, tile, rotation, line_mode="outer"):
+    def draw_rail_XY(self, tile, rotation, line_mode="outer", stitcher=None):
         """
         Draw a railway track in the X or Y direction for a given tile.
 
@@ -470,10 +566,18 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean, Default is False.
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
         track_type = tile.occupant.track_type
 
+        if stitcher is not None:
+            key = ("rail", track_type, tile.owner, line_mode, False)
+            self.add_tile_line(stitcher, tile, rotation, -0.5 * self.ss, 0, 0.5 * self.ss, 0, key)
+            return
+
         self.transform_to_tile(tile, rotation)
 
         self.draw_rail_line(
@@ -483,7 +587,7 @@ class CairoPainter:
 
         self.end_transform_to_tile()
 
-    def draw_rail_NSEW(self, tile, rotation, line_mode="outer"):
+    def draw_rail_NSEW(self, tile, rotation, line_mode="outer", stitcher=None):
         """
         Draw a railway track in the N, S, E or W direction for a given tile.
 
@@ -495,10 +599,18 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is False.
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
         track_type = tile.occupant.track_type
 
+        if stitcher is not None:
+            key = ("rail", track_type, tile.owner, line_mode, True)
+            self.add_tile_line(stitcher, tile, rotation, 0, 0.5 * self.ss, 0.5 * self.ss, 0, key)
+            return
+
         self.transform_to_tile(tile, rotation)
 
         self.draw_rail_line(
@@ -508,7 +620,7 @@ class CairoPainter:
 
         self.end_transform_to_tile()
 
-    def draw_rail_X(self, tile, line_mode="outer"):
+    def draw_rail_X(self, tile, line_mode="outer", stitcher=None):
         """
         Draw a railway track in the X direction for a given tile.
 
@@ -517,11 +629,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is False.
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_rail_XY(tile, 0, line_mode=line_mode)
+        self.draw_rail_XY(tile, 0, line_mode=line_mode, stitcher=stitcher)
 
-    def draw_rail_Y(self, tile, line_mode="outer"):
+    def draw_rail_Y(self, tile, line_mode="outer", stitcher=None):
         """
         Draw a railway track in the Y direction for a given tile.
 
@@ -530,11 +645,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is False.
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_rail_XY(tile, 1, line_mode=line_mode)
+        self.draw_rail_XY(tile, 1, line_mode=line_mode, stitcher=stitcher)
 
-    def draw_rail_N(self, tile, line_mode="outer"):
+    def draw_rail_N(self, tile, line_mode="outer", stitcher=None):
         """
         Draw a railway track in the N direction for a given tile.
 
@@ -543,11 +661,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is False.
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_rail_NSEW(tile, 3, line_mode=line_mode)
+        self.draw_rail_NSEW(tile, 3, line_mode=line_mode, stitcher=stitcher)
 
-    def draw_rail_W(self, tile, line_mode="outer"):
+    def draw_rail_W(self, tile, line_mode="outer", stitcher=None):
         """
         Draw a railway track in the W direction for a given tile.
 
@@ -556,11 +677,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is False.
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_rail_NSEW(tile, 2, line_mode=line_mode)
+        self.draw_rail_NSEW(tile, 2, line_mode=line_mode, stitcher=stitcher)
 
-    def draw_rail_S(self, tile, line_mode="outer"):
+    def draw_rail_S(self, tile, line_mode="outer", stitcher=None):
         """
         Draw a railway track in the S direction for a given tile.
 
@@ -569,11 +693,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is False.
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_rail_NSEW(tile, 1, line_mode=line_mode)
+        self.draw_rail_NSEW(tile, 1, line_mode=line_mode, stitcher=stitcher)
 
-    def draw_rail_E(self, tile, line_mode="outer"):
+    def draw_rail_E(self, tile, line_mode="outer", stitcher=None):
         """
         Draw a railway track in the E direction for a given tile.
 
@@ -582,9 +709,12 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is False.
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_rail_NSEW(tile, 0, line_mode=line_mode)
+        self.draw_rail_NSEW(tile, 0, line_mode=line_mode, stitcher=stitcher)
 
     def draw_rail_depot(self, tile, rotation):
         """
@@ -600,12 +730,15 @@ class CairoPainter:
         track_type = tile.occupant.track_type
         ss = self.ss
 
+        def draw(x, y):
+            self.draw_rail_line(
+                x - 0.2 * ss, y, x + 0.5 * ss, y, track_type,
+                line_mode="both", round_cap=False, owner=tile.owner
+            )
+            self.draw_line(x - 0.2 * ss, y + 0.3 * ss, x - 0.2 * ss, y - 0.3 * ss, self.style.rail_rgb, 0.2 * ss)
+
         self.transform_to_tile(tile, rotation)
-        self.draw_rail_line(
-            -0.2 * ss, 0, 0.5 * ss, 0, track_type,
-            line_mode="both", round_cap=False, owner=tile.owner
-        )
-        self.draw_line(-0.2 * ss, 0.3 * ss, -0.2 * ss, -0.3 * ss, self.rail_rgb, 0.2 * ss)
+        self.draw_cached(("rail_depot", track_type, tile.owner), draw)
         self.end_transform_to_tile()
 
     def draw_signal(self, cx, cy, signal_era, signal_type):
@@ -625,48 +758,43 @@ class CairoPainter:
         :type signal_type: integer
         """
 
-        ctx = self.context
+        style = self.style
         r = 0.1 * self.ss
         lw = 0.025 * self.ss
 
-        stroke_rgb = (0, 0, 0)
-        fill_rgbs = [
-           (255, 255, 255),  # Block signal.
-           (255, 255, 0),    # Pre signal.
-           (100, 100, 100),  # Exit signal.
-           (255, 255, 0),    # Combo signal.
-           (255, 0, 0),      # Path signal.
-           (255, 255, 255),  # One way path signal.
-        ]
-
-        self.set_rgb(fill_rgbs[signal_type])
-        if signal_era == 0:
-            ctx.arc(cx, cy, r, 0, 2 * math.pi)
-        else:
-            ctx.rectangle(cx - r, cy - r, 2 * r, 2 * r)
-        ctx.fill()
-
-        if signal_type == 5:  # One way path signal.
-            self.set_rgb((255, 0, 0))
-            ctx.move_to(cx - r, cy)
-            ctx.line_to(cx + r, cy)
-            ctx.set_line_width(0.75 * r)
-            ctx.stroke()
+        def draw(x, y):
+            ctx = self.context
 
-        elif signal_type == 3:  # Combo signal.
-            self.set_rgb((100, 100, 100))
-            ctx.move_to(cx, cy - r)
-            ctx.line_to(cx, cy + r)
-            ctx.set_line_width(0.75 * r)
+            self.set_rgb(style.signal_fill_colors[signal_type])
+            if signal_era == 0:
+                ctx.arc(x, y, r, 0, 2 * math.pi)
+            else:
+                ctx.rectangle(x - r, y - r, 2 * r, 2 * r)
+            ctx.fill()
+
+            if signal_type == 5:  # One way path signal.
+                self.set_rgb(style.signal_one_way_color)
+                ctx.move_to(x - r, y)
+                ctx.line_to(x + r, y)
+                ctx.set_line_width(0.75 * r)
+                ctx.stroke()
+
+            elif signal_type == 3:  # Combo signal.
+                self.set_rgb(style.signal_combo_color)
+                ctx.move_to(x, y - r)
+                ctx.line_to(x, y + r)
+                ctx.set_line_width(0.75 * r)
+                ctx.stroke()
+
+            self.set_rgb(style.signal_stroke_color)
+            ctx.set_line_width(lw)
+            if signal_era == 0:
+                ctx.arc(x, y, r, 0, 2 * math.pi)
+            else:
+                ctx.rectangle(x - r, y - r, 2 * r, 2 * r)
             ctx.stroke()
 
-        self.set_rgb(stroke_rgb)
-        ctx.set_line_width(lw)
-        if signal_era == 0:
-            ctx.arc(cx, cy, r, 0, 2 * math.pi)
-        else:
-            ctx.rectangle(cx - r, cy - r, 2 * r, 2 * r)
-        ctx.stroke()
+        self.draw_cached(("signal", signal_era, signal_type), draw, cx, cy)
 
     def draw_rail_signals_tile(self, tile, rotation):
         """
@@ -744,27 +872,34 @@ class CairoPainter:
         :type payload: string.
         """
 
-        bec = self.torb_edge_rgb
-        bew = self.bridge_edge_width
+        bec = self.style.torb_edge_rgb
+        bew = self.style.bridge_edge_width
         d = self.ss
         bd = 0.25 * d
 
-        self.transform_to_tile(tile, rotation)
-
-        self.draw_line(-0.25 * d, -bd, 0.5 * d, -bd, bec, bew)
-        self.draw_line(-0.25 * d, bd, 0.5 * d, bd, bec, bew)
-
         if payload == "road":
-            self.draw_road_line(-0.5 * d, 0, 0.5 * d, 0, line_mode="both", owner=tile.owner)
-            if tile.occupant.tram_type == 1:
-                self.draw_tram_line(-0.5 * d, 0, 0.5 * d, 0, owner=tile.owner_tram)
+            has_tram = tile.occupant.tram_type == 1
+            key = ("bridge_ramp", payload, tile.owner, has_tram, tile.owner_tram)
         else:
             track_type = tile.occupant.track_type
-            self.draw_rail_line(
-                -0.5 * d, 0, 0.5 * d, 0,
-                track_type, line_mode="both", owner=tile.owner
-            )
+            key = ("bridge_ramp", payload, tile.owner, track_type)
+
+        def draw(x, y):
+            self.draw_line(x - 0.25 * d, y - bd, x + 0.5 * d, y - bd, bec, bew)
+            self.draw_line(x - 0.25 * d, y + bd, x + 0.5 * d, y + bd, bec, bew)
+
+            if payload == "road":
+                self.draw_road_line(x - 0.5 * d, y, x + 0.5 * d, y, line_mode="both", owner=tile.owner)
+                if has_tram:
+                    self.draw_tram_line(x - 0.5 * d, y, x + 0.5 * d, y, owner=tile.owner_tram)
+            else:
+                self.draw_rail_line(
+                    x - 0.5 * d, y, x + 0.5 * d, y,
+                    track_type, line_mode="both", owner=tile.owner
+                )
 
+        self.transform_to_tile(tile, rotation)
+        self.draw_cached(key, draw)
         self.end_transform_to_tile()
 
     def draw_bridge_over(self, tile, rotation, payload, track_type, has_tram, source_tile_owner):
@@ -784,8 +919,8 @@ class CairoPainter:
         :type has_tram: Boolean
         """
 
-        bec = self.torb_edge_rgb
-        bew = self.bridge_edge_width
+        bec = self.style.torb_edge_rgb
+        bew = self.style.bridge_edge_width
         d = self.ss
         bd = 0.25 * d
 
@@ -823,26 +958,33 @@ class CairoPainter:
         :type payload: string.
         """
 
-        bec = self.torb_edge_rgb
-        bew = self.bridge_edge_width
+        bec = self.style.torb_edge_rgb
+        bew = self.style.bridge_edge_width
         d = self.ss
 
-        self.transform_to_tile(tile, rotation)
+        bd = 0.3 * d
 
         if payload == "road":
-            self.draw_road_line(-0.5 * d, 0, 0.25 * d, 0, line_mode="both")
+            key = ("tunnel_mouth", payload)
         else:
             track_type = tile.occupant.track_type
-            self.draw_rail_line(
-                -0.5 * d, 0, 0.25 * d, 0, track_type,
-                line_mode="both", owner=tile.owner
-            )
+            key = ("tunnel_mouth", payload, track_type, tile.owner)
 
-        bd = 0.3 * d
-        self.draw_line(0.25 * d, -bd, 0.25 * d, bd, bec, bew)
-        self.draw_line(0.25 * d, -bd, 0, -bd, bec, bew)
-        self.draw_line(0.25 * d, bd, 0, bd, bec, bew)
+        def draw(x, y):
+            if payload == "road":
+                self.draw_road_line(x - 0.5 * d, y, x + 0.25 * d, y, line_mode="both")
+            else:
+                self.draw_rail_line(
+                    x - 0.5 * d, y, x + 0.25 * d, y, track_type,
+                    line_mode="both", owner=tile.owner
+                )
 
+            self.draw_line(x + 0.25 * d, y - bd, x + 0.25 * d, y + bd, bec, bew)
+            self.draw_line(x + 0.25 * d, y - bd, x, y - bd, bec, bew)
+            self.draw_line(x + 0.25 * d, y + bd, x, y + bd, bec, bew)
+
+        self.transform_to_tile(tile, rotation)
+        self.draw_cached(key, draw)
         self.end_transform_to_tile()
 
     def draw_rail_bridge_ramp(self, tile, rotation):
@@ -910,21 +1052,14 @@ class CairoPainter:
         :type owner: Boolean
         """
 
-        rw1 = 1.75 * self.road_width
-        rw2 = 1.25 * self.road_width
-
-        do_draw_inner = line_mode in ["inner", "both"]
-        do_draw_outer = line_mode in ["outer", "both"]
-
-        rgb = self.road_tile_rgb
-        if owner is not None:
-            rgb = self.player_colors[owner]
+        style = self.style
+        do_draw_outer, do_draw_inner = LINE_MODES[line_mode]
 
         if do_draw_outer:
-            self.draw_line(x1, y1, x2, y2, rgb, rw1, round_cap)
+            self.draw_line(x1, y1, x2, y2, style.road_outer_colors[owner], style.road_outer_width, round_cap)
 
         if do_draw_inner:
-            self.draw_line(x1, y1, x2, y2, self.road_rgb, rw2, round_cap)
+            self.draw_line(x1, y1, x2, y2, style.road_rgb, style.road_inner_width, round_cap)
 
     def draw_tram_line(self, x1, y1, x2, y2, line_mode="outer", round_cap=False, owner=None):
         """
@@ -952,18 +1087,10 @@ class CairoPainter:
         :type owner: Boolean
         """
 
-        tw = self.tram_width
-        rgb = self.tram_rgb
+        style = self.style
+        self.draw_line(x1, y1, x2, y2, style.tram_colors[owner], style.tram_width, round_cap)
 
-        if owner is not None:
-            rgb = self.player_colors[owner]
-
-        if self.screen_mode == "martin":
-            rgb = self.tram_rgb
-
-        self.draw_line(x1, y1, x2, y2, rgb, tw, round_cap)
-
-    def draw_road_NSEW(self, tile, rotation, line_mode, round_cap):
+    def draw_road_NSEW(self, tile, rotation, line_mode, round_cap, stitcher=None):
         """
         Draw a road for a given tile.
 
@@ -978,15 +1105,23 @@ class CairoPainter:
 
         :param round_cap: If True, set the line cap to round. Defaults to False.
         :type round_cap: Boolean
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
+        if stitcher is not None:
+            key = ("road", tile.owner, line_mode, False)
+            self.add_tile_line(stitcher, tile, rotation, 0, 0.5 * self.ss, 0, 0, key)
+            return
+
         self.transform_to_tile(tile, rotation)
 
         self.draw_road_line(0, 0.5 * self.ss, 0, 0, line_mode=line_mode, round_cap=False, owner=tile.owner)
 
         self.end_transform_to_tile()
 
-    def draw_road_NE(self, tile, line_mode):
+    def draw_road_NE(self, tile, line_mode, stitcher=None):
         """
         Draw a road in the NE direction for a given tile.
 
@@ -995,11 +1130,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_road_NSEW(tile, 3, line_mode=line_mode, round_cap=False)
+        self.draw_road_NSEW(tile, 3, line_mode=line_mode, round_cap=False, stitcher=stitcher)
 
-    def draw_road_NW(self, tile, line_mode):
+    def draw_road_NW(self, tile, line_mode, stitcher=None):
         """
         Draw a road in the NW direction for a given tile.
 
@@ -1008,11 +1146,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_road_NSEW(tile, 2, line_mode=line_mode, round_cap=False)
+        self.draw_road_NSEW(tile, 2, line_mode=line_mode, round_cap=False, stitcher=stitcher)
 
-    def draw_road_SE(self, tile, line_mode):
+    def draw_road_SE(self, tile, line_mode, stitcher=None):
         """
         Draw a road in the SE direction for a given tile.
 
@@ -1021,11 +1162,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_road_NSEW(tile, 0, line_mode=line_mode, round_cap=False)
+        self.draw_road_NSEW(tile, 0, line_mode=line_mode, round_cap=False, stitcher=stitcher)
 
-    def draw_road_SW(self, tile, line_mode):
+    def draw_road_SW(self, tile, line_mode, stitcher=None):
         """
         Draw a road in the SW direction for a given tile.
 
@@ -1034,11 +1178,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_road_NSEW(tile, 1, line_mode=line_mode, round_cap=False)
+        self.draw_road_NSEW(tile, 1, line_mode=line_mode, round_cap=False, stitcher=stitcher)
 
-    def draw_road_through(self, tile, line_mode, rotation):
+    def draw_road_through(self, tile, line_mode, rotation, stitcher=None):
         """
         Draw a road that goes across a given tile in the NE-SW direction.
 
@@ -1050,16 +1197,24 @@ class CairoPainter:
 
         :param rotation: The direction of the road. Should be in the range [0, 1].
         :type rotation: integer
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
         d = 0.5 * self.ss
+
+        if stitcher is not None:
+            key = ("road", tile.owner, line_mode, False)
+            self.add_tile_line(stitcher, tile, rotation, 0, -d, 0, d, key)
+            return
         self.transform_to_tile(tile, rotation)
 
         self.draw_road_line(0, -d, 0, d, line_mode=line_mode, round_cap=False, owner=tile.owner)
 
         self.end_transform_to_tile()
 
-    def draw_road_NE_to_SW(self, tile, line_mode):
+    def draw_road_NE_to_SW(self, tile, line_mode, stitcher=None):
         """
         Draw a road that goes across a given tile in the NE-SW direction.
 
@@ -1068,11 +1223,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_road_through(tile, line_mode, 1)
+        self.draw_road_through(tile, line_mode, 1, stitcher=stitcher)
 
-    def draw_road_NW_to_SE(self, tile, line_mode):
+    def draw_road_NW_to_SE(self, tile, line_mode, stitcher=None):
         """
         Draw a road that goes across a given tile in the NE-SW direction.
 
@@ -1081,11 +1239,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_road_through(tile, line_mode, 0)
+        self.draw_road_through(tile, line_mode, 0, stitcher=stitcher)
 
-    def draw_tram_NSEW(self, tile, rotation, line_mode, round_cap):
+    def draw_tram_NSEW(self, tile, rotation, line_mode, round_cap, stitcher=None):
         """
         Draw a tram for a given tile.
 
@@ -1100,15 +1261,23 @@ class CairoPainter:
 
         :param round_cap: If True, set the line cap to round. Defaults to False.
         :type round_cap: Boolean
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
+        if stitcher is not None:
+            key = ("tram", tile.owner_tram, line_mode, True)
+            self.add_tile_line(stitcher, tile, rotation, 0, 0.5 * self.ss, 0, 0, key)
+            return
+
         self.transform_to_tile(tile, rotation)
 
         self.draw_tram_line(0, 0.5 * self.ss, 0, 0, line_mode=line_mode, round_cap=True, owner=tile.owner_tram)
 
         self.end_transform_to_tile()
 
-    def draw_tram_NE(self, tile, line_mode):
+    def draw_tram_NE(self, tile, line_mode, stitcher=None):
         """
         Draw a road in the NE direction for a given tile.
 
@@ -1117,11 +1286,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_tram_NSEW(tile, 3, line_mode=line_mode, round_cap=False)
+        self.draw_tram_NSEW(tile, 3, line_mode=line_mode, round_cap=False, stitcher=stitcher)
 
-    def draw_tram_NW(self, tile, line_mode):
+    def draw_tram_NW(self, tile, line_mode, stitcher=None):
         """
         Draw a road in the NW direction for a given tile.
 
@@ -1130,11 +1302,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_tram_NSEW(tile, 2, line_mode=line_mode, round_cap=False)
+        self.draw_tram_NSEW(tile, 2, line_mode=line_mode, round_cap=False, stitcher=stitcher)
 
-    def draw_tram_SE(self, tile, line_mode):
+    def draw_tram_SE(self, tile, line_mode, stitcher=None):
         """
         Draw a road in the SE direction for a given tile.
 
@@ -1143,11 +1318,14 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_tram_NSEW(tile, 0, line_mode=line_mode, round_cap=False)
+        self.draw_tram_NSEW(tile, 0, line_mode=line_mode, round_cap=False, stitcher=stitcher)
 
-    def draw_tram_SW(self, tile, line_mode):
+    def draw_tram_SW(self, tile, line_mode, stitcher=None):
         """
         Draw a road in the SW direction for a given tile.
 
@@ -1156,9 +1334,12 @@ class CairoPainter:
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
         :type line_mode: Boolean Default is "outer".
+
+        :param stitcher: If given, add the line to the stitcher instead of drawing it. Defaults to None.
+        :type stitcher: PathStitcher
         """
 
-        self.draw_tram_NSEW(tile, 1, line_mode=line_mode, round_cap=False)
+        self.draw_tram_NSEW(tile, 1, line_mode=line_mode, round_cap=False, stitcher=stitcher)
 
     def draw_road_depot(self, tile, rotation, line_mode):
         """
@@ -1174,15 +1355,19 @@ class CairoPainter:
         ss = self.ss
 
         if line_mode == "outer":
-            self.draw_square(tile, self.road_depot_rgb, rgb_stroke=self.player_colors[tile.owner])
+            self.draw_square(tile, self.style.road_depot_rgb, rgb_stroke=self.style.player_colors[tile.owner])
 
-        self.transform_to_tile(tile, rotation)
-        self.draw_road_line(0, 0, 0, 0, line_mode=line_mode, round_cap=True, owner=tile.owner)
-        self.draw_road_line(0, 0, 0.5 * ss, 0, round_cap=False, line_mode=line_mode, owner=tile.owner)
+        has_tram = tile.occupant.tram_type == 1
+
+        def draw(x, y):
+            self.draw_road_line(x, y, x, y, line_mode=line_mode, round_cap=True, owner=tile.owner)
+            self.draw_road_line(x, y, x + 0.5 * ss, y, round_cap=False, line_mode=line_mode, owner=tile.owner)
 
-        if tile.occupant.tram_type == 1:
-            self.draw_tram_line(0, 0, 0.5 * ss, 0, round_cap=True, line_mode="outer", owner=tile.owner)
+            if has_tram:
+                self.draw_tram_line(x, y, x + 0.5 * ss, y, round_cap=True, line_mode="outer", owner=tile.owner)
 
+        self.transform_to_tile(tile, rotation)
+        self.draw_cached(("road_depot", line_mode, tile.owner, has_tram), draw)
         self.end_transform_to_tile()
 
     def draw_road_bridge_ramp(self, tile, rotation):
@@ -1329,145 +1514,81 @@ class CairoPainter:
         elif payload_kind == 1:
             self.draw_road_bridge_over(tile, rotation, has_tram, source_tile_owner)
 
-    def draw_tile_edge(self, tile, rotation, owner):
+    def draw_region_outline(self, outline, owner):
         """
-        Draw the edge of a tile.
-
-        :param tile: The current tile.
-        :type tile: integer
+        Draw the outline of a region of tiles as one path, along the edge of the region.
 
-        :param rotation: The direction of the edge, in the range [0, 7].
-        :type rotation: integer
+        :param outline: The outline of the region.
+        :type outline: RegionOutline
 
-        :param owner: The owner index. Can be None.
+        :param owner: The owner index. Can be None, or "water".
         :type owner: integer
         """
 
-        d = self.ds + 0.5
-        ew = self.edge_width
-        dew = (ew - 1) // 2
-
-        rgb = self.industry_edge_rgb
-        if owner == "water":
-            rgb = self.water_edge_rgb
-        elif owner is not None:
-            rgb = self.player_colors[owner]
-
-        self.transform_to_tile(tile, rotation)
-
-        if rotation == 0:
-            self.draw_rectangle(-d, -d - dew, self.ss, ew, rgb)
-        elif rotation < 4:
-            self.draw_rectangle(-d, -d, self.ss, ew, rgb)
-        elif rotation == 4:
-            self.draw_rectangle(-d, -d - dew, ew, ew, rgb)
-        elif rotation == 5:
-            self.draw_rectangle(-d - dew, -d, ew, ew, rgb)
-        else:
-            self.draw_rectangle(-d, -d, ew, ew, rgb)
-
-        self.end_transform_to_tile()
-
-    def draw_industry_edge(self, tile, rotation):
-        """
-        Draw the edge of an industry tile.
-
-        :param tile: The current tile.
-        :type tile: integer
-
-        :param rotation: The direction of the edge, in the range [0, 7].
-        :type rotation: integer
-        """
-
-        self.draw_tile_edge(tile, rotation, None)
-
-    def draw_station_edge(self, tile, rotation):
-        """
-        Draw the edge of a station tile.
-
-        :param tile: The current tile.
-        :type tile: integer
-
-        :param rotation: The direction of the edge, in the range [0, 7].
-        :type rotation: integer
-        """
-
-        self.draw_tile_edge(tile, rotation, tile.owner)
-
-    def draw_water_edge(self, tile, rotation):
-        """
-        Draw the edge of a water tile.
-
-        :param tile: The current tile.
-        :type tile: integer
+        ctx = self.context
+        ss = self.ss
+        ew = self.style.edge_width
 
-        :param rotation: The direction of the edge, in the range [0, 7].
-        :type rotation: integer
-        """
+        # The NW edges straddle the tile border, with (ew - 1) / 2 pixels on the outside, as they always have, and
+        # the other edges are just inside it.
+        inset = 0.5 * ew / ss
+        insets = [0.5 / ss, inset, inset, inset]
 
-        self.draw_tile_edge(tile, rotation, "water")
+        # The corner at the top left of the tile in row 0 and column 0.
+        x0 = (self.parent.ncols - 0.5) * ss + 0.5
+        y0 = -0.5 * ss + 0.5
 
-    def draw_industry_edges(self, tile, tiles):
-        """
-        Draw all the edges of an industry tile.
+        ctx.save()
+        self.set_rgb(self.style.edge_colors[owner])
+        ctx.set_line_width(ew)
+        ctx.set_line_cap(LINE_CAP_BUTT)
+        ctx.set_line_join(LINE_JOIN_MITER)
+
+        for corners, closed in outline.paths:
+            points = inset_path(corners, insets, closed, inset)
+            row, col = points[0]
+            ctx.move_to(x0 - col * ss, y0 + row * ss)
+            for row, col in points[1:]:
+                ctx.line_to(x0 - col * ss, y0 + row * ss)
+            if closed:
+                ctx.close_path()
 
-        :param tile: The current tile.
-        :type tile: integer
+        ctx.stroke()
+        ctx.restore()
 
-        :param tiles: The list of all TileObjects in the map.
-        :type tiles: list of TileObject.
+    def get_region_owner(self, outline):
         """
+        Return the owner of a region of tiles, which is the owner of most of its tiles.
 
-        industry_id = tile.occupant.industry_id
-        for direction in range(8):
-            other_tile = self.parent.tile_grid.get_tile_dir(tile, direction)
-            if not other_tile:
-                continue
+        :param outline: The outline of the region.
+        :type outline: RegionOutline
 
-            is_same_industry = other_tile.kind == 8 and other_tile.occupant.industry_id == industry_id
-            if is_same_industry:
-                continue
-            self.draw_industry_edge(tile, direction)
-
-    def draw_station_edges(self, tile, tiles):
+        :return: The owner index.
+        :rtype: integer
         """
-        Draw all the edges of a station tile.
 
-        :param tile: The current tile.
-        :type tile: integer
+        owners = collections.Counter(tile.owner for tile in outline.tiles)
+        return owners.most_common(1)[0][0]
 
-        :param tiles: The list of all TileObjects in the map.
-        :type tiles: list of TileObject.
+    def draw_region_outlines(self, outlines, owner_function):
         """
+        Draw the outlines of regions of tiles.
 
-        station_id = tile.occupant.station_id
-        for direction in range(8):
-            other_tile = self.parent.tile_grid.get_tile_dir(tile, direction)
-            if not other_tile:
-                continue
-            is_same_station = other_tile.kind == 5 and other_tile.occupant.station_id == station_id
-            if is_same_station:
-                continue
-            self.draw_station_edge(tile, direction)
+        :param outlines: The outlines of the regions.
+        :type outlines: list of RegionOutline
 
-    def draw_water_edges(self, tile, tiles):
+        :param owner_function: A function that returns the owner index of a region, from its outline.
+        :type owner_function: callable
         """
-        Draw all the edges of a water tile.
 
-        :param tile: The current tile.
-        :type tile: integer
-
-        :param tiles: The list of all TileObjects in the map.
-        :type tiles: list of TileObject.
-        """
-
-        for direction in range(8):
-            other_tile = self.parent.tile_grid.get_tile_dir(tile, direction)
-            if not other_tile:
-                continue
-            if other_tile.kind == 6:
-                continue
-            self.draw_water_edge(tile, direction)
+        if self.parent.show_progress_bar:
+            with alive_bar(len(outlines)) as abar:
+                for outline in outlines:
+                    self.draw_region_outline(outline, owner_function(outline))
+                    abar()
+        else:
+            for outline in outlines:
+                self.draw_region_outline(outline, owner_function(outline))
 
     def make_industry_shapes(self, industry_tiles):
         """
@@ -1517,387 +1638,326 @@ class CairoPainter:
 
         return station_shapes_list
 
-    def draw_tile_backgrounds(self, tiles):
+    def get_tile_color_function(self, merge_rectangles=False):
         """
-        Draw the background squares for all the tiles.
+        Return a function that works out the background colour of a tile.
 
-        :param tiles: The list of all TileObjects in the map.
-        :type tiles: list of TileObject.
+        :param merge_rectangles: If True, use the vector levels of water noise. Defaults to False.
+        :type merge_rectangles: Boolean
+
+        :return: The function, which returns the colour of a tile, and whether it has rail on it.
+        :rtype: callable
         """
 
-        def process_tile(tile):
-            h = tile.height
-            h_index = (h - self.parent.min_height) / (self.parent.max_height - self.parent.min_height)
-
-            rgb_rand_1 = random.randint(0, self.ocean_noise)
-
-            height_rgb = [0, 0, 0]
-            height_rgb[0] = self.height_rgb_low[0] + h_index * (self.height_rgb_high[0] - self.height_rgb_low[0])
-            height_rgb[1] = self.height_rgb_low[1] + h_index * (self.height_rgb_high[1] - self.height_rgb_low[1])
-            height_rgb[2] = self.height_rgb_low[2] + h_index * (self.height_rgb_high[2] - self.height_rgb_low[2])
-
-            water_rgb = (rgb_rand_1, rgb_rand_1, 255)
-            if self.screen_mode == "dark":
-                water_rgb = (rgb_rand_1 // 2, rgb_rand_1 // 2, 150)
-            if self.screen_mode == "martin":
-                water_rgb = (195 + rgb_rand_1 * 0.5, 234 + rgb_rand_1 * 0.5, 251)
-
-            fillColors = [
-                height_rgb,              # Ground
-                height_rgb,              # Rail
-                self.road_tile_rgb,      # Road
-                height_rgb,              # Town building
-                height_rgb,              # Trees
-                self.station_rgb,        # Stations
-                water_rgb,               # Water
-                height_rgb,              # Void
-                self.industry_rgb,       # Industries
-                self.torb_rgb,           # Tunnel/bridge
-                height_rgb,              # Objects
-            ]
-            fillColor = fillColors[tile.kind % len(fillColors)]
-            if tile.kind == 1:
-                rail = tile.occupant
-                if rail.is_depot:
-                    fillColor = self.rail_depot_rgb
-
-            if tile.kind == 5:
-                station = tile.occupant
-                if station.station_type == 0:
-                    fillColor = self.rail_station_rgb
-                if station.station_type == 1:
-                    fillColor = self.airport_rgb
-                if station.station_type == 2:
-                    fillColor = self.bus_station_rgb
-                if station.station_type == 3:
-                    fillColor = self.truck_station_rgb
-                if station.station_type == 4:
-                    fillColor = self.heliport_rgb
-                if station.station_type == 5:
-                    fillColor = self.seaport_rgb
-
-            self.draw_square(tile, fillColor)
-            if tile.kind == 1:
-                rail = tile.occupant
-                if not rail.is_depot:
-                    self.draw_rail_background(tile)
+        style = self.style
+        ocean_noise = style.ocean_noise
+        background_colors = style.background_colors
+        height_colors = style.height_colors(self.parent.min_height, self.parent.max_height)
+        water_colors = style.vector_water_colors if merge_rectangles else style.water_colors
 
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile)
-                    abar()
-        else:
-            for tile in tiles:
-                process_tile(tile)
+        def get_color(tile):
+            kind = tile.kind
+            water_noise = random.randint(0, ocean_noise)
 
-    def draw_rail_tile_lines(self, tiles, line_mode):
-        """
-        Draw the rail lines.
+            if kind == 6:
+                return water_colors[water_noise], False
+            elif kind == 5:
+                return style.station_colors[tile.occupant.station_type], False
+            elif kind == 1:
+                if tile.occupant.is_depot:
+                    return style.rail_depot_rgb, False
+                return height_colors[tile.height], True
 
-        :param tiles: The list of rail TileObjects in the map.
-        :type tiles: list of TileObject.
+            fillColor = background_colors[kind]
+            if fillColor is None:
+                fillColor = height_colors[tile.height]
+            return fillColor, False
 
-        :param line_mode: Whether to draw the outer or inner line for the rail.
-        :type line_mode: Boolean
+        return get_color
+
+    def draw_tile_background(self, tile, get_color):
         """
+        Draw the background square of a tile.
 
-        def process_tile(tile, line_mode):
-            rail = tile.occupant
+        :param tile: The tile to consider.
+        :type tile: TileObject
 
-            if rail.is_depot:
-                self.draw_rail_depot(tile, rail.depot_direction)
-            else:
-                if rail.track_X:
-                    self.draw_rail_X(tile, line_mode=line_mode)
-                if rail.track_Y:
-                    self.draw_rail_Y(tile, line_mode=line_mode)
-                if rail.track_N:
-                    self.draw_rail_N(tile, line_mode=line_mode)
-                if rail.track_S:
-                    self.draw_rail_S(tile, line_mode=line_mode)
-                if rail.track_W:
-                    self.draw_rail_W(tile, line_mode=line_mode)
-                if rail.track_E:
-                    self.draw_rail_E(tile, line_mode=line_mode)
+        :param get_color: The function that works out the colour of a tile, from get_tile_color_function.
+        :type get_color: callable
+        """
 
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile, line_mode)
-                    abar()
-        else:
-            for tile in tiles:
-                process_tile(tile, line_mode)
+        fillColor, is_track = get_color(tile)
+        self.draw_square(tile, fillColor)
+        if is_track:
+            self.draw_rail_background(tile)
 
-    def draw_rail_signals(self, tiles):
+    def draw_merged_tile_backgrounds(self, tiles):
         """
-        Draw the rail lines.
+        Draw the background squares for all the tiles, with tiles of the same colour merged into rectangles, and the
+        vector levels of water noise. This keeps vector images small.
 
-        :param tiles: The list of rail TileObjects in the map.
+        :param tiles: The list of all TileObjects in the map.
         :type tiles: list of TileObject.
         """
 
-        def process_tile(tile):
-            self.draw_rail_signals_tile(tile, rotation=0)
+        style = self.style
+        height_colors = style.height_colors(self.parent.min_height, self.parent.max_height)
+        rail_colors = style.player_colors if style.draw_rail_backgrounds else None
+        get_color = self.get_tile_color_function(merge_rectangles=True)
 
-        tiles = [t for t in tiles if t.occupant.has_signals]
+        # Heights change slowly across the map, so the height colours are merged on their own as a base for every
+        # tile, and only the tiles with a different colour are merged again on top.
+        base_colors = []
+        colors = []
+        for tile in tiles:
+            fillColor, is_track = get_color(tile)
+            if is_track and rail_colors:
+                fillColor = rail_colors[tile.owner]
+            height_color = height_colors[tile.height]
+            base_colors.append(height_color)
+            colors.append(None if fillColor == height_color else fillColor)
 
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile)
-                    abar()
-        else:
-            for tile in tiles:
-                process_tile(tile)
+        nrows, ncols = self.parent.nrows, self.parent.ncols
+        rectangles = merge_tile_rectangles(base_colors, nrows, ncols) + merge_tile_rectangles(colors, nrows, ncols)
+        self.log_message(f"Merged {len(tiles)} background tiles into {len(rectangles)} rectangles.")
 
-    def draw_road_tile_lines(self, tiles, line_mode):
-        """
-        Draw the road lines.
+        for row, col, height, width, fillColor in rectangles:
+            x, y = self.xy_from_rc(row, col + width - 1)
+            self.draw_rectangle(x, y, width * self.ss, height * self.ss, fillColor, rgb_stroke=fillColor)
 
-        :param tiles: The list of road TileObjects in the map.
-        :type tiles: list of TileObject.
+    def draw_rail_tile(self, tile, line_mode, stitcher):
         """
+        Draw the rail lines of a tile. The track is added to a stitcher, to be drawn as long lines after the depots.
 
-        def process_tile(tile, line_mode):
-            road = tile.occupant
+        :param tile: The rail tile to consider.
+        :type tile: TileObject
 
-            if road.is_depot:
-                self.draw_road_depot(tile, road.depot_direction, line_mode=line_mode)
+        :param line_mode: Whether to draw the outer or inner line for the rail.
+        :type line_mode: string.
 
-            elif road.is_level_crossing:
-                self.draw_level_crossing(tile, road.level_crossing_direction)
+        :param stitcher: The stitcher to add the track to.
+        :type stitcher: PathStitcher
+        """
 
-            else:
-                has_stub = False
-
-                if road.road_NW and not road.road_SE:
-                    has_stub = True
-                if road.road_SW and not road.road_NE:
-                    has_stub = True
-                if road.road_SE and not road.road_NW:
-                    has_stub = True
-                if road.road_NE and not road.road_SW:
-                    has_stub = True
-
-                if has_stub:
-                    self.transform_to_tile(tile, 0)
-                    self.draw_road_line(0, 0, 0, 0, line_mode=line_mode, round_cap=True, owner=tile.owner)
-                    self.end_transform_to_tile()
-
-                if road.road_NW and not road.road_SE:
-                    self.draw_road_NW(tile, line_mode)
-                if road.road_SW and not road.road_NE:
-                    self.draw_road_SW(tile, line_mode)
-                if road.road_SE and not road.road_NW:
-                    self.draw_road_SE(tile, line_mode)
-                if road.road_NE and not road.road_SW:
-                    self.draw_road_NE(tile, line_mode)
-
-                if road.road_NW and road.road_SE:
-                    self.draw_road_NW_to_SE(tile, line_mode)
-                if road.road_SW and road.road_NE:
-                    self.draw_road_NE_to_SW(tile, line_mode)
+        rail = tile.occupant
 
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile, line_mode)
-                    abar()
+        if rail.is_depot:
+            self.draw_rail_depot(tile, rail.depot_direction)
         else:
-            for tile in tiles:
-                process_tile(tile, line_mode)
+            if rail.track_X:
+                self.draw_rail_X(tile, line_mode=line_mode, stitcher=stitcher)
+            if rail.track_Y:
+                self.draw_rail_Y(tile, line_mode=line_mode, stitcher=stitcher)
+            if rail.track_N:
+                self.draw_rail_N(tile, line_mode=line_mode, stitcher=stitcher)
+            if rail.track_S:
+                self.draw_rail_S(tile, line_mode=line_mode, stitcher=stitcher)
+            if rail.track_W:
+                self.draw_rail_W(tile, line_mode=line_mode, stitcher=stitcher)
+            if rail.track_E:
+                self.draw_rail_E(tile, line_mode=line_mode, stitcher=stitcher)
+
+    def draw_road_tile(self, tile, line_mode, stitcher):
+        """
+        Draw the road lines of a tile. The roads are added to a stitcher, to be drawn as long lines after the depots,
+        level crossings and dead ends.
+
+        :param tile: The road tile to consider.
+        :type tile: TileObject
 
-    def draw_tram_tile_lines(self, tiles, line_mode):
-        """
-        Draw the tram lines.
+        :param line_mode: Whether to draw the outer or inner line for the road.
+        :type line_mode: string.
 
-        :param tiles: The list of road TileObjects in the map.
-        :type tiles: list of TileObject.
+        :param stitcher: The stitcher to add the roads to.
+        :type stitcher: PathStitcher
         """
 
-        def process_tile(tiles, line_mode):
-            road = tile.occupant
+        road = tile.occupant
 
-            if road.is_depot:
-                return
+        if road.is_depot:
+            self.draw_road_depot(tile, road.depot_direction, line_mode=line_mode)
 
-            elif road.is_level_crossing:
-                return
+        elif road.is_level_crossing:
+            self.draw_level_crossing(tile, road.level_crossing_direction)
 
-            else:
-                if road.tram_NW:
-                    self.draw_tram_NW(tile, line_mode)
-                if road.tram_SW:
-                    self.draw_tram_SW(tile, line_mode)
-                if road.tram_SE:
-                    self.draw_tram_SE(tile, line_mode)
-                if road.tram_NE:
-                    self.draw_tram_NE(tile, line_mode)
-
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile, line_mode)
-                    abar()
         else:
-            for tile in tiles:
-                process_tile(tile, line_mode)
+            has_stub = False
+
+            if road.road_NW and not road.road_SE:
+                has_stub = True
+            if road.road_SW and not road.road_NE:
+                has_stub = True
+            if road.road_SE and not road.road_NW:
+                has_stub = True
+            if road.road_NE and not road.road_SW:
+                has_stub = True
+
+            if has_stub:
+                self.transform_to_tile(tile, 0)
+                self.draw_road_line(0, 0, 0, 0, line_mode=line_mode, round_cap=True, owner=tile.owner)
+                self.end_transform_to_tile()
+
+            if road.road_NW and not road.road_SE:
+                self.draw_road_NW(tile, line_mode, stitcher=stitcher)
+            if road.road_SW and not road.road_NE:
+                self.draw_road_SW(tile, line_mode, stitcher=stitcher)
+            if road.road_SE and not road.road_NW:
+                self.draw_road_SE(tile, line_mode, stitcher=stitcher)
+            if road.road_NE and not road.road_SW:
+                self.draw_road_NE(tile, line_mode, stitcher=stitcher)
+
+            if road.road_NW and road.road_SE:
+                self.draw_road_NW_to_SE(tile, line_mode, stitcher=stitcher)
+            if road.road_SW and road.road_NE:
+                self.draw_road_NE_to_SW(tile, line_mode, stitcher=stitcher)
+
+    def draw_tram_tile(self, tile, line_mode, stitcher):
+        """
+        Draw the tram lines of a road tile. The tram lines are added to a stitcher, to be drawn as long lines.
+
+        :param tile: The road tile to consider.
+        :type tile: TileObject
+
+        :param line_mode: Whether to draw the outer or inner line for the tram line.
+        :type line_mode: string.
 
-    def draw_stations_with_lines(self, tiles, all_tiles, line_mode="both"):
+        :param stitcher: The stitcher to add the tram lines to.
+        :type stitcher: PathStitcher
         """
-        Draw the stations with lines.
 
-        :param tiles: The list of stations TileObjects in the map.
-        :type tiles: list of TileObject.
+        road = tile.occupant
 
-        :param all_tiles: The list of all TileObjects in the map.
-        :type tiles: list of TileObject.
+        if road.is_depot or road.is_level_crossing:
+            return
+
+        if road.tram_NW:
+            self.draw_tram_NW(tile, line_mode, stitcher=stitcher)
+        if road.tram_SW:
+            self.draw_tram_SW(tile, line_mode, stitcher=stitcher)
+        if road.tram_SE:
+            self.draw_tram_SE(tile, line_mode, stitcher=stitcher)
+        if road.tram_NE:
+            self.draw_tram_NE(tile, line_mode, stitcher=stitcher)
+
+    def draw_station_tile(self, tile, line_mode="both"):
+        """
+        Draw the lines of a station tile.
+
+        :param tile: The station tile to consider.
+        :type tile: TileObject
 
         :param line_mode: Whether to draw the outer or inner line for the payload.
-        :type line_mode: Boolean
+        :type line_mode: string.
         """
 
-        def process_tile(tile, all_tiles, line_mode):
-            station = tile.occupant
-            self.draw_station_edges(tile, all_tiles)
+        station = tile.occupant
 
-            if station.station_type == 0:
-                if station.track_direction == 0:
-                    self.draw_rail_X(tile, line_mode="both")
-                else:
-                    self.draw_rail_Y(tile, line_mode="both")
+        if station.station_type == 0:
+            if station.track_direction == 0:
+                self.draw_rail_X(tile, line_mode="both")
+            else:
+                self.draw_rail_Y(tile, line_mode="both")
 
-            elif station.station_type in [2, 3]:
-                has_stub = False
+        elif station.station_type in [2, 3]:
+            has_stub = False
 
-                if station.road_NW and not station.road_SE:
-                    has_stub = True
-                if station.road_SW and not station.road_NE:
-                    has_stub = True
-                if station.road_SE and not station.road_NW:
-                    has_stub = True
-                if station.road_NE and not station.road_SW:
-                    has_stub = True
+            if station.road_NW and not station.road_SE:
+                has_stub = True
+            if station.road_SW and not station.road_NE:
+                has_stub = True
+            if station.road_SE and not station.road_NW:
+                has_stub = True
+            if station.road_NE and not station.road_SW:
+                has_stub = True
 
-                if has_stub:
-                    self.transform_to_tile(tile, 0)
-                    self.draw_road_line(0, 0, 0, 0, line_mode=line_mode, round_cap=True, owner=tile.owner)
-                    self.end_transform_to_tile()
+            if has_stub:
+                self.transform_to_tile(tile, 0)
+                self.draw_road_line(0, 0, 0, 0, line_mode=line_mode, round_cap=True, owner=tile.owner)
+                self.end_transform_to_tile()
 
-                if station.road_NW and not station.road_SE:
-                    self.draw_road_NW(tile, line_mode="both")
+            if station.road_NW and not station.road_SE:
+                self.draw_road_NW(tile, line_mode="both")
 
-                if station.road_SW and not station.road_NE:
-                    self.draw_road_SW(tile, line_mode="both")
+            if station.road_SW and not station.road_NE:
+                self.draw_road_SW(tile, line_mode="both")
 
-                if station.road_SE and not station.road_NW:
-                    self.draw_road_SE(tile, line_mode="both")
+            if station.road_SE and not station.road_NW:
+                self.draw_road_SE(tile, line_mode="both")
 
-                if station.road_NE and not station.road_SW:
-                    self.draw_road_NE(tile, line_mode="both")
+            if station.road_NE and not station.road_SW:
+                self.draw_road_NE(tile, line_mode="both")
 
-                if station.road_NW and station.road_SE:
-                    self.draw_road_NW_to_SE(tile, line_mode="both")
+            if station.road_NW and station.road_SE:
+                self.draw_road_NW_to_SE(tile, line_mode="both")
 
-                if station.road_SW and station.road_NE:
-                    self.draw_road_NE_to_SW(tile, line_mode="both")
+            if station.road_SW and station.road_NE:
+                self.draw_road_NE_to_SW(tile, line_mode="both")
 
-            if station.station_type == 7:
-                if station.track_direction == 0:
-                    self.draw_rail_X(tile, line_mode="inner")
-                else:
-                    self.draw_rail_Y(tile, line_mode="inner")
+        if station.station_type == 7:
+            if station.track_direction == 0:
+                self.draw_rail_X(tile, line_mode="inner")
+            else:
+                self.draw_rail_Y(tile, line_mode="inner")
 
-        # Draw tram lines last, to make sure they fit over the roads.
-        def process_tile_tram(tile, all_tiles):
-            station = tile.occupant
+    def draw_station_tile_trams(self, tile):
+        """
+        Draw the tram lines of a bus or truck stop tile. These are drawn after every station tile, to make sure they
+        fit over the roads.
 
-            if station.station_type in [2, 3]:
-                if tile.occupant.tram_type == 1:
-                    if station.road_NW:
-                        self.draw_tram_NW(tile, line_mode="both")
+        :param tile: The bus or truck stop tile to consider.
+        :type tile: TileObject
+        """
 
-                    if station.road_SW:
-                        self.draw_tram_SW(tile, line_mode="both")
+        station = tile.occupant
 
-                    if station.road_SE:
-                        self.draw_tram_SE(tile, line_mode="both")
+        if station.tram_type != 1:
+            return
 
-                    if station.road_NE:
-                        self.draw_tram_NE(tile, line_mode="both")
+        if station.road_NW:
+            self.draw_tram_NW(tile, line_mode="both")
 
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile, all_tiles, line_mode)
-                    abar()
-        else:
-            for tile in tiles:
-                process_tile(tile, all_tiles, line_mode)
+        if station.road_SW:
+            self.draw_tram_SW(tile, line_mode="both")
 
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile_tram(tile, all_tiles)
-                    abar()
-        else:
-            for tile in tiles:
-                process_tile_tram(tile, all_tiles)
+        if station.road_SE:
+            self.draw_tram_SE(tile, line_mode="both")
 
-    def draw_tunnel_mouths_and_bridge_ramps(self, tiles):
-        """
-        Draw the tunnel mouths and bridge ramps.
+        if station.road_NE:
+            self.draw_tram_NE(tile, line_mode="both")
 
-        :param tiles: The list of tunnel or bridge TileObjects in the map.
-        :type tiles: list of TileObject.
+    def draw_tunnel_mouth_or_bridge_ramp(self, tile):
         """
+        Draw the tunnel mouth or bridge ramp of a tile.
 
-        def process_tile(tile):
-            torb = tile.occupant
+        :param tile: The tunnel or bridge tile to consider.
+        :type tile: TileObject
+        """
 
-            if torb.is_tunnel:
-                if torb.payload_kind == 0:
-                    self.draw_rail_tunnel_mouth(tile, torb.entrance_direction)
-                elif torb.payload_kind == 1:
-                    self.draw_road_tunnel_mouth(tile, torb.entrance_direction)
-            else:
-                if torb.payload_kind == 0:
-                    self.draw_rail_bridge_ramp(tile, torb.entrance_direction)
-                elif torb.payload_kind == 1:
-                    self.draw_road_bridge_ramp(tile, torb.entrance_direction)
+        torb = tile.occupant
 
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile)
-                    abar()
+        if torb.is_tunnel:
+            if torb.payload_kind == 0:
+                self.draw_rail_tunnel_mouth(tile, torb.entrance_direction)
+            elif torb.payload_kind == 1:
+                self.draw_road_tunnel_mouth(tile, torb.entrance_direction)
         else:
-            for tile in tiles:
-                process_tile(tile)
+            if torb.payload_kind == 0:
+                self.draw_rail_bridge_ramp(tile, torb.entrance_direction)
+            elif torb.payload_kind == 1:
+                self.draw_road_bridge_ramp(tile, torb.entrance_direction)
 
-    def draw_bridges_over(self, tiles):
+    def draw_bridge_over_tile(self, tile, all_tiles):
         """
-        Draw the bridges over tiles, where they exist.
+        Draw the bridge over a tile.
 
-        :param tiles: The list of all TileObjects in the map.
-        :type tiles: list of TileObject.
-        """
+        :param tile: The tile with a bridge over it.
+        :type tile: TileObject
 
-        def process_tile(tile):
-            if not tile.bridge:
-                return
-            self.draw_unknown_bridge_over(tiles, tile, tile.bridge - 1)
+        :param all_tiles: The list of all TileObjects in the map, used to find the bridge ramps.
+        :type all_tiles: list of TileObject.
+        """
 
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile)
-                    abar()
-        else:
-            for tile in tiles:
-                process_tile(tile)
+        self.draw_unknown_bridge_over(all_tiles, tile, tile.bridge - 1)
 
     def draw_industry_tiles(self, tiles, all_tiles):
         """
@@ -1910,17 +1970,8 @@ class CairoPainter:
         :type all_tiles: list of TileObject.
         """
 
-        def process_tile(tile, all_tiles):
-            self.draw_industry_edges(tile, all_tiles)
-
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile, all_tiles)
-                    abar()
-        else:
-            for tile in tiles:
-                process_tile(tile, all_tiles)
+        outlines = make_region_outlines(tiles, lambda tile: tile.occupant.industry_id, self.parent.tile_grid)
+        self.draw_region_outlines(outlines, lambda outline: None)
 
     def draw_water_tiles(self, tiles, all_tiles):
         """
@@ -1933,43 +1984,34 @@ class CairoPainter:
         :type all_tiles: list of TileObject.
         """
 
-        def process_tile(tile, all_tiles):
-            self.draw_water_edges(tile, all_tiles)
-
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile, all_tiles)
-                    abar()
-        else:
-            for tile in tiles:
-                process_tile(tile, all_tiles)
+        outlines = make_region_outlines(tiles, lambda tile: 0, self.parent.tile_grid)
+        self.draw_region_outlines(outlines, lambda outline: "water")
 
-    def draw_building_tiles(self, tiles):
+    def draw_building(self, x, y):
         """
-        Draw the industry tiles.
+        Draw a town building at a given point.
 
-        :param tiles: The list of building TileObjects in the map.
-        :type tiles: list of TileObject.
-        """
+        :param x: The x coordinate of the centre of the building.
+        :type x: float
 
-        def process_tile(tile):
-            d = 0.3 * self.ss
+        :param y: The y coordinate of the centre of the building.
+        :type y: float
+        """
 
-            self.transform_to_tile(tile, 0)
+        d = 0.3 * self.ss
+        self.draw_rectangle(x - d, y - d, 2 * d, 2 * d, self.style.town_building_rgb)
 
-            self.draw_rectangle(-d, -d, 2 * d, 2 * d, self.town_building_rgb)
+    def draw_building_tile(self, tile):
+        """
+        Draw a building tile.
 
-            self.end_transform_to_tile()
+        :param tile: The building tile to consider.
+        :type tile: TileObject
+        """
 
-        if self.parent.show_progress_bar:
-            with alive_bar(len(tiles)) as abar:
-                for tile in tiles:
-                    process_tile(tile)
-                    abar()
-        else:
-            for tile in tiles:
-                process_tile(tile)
+        self.transform_to_tile(tile, 0)
+        self.draw_cached(("building",), self.draw_building)
+        self.end_transform_to_tile()
 
     def draw_label(self, text, font_size, cx, cy):
         """
@@ -1990,7 +2032,7 @@ class CairoPainter:
 
         context = self.context
         context.select_font_face(
-            "Arial", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_NORMAL
+            "Arial", FONT_SLANT_NORMAL, FONT_WEIGHT_NORMAL
         )
         context.set_font_size(font_size)
         (tx, ty, tw, th, tdx, tdy) = context.text_extents(text)
@@ -1999,7 +2041,7 @@ class CairoPainter:
         x = cx - tw / 2 - padding
         y = cy - th / 2 - padding
 
-        self.draw_rectangle_rgba(x, y, tw + 2 * padding, th + 2 * padding, (255, 255, 255, 0.5))
+        self.draw_rectangle_rgba(x, y, tw + 2 * padding, th + 2 * padding, self.style.label_background_rgba)
 
         context.set_source_rgb(0, 0, 0)
         context.move_to(cx - tw / 2, cy + 0.25 * font_size)
@@ -2045,107 +2087,588 @@ class CairoPainter:
 
             context.restore()
 
-    def save_image(self, image_file_path, filetype="PNG"):
+    def get_image_size(self):
         """
-        Save the image to file.
-
-        :param image_file_path: The path to the file, excluding the extension.
-        :type image_file_path: string.
-
-        :param filetype: The filetype to the image. Defaults to 'PNG'.
-        :type filetype: string.
+        Work out the size of the image.
 
-        :return: A list of list of TileObjects, one list per industry.
-        :rtype: list of lists of TileObjects
+        :return: The width and height of the image.
+        :rtype: (integer, integer)
         """
 
         iw = self.ss * (self.parent.ncols - 1)
         ih = self.ss * (self.parent.nrows - 1)
 
-        logline = f"Dimensions of tile size, image before resizing: {self.ss}, {iw} x {ih}"
+        logline = f"Dimensions of tile size, image: {self.ss}, {iw} x {ih}"
         self.log_message(logline)
 
-        max_dimension = max(iw, ih)
-        if max_dimension > 32767:
-            rho = 32767 / max_dimension
-            self.ss = int(rho * self.ss)
-            self.ds = int(rho * self.ds)
-            iw = self.ss * (self.parent.ncols - 1)
-            ih = self.ss * (self.parent.nrows - 1)
+        return iw, ih
 
-        logline = f"Dimensions of tile size, image after resizing : {self.ss}, {iw} x {ih}"
-        self.log_message(logline)
+    def make_display_list(self, merge_rectangles=False):
+        """
+        Go through the tiles and record everything that should be drawn, layer by layer.
 
-        if filetype == "PNG":
-            self.image = cairo.ImageSurface(cairo.FORMAT_ARGB32, iw, ih)
-        elif filetype == "SVG":
-            self.image = cairo.SVGSurface(f"{image_file_path}", iw, ih)
+        :param merge_rectangles: If True, merge the tile backgrounds into rectangles, which keeps vector images small.
+            Defaults to False.
+        :type merge_rectangles: Boolean
+
+        :return: The display list of the map.
+        :rtype: DisplayList
+        """
+
+        iw, ih = self.get_image_size()
 
-        self.context = cairo.Context(self.image)
+        # Text is measured with Cairo, so that the label backgrounds fit the text. Without Cairo, it is estimated.
+        cairo = import_cairo(required=False)
+        measure_context = None
+        if cairo is not None:
+            measure_context = cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1))
+        self.context = RecordingContext(iw, ih, self.ss, measure_context=measure_context)
 
         all_tiles = self.parent.tiles
-        rail_tiles = [t for t in all_tiles if t.kind == 1]
-        road_tiles = [t for t in all_tiles if t.kind == 2]
-        building_tiles = [t for t in all_tiles if t.kind == 3]
-        stations_tiles = [t for t in all_tiles if t.kind == 5]
-        water_tiles = [t for t in all_tiles if t.kind == 6]
-        industry_tiles = [t for t in all_tiles if t.kind == 8]
-        torb_tiles = [t for t in all_tiles if t.kind == 9]
+        tile_index = self.parent.tile_index
+        stations_tiles = tile_index.get_kind(5)
+        water_tiles = tile_index.get_kind(6)
+        industry_tiles = tile_index.get_kind(8)
 
         self.industry_shapes = self.make_industry_shapes(industry_tiles)
         self.station_shapes = self.make_station_shapes(stations_tiles)
 
-        self.log_message("Drawing tile backgrounds.")
-        self.draw_tile_backgrounds(all_tiles)
+        # Begin the layers in the order they are drawn in, so that they keep it however they are added to.
+        for name in LAYERS:
+            self.begin_layer(name)
+
+        # Everything that is drawn tile by tile is drawn in one walk over the map, with each pass adding to its own
+        # layer. The roads, rails and trams are stitched into long lines, which are drawn after the walk.
+        stitchers = {
+            name: PathStitcher() for name in ["roads-outer", "rails-outer", "roads-inner", "trams", "rails-inner"]
+        }
+        scheduler = TileScheduler(self)
+        rail_indices = tile_index.kinds[1]
+        road_indices = tile_index.kinds[2]
+        road_stop_indices = sorted(tile_index.station_types[2] + tile_index.station_types[3])
+
+        if not merge_rectangles:
+            scheduler.add_pass("backgrounds", self.draw_tile_background, args=(self.get_tile_color_function(),))
+        scheduler.add_pass("roads-outer", self.draw_road_tile, road_indices, args=("outer", stitchers["roads-outer"]))
+        scheduler.add_pass("rails-outer", self.draw_rail_tile, rail_indices, args=("outer", stitchers["rails-outer"]))
+        scheduler.add_pass("stations", self.draw_station_tile, tile_index.kinds[5], part=1)
+        scheduler.add_pass("stations", self.draw_station_tile_trams, road_stop_indices, part=2)
+        scheduler.add_pass("tunnels-and-bridge-ramps", self.draw_tunnel_mouth_or_bridge_ramp, tile_index.kinds[9])
+        scheduler.add_pass("buildings", self.draw_building_tile, tile_index.kinds[3])
+        scheduler.add_pass("roads-inner", self.draw_road_tile, road_indices, args=("inner", stitchers["roads-inner"]))
+        scheduler.add_pass("trams", self.draw_tram_tile, road_indices, args=("inner", stitchers["trams"]))
+        scheduler.add_pass("rails-inner", self.draw_rail_tile, rail_indices, args=("inner", stitchers["rails-inner"]))
+        scheduler.add_pass("signals", self.draw_rail_signals_tile, tile_index.signals, args=(0,))
+        scheduler.add_pass("bridges", self.draw_bridge_over_tile, tile_index.bridged, args=(all_tiles,))
+
+        self.log_message("Drawing tiles.")
+        scheduler.run(all_tiles, self.parent.nrows, self.parent.ncols)
+
+        for name, stitcher in stitchers.items():
+            self.begin_layer(name)
+            self.draw_stitched_paths(stitcher)
+
+        if merge_rectangles:
+            self.begin_layer("backgrounds")
+            self.log_message("Drawing tile backgrounds.")
+            self.draw_merged_tile_backgrounds(all_tiles)
+
+        # The edges of each station are drawn first, as one outline per station.
+        self.begin_layer("stations")
+        self.log_message("Drawing station outlines.")
+        outlines = make_region_outlines(stations_tiles, lambda tile: tile.occupant.station_id, self.parent.tile_grid)
+        self.draw_region_outlines(outlines, self.get_region_owner)
+
+        self.begin_layer("industries")
+        self.log_message("Drawing industry tiles.")
+        self.draw_industry_tiles(industry_tiles, all_tiles)
 
-        self.log_message("Drawing road tiles.")
-        self.draw_road_tile_lines(road_tiles, line_mode="outer")
+        self.begin_layer("water")
+        self.log_message("Drawing water tiles.")
+        self.draw_water_tiles(water_tiles, all_tiles)
 
-        if self.show_roads:
-            self.log_message("Drawing rail tiles.")
-            self.draw_rail_tile_lines(rail_tiles, line_mode="outer")
+        self.begin_layer("labels")
+        self.log_message("Drawing industry labels.")
+        self.draw_industry_labels()
 
-        self.log_message("Drawing station tiles.")
-        self.draw_stations_with_lines(stations_tiles, all_tiles)
+        # Station names don't work yet. I hope to add them in the future.
+        # self.log_message("Drawing station labels.")
+        # self.draw_station_labels()
 
-        self.log_message("Drawing tunnel mouth and bridge ramp tiles.")
-        self.draw_tunnel_mouths_and_bridge_ramps(torb_tiles)
+        display_list = self.context.finish()
+        self.context = None
+        self.log_message(f"Recorded {len(display_list)} primitives, with {len(display_list.symbols)} symbols.")
+        return display_list
 
-        self.log_message("Drawing building tiles.")
-        self.draw_building_tiles(building_tiles)
+    def set_layer_visible(self, name, visible=True):
+        """
+        Show or hide a layer. Images that are put together from the layer cache can then be remade without drawing
+        anything, with recomposite.
 
-        self.log_message("Drawing industry tiles.")
-        self.draw_industry_tiles(industry_tiles, all_tiles)
+        :param name: The name of the layer.
+        :type name: string.
 
-        self.log_message("Drawing water tiles.")
-        self.draw_water_tiles(water_tiles, all_tiles)
+        :param visible: If True, show the layer, otherwise hide it. Defaults to True.
+        :type visible: Boolean
+        """
 
-        if self.show_roads:
-            self.log_message("Drawing road tiles.")
-            self.draw_road_tile_lines(road_tiles, line_mode="inner")
+        if visible:
+            self.hidden_layers.discard(name)
+        else:
+            self.hidden_layers.add(name)
 
-        self.log_message("Drawing tram tiles.")
-        self.draw_tram_tile_lines(road_tiles, line_mode="inner")
+    def get_visible_layers(self, display_list):
+        """
+        Return the names of the layers of a display list that should be drawn.
 
-        self.log_message("Drawing rail tiles.")
-        self.draw_rail_tile_lines(rail_tiles, line_mode="inner")
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
 
-        if self.show_signals:
-            self.log_message("Drawing rail signals.")
-            self.draw_rail_signals(rail_tiles)
+        :return: The names of the layers.
+        :rtype: set of strings
+        """
 
-        self.log_message("Drawing bridges over tiles.")
-        self.draw_bridges_over(all_tiles)
+        return {name for name in display_list.layers if name not in self.hidden_layers}
 
-        self.log_message("Drawing industry labels.")
-        self.draw_industry_labels()
+    def get_layer_cache(self, display_list, scale):
+        """
+        Return the layer cache for a display list, keeping the layers that were drawn before if they have not
+        changed, so that restyling one layer only draws that layer again.
 
-        # Station names don't work yet. I hope to add them in the future.
-        # self.log_message("Drawing station labels.")
-        # self.draw_station_labels()
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param scale: How much to scale the display list by.
+        :type scale: float
+
+        :return: The layer cache.
+        :rtype: LayerCache
+        """
+
+        if self.layer_cache is None or self.layer_cache.scale != scale:
+            self.layer_cache = LayerCache(scale=scale)
+
+        if self.layer_cache.display_list is not display_list:
+            changed = self.layer_cache.update(display_list)
+            self.log_message(f"{len(changed)} of {len(self.layer_cache.digests)} layers need drawing.")
+
+        return self.layer_cache
+
+    def recomposite(self, image_file_path, compression_level=COMPRESSION_LEVEL, indexed=False):
+        """
+        Put the PNG image together again from the layer cache, with the layers that are visible now, and save it to
+        file. Nothing is drawn, so this is quick. save_image with a layers directory should be called first.
+
+        :param image_file_path: The path to the file.
+        :type image_file_path: string.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write an image with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+        """
+
+        if self.layer_cache is None:
+            raise ValueError("There are no cached layers. Save an image with a layers directory first.")
+
+        image = self.layer_cache.composite(self.get_visible_layers(self.layer_cache.display_list))
+        write_surface_png(
+            image, image_file_path.replace(".sav", ".png"), compression_level=compression_level, indexed=indexed
+        )
+
+    def get_display_list_scale(self, display_list, max_size=CAIRO_MAX_SIZE):
+        """
+        Return how much to scale a display list by to draw it at the current tile size, keeping the image within a
+        largest size.
+
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param max_size: The largest the width or height of the image can be, or None if there is no limit. Defaults
+            to the largest size Cairo can draw in one go.
+        :type max_size: integer.
+
+        :return: The scale.
+        :rtype: float
+        """
+
+        scale = self.ss / display_list.ss
+        max_dimension = scale * max(display_list.width, display_list.height)
+        if max_size is not None and max_dimension > max_size:
+            scale *= max_size / max_dimension
+        return scale
+
+    def make_indexed_image(self, style, samples=1):
+        """
+        Draw the map as the colour class of each pixel, so that it can be coloured in for any style that draws the
+        same shapes.
+
+        :param style: The style to draw the shapes with. Only its shapes matter.
+        :type style: CompiledStyle
+
+        :param samples: How many samples to draw for each pixel, across and down, for anti-aliasing. Defaults to 1.
+        :type samples: integer.
+
+        :return: The indexed image.
+        :rtype: IndexedImage
+        """
+
+        class_style = style.with_color_classes()
+        current_style = self.style
+        self.style = class_style
+        try:
+            display_list = self.make_display_list()
+        finally:
+            self.style = current_style
+
+        scale = self.get_display_list_scale(display_list)
+        max_samples = max(1, int(CAIRO_MAX_SIZE / (scale * max(display_list.width, display_list.height))))
+        if samples > max_samples:
+            self.log_message(f"Reducing the samples per pixel from {samples} to {max_samples}.")
+            samples = max_samples
+
+        indexed_image = IndexedImage.render(
+            display_list, class_style.color_classes, scale=scale, samples=samples,
+            layers=self.get_visible_layers(display_list)
+        )
+        self.log_message(f"Drew {len(indexed_image.classes) - 1} colour classes.")
+        return indexed_image
+
+    def save_themed_images(self, image_file_path, settings_file_paths, samples=1, compression_level=COMPRESSION_LEVEL,
+                           indexed=False):
+        """
+        Save a PNG image of the map for each of several config files, drawing the map once for each set of configs
+        that draw the same shapes, and colouring it in for each config with a palette.
+
+        :param image_file_path: The path to the file. The name of each config is added to it.
+        :type image_file_path: string.
+
+        :param settings_file_paths: The paths to the config files.
+        :type settings_file_paths: list of strings.
+
+        :param samples: How many samples to draw for each pixel, across and down, for anti-aliasing. Defaults to 1.
+        :type samples: integer.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write images with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+
+        :return: The paths to the images.
+        :rtype: list of strings
+        """
+
+        styles = []
+        for settings_file_path in settings_file_paths:
+            with open(settings_file_path) as file_handle:
+                styles.append(self.compile_style(json.load(file_handle)))
+
+        groups = {}
+        for settings_file_path, style in zip(settings_file_paths, styles):
+            groups.setdefault(style.get_shape_key(), []).append((settings_file_path, style))
+
+        root, extension = os.path.splitext(image_file_path.replace(".sav", ".png"))
+        image_file_paths = []
+        for group in groups.values():
+            indexed_image = self.make_indexed_image(group[0][1], samples=samples)
+            for settings_file_path, style in group:
+                name = os.path.splitext(os.path.basename(settings_file_path))[0]
+                themed_file_path = f"{root}_{name}{extension or '.png'}"
+                self.log_message(f"Writing {themed_file_path}.")
+                indexed_image.write_png(
+                    indexed_image.make_palette(style), themed_file_path, compression_level=compression_level,
+                    indexed=indexed
+                )
+                image_file_paths.append(themed_file_path)
+
+        self.log_message("All done!")
+        return image_file_paths
+
+    def write_display_list(self, display_list, image_file_path, filetype="PNG", layers_dir=None, backend="cairo",
+                           compression_level=COMPRESSION_LEVEL, indexed=False, quality=QUALITY):
+        """
+        Draw a display list on a new image, and save it to file.
+
+        The display list is scaled to the current tile size. Layers that are hidden are left out.
+
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param image_file_path: The path to the file.
+        :type image_file_path: string.
+
+        :param filetype: The filetype to the image. One of 'PNG', 'SVG', 'SVGZ' (gzipped SVG), or 'CAIRO_SVG' (SVG
+            written by Cairo rather than streamed). Defaults to 'PNG'.
+        :type filetype: string.
+
+        :param layers_dir: For PNG images, a directory to also write each layer to, as a transparent PNG. The layers
+            are kept in the layer cache, and the image is put together from them. Defaults to None.
+        :type layers_dir: string.
+
+        :param backend: The painter backend to draw PNG images with, one of PAINTER_BACKENDS. The layer cache always
+            uses Cairo. Defaults to 'cairo'.
+        :type backend: string.
+
+        :param compression_level: The zlib compression level of PNG images, from 0 to 9. Defaults to
+            COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write PNG images with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+
+        :param quality: The quality to draw PNG images at, one of QUALITIES, which sets how much detail is drawn at
+            each tile size. Defaults to QUALITY.
+        :type quality: string.
+        """
+
+        # PNG images are drawn band by band if they are big, so only the layer cache needs the whole image to fit
+        # on one Cairo surface.
+        max_size = CAIRO_MAX_SIZE if filetype != "PNG" or layers_dir is not None else None
+        scale = self.get_display_list_scale(display_list, max_size=max_size)
+        iw, ih = get_scaled_size(display_list, scale)
+
+        if scale != 1:
+            self.log_message(f"Scaling the display list by {scale:.3f}, to {iw} x {ih}")
+
+        layers = self.get_visible_layers(display_list)
 
         if filetype == "PNG":
-            self.log_message("Writing PNG file to disk.")
-            image_file_path = image_file_path.replace(".sav", ".png")
-            self.image.write_to_png(image_file_path)
+            if layers_dir is not None:
+                layer_cache = self.get_layer_cache(display_list, scale)
+                self.log_message(f"Writing the layers to {layers_dir}.")
+                layer_cache.write_layers(layers_dir, compression_level=compression_level, indexed=indexed)
+                image = layer_cache.composite(layers)
+                self.log_message("Writing PNG file to disk.")
+                write_surface_png(
+                    image, image_file_path.replace(".sav", ".png"), compression_level=compression_level,
+                    indexed=indexed
+                )
+            else:
+                painter_backend = get_painter_backend(backend)(self, quality=quality)
+                self.log_message(f"Drawing the PNG file with the {backend} backend.")
+                painter_backend.write_png(
+                    display_list, image_file_path.replace(".sav", ".png"), scale, layers,
+                    compression_level=compression_level, indexed=indexed
+                )
             self.log_message("All done!")
+
+        elif filetype == "CAIRO_SVG":
+            cairo = import_cairo()
+            image = cairo.SVGSurface(f"{image_file_path}", iw, ih)
+            replay(display_list, cairo.Context(image), scale=scale, layers=layers)
+            image.finish()
+
+        elif filetype in ("SVG", "SVGZ"):
+            writer = SvgWriter(image_file_path, iw, ih, compress=filetype == "SVGZ")
+            replay(display_list, writer.context, scale=scale, layers=layers, begin_layer=writer.begin_layer)
+            writer.close()
+            self.log_message(f"Wrote {writer.n_elements} elements to {image_file_path}.")
+
+        else:
+            raise ValueError(f"Unknown filetype: {filetype}.")
+
+    def save_image(self, image_file_path, filetype="PNG", display_list_path=None, layers_dir=None, backend="cairo",
+                   compression_level=COMPRESSION_LEVEL, indexed=False, quality=QUALITY):
+        """
+        Save the image to file.
+
+        Drawing happens in two stages: the tiles are turned into a display list, which is then drawn on the image.
+        If a display list path is given, the display list is saved there, and loaded from there next time, which
+        skips the tiles entirely. The display list is scaled to the current tile size, so one display list can be
+        used for any filetype and tile size, as long as it was made from the same save file and config.
+
+        :param image_file_path: The path to the file, excluding the extension.
+        :type image_file_path: string.
+
+        :param filetype: The filetype to the image. One of 'PNG', 'SVG', 'SVGZ' (gzipped SVG), or 'CAIRO_SVG' (SVG
+            written by Cairo rather than streamed). Defaults to 'PNG'.
+        :type filetype: string.
+
+        :param display_list_path: The path to a display list file (.npz) to load, or to save to. Defaults to None.
+        :type display_list_path: string.
+
+        :param layers_dir: For PNG images, a directory to also write each layer to, as a transparent PNG. Defaults to
+            None.
+        :type layers_dir: string.
+
+        :param backend: The painter backend to draw PNG images with, one of PAINTER_BACKENDS. Defaults to 'cairo'.
+        :type backend: string.
+
+        :param compression_level: The zlib compression level of PNG images, from 0 to 9. Defaults to
+            COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write PNG images with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+
+        :param quality: The quality to draw PNG images at, one of QUALITIES, which sets how much detail is drawn at
+            each tile size. Defaults to QUALITY.
+        :type quality: string.
+        """
+
+        display_list = self.get_display_list(filetype=filetype, display_list_path=display_list_path)
+        self.write_display_list(
+            display_list, image_file_path, filetype=filetype, layers_dir=layers_dir, backend=backend,
+            compression_level=compression_level, indexed=indexed, quality=quality
+        )
+
+    def get_display_list_key(self, merge_rectangles=False):
+        """
+        Return what a display list of the map is recorded from: digests of the save and of the config, and whether
+        the tile backgrounds are merged. A saved list with a different key would draw a different map.
+
+        :param merge_rectangles: If True, the tile backgrounds are merged. Defaults to False.
+        :type merge_rectangles: boolean.
+
+        :return: The key, as saved with the list.
+        :rtype: dict
+        """
+
+        config = json.dumps([self.settings, self.settings_rgb_values], sort_keys=True)
+        return {
+            "save": hashlib.sha1(self.parent.raw_source).hexdigest(),
+            "config": hashlib.sha1(config.encode()).hexdigest(),
+            "merge_rectangles": merge_rectangles,
+        }
+
+    def get_display_list(self, filetype="PNG", display_list_path=None):
+        """
+        Return the display list of the map, loading it from file if there is one that was recorded from the same
+        save and config, and otherwise recording it, and saving it to file if a path is given. The tiles are only
+        read if the list has to be recorded.
+
+        :param filetype: The filetype of the image it is for. Vector images merge the tile backgrounds. Defaults to
+            'PNG'.
+        :type filetype: string.
+
+        :param display_list_path: The path to a display list file (.npz) to load, or to save to. Defaults to None.
+        :type display_list_path: string.
+
+        :return: The display list of the map.
+        :rtype: DisplayList
+        """
+
+        merge_rectangles = filetype != "PNG"
+        key = self.get_display_list_key(merge_rectangles=merge_rectangles)
+
+        display_list = None
+        if display_list_path and os.path.exists(display_list_path):
+            display_list = DisplayList.load(display_list_path)
+            if display_list is None:
+                self.log_message(f"The display list in {display_list_path} is from another version, recording it again")
+            elif display_list.key != key:
+                changed = [name for name in key if (display_list.key or {}).get(name) != key[name]]
+                self.log_message(
+                    f"The display list in {display_list_path} has a different {', '.join(changed)}, recording it again"
+                )
+                display_list = None
+            else:
+                self.log_message(f"Loaded {len(display_list)} primitives from {display_list_path}")
+
+        if display_list is None:
+            if getattr(self.parent, "tile_grid", None) is None:
+                self.parent.ingest_data()
+            display_list = self.make_display_list(merge_rectangles=merge_rectangles)
+            display_list.key = key
+            if display_list_path:
+                display_list.save(display_list_path)
+                self.log_message(f"Saved the display list to {display_list_path}")
+
+        return display_list
+
+    def write_draft_png(self, display_list, image_file_path, backend="cairo", compression_level=COMPRESSION_LEVEL,
+                        indexed=False):
+        """
+        Draw a display list quickly, as a draft of the image: smaller, and with less detail.
+
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param image_file_path: The path to the file.
+        :type image_file_path: string.
+
+        :param backend: The painter backend to draw with, one of PAINTER_BACKENDS. Defaults to 'cairo'.
+        :type backend: string.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write an image with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+        """
+
+        tile_size = min(self.ss, max(self.ss / DRAFT_SHRINK, DRAFT_MIN_TILE_SIZE))
+        scale = self.get_display_list_scale(display_list, max_size=None) * tile_size / self.ss
+        painter_backend = get_painter_backend(backend)(self, quality="draft")
+        painter_backend.write_png(
+            display_list, image_file_path, scale, self.get_visible_layers(display_list),
+            compression_level=compression_level, indexed=indexed
+        )
+
+    def save_image_sizes(self, image_file_path, tile_sizes, display_list_path=None, backend="cairo",
+                         compression_level=COMPRESSION_LEVEL, indexed=False, redraw_sizes=(), quality=QUALITY):
+        """
+        Save a PNG image of the map at each of several tile sizes, drawing it once, at the largest size, and
+        shrinking it to the others by averaging the areas of the pixels, band by band as it is drawn.
+
+        Shrinking blurs small details like signals together, so sizes where they matter can be drawn again instead.
+
+        :param image_file_path: The path to the file. The tile size is added to it.
+        :type image_file_path: string.
+
+        :param tile_sizes: The tile sizes.
+        :type tile_sizes: list of integers.
+
+        :param display_list_path: The path to a display list file (.npz) to load, or to save to. Defaults to None.
+        :type display_list_path: string.
+
+        :param backend: The painter backend to draw with, one of PAINTER_BACKENDS. Defaults to 'cairo'.
+        :type backend: string.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write images with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+
+        :param redraw_sizes: The tile sizes to draw again from the display list rather than shrink. Defaults to none.
+        :type redraw_sizes: collection of integers.
+
+        :param quality: The quality to draw at, one of QUALITIES. The detail is worked out for the largest size, and
+            for each size drawn again. Defaults to QUALITY.
+        :type quality: string.
+
+        :return: The paths to the images, keyed by tile size.
+        :rtype: dict
+        """
+
+        display_list = self.get_display_list(display_list_path=display_list_path)
+        layers = self.get_visible_layers(display_list)
+        painter_backend = get_painter_backend(backend)(self, quality=quality)
+
+        root, extension = os.path.splitext(image_file_path.replace(".sav", ".png"))
+        paths = {tile_size: f"{root}_{tile_size}{extension or '.png'}" for tile_size in tile_sizes}
+        largest = max(tile_sizes)
+        resized = [
+            (paths[tile_size],) + get_scaled_size(display_list, tile_size / display_list.ss)
+            for tile_size in sorted(tile_sizes, reverse=True) if tile_size != largest and tile_size not in redraw_sizes
+        ]
+
+        self.log_message(f"Drawing tile size {largest}, and shrinking it to {len(resized)} smaller sizes.")
+        painter_backend.write_png(
+            display_list, paths[largest], largest / display_list.ss, layers, compression_level=compression_level,
+            indexed=indexed, resized=resized
+        )
+
+        for tile_size in sorted(tile_sizes, reverse=True):
+            if tile_size != largest and tile_size in redraw_sizes:
+                self.log_message(f"Drawing tile size {tile_size} again.")
+                painter_backend.write_png(
+                    display_list, paths[tile_size], tile_size / display_list.ss, layers,
+                    compression_level=compression_level, indexed=indexed
+                )
+
+        self.log_message("All done!")
+        return paths
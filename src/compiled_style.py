@@ -0,0 +1,407 @@
+#!/usr/bin/python3
+
+import types
+
+import webcolors
+
+# Which of the outer and inner lines to draw for each line mode.
+LINE_MODES = {
+    "outer": (True, False),
+    "inner": (False, True),
+    "both": (True, True),
+}
+
+# The colour slots that can be set in a config file, with their default values.
+COLOR_DEFAULTS = {
+    "height_rgb_low": (255, 255, 255),
+    "height_rgb_high": (200, 200, 200),
+
+    "road_tile_rgb": (100, 100, 100),
+    "rail_rgb": (255, 255, 255),
+    "road_rgb": (255, 255, 255),
+    "tram_rgb": (255, 255, 255),
+
+    "railway_rgb": (100, 100, 100),
+    "electrified_railway_rgb": (200, 200, 200),
+    "monorail_rgb": (150, 150, 150),
+    "maglev_rgb": (100, 100, 100),
+
+    "town_building_rgb": (255, 255, 255),
+    "industry_rgb": (255, 165, 0),
+    "industry_edge_rgb": (0, 0, 0),
+    "torb_rgb": (150, 150, 150),
+    "objects_rgb": (150, 150, 150),
+    "torb_edge_rgb": (0, 100, 100),
+    "water_edge_rgb": (0, 0, 255),
+
+    "station_rgb": (255, 0, 255),
+    "rail_station_rgb": (255, 0, 255),
+    "bus_station_rgb": (255, 0, 255),
+    "truck_station_rgb": (255, 0, 255),
+    "airport_rgb": (255, 255, 0),
+    "seaport_rgb": (0, 255, 255),
+    "heliport_rgb": (255, 255, 0),
+
+    "rail_depot_rgb": (0, 100, 100),
+    "road_depot_rgb": (0, 100, 100),
+    "ship_depot_rgb": (0, 100, 100),
+}
+
+# The colours of the signals, which are not configurable.
+SIGNAL_FILL_RGBS = [
+    (255, 255, 255),  # Block signal.
+    (255, 255, 0),    # Pre signal.
+    (100, 100, 100),  # Exit signal.
+    (255, 255, 0),    # Combo signal.
+    (255, 0, 0),      # Path signal.
+    (255, 255, 255),  # One way path signal.
+]
+SIGNAL_STROKE_RGB = (0, 0, 0)
+SIGNAL_ONE_WAY_RGB = (255, 0, 0)
+SIGNAL_COMBO_RGB = (100, 100, 100)
+
+# The attributes that change the shapes that are drawn, rather than their colours. Styles that agree on these draw
+# the same shapes, so one index image can be coloured in for all of them.
+SHAPE_ATTRIBUTES = (
+    "ocean_noise",
+    "draw_rail_backgrounds",
+    "rail_width",
+    "rail_outer_width",
+    "road_width",
+    "road_outer_width",
+    "road_inner_width",
+    "tram_width",
+    "bridge_edge_width",
+    "edge_width",
+)
+
+
+def resolve_rgb(value, rgb_values):
+    """
+    Turn a colour from a config file into a tuple of 3 ints.
+
+    :param value: The colour, either a tuple of 3 ints, a name from rgb_values.json, or a CSS colour name.
+    :type value: (integer, integer, integer) or string.
+
+    :param rgb_values: The named colours from rgb_values.json.
+    :type rgb_values: dict.
+
+    :return: The RGB values, in the range (0-255, 0-255, 0-255). Unknown names are black.
+    :rtype: (integer, integer, integer)
+    """
+
+    if isinstance(value, str):
+        if value in rgb_values:
+            return rgb_values[value]
+
+        try:
+            return webcolors.name_to_rgb(value)
+        except ValueError:
+            return (0, 0, 0)
+
+    return value
+
+
+def normalize_rgb(rgb):
+    """
+    Convert a colour to the range used by Cairo.
+
+    :param rgb: The colour, in the range (0-255, 0-255, 0-255).
+    :type rgb: (integer, integer, integer).
+
+    :return: The colour, in the range (0-1, 0-1, 0-1).
+    :rtype: (float, float, float)
+    """
+
+    (rgb_r, rgb_g, rgb_b) = rgb
+    return (rgb_r / 255, rgb_g / 255, rgb_b / 255)
+
+
+class CompiledStyle:
+    def __init__(self, settings, rgb_values, default_player_colors, ss, ds):
+        """
+        Compile the settings from a config file into the colours and widths used when drawing.
+
+        Everything that only depends on the settings is worked out here once, so that the draw functions only have to
+        look values up. Colours are stored in the range used by Cairo. A CompiledStyle can not be changed once made.
+
+        :param settings: The settings loaded from the config file.
+        :type settings: dict.
+
+        :param rgb_values: The named colours from rgb_values.json.
+        :type rgb_values: dict.
+
+        :param default_player_colors: The player colours to use if the config file has none.
+        :type default_player_colors: list of (integer, integer, integer).
+
+        :param ss: The size of a tile.
+        :type ss: integer.
+
+        :param ds: Half the size of a tile.
+        :type ds: integer.
+        """
+
+        self.screen_mode = settings.get("screen_mode", "normal")
+        self.reverse_track_rgb = settings.get("reverse_track_rgb", False)
+        self.ocean_noise = settings.get("ocean_noise", 50)
+        self.vector_ocean_noise_levels = max(1, settings.get("vector_ocean_noise_levels", 1))
+        self.color_classes = None
+
+        # The colours from the config file, keyed by slot name, are also set as attributes.
+        self.rgbs = types.MappingProxyType({
+            rgb_name: resolve_rgb(settings.get(rgb_name, default_value), rgb_values)
+            for rgb_name, default_value in COLOR_DEFAULTS.items()
+        })
+        self.colors = types.MappingProxyType({rgb_name: normalize_rgb(rgb) for rgb_name, rgb in self.rgbs.items()})
+        for rgb_name, color in self.colors.items():
+            setattr(self, rgb_name, color)
+
+        player_rgbs = [
+            resolve_rgb(rgb, rgb_values) for rgb in settings.get("player_colors", default_player_colors)
+        ]
+        self.player_colors = tuple(normalize_rgb(rgb) for rgb in player_rgbs)
+        owners = list(range(len(self.player_colors)))
+
+        # Thicknesses of various elements.
+        self.rail_width = ds / 3
+        self.rail_outer_width = 2.5 * self.rail_width
+        self.road_width = ds / 2
+        self.road_outer_width = 1.75 * self.road_width
+        self.road_inner_width = 1.25 * self.road_width
+        self.tram_width = ds / 5
+        self.bridge_edge_width = ss / 10
+        self.edge_width = int(0.1 * ss)
+        if self.edge_width % 2 == 0:
+            self.edge_width += 1
+
+        # The outer and inner colours of the rails, per track type and owner.
+        track_colors = (
+            self.railway_rgb,
+            self.electrified_railway_rgb,
+            self.monorail_rgb,
+            self.maglev_rgb
+        )
+        rail_outer_colors = []
+        rail_inner_colors = []
+        for track_color in track_colors:
+            inner_colors = {owner: self.player_colors[owner] for owner in owners}
+            inner_colors[None] = self.rail_rgb
+            outer_colors = {owner: track_color for owner in inner_colors}
+            if self.reverse_track_rgb:
+                outer_colors, inner_colors = inner_colors, outer_colors
+            rail_outer_colors.append(types.MappingProxyType(outer_colors))
+            rail_inner_colors.append(types.MappingProxyType(inner_colors))
+        self.rail_outer_colors = tuple(rail_outer_colors)
+        self.rail_inner_colors = tuple(rail_inner_colors)
+
+        road_outer_colors = {owner: self.player_colors[owner] for owner in owners}
+        road_outer_colors[None] = self.road_tile_rgb
+        self.road_outer_colors = types.MappingProxyType(road_outer_colors)
+
+        if self.screen_mode == "martin":
+            tram_colors = {owner: self.tram_rgb for owner in owners}
+        else:
+            tram_colors = {owner: self.player_colors[owner] for owner in owners}
+        tram_colors[None] = self.tram_rgb
+        self.tram_colors = types.MappingProxyType(tram_colors)
+
+        edge_colors = {owner: self.player_colors[owner] for owner in owners}
+        edge_colors[None] = self.industry_edge_rgb
+        edge_colors["water"] = self.water_edge_rgb
+        self.edge_colors = types.MappingProxyType(edge_colors)
+
+        # The background of each tile kind. None means that the colour depends on the height of the tile.
+        background_colors = [
+            None,                    # Ground
+            None,                    # Rail
+            self.road_tile_rgb,      # Road
+            None,                    # Town building
+            None,                    # Trees
+            self.station_rgb,        # Stations
+            None,                    # Water
+            None,                    # Void
+            self.industry_rgb,       # Industries
+            self.torb_rgb,           # Tunnel/bridge
+            None,                    # Objects
+        ]
+        self.background_colors = tuple(background_colors[kind % len(background_colors)] for kind in range(16))
+
+        self.station_colors = (
+            self.rail_station_rgb,
+            self.airport_rgb,
+            self.bus_station_rgb,
+            self.truck_station_rgb,
+            self.heliport_rgb,
+            self.seaport_rgb,
+            self.station_rgb,
+            self.station_rgb
+        )
+
+        self.water_colors = tuple(normalize_rgb(self.water_rgb(noise)) for noise in range(self.ocean_noise + 1))
+
+        # Vector images only use a few levels of noise, so that water tiles can be merged into large rectangles.
+        self.vector_water_colors = tuple(
+            normalize_rgb(self.water_rgb(self.quantize_noise(noise))) for noise in range(self.ocean_noise + 1)
+        )
+        self.draw_rail_backgrounds = self.screen_mode != "martin"
+
+        self.signal_fill_colors = tuple(normalize_rgb(rgb) for rgb in SIGNAL_FILL_RGBS)
+        self.signal_stroke_color = normalize_rgb(SIGNAL_STROKE_RGB)
+        self.signal_one_way_color = normalize_rgb(SIGNAL_ONE_WAY_RGB)
+        self.signal_combo_color = normalize_rgb(SIGNAL_COMBO_RGB)
+        self.label_background_rgba = (1.0, 1.0, 1.0, 0.5)
+
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"CompiledStyle is immutable, can not set {name}.")
+
+        super().__setattr__(name, value)
+
+    def with_color_classes(self):
+        """
+        Return a copy of the style where each colour is replaced by a stand-in for its colour class, which says where
+        the colour comes from, such as ("rail_outer_colors", track_type, owner). A stand-in is a colour with a negative
+        red value, -1 - the index of its class in color_classes, and the alpha of the colour it stands in for.
+
+        Anything drawn with the copy can be coloured in for any style with resolve_color_class.
+
+        :return: The copy.
+        :rtype: CompiledStyle
+        """
+
+        style = CompiledStyle.__new__(CompiledStyle)
+        style.color_classes = []
+        style.color_class_ids = {}
+        for name, value in self.__dict__.items():
+            if name not in ("_frozen", "color_classes", "rgbs"):
+                setattr(style, name, style.classify_colors(value, (name,)))
+        style.rgbs = self.rgbs
+        style._frozen = True
+        return style
+
+    def classify_colors(self, value, key):
+        """
+        Replace the colours in a value by the stand-ins for their colour classes, if this style has colour classes.
+
+        :param value: A colour, or a tuple, list or mapping that holds colours.
+        :type value: any.
+
+        :param key: The colour class of the value, to which the index or key of each colour inside it is added.
+        :type key: tuple.
+
+        :return: The value, with the colours replaced.
+        :rtype: any
+        """
+
+        if self.color_classes is None or value is None:
+            return value
+
+        if isinstance(value, (tuple, list)) and len(value) in (3, 4) and all(
+            isinstance(channel, (int, float)) for channel in value
+        ):
+            class_id = self.color_class_ids.get(key)
+            if class_id is None:
+                class_id = len(self.color_classes)
+                self.color_class_ids[key] = class_id
+                self.color_classes.append(key)
+            return (-1 - class_id, 0.0, 0.0) + tuple(value[3:])
+
+        if isinstance(value, tuple):
+            return tuple(self.classify_colors(item, key + (index,)) for index, item in enumerate(value))
+        if isinstance(value, list):
+            return [self.classify_colors(item, key + (index,)) for index, item in enumerate(value)]
+        if isinstance(value, types.MappingProxyType):
+            return types.MappingProxyType({
+                item_key: self.classify_colors(item, key + (item_key,)) for item_key, item in value.items()
+            })
+        return value
+
+    def resolve_color_class(self, key):
+        """
+        Return the colour of a colour class in this style.
+
+        :param key: The colour class, from the color_classes of a style made with with_color_classes.
+        :type key: tuple.
+
+        :return: The colour, in the range used by Cairo, with or without alpha.
+        :rtype: (float, float, float) or (float, float, float, float)
+        """
+
+        if key[0] == "height_colors":
+            return self.height_colors(key[1], key[2])[key[3]]
+
+        value = getattr(self, key[0])
+        for part in key[1:]:
+            value = value[part]
+        return value
+
+    def get_shape_key(self):
+        """
+        Return the settings that change the shapes that are drawn.
+
+        :return: The values of the SHAPE_ATTRIBUTES.
+        :rtype: tuple
+        """
+
+        return tuple(getattr(self, name) for name in SHAPE_ATTRIBUTES)
+
+    def water_rgb(self, noise):
+        """
+        Return the colour of a water tile.
+
+        :param noise: The random noise of the tile, in the range [0, ocean_noise].
+        :type noise: integer.
+
+        :return: The RGB values, in the range (0-255, 0-255, 0-255).
+        :rtype: (float, float, float)
+        """
+
+        if self.screen_mode == "martin":
+            return (195 + noise * 0.5, 234 + noise * 0.5, 251)
+        if self.screen_mode == "dark":
+            return (noise // 2, noise // 2, 150)
+        return (noise, noise, 255)
+
+    def quantize_noise(self, noise):
+        """
+        Round the noise of a water tile to one of vector_ocean_noise_levels evenly spaced levels.
+        With a single level, every tile gets the middle level.
+
+        :param noise: The random noise of the tile, in the range [0, ocean_noise].
+        :type noise: integer.
+
+        :return: The rounded noise.
+        :rtype: integer
+        """
+
+        levels = self.vector_ocean_noise_levels
+        if levels == 1 or self.ocean_noise == 0:
+            return self.ocean_noise // 2
+
+        step = self.ocean_noise / (levels - 1)
+        return int(round(round(noise / step) * step))
+
+    def height_colors(self, min_height, max_height):
+        """
+        Return the background colour for each height of the map.
+
+        :param min_height: The lowest height on the map.
+        :type min_height: integer.
+
+        :param max_height: The highest height on the map.
+        :type max_height: integer.
+
+        :return: The colours, indexed by height. Heights below min_height are None.
+        :rtype: list of (float, float, float)
+        """
+
+        low = self.rgbs["height_rgb_low"]
+        high = self.rgbs["height_rgb_high"]
+
+        colors = [None] * (max_height + 1)
+        for h in range(min_height, max_height + 1):
+            h_index = (h - min_height) / (max_height - min_height)
+            colors[h] = normalize_rgb([low[i] + h_index * (high[i] - low[i]) for i in range(3)])
+        return self.classify_colors(colors, ("height_colors", min_height, max_height))
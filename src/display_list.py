@@ -0,0 +1,764 @@
+#!/usr/bin/python3
+
+import array
+import json
+import math
+
+import numpy as np
+
+from drawing_context import (
+    LINE_CAP_BUTT, LINE_CAP_ROUND, LINE_JOIN_MITER, PATH_ARC, PATH_CLOSE, PATH_COORD_COUNTS, PATH_LINE, PATH_MOVE,
+    PATH_RECTANGLE, DrawingContext, DrawingState
+)
+
+# The kinds of primitive in a display list.
+PRIMITIVE_FILL = 0
+PRIMITIVE_STROKE = 1
+PRIMITIVE_TEXT = 2
+PRIMITIVE_USE = 3
+
+# Primitives that define a symbol are kept in this layer, and are only drawn when the symbol is used.
+SYMBOL_LAYER = 255
+
+# How far past its end a miter join can reach, as a multiple of the line width, with Cairo's default miter limit.
+MITER_REACH = 5
+
+# The version of the file format written by DisplayList.save.
+DISPLAY_LIST_VERSION = 1
+
+
+class DisplayList:
+    def __init__(self, width, height, ss):
+        """
+        Make a DisplayList, which holds everything drawn for a map as a list of primitives, so that it can be drawn
+        again on any surface, at any scale, without going through the tiles.
+
+        Each primitive has a kind, a style id, a layer and a path. The paths are stored as commands and numbers in
+        the coordinates of the image, in flat arrays shared by all the primitives. Styles, layer names, texts and
+        symbols are stored once in tables.
+
+        :param width: The width of the image.
+        :type width: integer.
+
+        :param height: The height of the image.
+        :type height: integer.
+
+        :param ss: The size of a tile when the list was made.
+        :type ss: integer.
+        """
+
+        self.width = width
+        self.height = height
+        self.ss = ss
+
+        # What the list was recorded from, so that a saved list is only used for the same save and config.
+        self.key = None
+
+        self.kinds = array.array("B")
+        self.style_ids = array.array("L")
+        self.layer_ids = array.array("B")
+        self.path_starts = array.array("L")
+
+        self.commands = array.array("B")
+        self.coords = array.array("d")
+        self.coord_starts = array.array("L")
+
+        self.styles = []
+        self.style_lookup = {}
+        self.layers = []
+        self.texts = []
+        self.text_primitives = array.array("L")
+        self.symbols = []
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def get_style_id(self, style):
+        """
+        Return the id of a style, adding it to the table of styles the first time it is used.
+
+        :param style: The style.
+        :type style: tuple.
+
+        :return: The id of the style.
+        :rtype: integer
+        """
+
+        style_id = self.style_lookup.get(style)
+        if style_id is None:
+            style_id = len(self.styles)
+            self.style_lookup[style] = style_id
+            self.styles.append(style)
+        return style_id
+
+    def add_primitive(self, kind, style_id, layer_id, path):
+        """
+        Add a primitive to the list.
+
+        :param kind: The kind of the primitive.
+        :type kind: integer.
+
+        :param style_id: The id of the style of the primitive, or of the symbol for PRIMITIVE_USE.
+        :type style_id: integer.
+
+        :param layer_id: The id of the layer of the primitive.
+        :type layer_id: integer.
+
+        :param path: The commands of the path, in the coordinates of the image.
+        :type path: list of tuples.
+        """
+
+        self.kinds.append(kind)
+        self.style_ids.append(style_id)
+        self.layer_ids.append(layer_id)
+
+        # This is called for every primitive, so the arrays are looked up once.
+        commands = self.commands
+        coords = self.coords
+        coord_starts = self.coord_starts
+        self.path_starts.append(len(commands))
+        for command in path:
+            commands.append(command[0])
+            coord_starts.append(len(coords))
+            coords.extend(command[1:])
+
+    def extend(self, other):
+        """
+        Add the primitives of another list to the end of this one. Only the primitives and their texts are added:
+        the other list must use the style and symbol ids of this one.
+
+        :param other: The list to add.
+        :type other: DisplayList
+        """
+
+        n_primitives = len(self)
+        n_commands = len(self.commands)
+        n_coords = len(self.coords)
+
+        self.kinds.extend(other.kinds)
+        self.style_ids.extend(other.style_ids)
+        self.layer_ids.extend(other.layer_ids)
+        self.commands.extend(other.commands)
+        self.coords.extend(other.coords)
+        self.texts.extend(other.texts)
+
+        for starts, other_starts, offset in (
+            (self.path_starts, other.path_starts, n_commands),
+            (self.coord_starts, other.coord_starts, n_coords),
+            (self.text_primitives, other.text_primitives, n_primitives),
+        ):
+            starts.frombytes((np.frombuffer(other_starts, dtype=other_starts.typecode) + offset).astype(
+                starts.typecode
+            ).tobytes())
+
+    def save(self, file_path):
+        """
+        Save the list to a compressed NumPy file, so that it can be loaded instead of drawing the map again.
+
+        :param file_path: The path to the file. NumPy adds the .npz extension if it is missing.
+        :type file_path: string.
+        """
+
+        tables = {
+            "version": DISPLAY_LIST_VERSION,
+            "width": self.width,
+            "height": self.height,
+            "ss": self.ss,
+            "key": self.key,
+            "styles": self.styles,
+            "layers": self.layers,
+            "texts": self.texts,
+            "symbols": self.symbols,
+        }
+
+        np.savez_compressed(
+            file_path,
+            kinds=np.frombuffer(self.kinds, dtype=np.uint8),
+            style_ids=np.array(self.style_ids, dtype=np.uint32),
+            layer_ids=np.frombuffer(self.layer_ids, dtype=np.uint8),
+            path_starts=np.array(self.path_starts, dtype=np.uint32),
+            commands=np.frombuffer(self.commands, dtype=np.uint8),
+            coords=np.frombuffer(self.coords, dtype=np.float64),
+            text_primitives=np.array(self.text_primitives, dtype=np.uint32),
+            tables=np.array(json.dumps(tables)),
+        )
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Load a list saved by save.
+
+        :param file_path: The path to the file.
+        :type file_path: string.
+
+        :return: The list, or None if the file was written by a different version.
+        :rtype: DisplayList
+        """
+
+        with np.load(file_path) as data:
+            tables = json.loads(str(data["tables"]))
+            if tables.get("version") != DISPLAY_LIST_VERSION:
+                return None
+
+            display_list = cls(tables["width"], tables["height"], tables["ss"])
+            display_list.key = tables.get("key")
+            display_list.kinds = array.array("B", data["kinds"].tobytes())
+            display_list.style_ids = array.array("L", data["style_ids"].tolist())
+            display_list.layer_ids = array.array("B", data["layer_ids"].tobytes())
+            display_list.path_starts = array.array("L", data["path_starts"].tolist())
+            display_list.commands = array.array("B", data["commands"].tobytes())
+            display_list.coords = array.array("d", data["coords"].tobytes())
+            display_list.text_primitives = array.array("L", data["text_primitives"].tolist())
+
+            # Where the numbers of each command start follows from the commands.
+            coord_counts = np.array(PATH_COORD_COUNTS, dtype=np.int64)[data["commands"]]
+            coord_starts = np.cumsum(coord_counts) - coord_counts
+            display_list.coord_starts = array.array("L", coord_starts.tolist())
+
+        display_list.styles = [tuple(style) for style in tables["styles"]]
+        display_list.style_lookup = {style: style_id for style_id, style in enumerate(display_list.styles)}
+        display_list.layers = tables["layers"]
+        display_list.texts = tables["texts"]
+        display_list.symbols = [tuple(symbol) for symbol in tables["symbols"]]
+
+        return display_list
+
+
+class RecordingContext(DrawingContext):
+    def __init__(self, width, height, ss, measure_context=None):
+        """
+        Make a RecordingContext, which records what is drawn on it into a DisplayList.
+
+        Each layer is recorded into its own queue, so the map can be drawn in one walk over the tiles, switching
+        between layers as it goes. The queues are put together in the order their layers were first begun by finish.
+
+        :param width: The width of the image.
+        :type width: integer.
+
+        :param height: The height of the image.
+        :type height: integer.
+
+        :param ss: The size of a tile.
+        :type ss: integer.
+
+        :param measure_context: A cairo.Context used to measure text. If None, text sizes are estimated.
+        :type measure_context: cairo.Context
+        """
+
+        super().__init__()
+        self.display_list = DisplayList(width, height, ss)
+        self.measure_context = measure_context
+        self.layer_lookup = {}
+        self.symbol_ids = {}
+        self.queues = {}
+        self.begin_layer("default")
+
+    def begin_layer(self, name, part=0):
+        """
+        Start a new layer. Everything drawn until the next layer is part of it. Starting a layer with the name of an
+        earlier layer adds to that layer.
+
+        :param name: The name of the layer.
+        :type name: string.
+
+        :param part: Which part of the layer to add to. Parts are drawn in order, so a layer can be added to in any
+            order and still be drawn in passes. Defaults to 0.
+        :type part: integer.
+        """
+
+        layer_id = self.layer_lookup.get(name)
+        if layer_id is None:
+            layer_id = len(self.display_list.layers)
+            self.layer_lookup[name] = layer_id
+            self.display_list.layers.append(name)
+        self.layer_id = layer_id
+        self.queue = self.get_queue(layer_id, part)
+
+    def get_queue(self, layer_id, part):
+        """
+        Return the queue that the primitives of part of a layer are recorded into.
+
+        :param layer_id: The id of the layer.
+        :type layer_id: integer.
+
+        :param part: The part of the layer.
+        :type part: integer.
+
+        :return: The queue.
+        :rtype: DisplayList
+        """
+
+        queue = self.queues.get((layer_id, part))
+        if queue is None:
+            queue = DisplayList(self.display_list.width, self.display_list.height, self.display_list.ss)
+            self.queues[(layer_id, part)] = queue
+        return queue
+
+    def finish(self):
+        """
+        Put the queues together into the display list, layer by layer, with the symbols at the end.
+
+        :return: The display list.
+        :rtype: DisplayList
+        """
+
+        display_list = self.display_list
+        for layer_id, part in sorted(self.queues):
+            queue = self.queues[(layer_id, part)]
+            if layer_id == SYMBOL_LAYER:
+                offset = len(display_list)
+                display_list.symbols = [(start + offset, end + offset) for start, end in display_list.symbols]
+            display_list.extend(queue)
+
+        self.queues = {}
+        self.begin_layer("default")
+        return display_list
+
+    def fill(self):
+        """Record a fill of the current path, and clear it."""
+
+        if self.path:
+            style_id = self.display_list.get_style_id(("fill",) + self.state.rgba)
+            self.queue.add_primitive(PRIMITIVE_FILL, style_id, self.layer_id, self.path)
+        self.new_path()
+
+    def stroke(self):
+        """Record a stroke of the current path, and clear it."""
+
+        if self.path:
+            state = self.state
+            style = ("stroke",) + state.rgba + (
+                state.line_width * self.get_scale(), state.line_cap, state.line_join
+            )
+            style_id = self.display_list.get_style_id(style)
+            self.queue.add_primitive(PRIMITIVE_STROKE, style_id, self.layer_id, self.path)
+        self.new_path()
+
+    def text_extents(self, text):
+        """
+        Return the extents of a piece of text, measured with the measure context if there is one.
+
+        :return: The x bearing, y bearing, width, height, x advance and y advance, like cairo.Context.text_extents.
+        :rtype: (float, float, float, float, float, float)
+        """
+
+        if self.measure_context is None:
+            return super().text_extents(text)
+
+        state = self.state
+        self.measure_context.select_font_face(state.font_family, state.font_slant, state.font_weight)
+        self.measure_context.set_font_size(state.font_size)
+        return tuple(self.measure_context.text_extents(text))
+
+    def show_text(self, text):
+        """Record text, with its baseline starting at the current point."""
+
+        state = self.state
+        style = ("text",) + state.rgba + (
+            state.font_family, state.font_slant, state.font_weight, state.font_size * self.get_scale()
+        )
+        style_id = self.display_list.get_style_id(style)
+        point = self.current_point or self.to_device(0, 0)
+
+        queue = self.queue
+        queue.texts.append(text)
+        queue.text_primitives.append(len(queue))
+        queue.add_primitive(PRIMITIVE_TEXT, style_id, self.layer_id, [(PATH_MOVE,) + point])
+
+    def use_symbol(self, key, draw_function, x=0, y=0):
+        """
+        Record a copy of a symbol at (x, y) in user space. The first time a key is used, the symbol is recorded by
+        calling draw_function(0, 0) with a fresh drawing state.
+
+        :param key: The key of the symbol. Everything that changes how the symbol looks should be part of it.
+        :type key: tuple.
+
+        :param draw_function: A function that draws the symbol at a given point.
+        :type draw_function: callable.
+
+        :param x: The x coordinate to place the symbol at. Defaults to 0.
+        :type x: float
+
+        :param y: The y coordinate to place the symbol at. Defaults to 0.
+        :type y: float
+        """
+
+        display_list = self.display_list
+
+        symbol_id = self.symbol_ids.get(key)
+        if symbol_id is None:
+            symbol_id = len(display_list.symbols)
+            self.symbol_ids[key] = symbol_id
+
+            saved = (
+                self.state, self.stack, self.path, self.current_point, self.subpath_start, self.layer_id, self.queue
+            )
+            self.state = DrawingState()
+            self.stack = []
+            self.new_path()
+            self.layer_id = SYMBOL_LAYER
+            self.queue = self.get_queue(SYMBOL_LAYER, 0)
+
+            # Symbols are kept in a queue of their own, which finish puts after the layers.
+            start = len(self.queue)
+            draw_function(0, 0)
+            display_list.symbols.append((start, len(self.queue)))
+
+            (
+                self.state, self.stack, self.path, self.current_point, self.subpath_start, self.layer_id, self.queue
+            ) = saved
+
+        # The placement is stored as a move to the origin of the symbol, and a line along its x axis.
+        origin = self.to_device(x, y)
+        axis = self.to_device(x + 1, y)
+        self.queue.add_primitive(
+            PRIMITIVE_USE, symbol_id, self.layer_id, [(PATH_MOVE,) + origin, (PATH_LINE,) + axis]
+        )
+
+
+def get_primitive_bounds(display_list):
+    """
+    Work out a box around everything each primitive of a display list draws, in the coordinates of the image. The
+    boxes are a little bigger than they need to be, as they allow for miter joins, and guess how wide text is.
+
+    :param display_list: The display list.
+    :type display_list: DisplayList
+
+    :return: The left, top, right and bottom of the box of each primitive.
+    :rtype: numpy array of float64, of shape (number of primitives, 4)
+    """
+
+    n_primitives = len(display_list)
+    bounds = np.empty((n_primitives, 4))
+    if not n_primitives:
+        return bounds
+
+    # The box of each command of each path.
+    commands = np.frombuffer(display_list.commands, dtype=np.uint8)
+    coords = np.frombuffer(display_list.coords, dtype=np.float64)
+    coord_starts = np.frombuffer(display_list.coord_starts, dtype=display_list.coord_starts.typecode).astype(np.int64)
+    padded = np.concatenate([coords, np.zeros(5)])
+
+    def coord(offset):
+        return padded[coord_starts + offset]
+
+    x, y = coord(0), coord(1)
+    command_bounds = np.stack([x, y, x, y], axis=1)
+    command_bounds[commands == PATH_CLOSE] = (np.inf, np.inf, -np.inf, -np.inf)
+
+    is_rectangle = commands == PATH_RECTANGLE
+    x2, y2 = x + coord(2), y + coord(3)
+    command_bounds[is_rectangle] = np.stack([
+        np.minimum(x, x2), np.minimum(y, y2), np.maximum(x, x2), np.maximum(y, y2)
+    ], axis=1)[is_rectangle]
+
+    is_arc = commands == PATH_ARC
+    radius = np.abs(coord(2))
+    command_bounds[is_arc] = np.stack([x - radius, y - radius, x + radius, y + radius], axis=1)[is_arc]
+
+    # The box of each path is the box around its commands.
+    path_starts = np.frombuffer(display_list.path_starts, dtype=display_list.path_starts.typecode).astype(np.int64)
+    bounds[:, :2] = np.minimum.reduceat(command_bounds[:, :2], path_starts, axis=0)
+    bounds[:, 2:] = np.maximum.reduceat(command_bounds[:, 2:], path_starts, axis=0)
+
+    # Strokes reach out by half their width, or further at miter joins, and text reaches out from its start.
+    kinds = np.frombuffer(display_list.kinds, dtype=np.uint8)
+    style_ids = np.frombuffer(display_list.style_ids, dtype=display_list.style_ids.typecode)
+    reach = np.zeros(len(display_list.styles) + 1)
+    for style_id, style in enumerate(display_list.styles):
+        if style[0] == "stroke":
+            reach[style_id] = style[5] * (MITER_REACH if style[7] == LINE_JOIN_MITER else 0.5)
+        elif style[0] == "text":
+            reach[style_id] = style[8]
+    primitive_reach = np.where(kinds == PRIMITIVE_USE, 0, reach[np.minimum(style_ids, len(reach) - 1)])
+
+    text_primitives = np.frombuffer(display_list.text_primitives, dtype=display_list.text_primitives.typecode)
+    if len(text_primitives):
+        text_lengths = np.array([len(text) for text in display_list.texts], dtype=np.float64)
+        primitive_reach[text_primitives] *= text_lengths + 1
+
+    # A symbol can be placed at any angle and size, so its copies reach as far from where they are placed as the
+    # furthest corner of the symbol. Symbols inside symbols are made later, so they are worked out first.
+    symbol_reach = np.zeros(len(display_list.symbols))
+    is_use = kinds == PRIMITIVE_USE
+    for symbol_id in reversed(range(len(display_list.symbols))):
+        start, end = display_list.symbols[symbol_id]
+        if start < end:
+            uses = np.nonzero(is_use[start:end])[0] + start
+            primitive_reach[uses] = symbol_reach[style_ids[uses]] * np.hypot(
+                bounds[uses, 2] - bounds[uses, 0], bounds[uses, 3] - bounds[uses, 1]
+            )
+            inner = bounds[start:end] + primitive_reach[start:end, None] * (-1, -1, 1, 1)
+            inner = inner[np.isfinite(inner).all(axis=1)]
+            if len(inner):
+                symbol_reach[symbol_id] = np.abs(inner).max() * math.sqrt(2)
+
+    # A symbol is placed with a line from its origin along its x axis, which is as long as its scale.
+    uses = np.nonzero(is_use)[0]
+    if len(uses):
+        primitive_reach[uses] = symbol_reach[style_ids[uses]] * np.hypot(
+            bounds[uses, 2] - bounds[uses, 0], bounds[uses, 3] - bounds[uses, 1]
+        )
+        origins = padded[coord_starts[path_starts[uses]] + np.array([[0], [1]])].T
+        bounds[uses] = np.concatenate([origins, origins], axis=1)
+
+    bounds += primitive_reach[:, None] * (-1, -1, 1, 1)
+    return bounds
+
+
+def find_primitives(bounds, x0, y0, x1, y1):
+    """
+    Find the primitives that may draw inside a box.
+
+    :param bounds: The box of each primitive, from get_primitive_bounds.
+    :type bounds: numpy array of float64, of shape (number of primitives, 4)
+
+    :param x0: The left of the box.
+    :type x0: float
+
+    :param y0: The top of the box.
+    :type y0: float
+
+    :param x1: The right of the box.
+    :type x1: float
+
+    :param y1: The bottom of the box.
+    :type y1: float
+
+    :return: The indices of the primitives, in order.
+    :rtype: numpy array of integers.
+    """
+
+    return np.nonzero(
+        (bounds[:, 0] <= x1) & (bounds[:, 2] >= x0) & (bounds[:, 1] <= y1) & (bounds[:, 3] >= y0)
+    )[0]
+
+
+def replay_primitives(display_list, context, start, end, texts, layers=None, begin_layer=None, indices=None,
+                      round_caps=True):
+    """
+    Draw a range of the primitives in a display list on a context. The primitives that define symbols are only drawn
+    if the whole range is in a symbol.
+
+    :param display_list: The list to replay.
+    :type display_list: DisplayList
+
+    :param context: The context to draw on.
+    :type context: cairo.Context or DrawingContext
+
+    :param start: The index of the first primitive.
+    :type start: integer.
+
+    :param end: The index after the last primitive.
+    :type end: integer.
+
+    :param texts: The text of each PRIMITIVE_TEXT primitive, keyed by its index.
+    :type texts: dict.
+
+    :param layers: The names of the layers to draw. If None, draw all the layers. Defaults to None.
+    :type layers: set of strings.
+
+    :param begin_layer: A function called with the name of each layer before it is drawn. Defaults to None.
+    :type begin_layer: callable.
+
+    :param indices: The indices of the primitives in the range to draw, in order. If None, draw them all. Defaults to
+        None.
+    :type indices: list of integers.
+
+    :param round_caps: If False, draw butt line caps instead of round ones. Defaults to True.
+    :type round_caps: Boolean
+    """
+
+    kinds = display_list.kinds
+    style_ids = display_list.style_ids
+    layer_ids = display_list.layer_ids
+    path_starts = display_list.path_starts
+    commands = display_list.commands
+    coords = display_list.coords
+    coord_starts = display_list.coord_starts
+    styles = display_list.styles
+    n_primitives = len(display_list)
+    n_commands = len(commands)
+
+    # There are many primitives, so look the methods of the context up once.
+    move_to = context.move_to
+    line_to = context.line_to
+    close_path = context.close_path
+    rectangle = context.rectangle
+    arc = context.arc
+    fill = context.fill
+    stroke = context.stroke
+    set_source_rgba = context.set_source_rgba
+
+    in_symbol = start < end and layer_ids[start] == SYMBOL_LAYER
+    layer_id = None
+    drawn_layer_id = None
+    drawn_style_id = None
+    drawn_rgba = None
+    drawn_line = None
+    drawn_font = None
+    skip = False
+
+    for index in range(start, end) if indices is None else indices:
+        if layer_ids[index] != layer_id:
+            layer_id = layer_ids[index]
+            if layer_id == SYMBOL_LAYER:
+                skip = not in_symbol
+            else:
+                name = display_list.layers[layer_id]
+                skip = layers is not None and name not in layers
+
+                # Symbols are defined in the middle of layers, so the layer may carry on after one.
+                if begin_layer is not None and not skip and layer_id != drawn_layer_id:
+                    begin_layer(name)
+                    drawn_layer_id = layer_id
+
+        if skip:
+            continue
+
+        kind = kinds[index]
+        if kind == PRIMITIVE_USE:
+            replay_use(display_list, context, index, style_ids[index], texts, round_caps=round_caps)
+            drawn_style_id = drawn_rgba = drawn_line = drawn_font = None
+            continue
+
+        # The style is only set when it changes, and then only the parts of it that change. The tile backgrounds
+        # are each filled and stroked in the same colour, so the fills and strokes take turns, but share a colour.
+        style_id = style_ids[index]
+        if style_id != drawn_style_id:
+            style = styles[style_id]
+            rgba = style[1:5]
+            if rgba != drawn_rgba:
+                set_source_rgba(*rgba)
+                drawn_rgba = rgba
+            if kind == PRIMITIVE_STROKE:
+                line = style[5:8]
+                if line != drawn_line:
+                    context.set_line_width(style[5])
+                    context.set_line_cap(style[6] if round_caps or style[6] != LINE_CAP_ROUND else LINE_CAP_BUTT)
+                    context.set_line_join(style[7])
+                    drawn_line = line
+            elif kind == PRIMITIVE_TEXT:
+                font = style[5:9]
+                if font != drawn_font:
+                    context.select_font_face(style[5], style[6], style[7])
+                    context.set_font_size(style[8])
+                    drawn_font = font
+            drawn_style_id = style_id
+
+        path_start = path_starts[index]
+        path_end = path_starts[index + 1] if index + 1 < n_primitives else n_commands
+
+        # Most paths are a single rectangle, such as the tile backgrounds.
+        if path_end - path_start == 1 and commands[path_start] == PATH_RECTANGLE:
+            i = coord_starts[path_start]
+            rectangle(coords[i], coords[i + 1], coords[i + 2], coords[i + 3])
+        else:
+            for command_index in range(path_start, path_end):
+                command = commands[command_index]
+                i = coord_starts[command_index]
+                if command == PATH_RECTANGLE:
+                    rectangle(coords[i], coords[i + 1], coords[i + 2], coords[i + 3])
+                elif command == PATH_LINE:
+                    line_to(coords[i], coords[i + 1])
+                elif command == PATH_MOVE:
+                    move_to(coords[i], coords[i + 1])
+                elif command == PATH_CLOSE:
+                    close_path()
+                else:
+                    arc(coords[i], coords[i + 1], coords[i + 2], coords[i + 3], coords[i + 4])
+
+        if kind == PRIMITIVE_FILL:
+            fill()
+        elif kind == PRIMITIVE_STROKE:
+            stroke()
+        else:
+            context.show_text(texts[index])
+            context.new_path()
+
+
+def replay_use(display_list, context, index, symbol_id, texts, round_caps=True):
+    """
+    Draw a copy of a symbol, placed by a PRIMITIVE_USE primitive.
+
+    :param display_list: The list to replay.
+    :type display_list: DisplayList
+
+    :param context: The context to draw on.
+    :type context: cairo.Context or DrawingContext
+
+    :param index: The index of the PRIMITIVE_USE primitive.
+    :type index: integer.
+
+    :param symbol_id: The id of the symbol.
+    :type symbol_id: integer.
+
+    :param texts: The text of each PRIMITIVE_TEXT primitive, keyed by its index.
+    :type texts: dict.
+
+    :param round_caps: If False, draw butt line caps instead of round ones. Defaults to True.
+    :type round_caps: Boolean
+    """
+
+    coords = display_list.coords
+    i = display_list.coord_starts[display_list.path_starts[index]]
+    x0, y0, x1, y1 = coords[i], coords[i + 1], coords[i + 2], coords[i + 3]
+
+    symbol_start, symbol_end = display_list.symbols[symbol_id]
+
+    def draw(x, y):
+        replay_primitives(display_list, context, symbol_start, symbol_end, texts, round_caps=round_caps)
+
+    context.save()
+    context.translate(x0, y0)
+    if (x1, y1) != (x0 + 1, y0):
+        context.rotate(math.atan2(y1 - y0, x1 - x0))
+        length = math.hypot(x1 - x0, y1 - y0)
+        if abs(length - 1) > 1e-9:
+            context.scale(length, length)
+
+    use_symbol = getattr(context, "use_symbol", None)
+    if isinstance(context, DrawingContext) and use_symbol is not None:
+        use_symbol(("symbol", symbol_id, round_caps), draw)
+    else:
+        draw(0, 0)
+    context.restore()
+
+
+def replay(display_list, context, scale=1.0, layers=None, begin_layer=None, indices=None, round_caps=True):
+    """
+    Draw a display list on a context.
+
+    :param display_list: The list to replay.
+    :type display_list: DisplayList
+
+    :param context: The context to draw on, either a cairo.Context or a DrawingContext such as an SvgContext.
+    :type context: cairo.Context or DrawingContext
+
+    :param scale: How much to scale the image by. Defaults to 1.
+    :type scale: float
+
+    :param layers: The names of the layers to draw. If None, draw all the layers. Defaults to None.
+    :type layers: set of strings.
+
+    :param begin_layer: A function called with the name of each layer before it is drawn. Defaults to None.
+    :type begin_layer: callable.
+
+    :param indices: The indices of the primitives to draw, in order, such as those from find_primitives. If None,
+        draw them all. Defaults to None.
+    :type indices: list of integers.
+
+    :param round_caps: If False, draw butt line caps instead of round ones, which is quicker. Defaults to True.
+    :type round_caps: Boolean
+    """
+
+    texts = dict(zip(display_list.text_primitives, display_list.texts))
+
+    context.save()
+    if scale != 1:
+        context.scale(scale, scale)
+    replay_primitives(
+        display_list, context, 0, len(display_list), texts, layers=layers, begin_layer=begin_layer, indices=indices,
+        round_caps=round_caps
+    )
+    context.restore()
@@ -0,0 +1,278 @@
+#!/usr/bin/python3
+
+import math
+
+# The commands of a path, in the coordinates of the image.
+PATH_MOVE = 0
+PATH_LINE = 1
+PATH_CLOSE = 2
+PATH_ARC = 3
+PATH_RECTANGLE = 4
+
+# How many numbers each path command takes: (x, y) for moves and lines, (xc, yc, radius, angle1, angle2) for arcs,
+# and (x, y, width, height) for rectangles. An arc starts with a line from the current point, or a move if there is
+# none, like in Cairo.
+PATH_COORD_COUNTS = [2, 2, 0, 5, 4]
+
+# The line caps, line joins and font styles, with the same values as in Cairo.
+LINE_CAP_BUTT = 0
+LINE_CAP_ROUND = 1
+LINE_CAP_SQUARE = 2
+LINE_JOIN_MITER = 0
+LINE_JOIN_ROUND = 1
+LINE_JOIN_BEVEL = 2
+FONT_SLANT_NORMAL = 0
+FONT_WEIGHT_NORMAL = 0
+
+
+class DrawingState:
+    __slots__ = (
+        "rgba", "line_width", "line_cap", "line_join", "matrix", "font_family", "font_slant", "font_weight", "font_size"
+    )
+
+    def __init__(self):
+        """
+        Make a DrawingState, which holds the part of the drawing state that is saved and restored, with Cairo's
+        defaults.
+        """
+
+        self.rgba = (0, 0, 0, 1)
+        self.line_width = 2.0
+        self.line_cap = 0
+        self.line_join = 0
+        self.matrix = (1, 0, 0, 1, 0, 0)
+        self.font_family = "sans-serif"
+        self.font_slant = 0
+        self.font_weight = 0
+        self.font_size = 10.0
+
+    def copy(self):
+        """
+        Return a copy of the state.
+
+        :return: The copy.
+        :rtype: DrawingState
+        """
+
+        # The state is copied every time it is saved, which is often, so the fields are copied by hand.
+        state = object.__new__(DrawingState)
+        state.rgba = self.rgba
+        state.line_width = self.line_width
+        state.line_cap = self.line_cap
+        state.line_join = self.line_join
+        state.matrix = self.matrix
+        state.font_family = self.font_family
+        state.font_slant = self.font_slant
+        state.font_weight = self.font_weight
+        state.font_size = self.font_size
+        return state
+
+
+class DrawingContext:
+    def __init__(self):
+        """
+        Make a DrawingContext, which has the parts of the API of a cairo.Context that the painter uses, and keeps the
+        current path in the coordinates of the image.
+
+        It is a base class: subclasses decide what filling, stroking and showing text do. The transformations are
+        expected to be translations, rotations and uniform scales, which is all the painter uses.
+        """
+
+        self.state = DrawingState()
+        self.stack = []
+        self.path = []
+        self.current_point = None
+        self.subpath_start = None
+
+    # Drawing state.
+
+    def save(self):
+        """Save the drawing state."""
+
+        self.stack.append(self.state.copy())
+
+    def restore(self):
+        """Restore the last saved drawing state."""
+
+        self.state = self.stack.pop()
+
+    def set_source_rgb(self, red, green, blue):
+        """Set the colour, in the range 0-1."""
+
+        self.state.rgba = (red, green, blue, 1)
+
+    def set_source_rgba(self, red, green, blue, alpha):
+        """Set the colour and opacity, in the range 0-1."""
+
+        self.state.rgba = (red, green, blue, alpha)
+
+    def set_line_width(self, width):
+        """Set the width of lines."""
+
+        self.state.line_width = width
+
+    def set_line_cap(self, line_cap):
+        """Set the line cap, using the Cairo value."""
+
+        self.state.line_cap = int(line_cap)
+
+    def set_line_join(self, line_join):
+        """Set the line join, using the Cairo value."""
+
+        self.state.line_join = int(line_join)
+
+    def select_font_face(self, family, slant=0, weight=0):
+        """Set the font family, slant and weight, using the Cairo values."""
+
+        self.state.font_family = family
+        self.state.font_slant = int(slant)
+        self.state.font_weight = int(weight)
+
+    def set_font_size(self, size):
+        """Set the font size."""
+
+        self.state.font_size = size
+
+    # Transformations.
+
+    def translate(self, tx, ty):
+        """Move the origin of the user space."""
+
+        xx, yx, xy, yy, x0, y0 = self.state.matrix
+        self.state.matrix = (xx, yx, xy, yy, x0 + xx * tx + xy * ty, y0 + yx * tx + yy * ty)
+
+    def rotate(self, angle):
+        """Rotate the user space by an angle, in radians."""
+
+        c = math.cos(angle)
+        s = math.sin(angle)
+
+        # Keep quarter turns exact.
+        c = round(c) if abs(c - round(c)) < 1e-12 else c
+        s = round(s) if abs(s - round(s)) < 1e-12 else s
+
+        xx, yx, xy, yy, x0, y0 = self.state.matrix
+        self.state.matrix = (xx * c + xy * s, yx * c + yy * s, xy * c - xx * s, yy * c - yx * s, x0, y0)
+
+    def scale(self, sx, sy):
+        """Scale the user space."""
+
+        xx, yx, xy, yy, x0, y0 = self.state.matrix
+        self.state.matrix = (xx * sx, yx * sx, xy * sy, yy * sy, x0, y0)
+
+    def to_device(self, x, y):
+        """
+        Transform a point from user space to the coordinates of the image.
+
+        :return: The transformed point.
+        :rtype: (float, float)
+        """
+
+        xx, yx, xy, yy, x0, y0 = self.state.matrix
+        return xx * x + xy * y + x0, yx * x + yy * y + y0
+
+    def get_scale(self):
+        """
+        Return how much lengths are scaled by the transformation.
+
+        :return: The scale factor.
+        :rtype: float
+        """
+
+        xx, yx, xy, yy, x0, y0 = self.state.matrix
+        return math.sqrt(abs(xx * yy - xy * yx))
+
+    def get_rotation(self):
+        """
+        Return the angle that the transformation rotates by.
+
+        :return: The angle, in radians.
+        :rtype: float
+        """
+
+        xx, yx, xy, yy, x0, y0 = self.state.matrix
+        return math.atan2(yx, xx)
+
+    # Paths.
+
+    def new_path(self):
+        """Clear the current path."""
+
+        self.path = []
+        self.current_point = None
+        self.subpath_start = None
+
+    def move_to(self, x, y):
+        """Start a new sub-path at a point."""
+
+        point = self.to_device(x, y)
+        self.path.append((PATH_MOVE,) + point)
+        self.current_point = point
+        self.subpath_start = point
+
+    def line_to(self, x, y):
+        """Add a line from the current point to a point."""
+
+        if self.current_point is None:
+            self.move_to(x, y)
+            return
+
+        point = self.to_device(x, y)
+        self.path.append((PATH_LINE,) + point)
+        self.current_point = point
+
+    def close_path(self):
+        """Close the current sub-path."""
+
+        if self.current_point is None:
+            return
+
+        self.path.append((PATH_CLOSE,))
+        self.current_point = self.subpath_start
+
+    def rectangle(self, x, y, width, height):
+        """Add a closed rectangle to the path."""
+
+        xx, yx, xy, yy, x0, y0 = self.state.matrix
+        if yx == 0 and xy == 0:
+            point = self.to_device(x, y)
+            self.path.append((PATH_RECTANGLE,) + point + (xx * width, yy * height))
+            self.current_point = point
+            self.subpath_start = point
+            return
+
+        self.move_to(x, y)
+        self.line_to(x + width, y)
+        self.line_to(x + width, y + height)
+        self.line_to(x, y + height)
+        self.close_path()
+
+    def arc(self, xc, yc, radius, angle1, angle2):
+        """Add a clockwise arc to the path, with a line to its start if there is a current point."""
+
+        while angle2 < angle1:
+            angle2 += 2 * math.pi
+
+        # Like in Cairo, the arc starts with a line from the current point, or a move if there is none.
+        if self.current_point is None:
+            self.subpath_start = self.to_device(xc + radius * math.cos(angle1), yc + radius * math.sin(angle1))
+
+        rotation = self.get_rotation()
+        center = self.to_device(xc, yc)
+        self.path.append((PATH_ARC,) + center + (radius * self.get_scale(), angle1 + rotation, angle2 + rotation))
+        self.current_point = self.to_device(xc + radius * math.cos(angle2), yc + radius * math.sin(angle2))
+
+    # Text.
+
+    def text_extents(self, text):
+        """
+        Estimate the extents of a piece of text, from the font size alone.
+
+        :return: The x bearing, y bearing, width, height, x advance and y advance, like cairo.Context.text_extents.
+        :rtype: (float, float, float, float, float, float)
+        """
+
+        size = self.state.font_size
+        width = 0.55 * size * len(text)
+        height = 0.72 * size
+        return (0, -height, width, height, width, 0)
@@ -0,0 +1,259 @@
+#!/usr/bin/python3
+
+import copy
+
+import numpy as np
+
+from display_list import PRIMITIVE_USE, replay
+from painter_backend import import_cairo
+from png_writer import COMPRESSION_LEVEL, unpremultiply, write_png
+
+
+def encode_class_id(class_id):
+    """
+    Encode a class id as a colour, so that drawing with it writes the id to the pixels of an RGB24 surface.
+
+    :param class_id: The class id, less than 2^24.
+    :type class_id: integer.
+
+    :return: The colour, in the range used by Cairo.
+    :rtype: (float, float, float)
+    """
+
+    return ((class_id >> 16) / 255, ((class_id >> 8) & 255) / 255, (class_id & 255) / 255)
+
+
+def make_class_table(display_list):
+    """
+    Give each colour used in a display list a class id, starting from 1. Class 0 means that nothing was drawn.
+
+    :param display_list: The display list, drawn with a style made by CompiledStyle.with_color_classes.
+    :type display_list: DisplayList
+
+    :return: The colour of each class, and the class id of each style in the display list.
+    :rtype: (list of (float, float, float, float), list of integers)
+    """
+
+    classes = [(0.0, 0.0, 0.0, 0.0)]
+    class_ids = {}
+    style_class_ids = []
+    for style in display_list.styles:
+        rgba = tuple(style[1:5])
+        class_id = class_ids.get(rgba)
+        if class_id is None:
+            class_id = len(classes)
+            class_ids[rgba] = class_id
+            classes.append(rgba)
+        style_class_ids.append(class_id)
+    return classes, style_class_ids
+
+
+def render_class_ids(display_list, style_class_ids, scale, layers):
+    """
+    Draw the class ids of some of the layers of a display list, without anti-aliasing.
+
+    :param display_list: The display list.
+    :type display_list: DisplayList
+
+    :param style_class_ids: The class id of each style in the display list.
+    :type style_class_ids: list of integers.
+
+    :param scale: How much to scale the display list by.
+    :type scale: float
+
+    :param layers: The names of the layers to draw.
+    :type layers: set of strings.
+
+    :return: The class id of each pixel.
+    :rtype: numpy array of uint32.
+    """
+
+    # The shapes are the same, only the styles change.
+    index_list = copy.copy(display_list)
+    index_list.styles = [
+        (style[0],) + encode_class_id(class_id) + (1.0,) + tuple(style[5:])
+        for style, class_id in zip(display_list.styles, style_class_ids)
+    ]
+
+    cairo = import_cairo()
+    width = int(round(scale * display_list.width))
+    height = int(round(scale * display_list.height))
+    surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+    context = cairo.Context(surface)
+    context.set_antialias(cairo.ANTIALIAS_NONE)
+    font_options = cairo.FontOptions()
+    font_options.set_antialias(cairo.ANTIALIAS_NONE)
+    context.set_font_options(font_options)
+
+    replay(index_list, context, scale=scale, layers=layers)
+
+    surface.flush()
+    pixels = np.ndarray(
+        shape=(height, surface.get_stride() // 4), dtype=np.uint32, buffer=surface.get_data()
+    )[:, :width]
+    return pixels & 0xFFFFFF
+
+
+class IndexedImage:
+    def __init__(self, class_ids, overlay_ids, classes, color_classes, samples=1):
+        """
+        Make an IndexedImage, which holds the colour class of each pixel of a map, so that it can be coloured in for
+        any style with one lookup in a palette.
+
+        Most layers are opaque, and are drawn into class_ids. The layers from the first one that has translucent
+        colours onwards, which is only the labels, are drawn into overlay_ids, and blended over class_ids when the
+        image is coloured in.
+
+        :param class_ids: The class id of each pixel, of the layers below the overlay.
+        :type class_ids: numpy array of uint8 or uint16.
+
+        :param overlay_ids: The class id of each pixel of the overlay, or None if there is no overlay.
+        :type overlay_ids: numpy array of uint8 or uint16.
+
+        :param classes: The colour of each class, as drawn. A negative red value stands in for a colour class.
+        :type classes: list of (float, float, float, float).
+
+        :param color_classes: The colour classes of the style the map was drawn with.
+        :type color_classes: list of tuples.
+
+        :param samples: How many samples were drawn for each pixel, across and down. Anti-aliasing comes from the
+            coverage of the samples. Defaults to 1.
+        :type samples: integer.
+        """
+
+        self.class_ids = class_ids
+        self.overlay_ids = overlay_ids
+        self.classes = classes
+        self.color_classes = color_classes
+        self.samples = samples
+
+    @classmethod
+    def render(cls, display_list, color_classes, scale=1.0, samples=1, layers=None):
+        """
+        Draw the class ids of a display list.
+
+        :param display_list: The display list, drawn with a style made by CompiledStyle.with_color_classes.
+        :type display_list: DisplayList
+
+        :param color_classes: The colour classes of that style.
+        :type color_classes: list of tuples.
+
+        :param scale: How much to scale the display list by. Defaults to 1.
+        :type scale: float
+
+        :param samples: How many samples to draw for each pixel, across and down. Defaults to 1.
+        :type samples: integer.
+
+        :param layers: The names of the layers to draw. If None, draw all the layers. Defaults to None.
+        :type layers: set of strings.
+
+        :return: The indexed image.
+        :rtype: IndexedImage
+        """
+
+        classes, style_class_ids = make_class_table(display_list)
+        dtype = np.uint8 if len(classes) <= 256 else np.uint16
+
+        if layers is None:
+            layers = set(display_list.layers)
+
+        # Find the first layer with a translucent colour.
+        translucent = np.array([rgba[3] < 1 for rgba in classes], dtype=bool)
+        kinds = np.frombuffer(display_list.kinds, dtype=np.uint8)
+        style_ids = np.array(display_list.style_ids, dtype=np.int64)
+        layer_ids = np.frombuffer(display_list.layer_ids, dtype=np.uint8)
+        is_translucent = np.zeros(len(kinds), dtype=bool)
+        is_style = kinds != PRIMITIVE_USE
+        is_translucent[is_style] = translucent[np.array(style_class_ids, dtype=np.int64)[style_ids[is_style]]]
+        translucent_layer_ids = set(np.unique(layer_ids[is_translucent]).tolist())
+
+        base_layers = set()
+        overlay_layers = set()
+        for layer_id, name in enumerate(display_list.layers):
+            if translucent_layer_ids and layer_id >= min(translucent_layer_ids):
+                overlay_layers.add(name)
+            else:
+                base_layers.add(name)
+
+        scale *= samples
+        class_ids = render_class_ids(display_list, style_class_ids, scale, base_layers & layers).astype(dtype)
+        overlay_ids = None
+        if overlay_layers & layers:
+            overlay_ids = render_class_ids(display_list, style_class_ids, scale, overlay_layers & layers).astype(dtype)
+
+        return cls(class_ids, overlay_ids, classes, color_classes, samples=samples)
+
+    def make_palette(self, style):
+        """
+        Work out the colour of each class in a style.
+
+        :param style: The style.
+        :type style: CompiledStyle
+
+        :return: The colour of each class, premultiplied by alpha, in the range 0-255.
+        :rtype: numpy array of float32, of shape (number of classes, 4).
+        """
+
+        palette = np.zeros((len(self.classes), 4), dtype=np.float32)
+        for class_id, (red, green, blue, alpha) in enumerate(self.classes):
+            if class_id == 0:
+                continue
+            if red < 0:
+                color = style.resolve_color_class(self.color_classes[-1 - int(red)])
+                red, green, blue = color[:3]
+                if len(color) == 4:
+                    alpha = color[3]
+            palette[class_id] = (255 * alpha * red, 255 * alpha * green, 255 * alpha * blue, 255 * alpha)
+        return palette
+
+    def colorize(self, palette):
+        """
+        Colour the image in with a palette.
+
+        :param palette: The colour of each class, from make_palette.
+        :type palette: numpy array of float32.
+
+        :return: The image, premultiplied by alpha.
+        :rtype: numpy array of uint8, of shape (height, width, 4).
+        """
+
+        # Look the colours up as whole pixels, which is much quicker than one channel at a time.
+        pixels = np.rint(palette).astype(np.uint8).view(np.uint32).ravel()[self.class_ids]
+        image = pixels.view(np.uint8).reshape(self.class_ids.shape + (4,))
+
+        if self.overlay_ids is not None:
+            drawn = self.overlay_ids != 0
+            top = palette[self.overlay_ids[drawn]]
+            image[drawn] = np.rint(top + image[drawn] * (1 - top[:, 3:] / 255)).astype(np.uint8)
+
+        if self.samples > 1:
+            samples = self.samples
+            n_samples = samples * samples
+            total = np.full(image[::samples, ::samples].shape, n_samples // 2, dtype=np.uint16)
+            for row in range(samples):
+                for col in range(samples):
+                    total += image[row::samples, col::samples]
+            image = (total // n_samples).astype(np.uint8)
+
+        return image
+
+    def write_png(self, palette, file_path, compression_level=COMPRESSION_LEVEL, indexed=False):
+        """
+        Colour the image in with a palette, and save it as a PNG file.
+
+        :param palette: The colour of each class, from make_palette.
+        :type palette: numpy array of float32.
+
+        :param file_path: The path to the file.
+        :type file_path: string.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write an image with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+        """
+
+        write_png(
+            file_path, unpremultiply(self.colorize(palette)), compression_level=compression_level, indexed=indexed
+        )
@@ -0,0 +1,228 @@
+#!/usr/bin/python3
+
+import hashlib
+import os
+
+import numpy as np
+
+from display_list import PRIMITIVE_USE, SYMBOL_LAYER, replay
+from drawing_context import PATH_COORD_COUNTS
+from cairo_backend import write_surface_png
+from painter_backend import import_cairo
+from png_writer import COMPRESSION_LEVEL
+
+
+def hash_primitives(display_list, mask, style_hashes, symbol_hashes):
+    """
+    Hash the primitives picked out by a mask, in a way that does not depend on the order of the style and symbol
+    tables.
+
+    :param display_list: The display list.
+    :type display_list: DisplayList
+
+    :param mask: Which primitives to hash.
+    :type mask: numpy array of bool.
+
+    :param style_hashes: A hash of each style in the table of styles.
+    :type style_hashes: numpy array of uint64.
+
+    :param symbol_hashes: A hash of each symbol.
+    :type symbol_hashes: numpy array of uint64.
+
+    :return: The digest.
+    :rtype: string
+    """
+
+    kinds = np.frombuffer(display_list.kinds, dtype=np.uint8)
+    style_ids = np.array(display_list.style_ids, dtype=np.int64)
+    path_starts = np.array(display_list.path_starts, dtype=np.int64)
+    commands = np.frombuffer(display_list.commands, dtype=np.uint8)
+    coords = np.frombuffer(display_list.coords, dtype=np.float64)
+
+    # The style of a primitive, or the symbol it places.
+    is_use = kinds == PRIMITIVE_USE
+    values = np.zeros(len(kinds), dtype=np.uint64)
+    if len(style_hashes):
+        values[~is_use] = style_hashes[np.minimum(style_ids[~is_use], len(style_hashes) - 1)]
+    if len(symbol_hashes):
+        values[is_use] = symbol_hashes[np.minimum(style_ids[is_use], len(symbol_hashes) - 1)]
+
+    # The primitive that each command and each number belongs to.
+    command_counts = np.diff(np.append(path_starts, len(commands)))
+    command_primitives = np.repeat(np.arange(len(kinds)), command_counts)
+    coord_counts = np.array(PATH_COORD_COUNTS, dtype=np.int64)[commands]
+    coord_primitives = np.repeat(command_primitives, coord_counts)
+
+    digest = hashlib.sha1()
+    digest.update(kinds[mask].tobytes())
+    digest.update(values[mask].tobytes())
+    digest.update(commands[mask[command_primitives]].tobytes())
+    digest.update(coords[mask[coord_primitives]].tobytes())
+    return digest.hexdigest()
+
+
+def layer_digests(display_list):
+    """
+    Work out a digest of the contents of each layer of a display list, so that a layer only needs drawing again if
+    its digest changes.
+
+    :param display_list: The display list.
+    :type display_list: DisplayList
+
+    :return: The digest of each layer that has primitives, keyed by name.
+    :rtype: dict
+    """
+
+    style_hashes = np.array([
+        int.from_bytes(hashlib.sha1(repr(style).encode()).digest()[:8], "little") for style in display_list.styles
+    ], dtype=np.uint64)
+
+    n_primitives = len(display_list)
+    layer_ids = np.frombuffer(display_list.layer_ids, dtype=np.uint8)
+
+    symbol_hashes = []
+    for start, end in display_list.symbols:
+        mask = np.zeros(n_primitives, dtype=bool)
+        mask[start:end] = True
+        digest = hash_primitives(display_list, mask, style_hashes, np.zeros(0, dtype=np.uint64))
+        symbol_hashes.append(int(digest[:16], 16))
+    symbol_hashes = np.array(symbol_hashes, dtype=np.uint64)
+
+    digests = {}
+    for layer_id, name in enumerate(display_list.layers):
+        mask = layer_ids == layer_id
+        if layer_id != SYMBOL_LAYER and mask.any():
+            digests[name] = hash_primitives(display_list, mask, style_hashes, symbol_hashes)
+    return digests
+
+
+class LayerCache:
+    def __init__(self, scale=1.0):
+        """
+        Make a LayerCache, which keeps each layer of a display list drawn on its own transparent surface, so that
+        the image can be put together again from any set of layers without drawing anything.
+
+        Each layer takes as much memory as the whole image, so this is best kept for when layers are toggled or
+        written out separately.
+
+        :param scale: How much to scale the display list by. Defaults to 1.
+        :type scale: float
+        """
+
+        self.scale = scale
+        self.display_list = None
+        self.digests = {}
+        self.surfaces = {}
+
+    def get_size(self):
+        """
+        Return the size of the image.
+
+        :return: The width and height of the image.
+        :rtype: (integer, integer)
+        """
+
+        return (
+            int(round(self.scale * self.display_list.width)),
+            int(round(self.scale * self.display_list.height))
+        )
+
+    def update(self, display_list):
+        """
+        Use a new display list, keeping the surfaces of the layers that have not changed.
+
+        :param display_list: The new display list.
+        :type display_list: DisplayList
+
+        :return: The names of the layers that have changed.
+        :rtype: list of strings
+        """
+
+        size = self.get_size() if self.display_list is not None else None
+        self.display_list = display_list
+        if size != self.get_size():
+            self.surfaces = {}
+
+        digests = layer_digests(display_list)
+        changed = [name for name, digest in digests.items() if self.digests.get(name) != digest]
+        for name in list(self.surfaces):
+            if name in changed or name not in digests:
+                del self.surfaces[name]
+
+        self.digests = digests
+        return changed
+
+    def get_layer_names(self):
+        """
+        Return the names of the layers that have something in them, in the order they are drawn.
+
+        :return: The names of the layers.
+        :rtype: list of strings
+        """
+
+        return [name for name in self.display_list.layers if name in self.digests]
+
+    def get_surface(self, name):
+        """
+        Return the surface of a layer, drawing it the first time.
+
+        :param name: The name of the layer.
+        :type name: string.
+
+        :return: The surface, which is transparent where the layer has nothing.
+        :rtype: cairo.ImageSurface
+        """
+
+        surface = self.surfaces.get(name)
+        if surface is None:
+            cairo = import_cairo()
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, *self.get_size())
+            replay(self.display_list, cairo.Context(surface), scale=self.scale, layers={name})
+            self.surfaces[name] = surface
+        return surface
+
+    def composite(self, layers=None):
+        """
+        Put an image together from the surfaces of some of the layers.
+
+        :param layers: The names of the layers to use. If None, use all the layers. Defaults to None.
+        :type layers: set of strings.
+
+        :return: The image.
+        :rtype: cairo.ImageSurface
+        """
+
+        cairo = import_cairo()
+        image = cairo.ImageSurface(cairo.FORMAT_ARGB32, *self.get_size())
+        context = cairo.Context(image)
+        for name in self.get_layer_names():
+            if layers is None or name in layers:
+                context.set_source_surface(self.get_surface(name), 0, 0)
+                context.paint()
+        return image
+
+    def write_layers(self, directory, compression_level=COMPRESSION_LEVEL, indexed=False):
+        """
+        Write each layer to its own transparent PNG file.
+
+        :param directory: The directory to write the files to. It is made if it does not exist.
+        :type directory: string.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write images with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+
+        :return: The paths to the files, keyed by the name of their layer.
+        :rtype: dict
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        paths = {}
+        for name in self.get_layer_names():
+            path = os.path.join(directory, f"{name}.png")
+            write_surface_png(self.get_surface(name), path, compression_level=compression_level, indexed=indexed)
+            paths[name] = path
+        return paths
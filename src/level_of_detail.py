@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+
+import numpy as np
+
+# The qualities a map can be drawn at, from the quickest to the most detailed.
+QUALITIES = ("draft", "normal", "high")
+
+# The quality maps are drawn at, unless another is asked for. Leaving out detail changes the image, so it has to be
+# asked for.
+QUALITY = "high"
+
+# The layers of small details, whose primitives are left out when they are too small to see. The backgrounds, water,
+# stations, industries and the outer lines of the roads and rails make up the map, so they are always drawn.
+DETAIL_LAYERS = frozenset([
+    "tunnels-and-bridge-ramps", "buildings", "roads-inner", "trams", "rails-inner", "signals", "bridges", "labels",
+])
+
+# The tiers of detail of each quality, from the biggest tile size down, as the smallest tile size of the tier, the
+# smallest primitive to draw in pixels, whether to anti-alias, and whether to draw round line caps. Round caps reach
+# less than a pixel past the ends of lines at small tile sizes, and are much slower to draw than butt caps.
+DETAIL_TIERS = {
+    "draft": [(15, 1.0, False, False), (0, 2.0, False, False)],
+    "normal": [(15, 0.0, True, True), (7, 0.5, True, False), (0, 1.0, True, False)],
+    "high": [(0, 0.0, True, True)],
+}
+
+
+class DetailLevel:
+    def __init__(self, name, min_size=0.0, antialias=True, round_caps=True):
+        """
+        Make a DetailLevel, which says how much detail to draw a display list with.
+
+        :param name: The name of the level, for logging.
+        :type name: string.
+
+        :param min_size: The smallest width or height, in pixels, of a primitive in one of the DETAIL_LAYERS to
+            draw. Defaults to 0, which draws them all.
+        :type min_size: float
+
+        :param antialias: Whether to anti-alias the edges of shapes. Backends that take as long either way always
+            anti-alias. Defaults to True.
+        :type antialias: Boolean
+
+        :param round_caps: Whether to draw round line caps, rather than butt caps. Defaults to True.
+        :type round_caps: Boolean
+        """
+
+        self.name = name
+        self.min_size = min_size
+        self.antialias = antialias
+        self.round_caps = round_caps
+
+    def is_full(self):
+        """
+        Return whether the level draws everything, as the display list was recorded.
+
+        :return: True if nothing is left out or drawn more simply.
+        :rtype: Boolean
+        """
+
+        return not self.min_size and self.antialias and self.round_caps
+
+
+def get_detail_level(quality, tile_size):
+    """
+    Work out how much detail to draw a display list with, from the quality and the tile size it is drawn at.
+
+    :param quality: The quality, one of QUALITIES.
+    :type quality: string.
+
+    :param tile_size: The size of a tile in the image, in pixels.
+    :type tile_size: float
+
+    :return: The level of detail.
+    :rtype: DetailLevel
+    """
+
+    if quality not in DETAIL_TIERS:
+        raise ValueError(f"Unknown quality: {quality}. Use one of {', '.join(QUALITIES)}.")
+
+    for min_tile_size, min_size, antialias, round_caps in DETAIL_TIERS[quality]:
+        if tile_size >= min_tile_size:
+            break
+    return DetailLevel(f"{quality}, tile size {tile_size:g}", min_size, antialias, round_caps)
+
+
+def find_detailed_primitives(display_list, bounds, detail):
+    """
+    Find the primitives of a display list that are big enough to draw at a level of detail.
+
+    :param display_list: The display list.
+    :type display_list: DisplayList
+
+    :param bounds: The box of each primitive, from get_primitive_bounds, scaled to the image.
+    :type bounds: numpy array of float64, of shape (number of primitives, 4)
+
+    :param detail: The level of detail.
+    :type detail: DetailLevel
+
+    :return: Whether to draw each primitive.
+    :rtype: numpy array of Booleans.
+    """
+
+    sizes = np.maximum(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1])
+    layer_ids = np.frombuffer(display_list.layer_ids, dtype=np.uint8)
+    detail_layer_ids = [layer_id for layer_id, name in enumerate(display_list.layers) if name in DETAIL_LAYERS]
+    return ~np.isin(layer_ids, detail_layer_ids) | (sizes >= detail.min_size)
@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+
+import numpy as np
+
+# The maps of the save that the colours of the tiles come from.
+MINIMAP_LAYERS = (b'MAPT', b'MAPH', b'MAPO', b'MAP5', b'MAPE')
+
+# The most pixels per tile of a minimap. Bigger images are better drawn by the painter.
+MAX_PIXELS_PER_TILE = 4
+
+
+def make_color_table(colors):
+    """
+    Turn a list of colours into a table that can be indexed with arrays.
+
+    :param colors: The colours, in the range (0-1, 0-1, 0-1). Missing colours are None.
+    :type colors: list of (float, float, float).
+
+    :return: The colours, in the range 0-255, with black for the missing ones.
+    :rtype: numpy array of uint8, of shape (len(colors), 3).
+    """
+
+    table = np.zeros((len(colors), 3), dtype=np.uint8)
+    for index, color in enumerate(colors):
+        if color is not None:
+            table[index] = np.rint(np.asarray(color[:3]) * 255)
+    return table
+
+
+def get_tile_colors(layers, style, seed=0):
+    """
+    Work out the background colour of every tile at once, with the same rules as the painter's tile backgrounds
+    and rail backgrounds.
+
+    :param layers: The value of each tile in each of the MINIMAP_LAYERS, keyed by the name of the map.
+    :type layers: dict of numpy arrays of uint8, of shape (nrows, ncols).
+
+    :param style: The compiled style to colour the tiles with.
+    :type style: CompiledStyle
+
+    :param seed: The seed of the noise of the water. Defaults to 0.
+    :type seed: integer.
+
+    :return: The colour of each tile.
+    :rtype: numpy array of uint8, of shape (nrows, ncols, 3).
+    """
+
+    kind = layers[b'MAPT'] >> 4
+    height = layers[b'MAPH']
+
+    # Every colour a tile can have goes in one table, and each tile gets the index of its colour in it.
+    tables = {
+        "height": style.height_colors(int(height.min()), int(height.max())),
+        "kind": style.background_colors,
+        "water": style.water_colors,
+        "station": style.station_colors,
+        "player": style.player_colors,
+        "depot": [style.rail_depot_rgb],
+    }
+    offsets = {}
+    colors = []
+    for name, table in tables.items():
+        offsets[name] = len(colors)
+        colors.extend(table)
+
+    # Tiles without a colour of their own kind are coloured by their height.
+    has_kind_color = np.array([color is not None for color in style.background_colors])
+    indices = np.where(has_kind_color[kind], offsets["kind"] + kind.astype(np.int32), height)
+
+    water = kind == 6
+    noise = np.random.default_rng(seed).integers(0, style.ocean_noise + 1, size=int(water.sum()))
+    indices[water] = offsets["water"] + noise
+
+    stations = kind == 5
+    indices[stations] = offsets["station"] + ((layers[b'MAPE'][stations] >> 3) & 7)
+
+    rail = kind == 1
+    depots = rail & ((layers[b'MAP5'] >> 6) == 3)
+    if style.draw_rail_backgrounds:
+        tracks = rail & ~depots
+        indices[tracks] = offsets["player"] + (layers[b'MAPO'][tracks] & 15) % len(style.player_colors)
+    indices[depots] = offsets["depot"]
+
+    return make_color_table(colors)[indices]
+
+
+def make_minimap(layers, style, pixels_per_tile=1, seed=0):
+    """
+    Make a minimap of the background colours of the tiles, with a square of pixels for each tile, laid out like the
+    painter's images.
+
+    :param layers: The value of each tile in each of the MINIMAP_LAYERS, keyed by the name of the map.
+    :type layers: dict of numpy arrays of uint8, of shape (nrows, ncols).
+
+    :param style: The compiled style to colour the tiles with.
+    :type style: CompiledStyle
+
+    :param pixels_per_tile: The width and height of each tile, from 1 to MAX_PIXELS_PER_TILE. Defaults to 1.
+    :type pixels_per_tile: integer.
+
+    :param seed: The seed of the noise of the water. Defaults to 0.
+    :type seed: integer.
+
+    :return: The image, as RGB.
+    :rtype: numpy array of uint8, of shape (pixels_per_tile * (nrows - 1), pixels_per_tile * (ncols - 1), 3).
+    """
+
+    if not 1 <= pixels_per_tile <= MAX_PIXELS_PER_TILE:
+        raise ValueError(f"A minimap has 1 to {MAX_PIXELS_PER_TILE} pixels per tile, not {pixels_per_tile}.")
+
+    # The painter draws the columns from right to left, and the edges of the map are cut through the middle of the
+    # tiles, which leaves one tile fewer across and down.
+    colors = get_tile_colors(layers, style, seed=seed)[:, ::-1]
+    nrows, ncols = colors.shape[:2]
+    image = np.repeat(np.repeat(colors, pixels_per_tile, axis=0), pixels_per_tile, axis=1)
+    start = pixels_per_tile // 2
+    return image[start:start + pixels_per_tile * (nrows - 1), start:start + pixels_per_tile * (ncols - 1)]
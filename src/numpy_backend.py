@@ -0,0 +1,623 @@
+#!/usr/bin/python3
+
+import math
+
+import numpy as np
+
+from display_list import replay
+from drawing_context import (
+    LINE_CAP_ROUND, LINE_CAP_SQUARE, LINE_JOIN_MITER, LINE_JOIN_ROUND, PATH_ARC, PATH_CLOSE, PATH_LINE, PATH_MOVE,
+    PATH_RECTANGLE, DrawingContext
+)
+from level_of_detail import QUALITY
+from painter_backend import PainterBackend, import_cairo
+
+# How many rows of samples to take in each row of pixels. The coverage along each row of samples is exact.
+SAMPLE_ROWS = 4
+
+# How far a flattened arc may be from the true arc, in pixels.
+ARC_TOLERANCE = 0.1
+
+# The longest a miter join can be, as a multiple of the line width, like in Cairo.
+MITER_LIMIT = 10
+
+# The most crossings of rows of samples with edges to work out at once, when filling a polygon.
+MAX_BAND_CROSSINGS = 1 << 22
+
+# How many bytes of coverage masks to keep. Most shapes on a map are small and repeated many times, so this is plenty.
+MAX_MASK_BYTES = 1 << 27
+
+# Masks with more pixels than this are not kept, as big shapes like long lines are seldom repeated.
+MAX_KEPT_MASK_PIXELS = 1 << 16
+
+
+def flatten_arc(xc, yc, radius, angle1, angle2):
+    """
+    Turn a clockwise arc into a list of points.
+
+    :return: The points, from the start of the arc to its end.
+    :rtype: list of (float, float)
+    """
+
+    if radius > ARC_TOLERANCE:
+        step = 2 * math.acos(1 - ARC_TOLERANCE / radius)
+    else:
+        step = 0.5 * math.pi
+    n_steps = max(1, math.ceil((angle2 - angle1) / step))
+
+    points = []
+    for i in range(n_steps + 1):
+        angle = angle1 + (angle2 - angle1) * i / n_steps
+        points.append((xc + radius * math.cos(angle), yc + radius * math.sin(angle)))
+    return points
+
+
+def flatten_path(path):
+    """
+    Turn a path into sub-paths made of straight lines, like Cairo does.
+
+    :param path: The commands of the path, in the coordinates of the image, as kept by a DrawingContext.
+    :type path: list of tuples.
+
+    :return: The points of each sub-path, and whether it is closed.
+    :rtype: list of [list of (float, float), Boolean]
+    """
+
+    subpaths = []
+    points = None
+    start = None
+    for command in path:
+        kind = command[0]
+        if kind == PATH_MOVE:
+            start = command[1:3]
+            points = [start]
+            subpaths.append([points, False])
+        elif kind == PATH_LINE:
+            if points is None:
+                points = [start]
+                subpaths.append([points, False])
+            points.append(command[1:3])
+        elif kind == PATH_CLOSE:
+            if points is not None:
+                subpaths[-1][1] = True
+                start = points[0]
+                points = None
+        elif kind == PATH_RECTANGLE:
+            x, y, width, height = command[1:]
+            subpaths.append([[(x, y), (x + width, y), (x + width, y + height), (x, y + height)], True])
+            start = (x, y)
+            points = None
+        elif kind == PATH_ARC:
+            # The arc starts with a line from the current point, if there is one.
+            if points is None:
+                points = [start] if start is not None else []
+                subpaths.append([points, False])
+            points.extend(flatten_arc(*command[1:]))
+    return subpaths
+
+
+def make_disc(x, y, radius):
+    """
+    Return a polygon that covers a disc.
+
+    :return: The points of the polygon.
+    :rtype: list of (float, float)
+    """
+
+    return flatten_arc(x, y, radius, 0, 2 * math.pi)[:-1]
+
+
+def make_join(point, direction_in, direction_out, half_width, line_join):
+    """
+    Return the polygons that fill the corner where two lines of a stroke meet.
+
+    :return: The polygons.
+    :rtype: list of lists of (float, float)
+    """
+
+    (x, y) = point
+    (dx1, dy1) = direction_in
+    (dx2, dy2) = direction_out
+    dot = dx1 * dx2 + dy1 * dy2
+    if abs(dx1 * dy2 - dy1 * dx2) < 1e-9 and dot > 0:
+        return []
+    if line_join == LINE_JOIN_ROUND:
+        return [make_disc(x, y, half_width)]
+
+    # Fill both sides of the corner, as the inner side is covered by the lines anyway.
+    nx1, ny1 = -dy1 * half_width, dx1 * half_width
+    nx2, ny2 = -dy2 * half_width, dx2 * half_width
+    polygons = []
+    use_miter = line_join == LINE_JOIN_MITER and (1 + dot) / 2 >= 1 / MITER_LIMIT ** 2
+    for side in (1, -1):
+        corner_in = (x + side * nx1, y + side * ny1)
+        corner_out = (x + side * nx2, y + side * ny2)
+        if use_miter:
+            mx = side * (nx1 + nx2) / (1 + dot)
+            my = side * (ny1 + ny2) / (1 + dot)
+            polygons.append([point, corner_in, (x + mx, y + my), corner_out])
+        else:
+            polygons.append([point, corner_in, corner_out])
+    return polygons
+
+
+def make_stroke_polygons(subpaths, half_width, line_cap, line_join):
+    """
+    Return polygons that together cover a stroke of some sub-paths.
+
+    :param subpaths: The sub-paths, from flatten_path.
+    :type subpaths: list.
+
+    :param half_width: Half the width of the line, in pixels.
+    :type half_width: float
+
+    :param line_cap: The line cap, using the Cairo value.
+    :type line_cap: integer.
+
+    :param line_join: The line join, using the Cairo value.
+    :type line_join: integer.
+
+    :return: The polygons.
+    :rtype: list of lists of (float, float)
+    """
+
+    polygons = []
+    for points, closed in subpaths:
+        points = [point for i, point in enumerate(points) if i == 0 or point != points[i - 1]]
+        if closed and len(points) > 1 and points[-1] == points[0]:
+            points.pop()
+
+        if len(points) == 1:
+            if line_cap == LINE_CAP_ROUND:
+                polygons.append(make_disc(points[0][0], points[0][1], half_width))
+            continue
+
+        n_points = len(points)
+        n_lines = n_points if closed and n_points > 2 else n_points - 1
+        directions = []
+        for i in range(n_lines):
+            (x1, y1) = points[i]
+            (x2, y2) = points[(i + 1) % n_points]
+            length = math.hypot(x2 - x1, y2 - y1)
+            dx, dy = (x2 - x1) / length, (y2 - y1) / length
+            directions.append((dx, dy))
+
+            if not closed and line_cap == LINE_CAP_SQUARE:
+                if i == 0:
+                    x1, y1 = x1 - dx * half_width, y1 - dy * half_width
+                if i == n_lines - 1:
+                    x2, y2 = x2 + dx * half_width, y2 + dy * half_width
+
+            nx, ny = -dy * half_width, dx * half_width
+            polygons.append([(x1 + nx, y1 + ny), (x2 + nx, y2 + ny), (x2 - nx, y2 - ny), (x1 - nx, y1 - ny)])
+
+        if closed and n_points > 2:
+            joins = range(n_points)
+        else:
+            joins = range(1, n_lines)
+            if line_cap == LINE_CAP_ROUND:
+                polygons.append(make_disc(points[0][0], points[0][1], half_width))
+                polygons.append(make_disc(points[-1][0], points[-1][1], half_width))
+
+        for i in joins:
+            polygons.extend(make_join(points[i], directions[i - 1], directions[i], half_width, line_join))
+
+    # With every polygon the same way round, the non-zero winding rule fills their union.
+    for polygon in polygons:
+        area = sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1]))
+        if area < 0:
+            polygon.reverse()
+    return polygons
+
+
+def make_polygon_mask(polygons, clip=None):
+    """
+    Work out how much of each pixel some polygons cover, with the non-zero winding rule.
+
+    :param polygons: The polygons, in the coordinates of the image.
+    :type polygons: list of lists of (float, float)
+
+    :param clip: The left, top, right and bottom of the part of the image to work out, or None for all of it.
+        Defaults to None.
+    :type clip: (integer, integer, integer, integer)
+
+    :return: The x and y of the top left of the mask, and the mask, or None if the polygons cover nothing.
+    :rtype: (integer, integer, numpy array of float32)
+    """
+
+    polygons = [polygon for polygon in polygons if len(polygon) > 2]
+    if not polygons:
+        return None
+
+    points = np.concatenate([np.asarray(polygon, dtype=np.float64) for polygon in polygons])
+    x0 = math.floor(points[:, 0].min())
+    y0 = math.floor(points[:, 1].min())
+    x1 = math.ceil(points[:, 0].max())
+    y1 = math.ceil(points[:, 1].max())
+    if clip is not None:
+        x0, y0 = max(x0, clip[0]), max(y0, clip[1])
+        x1, y1 = min(x1, clip[2]), min(y1, clip[3])
+    width = x1 - x0
+    height = y1 - y0
+    if width <= 0 or height <= 0:
+        return None
+
+    # The edges of the polygons, relative to the top left of the mask, without the horizontal ones.
+    starts = points - (x0, y0)
+    ends = np.concatenate([
+        np.roll(np.asarray(polygon, dtype=np.float64), -1, axis=0) for polygon in polygons
+    ]) - (x0, y0)
+    sloped = starts[:, 1] != ends[:, 1]
+    ex0, ey0 = starts[sloped, 0], starts[sloped, 1]
+    ex1, ey1 = ends[sloped, 0], ends[sloped, 1]
+
+    mask = np.empty((height, width), dtype=np.float32)
+    edge_top = np.minimum(ey0, ey1)
+    edge_bottom = np.maximum(ey0, ey1)
+
+    # Work through the mask in bands of rows, so that only the edges that reach each band are looked at, and the
+    # crossings of big paths with many edges fit in memory.
+    band_rows = max(1, MAX_BAND_CROSSINGS // (SAMPLE_ROWS * max(1, len(ex0))))
+    for band_y0 in range(0, height, band_rows):
+        band_y1 = min(band_y0 + band_rows, height)
+        in_band = (edge_top < band_y1) & (edge_bottom > band_y0)
+        mask[band_y0:band_y1] = make_band_coverage(
+            ex0[in_band], ey0[in_band], ex1[in_band], ey1[in_band], band_y0, band_y1, width
+        )
+    return x0, y0, mask
+
+
+def make_band_coverage(ex0, ey0, ex1, ey1, y0, y1, width):
+    """
+    Work out how much of each pixel in a band of rows some edges enclose, with the non-zero winding rule.
+
+    :param ex0: The x coordinates of the starts of the edges.
+    :type ex0: numpy array of float64.
+
+    :param ey0: The y coordinates of the starts of the edges.
+    :type ey0: numpy array of float64.
+
+    :param ex1: The x coordinates of the ends of the edges.
+    :type ex1: numpy array of float64.
+
+    :param ey1: The y coordinates of the ends of the edges.
+    :type ey1: numpy array of float64.
+
+    :param y0: The first row of the band.
+    :type y0: integer.
+
+    :param y1: The row after the last row of the band.
+    :type y1: integer.
+
+    :param width: The width of the band.
+    :type width: integer.
+
+    :return: The coverage of each pixel.
+    :rtype: numpy array of float32, of shape (y1 - y0, width)
+    """
+
+    n_rows = (y1 - y0) * SAMPLE_ROWS
+    if not len(ex0):
+        return np.zeros((y1 - y0, width), dtype=np.float32)
+
+    # Where each row of samples crosses each edge, and which way.
+    ys = y0 + (np.arange(n_rows) + 0.5)[:, None] / SAMPLE_ROWS
+    crosses = (ys >= np.minimum(ey0, ey1)) & (ys < np.maximum(ey0, ey1))
+    xs = np.where(crosses, ex0 + (ys - ey0) * ((ex1 - ex0) / (ey1 - ey0)), np.inf)
+    windings = np.where(crosses, np.sign(ey1 - ey0), 0).astype(np.int32)
+
+    n_crossings = int(crosses.sum(axis=1).max())
+    order = np.argsort(xs, axis=1)[:, :n_crossings]
+    xs = np.take_along_axis(xs, order, axis=1)
+    windings = np.cumsum(np.take_along_axis(windings, order, axis=1), axis=1)
+
+    # The spans between crossings that are inside the polygons.
+    inside = (windings[:, :-1] != 0) & np.isfinite(xs[:, 1:])
+    rows, k = np.nonzero(inside)
+    left = np.clip(xs[rows, k], 0, width)
+    right = np.clip(xs[rows, k + 1], 0, width)
+    keep = right > left
+    rows, left, right = rows[keep], left[keep], right[keep]
+
+    # Add up the spans: the pixels at either end are partly covered, and the ones in between are fully covered,
+    # which is added as steps that are summed along each row.
+    coverage = np.zeros((n_rows, width + 1), dtype=np.float32)
+    steps = np.zeros((n_rows, width + 1), dtype=np.float32)
+    left_pixel = np.floor(left).astype(np.int64)
+    right_pixel = np.floor(right).astype(np.int64)
+    same = left_pixel == right_pixel
+    np.add.at(coverage, (rows[same], left_pixel[same]), right[same] - left[same])
+    rows, left, right = rows[~same], left[~same], right[~same]
+    left_pixel, right_pixel = left_pixel[~same], right_pixel[~same]
+    np.add.at(coverage, (rows, left_pixel), left_pixel + 1 - left)
+    np.add.at(coverage, (rows, right_pixel), right - right_pixel)
+    np.add.at(steps, (rows, left_pixel + 1), 1)
+    np.add.at(steps, (rows, right_pixel), -1)
+    coverage += np.cumsum(steps, axis=1)
+
+    return np.minimum(coverage[:, :width].reshape(y1 - y0, SAMPLE_ROWS, width).mean(axis=1), 1)
+
+
+def make_rectangle_mask(x, y, width, height, clip=None):
+    """
+    Work out how much of each pixel a rectangle along the axes covers.
+
+    :param clip: The left, top, right and bottom of the part of the image to work out, or None for all of it.
+        Defaults to None.
+    :type clip: (integer, integer, integer, integer)
+
+    :return: The x and y of the top left of the mask, and the mask, or None if the rectangle covers nothing.
+    :rtype: (integer, integer, numpy array of float32)
+    """
+
+    x1, x2 = sorted((x, x + width))
+    y1, y2 = sorted((y, y + height))
+    x0 = math.floor(x1)
+    y0 = math.floor(y1)
+    x3 = math.ceil(x2)
+    y3 = math.ceil(y2)
+    if clip is not None:
+        x0, y0 = max(x0, clip[0]), max(y0, clip[1])
+        x3, y3 = min(x3, clip[2]), min(y3, clip[3])
+    if x2 <= x1 or y2 <= y1 or x3 <= x0 or y3 <= y0:
+        return None
+
+    columns = np.arange(x0, x3, dtype=np.float32)
+    rows = np.arange(y0, y3, dtype=np.float32)
+    coverage_x = np.clip(np.minimum(x2, columns + 1) - np.maximum(x1, columns), 0, 1)
+    coverage_y = np.clip(np.minimum(y2, rows + 1) - np.maximum(y1, rows), 0, 1)
+    return x0, y0, np.outer(coverage_y, coverage_x).astype(np.float32)
+
+
+class RasterContext(DrawingContext):
+    def __init__(self, width, height, masks=None):
+        """
+        Make a RasterContext, which draws on an image held in a NumPy array, with anti-aliasing.
+
+        The coverage of each shape is worked out once for each position within a pixel, and kept, so that the
+        shapes that are repeated across the map are only blended in, with one slice of the image each.
+
+        :param width: The width of the image.
+        :type width: integer.
+
+        :param height: The height of the image.
+        :type height: integer.
+
+        :param masks: The coverage masks kept by another context, to share with this one, and how many bytes they
+            take. Defaults to None.
+        :type masks: (dict, integer)
+        """
+
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.image = np.zeros((height, width, 4), dtype=np.uint8)
+        self.masks, self.mask_bytes = masks or ({}, 0)
+        self.colors = {}
+        self.n_shapes = 0
+        self.n_texts_skipped = 0
+        self.cairo = import_cairo(required=False)
+
+    def fill(self):
+        """Fill the current path and clear it."""
+
+        path = self.path
+        if path:
+            if len(path) == 1 and path[0][0] == PATH_RECTANGLE:
+                self.draw_path("rectangle", lambda clip: make_rectangle_mask(*path[0][1:], clip=clip))
+            else:
+                self.draw_path("fill", lambda clip: make_polygon_mask([
+                    points for points, closed in flatten_path(path)
+                ], clip=clip))
+
+        self.new_path()
+
+    def stroke(self):
+        """Stroke the current path and clear it."""
+
+        path = self.path
+        if path:
+            state = self.state
+            half_width = 0.5 * state.line_width * self.get_scale()
+            line_cap = state.line_cap
+            line_join = state.line_join
+
+            def make_mask(clip):
+                subpaths = flatten_path(path)
+
+                # A single line along an axis, without round caps, is a rectangle.
+                if len(subpaths) == 1 and len(subpaths[0][0]) == 2 and line_cap != LINE_CAP_ROUND:
+                    (x1, y1), (x2, y2) = subpaths[0][0]
+                    if x1 == x2 or y1 == y2:
+                        extend = half_width if line_cap == LINE_CAP_SQUARE else 0
+                        x1, x2 = sorted((x1, x2))
+                        y1, y2 = sorted((y1, y2))
+                        if x1 == x2:
+                            return make_rectangle_mask(
+                                x1 - half_width, y1 - extend, 2 * half_width, y2 - y1 + 2 * extend, clip=clip
+                            )
+                        return make_rectangle_mask(
+                            x1 - extend, y1 - half_width, x2 - x1 + 2 * extend, 2 * half_width, clip=clip
+                        )
+
+                return make_polygon_mask(make_stroke_polygons(subpaths, half_width, line_cap, line_join), clip=clip)
+
+            self.draw_path(("stroke", round(half_width, 4), line_cap, line_join), make_mask)
+
+        self.new_path()
+
+    def draw_path(self, shape, make_mask):
+        """
+        Blend the current colour into the image, through the coverage mask of the current path.
+
+        :param shape: What is being drawn with the path, which is part of the key of its mask.
+        :type shape: hashable.
+
+        :param make_mask: A function that works out the mask of the path within a clip rectangle of the image, as
+            (x, y, mask), or None.
+        :type make_mask: callable.
+        """
+
+        # The mask only depends on where the path is within a pixel, so it is keyed by the path moved to near 0.
+        first = self.path[0]
+        shift_x = math.floor(first[1])
+        shift_y = math.floor(first[2])
+        key = [shape]
+        for command in self.path:
+            if len(command) > 1:
+                key.append((command[0], round(command[1] - shift_x, 3), round(command[2] - shift_y, 3)) + tuple(
+                    round(value, 4) for value in command[3:]
+                ))
+            else:
+                key.append(command[0])
+        key = tuple(key)
+
+        entry = self.masks.get(key)
+        if entry is None:
+            # Only the part of the mask inside the image is worked out. A mask that might have been cut short at the
+            # edge of the image is not kept, as the same path could be drawn further in on another image.
+            result = make_mask((0, 0, self.width, self.height))
+            if result is None:
+                entry = (0, 0, None, False)
+                n_bytes = None
+            else:
+                x, y, mask = result
+                entry = (x - shift_x, y - shift_y, mask, bool(mask.min() >= 1))
+                inside = x > 0 and y > 0 and x + mask.shape[1] < self.width and y + mask.shape[0] < self.height
+                n_bytes = mask.nbytes if inside and mask.size <= MAX_KEPT_MASK_PIXELS else None
+            if n_bytes is not None:
+                if self.mask_bytes + n_bytes > MAX_MASK_BYTES:
+                    self.masks.clear()
+                    self.mask_bytes = 0
+                self.masks[key] = entry
+                self.mask_bytes += n_bytes
+
+        x, y, mask, full = entry
+        if mask is not None:
+            self.blend(shift_x + x, shift_y + y, mask, full)
+
+    def blend(self, x, y, mask, full=False):
+        """
+        Blend the current colour into the image.
+
+        :param x: The x coordinate of the left of the mask.
+        :type x: integer.
+
+        :param y: The y coordinate of the top of the mask.
+        :type y: integer.
+
+        :param mask: How much of each pixel to cover, in the range 0-1.
+        :type mask: numpy array of float32.
+
+        :param full: If True, the mask covers every pixel fully. Defaults to False.
+        :type full: Boolean
+        """
+
+        height, width = mask.shape
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, self.width), min(y + height, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        if (x0, y0, x1, y1) != (x, y, x + width, y + height):
+            mask = mask[y0 - y:y1 - y, x0 - x:x1 - x]
+
+        rgba = self.state.rgba
+        color = self.colors.get(rgba)
+        if color is None:
+            color = np.clip(np.array(rgba[:3] + (1,), dtype=np.float32), 0, 1) * 255
+            color = (color, np.rint(color).astype(np.uint8))
+            self.colors[rgba] = color
+
+        self.n_shapes += 1
+        region = self.image[y0:y1, x0:x1]
+        alpha = rgba[3]
+        if full and alpha >= 1:
+            region[:] = color[1]
+            return
+
+        coverage = (mask * alpha if alpha < 1 else mask)[:, :, None]
+        region[:] = (region * (1 - coverage) + color[0] * coverage + 0.5).astype(np.uint8)
+
+    def show_text(self, text):
+        """Draw text, with its baseline starting at the current point. This needs Cairo, for the fonts."""
+
+        cairo = self.cairo
+        if cairo is None:
+            self.n_texts_skipped += 1
+            return
+
+        state = self.state
+        x, y = self.current_point or self.to_device(0, 0)
+
+        def make_context(surface):
+            context = cairo.Context(surface)
+            context.select_font_face(state.font_family, state.font_slant, state.font_weight)
+            context.set_font_size(state.font_size * self.get_scale())
+            return context
+
+        x_bearing, y_bearing, text_width, text_height = make_context(
+            cairo.ImageSurface(cairo.FORMAT_A8, 1, 1)
+        ).text_extents(text)[:4]
+        x0 = math.floor(x + x_bearing) - 1
+        y0 = math.floor(y + y_bearing) - 1
+        width = math.ceil(text_width) + 3
+        height = math.ceil(text_height) + 3
+
+        surface = cairo.ImageSurface(cairo.FORMAT_A8, width, height)
+        context = make_context(surface)
+        context.move_to(x - x0, y - y0)
+        context.show_text(text)
+        surface.flush()
+
+        mask = np.ndarray(shape=(height, surface.get_stride()), dtype=np.uint8, buffer=surface.get_data())
+        self.blend(x0, y0, mask[:, :width].astype(np.float32) / 255)
+
+
+class NumpyBackend(PainterBackend):
+    """
+    A painter backend that draws with NumPy, blending each shape in with a slice of the image. It is quickest at
+    small tile sizes, where the same few shapes are drawn over and over. Text is drawn with Cairo if it is
+    installed, and left out otherwise. It always anti-aliases, as the coverage masks take as long to work out
+    either way, and covering pixels by how much of them a shape covers leaves holes where tiles meet.
+    """
+
+    def __init__(self, painter, quality=QUALITY):
+        """
+        :param painter: The painter that made the display lists, used for logging.
+        :type painter: CairoPainter
+
+        :param quality: The quality to draw at, one of QUALITIES. Defaults to QUALITY.
+        :type quality: string.
+        """
+
+        super().__init__(painter, quality=quality)
+
+        # The coverage masks are kept from one region to the next, as the same shapes are drawn all over the map.
+        self.masks = None
+        self.n_shapes = 0
+        self.n_texts_skipped = 0
+
+    def log_totals(self):
+        """Log how many shapes were drawn, and how many labels were left out, since the last time."""
+
+        self.log_message(f"Drew {self.n_shapes} shapes, with {len(self.masks[0]) if self.masks else 0} coverage masks.")
+        if self.n_texts_skipped:
+            self.log_message(f"Left out {self.n_texts_skipped} labels, as drawing text needs Cairo.")
+        self.n_shapes = 0
+        self.n_texts_skipped = 0
+
+    def render_region(self, display_list, x, y, width, height, scale=1.0, layers=None, indices=None, detail=None):
+        """Draw part of a display list on a new image, with NumPy."""
+
+        context = RasterContext(width, height, masks=self.masks)
+        if x or y:
+            context.translate(-x, -y)
+        replay(
+            display_list, context, scale=scale, layers=layers, indices=indices,
+            round_caps=detail is None or detail.round_caps
+        )
+
+        self.masks = (context.masks, context.mask_bytes)
+        self.n_shapes += context.n_shapes
+        self.n_texts_skipped += context.n_texts_skipped
+        return context.image
@@ -4,6 +4,20 @@
 Various types used in the game. Most of these are not used in the save file parser.
 """
 
+# The map layers of the save file that are read for each tile, with their width in bits.
+MAP_LAYERS = [
+    (b'MAPT', 8),
+    (b'MAPH', 8),
+    (b'MAPO', 8),
+    (b'MAP2', 16),
+    (b'M3LO', 8),
+    (b'M3HI', 8),
+    (b'MAP5', 8),
+    (b'MAPE', 8),
+    (b'MAP7', 8),
+    (b'MAP8', 16)
+]
+
 TILE_ZONES = [
     'normal',
     'desert',
@@ -0,0 +1,336 @@
+#!/usr/bin/python3
+
+import contextlib
+import importlib
+
+import numpy as np
+from alive_progress import alive_bar
+
+from area_resampler import AreaResampler
+from display_list import find_primitives, get_primitive_bounds
+from level_of_detail import QUALITY, find_detailed_primitives, get_detail_level
+from png_writer import COMPRESSION_LEVEL, PngWriter, unpremultiply
+
+# The backends that can draw a display list on a raster image, by name, with the module and class of each. They are
+# imported when they are first used, so a backend's dependencies are only needed if it is used.
+PAINTER_BACKENDS = {
+    "cairo": ("cairo_backend", "CairoBackend"),
+    "numpy": ("numpy_backend", "NumpyBackend"),
+}
+
+
+# The widest and tallest image Cairo can draw on.
+CAIRO_MAX_SIZE = 32767
+
+# The most memory to use for each band of rows, when a PNG image is drawn band by band, in bytes.
+BAND_BYTES = 1 << 26
+
+
+def get_scaled_size(display_list, scale=1.0):
+    """
+    Return the size of the image a display list is drawn on, at a given scale.
+
+    :param display_list: The display list of the map.
+    :type display_list: DisplayList
+
+    :param scale: How much to scale the display list by. Defaults to 1.
+    :type scale: float
+
+    :return: The width and height of the image.
+    :rtype: (integer, integer)
+    """
+
+    return int(round(scale * display_list.width)), int(round(scale * display_list.height))
+
+
+def import_cairo(required=True):
+    """
+    Import Cairo when it is first needed, so that it is only needed for the things that use it.
+
+    :param required: If True, raise an ImportError if Cairo is not installed, otherwise return None. Defaults to True.
+    :type required: Boolean
+
+    :return: The cairo module.
+    :rtype: module
+    """
+
+    try:
+        import cairo
+    except ImportError as error:
+        if required:
+            raise ImportError("This needs pycairo. Install it, or use the numpy backend.") from error
+        return None
+    return cairo
+
+
+def get_painter_backend(name):
+    """
+    Return the class of a painter backend.
+
+    :param name: The name of the backend, one of PAINTER_BACKENDS.
+    :type name: string.
+
+    :return: The class.
+    :rtype: type
+    """
+
+    if name not in PAINTER_BACKENDS:
+        raise ValueError(f"Unknown painter backend: {name}. Use one of {', '.join(PAINTER_BACKENDS)}.")
+
+    module_name, class_name = PAINTER_BACKENDS[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class PainterBackend:
+    # The widest and tallest region the backend can draw at once, or None if there is no limit.
+    max_size = None
+
+    def __init__(self, painter, quality=QUALITY):
+        """
+        Make a PainterBackend, which draws display lists on raster images. This is a base class: subclasses decide
+        how to draw.
+
+        :param painter: The painter that made the display lists, used for logging.
+        :type painter: CairoPainter
+
+        :param quality: The quality to draw at, one of QUALITIES, which sets how much detail is drawn at each tile
+            size. Defaults to QUALITY.
+        :type quality: string.
+        """
+
+        self.painter = painter
+        self.quality = quality
+
+    @classmethod
+    def is_available(cls):
+        """
+        Return whether the dependencies of the backend are installed.
+
+        :return: True if the backend can be used.
+        :rtype: Boolean
+        """
+
+        return True
+
+    def log_message(self, message):
+        """
+        Send a message to the logger.
+
+        :param message: The message to log.
+        :type message: string.
+        """
+
+        self.painter.log_message(message)
+
+    def log_totals(self):
+        """Log what the backend has drawn since the last time. Subclasses can say more."""
+
+        pass
+
+    def choose_detail_level(self, display_list, scale=1.0):
+        """
+        Work out how much detail to draw a display list with at a scale, and log it if it is less than full.
+
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param scale: How much the display list is scaled by. Defaults to 1.
+        :type scale: float
+
+        :return: The level of detail.
+        :rtype: DetailLevel
+        """
+
+        detail = get_detail_level(self.quality, display_list.ss * scale)
+        if not detail.is_full():
+            self.log_message(
+                f"Drawing at {detail.name}: details under {detail.min_size:g} pixels are left out, and lines have "
+                f"{'round' if detail.round_caps else 'butt'} caps."
+            )
+        return detail
+
+    def find_detailed_indices(self, display_list, scale, detail):
+        """
+        Find the primitives of a display list to draw at a level of detail.
+
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param scale: How much the display list is scaled by.
+        :type scale: float
+
+        :param detail: The level of detail.
+        :type detail: DetailLevel
+
+        :return: The indices of the primitives, in order, or None to draw them all.
+        :rtype: numpy array of integers.
+        """
+
+        if not detail.min_size:
+            return None
+        bounds = get_primitive_bounds(display_list) * scale
+        return np.nonzero(find_detailed_primitives(display_list, bounds, detail))[0]
+
+    def render(self, display_list, scale=1.0, layers=None):
+        """
+        Draw a display list on a new image.
+
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param scale: How much to scale the display list by. Defaults to 1.
+        :type scale: float
+
+        :param layers: The names of the layers to draw. If None, draw all the layers. Defaults to None.
+        :type layers: set of strings.
+
+        :return: The image, premultiplied by alpha.
+        :rtype: numpy array of uint8, of shape (height, width, 4).
+        """
+
+        width, height = get_scaled_size(display_list, scale)
+        detail = self.choose_detail_level(display_list, scale)
+        image = self.render_region(
+            display_list, 0, 0, width, height, scale=scale, layers=layers,
+            indices=self.find_detailed_indices(display_list, scale, detail), detail=detail
+        )
+        self.log_totals()
+        return image
+
+    def render_region(self, display_list, x, y, width, height, scale=1.0, layers=None, indices=None, detail=None):
+        """
+        Draw part of a display list on a new image.
+
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param x: The x coordinate of the left of the region, in the scaled image.
+        :type x: integer.
+
+        :param y: The y coordinate of the top of the region, in the scaled image.
+        :type y: integer.
+
+        :param width: The width of the region.
+        :type width: integer.
+
+        :param height: The height of the region.
+        :type height: integer.
+
+        :param scale: How much to scale the display list by. Defaults to 1.
+        :type scale: float
+
+        :param layers: The names of the layers to draw. If None, draw all the layers. Defaults to None.
+        :type layers: set of strings.
+
+        :param indices: The indices of the primitives that reach the region, from find_primitives. If None, draw
+            them all. Defaults to None.
+        :type indices: list of integers.
+
+        :param detail: How to draw the primitives: with anti-aliasing or not, and with round line caps or not. If
+            None, draw them as they were recorded. Defaults to None.
+        :type detail: DetailLevel
+
+        :return: The region of the image, premultiplied by alpha.
+        :rtype: numpy array of uint8, of shape (height, width, 4).
+        """
+
+        raise NotImplementedError
+
+    def write_png(self, display_list, image_file_path, scale=1.0, layers=None, band_bytes=BAND_BYTES,
+                  compression_level=COMPRESSION_LEVEL, indexed=False, resized=None):
+        """
+        Draw a display list band by band, and save it as a PNG file. Each band of rows is drawn on its own, with only
+        the primitives that reach it, and written to the file as soon as it is drawn, so the image can be much
+        bigger than the memory it takes to draw. Smaller copies of the image can be written at the same time, shrunk
+        from the same bands, rather than drawn again.
+
+        :param display_list: The display list of the map.
+        :type display_list: DisplayList
+
+        :param image_file_path: The path to the file.
+        :type image_file_path: string.
+
+        :param scale: How much to scale the display list by. Defaults to 1.
+        :type scale: float
+
+        :param layers: The names of the layers to draw. If None, draw all the layers. Defaults to None.
+        :type layers: set of strings.
+
+        :param band_bytes: The most memory to use for each band, in bytes. Defaults to BAND_BYTES.
+        :type band_bytes: integer.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write an image with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+
+        :param resized: The path, width and height of each smaller copy of the image to write, or None for none.
+            Defaults to None.
+        :type resized: list of (string, integer, integer)
+        """
+
+        width, height = get_scaled_size(display_list, scale)
+        resized = list(resized or [])
+        bounds = get_primitive_bounds(display_list) * scale
+        detail = self.choose_detail_level(display_list, scale)
+        detailed = find_detailed_primitives(display_list, bounds, detail) if detail.min_size else None
+
+        band_rows = max(1, band_bytes // (4 * width))
+        region_width = width
+        if self.max_size is not None:
+            band_rows = min(band_rows, self.max_size)
+            region_width = min(width, self.max_size)
+
+        bands = [(y, min(band_rows, height - y)) for y in range(0, height, band_rows)]
+        self.log_message(f"Drawing {width} x {height} pixels in {len(bands)} bands of up to {band_rows} rows.")
+
+        def write_band(y, rows):
+            regions = []
+            for x in range(0, width, region_width):
+                columns = min(region_width, width - x)
+
+                # Antialiasing reaches into the pixels around a shape.
+                indices = find_primitives(bounds, x - 1, y - 1, x + columns + 1, y + rows + 1)
+                if detailed is not None:
+                    indices = indices[detailed[indices]]
+                regions.append(self.render_region(
+                    display_list, x, y, columns, rows, scale=scale, layers=layers, indices=indices, detail=detail
+                ))
+            band = np.concatenate(regions, axis=1)
+            writer.write_rows(unpremultiply(band))
+
+            # The smaller copies are averaged before alpha is divided out, so transparent pixels do not count.
+            for resized_writer, resampler in zip(resized_writers, resamplers):
+                resized_writer.write_rows(unpremultiply(resampler.add_rows(band)))
+
+        with contextlib.ExitStack() as stack:
+            writer = stack.enter_context(PngWriter(
+                image_file_path, width, height, compression_level=compression_level, indexed=indexed
+            ))
+            resized_writers = [
+                stack.enter_context(PngWriter(
+                    path, resized_width, resized_height, compression_level=compression_level, indexed=indexed
+                ))
+                for path, resized_width, resized_height in resized
+            ]
+            resamplers = [
+                AreaResampler(width, height, resized_width, resized_height)
+                for path, resized_width, resized_height in resized
+            ]
+
+            if self.painter.parent.show_progress_bar:
+                with alive_bar(len(bands)) as abar:
+                    for y, rows in bands:
+                        write_band(y, rows)
+                        abar()
+            else:
+                for y, rows in bands:
+                    write_band(y, rows)
+
+        if indexed:
+            self.log_message(
+                f"Wrote a palette of {len(writer.quantizer.get_palette())} colours, with "
+                f"{writer.quantizer.n_approximated} pixels drawn with the nearest colour."
+            )
+        self.log_totals()
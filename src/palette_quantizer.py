@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+
+import numpy as np
+
+# The most colours a PNG palette can have.
+PALETTE_SIZE = 256
+
+# How many colours to match to their nearest palette entry at once.
+MATCH_CHUNK = 1 << 14
+
+# Until the last rows of an image, a new colour has to cover at least one in this many of the pixels it comes with to
+# be added to the palette, so the rare blends of the first rows do not use up the palette.
+RARE_COLOR_PIXELS = 1 << 16
+
+
+def pack_colors(image):
+    """
+    Pack each RGBA pixel of an image into one integer, so colours can be compared and sorted as numbers.
+
+    :param image: The image, as RGBA.
+    :type image: numpy array of uint8, of shape (..., 4).
+
+    :return: The packed colours, with red in the top byte.
+    :rtype: numpy array of uint32, of shape (...)
+    """
+
+    image = image.astype(np.uint32)
+    return (image[..., 0] << 24) | (image[..., 1] << 16) | (image[..., 2] << 8) | image[..., 3]
+
+
+def unpack_colors(keys):
+    """
+    Unpack colours packed by pack_colors.
+
+    :param keys: The packed colours.
+    :type keys: numpy array of uint32.
+
+    :return: The colours, as RGBA.
+    :rtype: numpy array of uint8, of shape (len(keys), 4).
+    """
+
+    return np.stack([(keys >> shift) & 255 for shift in (24, 16, 8, 0)], axis=-1).astype(np.uint8)
+
+
+class PaletteQuantizer:
+    def __init__(self, size=PALETTE_SIZE):
+        """
+        Make a PaletteQuantizer, which turns RGBA images into indices into a palette of up to 256 colours, a few rows
+        at a time.
+
+        Maps only have a few dozen flat colours, and anti-aliasing blends them at the edges of shapes. Each colour
+        keeps the palette entry it is first given, and new colours get the free entries, most common first, so the
+        palette is exact if there are few enough colours. Colours that do not get an entry are drawn with the nearest
+        colour in the palette, which are only ever the rare blends.
+
+        :param size: The most colours the palette can have. Defaults to PALETTE_SIZE.
+        :type size: integer.
+        """
+
+        self.size = size
+        self.keys = np.zeros(0, dtype=np.uint32)
+        self.entries = np.zeros(0, dtype=np.uint8)
+        self.colors = np.zeros((0, 4), dtype=np.uint8)
+        self.n_approximated = 0
+
+    def get_palette(self):
+        """
+        Return the colours of the palette, in the order of their indices.
+
+        :return: The palette, as RGBA.
+        :rtype: numpy array of uint8, of shape (number of colours, 4).
+        """
+
+        return self.colors
+
+    def quantize(self, image, min_count=1):
+        """
+        Turn an image into indices into the palette, adding any new colours to it while there is room.
+
+        :param image: The image, as RGBA that is not premultiplied by alpha.
+        :type image: numpy array of uint8, of shape (height, width, 4).
+
+        :param min_count: How many pixels a new colour needs, to be added to the palette. Rarer colours are drawn
+            with the nearest colour already in it, which leaves room for colours that are common further on in the
+            image. Defaults to 1.
+        :type min_count: integer.
+
+        :return: The index of the colour of each pixel.
+        :rtype: numpy array of uint8, of shape (height, width).
+        """
+
+        keys, inverse, counts = np.unique(pack_colors(image).ravel(), return_inverse=True, return_counts=True)
+
+        # The colours already in the palette keep their entries.
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1) if len(self.keys) else None
+        known = self.keys[positions] == keys if positions is not None else np.zeros(len(keys), dtype=bool)
+        indices = np.zeros(len(keys), dtype=np.uint8)
+        if known.any():
+            indices[known] = self.entries[positions[known]]
+
+        # New colours that are common enough fill the free entries, the most common first.
+        new = np.flatnonzero(~known)
+        new = new[np.argsort(-counts[new], kind="stable")]
+        n_added = min(self.size - len(self.colors), int((counts[new] >= min_count).sum()))
+        if not len(self.colors):
+            n_added = max(n_added, 1)
+        added, rest = new[:n_added], new[n_added:]
+        if len(added):
+            indices[added] = np.arange(len(self.colors), len(self.colors) + len(added))
+            self.colors = np.concatenate([self.colors, unpack_colors(keys[added])])
+            self.keys = np.concatenate([self.keys, keys[added]])
+            self.entries = np.concatenate([self.entries, indices[added]])
+            order = np.argsort(self.keys)
+            self.keys, self.entries = self.keys[order], self.entries[order]
+
+        # Any colours left over get the nearest entry.
+        if len(rest):
+            indices[rest] = self.match(unpack_colors(keys[rest]))
+            self.n_approximated += int(counts[rest].sum())
+
+        return indices[inverse].reshape(image.shape[:2])
+
+    def match(self, colors):
+        """
+        Find the nearest colour in the palette to each of some colours.
+
+        :param colors: The colours, as RGBA.
+        :type colors: numpy array of uint8, of shape (n, 4).
+
+        :return: The index of the nearest palette entry to each colour.
+        :rtype: numpy array of uint8.
+        """
+
+        palette = self.colors.astype(np.int32)
+        indices = np.empty(len(colors), dtype=np.uint8)
+        for start in range(0, len(colors), MATCH_CHUNK):
+            chunk = colors[start:start + MATCH_CHUNK].astype(np.int32)
+            distances = ((chunk[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+            indices[start:start + MATCH_CHUNK] = distances.argmin(axis=1)
+        return indices
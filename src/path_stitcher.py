@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+
+# The axes that segments can be stitched along. Each maps a position along the axis, t, and the offset of the line
+# to the point (x, y).
+AXIS_HORIZONTAL = 0
+AXIS_VERTICAL = 1
+AXIS_DIAGONAL_DOWN = 2
+AXIS_DIAGONAL_UP = 3
+
+
+def point_on_axis(axis, offset, t):
+    """
+    Return the point at a position along a line.
+
+    :param axis: The axis of the line.
+    :type axis: integer.
+
+    :param offset: The offset of the line, which is the same for every point on it.
+    :type offset: float.
+
+    :param t: The position along the line.
+    :type t: float.
+
+    :return: The coordinates of the point.
+    :rtype: (float, float)
+    """
+
+    if axis == AXIS_HORIZONTAL:
+        return t, offset
+    if axis == AXIS_VERTICAL:
+        return offset, t
+    if axis == AXIS_DIAGONAL_DOWN:
+        return t, t + offset
+    return t, offset - t
+
+
+class PathStitcher:
+    def __init__(self):
+        """
+        Make a PathStitcher, which collects short line segments and merges the collinear ones that touch into runs,
+        so that a long straight line is stroked once instead of once per tile.
+
+        Segments are only merged if they have the same key, which should hold everything that changes how the line
+        looks (the payload, colour, width, caps). Overlapping or touching segments on the same line are merged into
+        one, which covers the same pixels as the separate segments for both butt and round caps.
+        """
+
+        self.lines = {}
+        self.others = []
+        self.n_segments = 0
+
+    def add(self, x1, y1, x2, y2, key):
+        """
+        Add a line segment.
+
+        :param x1: The x coordinate of the start of the line.
+        :type x1: float
+
+        :param y1: The y coordinate of the start of the line.
+        :type y1: float
+
+        :param x2: The x coordinate of the end of the line.
+        :type x2: float
+
+        :param y2: The y coordinate of the end of the line.
+        :type y2: float
+
+        :param key: The style of the line. Segments with different keys are never merged.
+        :type key: tuple.
+        """
+
+        order = self.n_segments
+        self.n_segments += 1
+
+        dx = x2 - x1
+        dy = y2 - y1
+
+        if dy == 0:
+            axis, offset, t1, t2 = AXIS_HORIZONTAL, y1, x1, x2
+        elif dx == 0:
+            axis, offset, t1, t2 = AXIS_VERTICAL, x1, y1, y2
+        elif dx == dy:
+            axis, offset, t1, t2 = AXIS_DIAGONAL_DOWN, y1 - x1, x1, x2
+        elif dx == -dy:
+            axis, offset, t1, t2 = AXIS_DIAGONAL_UP, y1 + x1, x1, x2
+        else:
+            self.others.append((order, key, x1, y1, x2, y2))
+            return
+
+        if t2 < t1:
+            t1, t2 = t2, t1
+
+        self.lines.setdefault((key, axis, offset), []).append((t1, t2, order))
+
+    def get_runs(self):
+        """
+        Merge the segments into runs.
+
+        :return: The runs, as (key, x1, y1, x2, y2) tuples. They are in the order their first segment was added.
+        :rtype: list of tuples
+        """
+
+        runs = list(self.others)
+
+        for (key, axis, offset), intervals in self.lines.items():
+            intervals.sort()
+
+            run_t1, run_t2, run_order = intervals[0]
+            for t1, t2, order in intervals[1:]:
+                if t1 <= run_t2:
+                    run_t2 = max(run_t2, t2)
+                    run_order = min(run_order, order)
+                    continue
+
+                runs.append(
+                    (run_order, key) + point_on_axis(axis, offset, run_t1) + point_on_axis(axis, offset, run_t2)
+                )
+                run_t1, run_t2, run_order = t1, t2, order
+
+            runs.append((run_order, key) + point_on_axis(axis, offset, run_t1) + point_on_axis(axis, offset, run_t2))
+
+        runs.sort(key=lambda run: run[0])
+        return [run[1:] for run in runs]
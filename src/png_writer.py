@@ -0,0 +1,399 @@
+#!/usr/bin/python3
+
+import collections
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from palette_quantizer import RARE_COLOR_PIXELS, PaletteQuantizer
+
+# The PNG colour types for images with 3 and 4 channels.
+PNG_COLOR_TYPES = {3: 2, 4: 6}
+
+# The PNG colour type for images with a palette.
+PNG_COLOR_TYPE_PALETTE = 3
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# How much compressed data to gather before writing it out as an IDAT chunk, in bytes.
+IDAT_CHUNK_BYTES = 1 << 20
+
+# The zlib compression level to use by default. 1 is quickest, and 9 makes the smallest files.
+COMPRESSION_LEVEL = 6
+
+# How many threads each PNG file is compressed with, unless it is told otherwise. None uses one for each CPU, and
+# processes that share the CPUs with others set it lower.
+DEFAULT_THREADS = None
+
+# How many bytes of rows to compress in each block. The blocks are compressed in parallel, each primed with the end of
+# the block before, so the files are hardly any bigger than if they were compressed in one go.
+BLOCK_BYTES = 1 << 20
+
+# How much of the end of each block primes the next, which is as far back as deflate can look.
+WINDOW_BYTES = 1 << 15
+
+# The modulus of the Adler-32 checksum.
+ADLER_BASE = 65521
+
+
+def unpremultiply(image):
+    """
+    Divide the colour of each pixel by its alpha, as PNG files store colours that are not premultiplied.
+
+    :param image: The image, premultiplied by alpha.
+    :type image: numpy array of uint8, of shape (height, width, 4).
+
+    :return: The image, not premultiplied by alpha.
+    :rtype: numpy array of uint8, of shape (height, width, 4).
+    """
+
+    alpha = image[:, :, 3]
+    partial = (alpha != 0) & (alpha != 255)
+    if not partial.any():
+        return image
+
+    image = image.copy()
+    pixel_alpha = alpha[partial].astype(np.uint32)[:, None]
+    image[:, :, :3][partial] = np.minimum(
+        (image[:, :, :3][partial].astype(np.uint32) * 255 + pixel_alpha // 2) // pixel_alpha, 255
+    ).astype(np.uint8)
+    return image
+
+
+def combine_adler32(adler1, adler2, length2):
+    """
+    Work out the Adler-32 checksum of two pieces of data joined together, from the checksums of each, like zlib's
+    adler32_combine.
+
+    :param adler1: The checksum of the first piece.
+    :type adler1: integer.
+
+    :param adler2: The checksum of the second piece.
+    :type adler2: integer.
+
+    :param length2: The length of the second piece, in bytes.
+    :type length2: integer.
+
+    :return: The checksum of both pieces.
+    :rtype: integer
+    """
+
+    remainder = length2 % ADLER_BASE
+    sum1 = (adler1 & 0xffff) + (adler2 & 0xffff) + ADLER_BASE - 1
+    sum2 = (remainder * (adler1 & 0xffff)) % ADLER_BASE
+    sum2 += (adler1 >> 16) + (adler2 >> 16) + ADLER_BASE - remainder
+    return (sum1 % ADLER_BASE) | ((sum2 % ADLER_BASE) << 16)
+
+
+def compress_block(data, level, dictionary):
+    """
+    Compress a block of data as raw deflate, ending on a byte boundary with a sync flush, so that blocks compressed
+    separately can be joined into one stream.
+
+    :param data: The data.
+    :type data: bytes.
+
+    :param level: The zlib compression level.
+    :type level: integer.
+
+    :param dictionary: The data just before the block, which it can refer back to, or None.
+    :type dictionary: bytes.
+
+    :return: The compressed block, and the Adler-32 checksum of the data.
+    :rtype: (bytes, integer)
+    """
+
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH), zlib.adler32(data)
+
+
+def make_chunk(chunk_type, data):
+    """
+    Make a PNG chunk.
+
+    :param chunk_type: The type of the chunk, such as b"IDAT".
+    :type chunk_type: bytes.
+
+    :param data: The data of the chunk.
+    :type data: bytes.
+
+    :return: The chunk, with its length and checksum.
+    :rtype: bytes
+    """
+
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+class PngWriter:
+    def __init__(self, file_path, width, height, channels=4, compression_level=COMPRESSION_LEVEL, threads=None,
+                 indexed=False):
+        """
+        Make a PngWriter, which writes a PNG file a few rows at a time, so the whole image never has to be in memory.
+        The rows are split into blocks as they arrive, which are compressed in parallel by worker threads, and
+        joined into one zlib stream that is written out in IDAT chunks.
+
+        Indexed images store one byte per pixel, an index into a palette of up to 256 colours that is built from the
+        rows as they arrive. The palette has to come before the pixels in the file, so the IDAT chunks are kept in a
+        temporary file until the end.
+
+        It can be used as a context manager, which closes it at the end.
+
+        :param file_path: The path to the file.
+        :type file_path: string.
+
+        :param width: The width of the image.
+        :type width: integer.
+
+        :param height: The height of the image.
+        :type height: integer.
+
+        :param channels: 3 for RGB, or 4 for RGBA. Defaults to 4.
+        :type channels: integer.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param threads: How many threads to compress with. If None, use DEFAULT_THREADS, or one for each CPU.
+            Defaults to None.
+        :type threads: integer.
+
+        :param indexed: If True, write an image with a palette, rather than RGB or RGBA. Defaults to False.
+        :type indexed: boolean.
+        """
+
+        if not 0 <= compression_level <= 9:
+            raise ValueError(f"The compression level must be from 0 to 9, not {compression_level}.")
+
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.compression_level = compression_level
+        self.n_rows = 0
+        self.pending = []
+        self.n_pending = 0
+
+        self.threads = threads or DEFAULT_THREADS or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+        self.blocks = collections.deque()
+        self.dictionary = None
+        self.adler = 1
+
+        # The zlib header, which is the same for any data at the same level.
+        self.pending.append(zlib.compressobj(compression_level).flush()[:2])
+        self.n_pending = 2
+
+        self.file_path = file_path
+        self.quantizer = PaletteQuantizer() if indexed else None
+        if indexed:
+            self.file_handle = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(file_path)))
+        else:
+            self.file_handle = open(file_path, "wb")
+            self.write_header(self.file_handle)
+
+    def write_header(self, file_handle):
+        """
+        Write the start of the file, up to the pixels.
+
+        :param file_handle: The file to write to.
+        :type file_handle: file.
+        """
+
+        file_handle.write(PNG_SIGNATURE)
+        color_type = PNG_COLOR_TYPES[self.channels] if self.quantizer is None else PNG_COLOR_TYPE_PALETTE
+        file_handle.write(make_chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, color_type, 0, 0, 0)))
+
+        if self.quantizer is not None:
+            palette = self.quantizer.get_palette()
+            file_handle.write(make_chunk(b"PLTE", palette[:, :3].tobytes()))
+            if (palette[:, 3] != 255).any():
+                file_handle.write(make_chunk(b"tRNS", palette[:, 3].tobytes()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.shutdown()
+
+    def write_rows(self, image):
+        """
+        Add some rows to the image.
+
+        :param image: The rows, as RGB or RGBA that is not premultiplied by alpha.
+        :type image: numpy array of uint8, of shape (rows, width, channels).
+        """
+
+        n_rows, width, channels = image.shape
+        if width != self.width or channels != self.channels:
+            raise ValueError(
+                f"Expected rows {self.width} wide with {self.channels} channels, not {width} with {channels}."
+            )
+        if self.n_rows + n_rows > self.height:
+            raise ValueError(f"The image only has {self.height} rows.")
+
+        if self.quantizer is not None:
+            if channels == 3:
+                image = np.concatenate([image, np.full((n_rows, width, 1), 255, dtype=np.uint8)], axis=2)
+            last = self.n_rows + n_rows == self.height
+            image = self.quantizer.quantize(image, min_count=1 if last else n_rows * width // RARE_COLOR_PIXELS)
+            channels = 1
+
+        # Each row starts with its filter type, which is 0 (none).
+        rows = np.zeros((n_rows, 1 + width * channels), dtype=np.uint8)
+        rows[:, 1:] = image.reshape(n_rows, width * channels)
+        self.n_rows += n_rows
+
+        data = rows.tobytes()
+        for start in range(0, len(data), BLOCK_BYTES):
+            self.add_block(data[start:start + BLOCK_BYTES])
+
+    def add_block(self, data):
+        """
+        Compress a block of rows, on a worker thread if there are any. The blocks that have been compressed are
+        gathered in order, and only a few are left in flight, so the memory they take stays bounded.
+
+        :param data: The rows, with their filter types.
+        :type data: bytes.
+        """
+
+        if self.executor is None:
+            self.add_compressed_block(compress_block(data, self.compression_level, self.dictionary), len(data))
+        else:
+            future = self.executor.submit(compress_block, data, self.compression_level, self.dictionary)
+            self.blocks.append((future, len(data)))
+            while self.blocks and (self.blocks[0][0].done() or len(self.blocks) > 2 * self.threads):
+                future, length = self.blocks.popleft()
+                self.add_compressed_block(future.result(), length)
+        self.dictionary = data[-WINDOW_BYTES:]
+
+    def add_compressed_block(self, result, length):
+        """
+        Add a compressed block to the stream, and its checksum to the checksum of the stream.
+
+        :param result: The compressed block, and the checksum of its data.
+        :type result: (bytes, integer)
+
+        :param length: The length of the data of the block, in bytes.
+        :type length: integer.
+        """
+
+        compressed, adler = result
+        self.adler = combine_adler32(self.adler, adler, length)
+        self.add_compressed(compressed)
+
+    def add_compressed(self, data):
+        """
+        Gather compressed data, and write it out as an IDAT chunk once there is enough of it.
+
+        :param data: The compressed data.
+        :type data: bytes.
+        """
+
+        if data:
+            self.pending.append(data)
+            self.n_pending += len(data)
+        if self.n_pending >= IDAT_CHUNK_BYTES:
+            self.write_pending()
+
+    def write_pending(self):
+        """Write out the compressed data gathered so far as an IDAT chunk."""
+
+        if self.pending:
+            self.file_handle.write(make_chunk(b"IDAT", b"".join(self.pending)))
+            self.pending = []
+            self.n_pending = 0
+
+    def close(self):
+        """Finish the image and close the file. All the rows must have been written."""
+
+        if self.n_rows != self.height:
+            self.shutdown()
+            raise ValueError(f"Only {self.n_rows} of the {self.height} rows of the image were written.")
+
+        while self.blocks:
+            future, length = self.blocks.popleft()
+            self.add_compressed_block(future.result(), length)
+
+        # The stream ends with an empty final block, and the checksum of all the data.
+        self.pending.append(b"\x03\x00" + struct.pack(">I", self.adler))
+        self.write_pending()
+        self.file_handle.write(make_chunk(b"IEND", b""))
+
+        if self.quantizer is not None:
+            with open(self.file_path, "wb") as file_handle:
+                self.write_header(file_handle)
+                self.file_handle.seek(0)
+                shutil.copyfileobj(self.file_handle, file_handle)
+        self.shutdown()
+
+    def shutdown(self):
+        """Stop the worker threads and close the file."""
+
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+        self.file_handle.close()
+
+
+def write_png(file_path, image, compression_level=COMPRESSION_LEVEL, threads=None, indexed=False):
+    """
+    Save an image as a PNG file, compressing it in parallel, without needing Cairo.
+
+    :param file_path: The path to the file.
+    :type file_path: string.
+
+    :param image: The image, as RGB or RGBA that is not premultiplied by alpha.
+    :type image: numpy array of uint8, of shape (height, width, 3 or 4).
+
+    :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+    :type compression_level: integer.
+
+    :param threads: How many threads to compress with. If None, use DEFAULT_THREADS, or one for each CPU. Defaults
+        to None.
+    :type threads: integer.
+
+    :param indexed: If True, write an image with a palette of up to 256 colours. Defaults to False.
+    :type indexed: boolean.
+    """
+
+    height, width, channels = image.shape
+    with PngWriter(
+        file_path, width, height, channels=channels, compression_level=compression_level, threads=threads,
+        indexed=indexed
+    ) as writer:
+        writer.write_rows(image)
+
+
+def write_atomically(file_path, write):
+    """
+    Write a file under a temporary name in the same directory, and then rename it over the file, so anything reading
+    the file only ever sees a whole one, the old or the new.
+
+    :param file_path: The path to the file.
+    :type file_path: string.
+
+    :param write: A function that writes the file, given the path to write it to.
+    :type write: callable.
+    """
+
+    directory, name = os.path.split(file_path)
+    handle, temporary_path = tempfile.mkstemp(
+        prefix=f".{name}.", suffix=os.path.splitext(name)[1], dir=directory or "."
+    )
+    os.close(handle)
+    try:
+        write(temporary_path)
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
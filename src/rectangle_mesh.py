@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+
+
+def merge_rectangles(values, nrows, ncols):
+    """
+    Cover a grid with as few rectangles as a greedy search finds, where every cell in a rectangle has the same value.
+
+    Starting from the first cell that is not covered yet, in row order, each rectangle is made as wide as it can be,
+    and then as tall as it can be with that width.
+
+    :param values: The value of each cell, in row order. Values must be hashable. Cells with the value None are left
+        uncovered.
+    :type values: list.
+
+    :param nrows: The number of rows in the grid.
+    :type nrows: integer.
+
+    :param ncols: The number of columns in the grid.
+    :type ncols: integer.
+
+    :return: The rectangles, as (row, col, height, width, value) tuples, in the order of their first cell.
+    :rtype: list of (integer, integer, integer, integer, any)
+    """
+
+    # Compare small integers rather than the values themselves.
+    ids = {}
+    cells = [ids.setdefault(value, len(ids)) for value in values]
+    values_by_id = list(ids)
+
+    covered = bytearray(value is None for value in values)
+    rectangles = []
+
+    for row in range(nrows):
+        row_start = row * ncols
+        col = 0
+        while col < ncols:
+            index = row_start + col
+            if covered[index]:
+                col += 1
+                continue
+
+            cell = cells[index]
+            end = index + 1
+            row_end = row_start + ncols
+            while end < row_end and cells[end] == cell and not covered[end]:
+                end += 1
+            width = end - index
+
+            run = [cell] * width
+            height = 1
+            below = index + ncols
+            while below < len(cells) and cells[below:below + width] == run and not any(covered[below:below + width]):
+                height += 1
+                below += ncols
+
+            for covered_row in range(height):
+                start = index + covered_row * ncols
+                covered[start:start + width] = b"\x01" * width
+
+            rectangles.append((row, col, height, width, values_by_id[cell]))
+            col += width
+
+    return rectangles
@@ -0,0 +1,379 @@
+#!/usr/bin/python3
+
+# The steps between vertices of the tile grid, as (drow, dcol), for each direction of a boundary edge.
+# The edges go clockwise around a region (with rows going down), so the region is always on the right.
+# Direction 0 runs along the NW side of a tile, 1 the SW, 2 the SE and 3 the NE.
+STEPS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+# The cell on the right of a boundary edge in each direction, as (drow, dcol) from the vertex the edge starts at.
+EDGE_CELLS = [(0, 0), (0, -1), (-1, -1), (-1, 0)]
+
+# The turns to try at a vertex where two boundary edges leave, in order: right, straight, left.
+# Turning right first keeps regions that only touch at a corner in separate loops.
+TURNS = [1, 0, 3]
+
+# The steps to the 8 neighbours of a cell, as (drow, dcol).
+NEIGHBOURS = [(-1, 0), (0, 1), (1, 0), (0, -1), (-1, -1), (-1, 1), (1, 1), (1, -1)]
+
+
+class RegionOutline:
+    def __init__(self, key, tiles, paths):
+        """
+        Make a RegionOutline, which holds the boundary of a connected region of tiles.
+
+        :param key: The key shared by all the tiles in the region.
+        :type key: any hashable.
+
+        :param tiles: The tiles in the region.
+        :type tiles: list of TileObject.
+
+        :param paths: The paths around the region, as returned by trace_paths. There is one closed path for the
+            outer boundary and one for each hole, unless a hole touches the boundary at a corner, and the paths are
+            open where the region meets the edge of the map.
+        :type paths: list of (list of (integer, integer, integer, integer), boolean).
+        """
+
+        self.key = key
+        self.tiles = tiles
+        self.paths = paths
+
+
+def find_regions(tiles, key_function):
+    """
+    Group tiles into regions of tiles that share a side and have the same key.
+
+    :param tiles: The tiles to group.
+    :type tiles: list of TileObject.
+
+    :param key_function: A function that returns the key of a tile.
+    :type key_function: callable.
+
+    :return: The regions, as (key, tiles) tuples, in the order of their first tile.
+    :rtype: list of (any, list of TileObject)
+    """
+
+    keys = {(tile.row, tile.col): key_function(tile) for tile in tiles}
+    tiles_by_cell = {(tile.row, tile.col): tile for tile in tiles}
+    seen = set()
+    regions = []
+
+    for tile in tiles:
+        cell = (tile.row, tile.col)
+        if cell in seen:
+            continue
+
+        key = keys[cell]
+        seen.add(cell)
+        stack = [cell]
+        region_tiles = []
+        while stack:
+            row, col = stack.pop()
+            region_tiles.append(tiles_by_cell[(row, col)])
+            for drow, dcol in STEPS:
+                other_cell = (row + drow, col + dcol)
+                if other_cell not in seen and other_cell in keys and keys[other_cell] == key:
+                    seen.add(other_cell)
+                    stack.append(other_cell)
+
+        regions.append((key, region_tiles))
+
+    return regions
+
+
+def trace_loops(cells):
+    """
+    Trace the boundary of a set of cells into closed loops of edges.
+
+    :param cells: The (row, col) of the cells in the region.
+    :type cells: set of (integer, integer).
+
+    :return: The loops, as lists of (row, col, direction) edges, each starting at the vertex (row, col) on the grid
+        of tile corners.
+    :rtype: list of lists of (integer, integer, integer)
+    """
+
+    edges = {}
+    for row, col in cells:
+        if (row - 1, col) not in cells:
+            edges.setdefault((row, col), []).append(0)
+        if (row, col + 1) not in cells:
+            edges.setdefault((row, col + 1), []).append(1)
+        if (row + 1, col) not in cells:
+            edges.setdefault((row + 1, col + 1), []).append(2)
+        if (row, col - 1) not in cells:
+            edges.setdefault((row + 1, col), []).append(3)
+
+    loops = []
+    while edges:
+        start = next(iter(edges))
+        first_direction = edges[start].pop()
+        if not edges[start]:
+            del edges[start]
+
+        loop = [(start[0], start[1], first_direction)]
+        vertex = start
+        direction = first_direction
+        while True:
+            drow, dcol = STEPS[direction]
+            vertex = (vertex[0] + drow, vertex[1] + dcol)
+
+            directions = edges.get(vertex, [])
+            if vertex == start:
+                directions = directions + [first_direction]
+
+            for turn in TURNS:
+                next_direction = (direction + turn) % 4
+                if next_direction in directions:
+                    break
+
+            if vertex == start and next_direction == first_direction:
+                break
+
+            edges[vertex].remove(next_direction)
+            if not edges[vertex]:
+                del edges[vertex]
+            loop.append((vertex[0], vertex[1], next_direction))
+            direction = next_direction
+
+        loops.append(loop)
+
+    return loops
+
+
+def get_corners(edges, closed, start_direction=None, end_direction=None):
+    """
+    Return the corners of a path of edges, where it changes direction, and its ends if it is open.
+
+    :param edges: The edges of the path, in order, as returned by trace_loops.
+    :type edges: list of (integer, integer, integer).
+
+    :param closed: If True, the path is a loop, and the last edge joins the first.
+    :type closed: boolean.
+
+    :param start_direction: For an open path, the direction of the edge before it, if the path turns a corner there.
+        Defaults to None.
+    :type start_direction: integer.
+
+    :param end_direction: For an open path, the direction of the edge after it, if the path turns a corner there.
+        Defaults to None.
+    :type end_direction: integer.
+
+    :return: The corners, as (row, col, direction_in, direction_out). The ends of an open path have the same
+        direction in and out, unless they turn a corner.
+    :rtype: list of (integer, integer, integer, integer)
+    """
+
+    corners = []
+    if not closed:
+        row, col, direction = edges[0]
+        corners.append((row, col, direction if start_direction is None else start_direction, direction))
+
+    next_edges = edges[1:] + edges[:1] if closed else edges[1:]
+    for (_, _, direction_in), (row, col, direction_out) in zip(edges, next_edges):
+        if direction_in != direction_out:
+            corners.append((row, col, direction_in, direction_out))
+
+    if not closed:
+        row, col, direction = edges[-1]
+        drow, dcol = STEPS[direction]
+        corners.append((row + drow, col + dcol, direction, direction if end_direction is None else end_direction))
+
+    return corners
+
+
+def get_corner_cell(edge_in, edge_out, cells):
+    """
+    Return the cell inside the corner where a boundary turns left, if it is in a set of cells.
+
+    :param edge_in: The edge into the corner, as (row, col, direction).
+    :type edge_in: (integer, integer, integer).
+
+    :param edge_out: The edge out of the corner, which starts where edge_in ends.
+    :type edge_out: (integer, integer, integer).
+
+    :param cells: The cells to look for it in.
+    :type cells: set of (integer, integer).
+
+    :return: The (row, col) of the cell, or None if the boundary does not turn left, or the cell is not in cells.
+    :rtype: (integer, integer)
+    """
+
+    if edge_out[2] != (edge_in[2] + 3) % 4:
+        return None
+
+    # The corner is the vertex where edge_out starts, and of the four cells around it, the ones on the right of the
+    # two edges are on either side of the corner cell.
+    row, col, _ = edge_out
+    drow_in, dcol_in = EDGE_CELLS[edge_in[2]]
+    drow_out, dcol_out = EDGE_CELLS[edge_out[2]]
+    in_cell = (row - STEPS[edge_in[2]][0] + drow_in, col - STEPS[edge_in[2]][1] + dcol_in)
+    out_cell = (row + drow_out, col + dcol_out)
+    for cell in [(row - 1, col - 1), (row - 1, col), (row, col - 1), (row, col)]:
+        if cell != in_cell and cell != out_cell and cell in cells:
+            return cell
+    return None
+
+
+def trace_paths(cells, open_cells=frozenset()):
+    """
+    Trace the boundary of a set of cells into paths, keeping only the corners. The boundary is left out along the
+    cells in open_cells, so that the paths around them are open.
+
+    :param cells: The (row, col) of the cells in the region, including the open cells.
+    :type cells: set of (integer, integer).
+
+    :param open_cells: The cells to leave the boundary out along. Defaults to none.
+    :type open_cells: set of (integer, integer).
+
+    :return: The paths, as (corners, closed), with the corners as returned by get_corners. An open path turns the
+        corner at an end where it meets the left out boundary at a left turn, with a cell that is not open inside it.
+    :rtype: list of (list of (integer, integer, integer, integer), boolean)
+    """
+
+    real_cells = cells - open_cells
+    paths = []
+    for loop in trace_loops(cells):
+        is_open = [(row + EDGE_CELLS[direction][0], col + EDGE_CELLS[direction][1]) in open_cells
+                   for row, col, direction in loop]
+        if not any(is_open):
+            paths.append((get_corners(loop, True), True))
+            continue
+
+        # Start just after an open edge, so that every run of edges that are not open has open edges either side.
+        start = is_open.index(True) + 1
+        run = []
+        previous_edge = loop[start - 1]
+        for edge, edge_is_open in zip(loop[start:] + loop[:start], is_open[start:] + is_open[:start]):
+            if not edge_is_open:
+                run.append(edge)
+                continue
+
+            if run:
+                start_direction = end_direction = None
+                if get_corner_cell(previous_edge, run[0], real_cells) is not None:
+                    start_direction = previous_edge[2]
+                if get_corner_cell(run[-1], edge, real_cells) is not None:
+                    end_direction = edge[2]
+                paths.append((get_corners(run, False, start_direction, end_direction), False))
+                run = []
+            previous_edge = edge
+
+    return paths
+
+
+def inset_path(corners, insets, closed=True, extension=0.0):
+    """
+    Move the corners of a path into the region, so that a line along the path is inside it by a given distance on
+    each side.
+
+    :param corners: The corners of the path, as returned by get_corners.
+    :type corners: list of (integer, integer, integer, integer).
+
+    :param insets: The distance to move the sides of the path, in tiles, for each direction of edge.
+    :type insets: list of 4 floats.
+
+    :param closed: If True, the path is a loop. Defaults to True.
+    :type closed: boolean.
+
+    :param extension: How far to carry on the ends of an open path that turn a corner, in tiles, so that a line
+        with butt caps fills the corner as a join would. Defaults to 0.
+    :type extension: float.
+
+    :return: The moved corners, as (row, col).
+    :rtype: list of (float, float)
+    """
+
+    points = []
+    for row, col, direction_in, direction_out in corners:
+        # The region is on the right of each edge, which is (dcol, -drow) in (row, col).
+        drow_in, dcol_in = STEPS[direction_in]
+        inset_in = insets[direction_in]
+        if direction_out == direction_in:
+            points.append((row + inset_in * dcol_in, col - inset_in * drow_in))
+            continue
+
+        drow_out, dcol_out = STEPS[direction_out]
+        inset_out = insets[direction_out]
+        points.append((
+            row + inset_in * dcol_in + inset_out * dcol_out,
+            col - inset_in * drow_in - inset_out * drow_out
+        ))
+
+    if not closed:
+        row, col, direction_in, direction_out = corners[0]
+        if direction_in != direction_out:
+            drow, dcol = STEPS[direction_out]
+            points[0] = (points[0][0] - extension * drow, points[0][1] - extension * dcol)
+        row, col, direction_in, direction_out = corners[-1]
+        if direction_in != direction_out:
+            drow, dcol = STEPS[direction_in]
+            points[-1] = (points[-1][0] + extension * drow, points[-1][1] + extension * dcol)
+
+    return points
+
+
+def find_open_cells(region_tiles, cells, key, keys, tile_grid):
+    """
+    Find the cells off the map next to a region, where the tile grid has no tile, or wraps around to a tile with the
+    same key. The region's boundary is left out along them, as there is no edge where there is no other tile.
+
+    :param region_tiles: The tiles in the region.
+    :type region_tiles: list of TileObject.
+
+    :param cells: The (row, col) of the cells in the region.
+    :type cells: set of (integer, integer).
+
+    :param key: The key of the region.
+    :type key: any hashable.
+
+    :param keys: The key of every tile being grouped into regions, by (row, col).
+    :type keys: dict.
+
+    :param tile_grid: The grid of tiles, used to find the neighbours of each tile.
+    :type tile_grid: TileGrid.
+
+    :return: The (row, col) of the cells.
+    :rtype: set of (integer, integer)
+    """
+
+    open_cells = set()
+    for tile in region_tiles:
+        for drow, dcol in NEIGHBOURS:
+            cell = (tile.row + drow, tile.col + dcol)
+            if cell in cells or cell in open_cells:
+                continue
+            other_tile = tile_grid.get_tile_dcr(tile, drow, dcol)
+            if other_tile is None:
+                open_cells.add(cell)
+                continue
+            other_cell = (other_tile.row, other_tile.col)
+            if other_cell != cell and keys.get(other_cell) == key:
+                open_cells.add(cell)
+    return open_cells
+
+
+def make_region_outlines(tiles, key_function, tile_grid):
+    """
+    Find the regions of tiles with the same key, and trace their outlines.
+
+    :param tiles: The tiles to consider.
+    :type tiles: list of TileObject.
+
+    :param key_function: A function that returns the key of a tile.
+    :type key_function: callable.
+
+    :param tile_grid: The grid of tiles, used to find where a region meets the edge of the map.
+    :type tile_grid: TileGrid.
+
+    :return: The outline of each region.
+    :rtype: list of RegionOutline
+    """
+
+    keys = {(tile.row, tile.col): key_function(tile) for tile in tiles}
+
+    outlines = []
+    for key, region_tiles in find_regions(tiles, key_function):
+        cells = {(tile.row, tile.col) for tile in region_tiles}
+        open_cells = find_open_cells(region_tiles, cells, key, keys, tile_grid)
+        outlines.append(RegionOutline(key, region_tiles, trace_paths(cells | open_cells, open_cells)))
+    return outlines
@@ -0,0 +1,750 @@
+#!/usr/bin/python3
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+import urllib.parse
+
+import batch_render
+from level_of_detail import QUALITIES, QUALITY
+from painter_backend import PAINTER_BACKENDS
+from png_writer import COMPRESSION_LEVEL
+from run import get_tile_size
+from surveyor import Surveyor
+
+# The image modes the service can draw, with the content type of each.
+CONTENT_TYPES = {
+    "PNG": "image/png",
+    "SVG": "image/svg+xml",
+    "SVGZ": "image/svg+xml",
+}
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+# The most bytes the request line and headers of a request can take.
+MAX_HEADER_BYTES = 1 << 16
+
+# How many bytes of an image to send at a time.
+STREAM_CHUNK_BYTES = 1 << 16
+
+# How many of the latest jobs the latency metrics are worked out from.
+LATENCY_WINDOW = 1000
+
+# How often to check whether the client of a job has gone away, in seconds.
+DISCONNECT_POLL_SECONDS = 0.5
+
+# The ingested saves each worker keeps, keyed by the hash of the save, from the least recently used.
+ingest_cache = collections.OrderedDict()
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        """
+        Make an HttpError, which is sent back to the client as a JSON error.
+
+        :param status: The HTTP status code.
+        :type status: integer.
+
+        :param message: What went wrong.
+        :type message: string.
+        """
+
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def init_service_worker(settings, settings_rgb_values, threads, cache_size):
+    """
+    Get a worker process ready to draw, like the batch workers, with an empty cache of ingested saves.
+
+    :param settings: The settings loaded from the config file.
+    :type settings: dict.
+
+    :param settings_rgb_values: The named colours loaded from config/rgb_values.json.
+    :type settings_rgb_values: dict.
+
+    :param threads: How many threads to compress each PNG file with, so the workers share the CPUs.
+    :type threads: integer.
+
+    :param cache_size: How many ingested saves to keep.
+    :type cache_size: integer.
+    """
+
+    batch_render.init_worker(settings, settings_rgb_values, threads)
+    batch_render.worker_settings["cache_size"] = cache_size
+
+
+def render_job(digest, data, image_file_path, options):
+    """
+    Draw a save, in a worker process. The ingested save is taken from the cache if it is there, and kept in it
+    otherwise.
+
+    :param digest: The SHA-1 hash of the save, which is its key in the cache.
+    :type digest: string.
+
+    :param data: The contents of the save file.
+    :type data: bytes.
+
+    :param image_file_path: The path to write the image to.
+    :type image_file_path: string.
+
+    :param options: The tile size, mode, backend, compression level, indexed flag and quality to draw with.
+    :type options: dict.
+
+    :return: Whether the save was in the cache, and how long ingesting and drawing it took.
+    :rtype: dict
+    """
+
+    start = time.perf_counter()
+    surveyor = ingest_cache.get(digest)
+    cached = surveyor is not None
+    if cached:
+        ingest_cache.move_to_end(digest)
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".sav") as save_file:
+            save_file.write(data)
+            save_file.flush()
+            surveyor = Surveyor(save_file.name)
+        surveyor.ingest_data()
+        ingest_cache[digest] = surveyor
+        while len(ingest_cache) > batch_render.worker_settings["cache_size"]:
+            ingest_cache.popitem(last=False)
+    ingested = time.perf_counter()
+
+    random.seed(123)
+    settings = batch_render.worker_settings
+    surveyor.set_settings(settings["settings"], settings["settings_rgb_values"], options["tile_size"])
+    surveyor.save_image(
+        image_file_path, options["mode"], backend=options["backend"],
+        compression_level=options["compression_level"], indexed=options["indexed"], quality=options["quality"]
+    )
+    return {
+        "cached": cached,
+        "ingest_seconds": ingested - start,
+        "render_seconds": time.perf_counter() - ingested,
+    }
+
+
+def parse_options(query):
+    """
+    Read the render options of a request from its query string.
+
+    :param query: The values of the query string, from urllib.parse.parse_qs.
+    :type query: dict of lists of strings.
+
+    :return: The tile size, mode, backend, compression level, indexed flag and quality to draw with.
+    :rtype: dict
+    """
+
+    def get(name, default=None):
+        return query[name][-1] if name in query else default
+
+    try:
+        tile_size = get("tile_size")
+        options = {
+            "tile_size": get_tile_size(int(tile_size)) if tile_size else None,
+            "mode": get("mode", "png").upper(),
+            "backend": get("backend", "cairo"),
+            "compression_level": int(get("compression_level", COMPRESSION_LEVEL)),
+            "indexed": get("indexed", "false").lower() in ("1", "true", "yes"),
+            "quality": get("quality", QUALITY),
+        }
+    except ValueError as error:
+        raise HttpError(400, f"Bad option: {error}") from error
+
+    if options["mode"] not in CONTENT_TYPES:
+        raise HttpError(400, f"Unknown mode: {options['mode']}. Use one of {', '.join(CONTENT_TYPES).lower()}.")
+    if options["backend"] not in PAINTER_BACKENDS:
+        raise HttpError(400, f"Unknown backend: {options['backend']}. Use one of {', '.join(PAINTER_BACKENDS)}.")
+    if not 0 <= options["compression_level"] <= 9:
+        raise HttpError(400, f"The compression level is from 0 to 9, not {options['compression_level']}.")
+    if options["quality"] not in QUALITIES:
+        raise HttpError(400, f"Unknown quality: {options['quality']}. Use one of {', '.join(QUALITIES)}.")
+    return options
+
+
+def get_percentiles(values):
+    """
+    Summarise some latencies.
+
+    :param values: The latencies, in seconds.
+    :type values: collection of floats.
+
+    :return: The mean, median, 95th percentile and largest latency, or None if there are none.
+    :rtype: dict
+    """
+
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        "mean": sum(values) / len(values),
+        "p50": values[len(values) // 2],
+        "p95": values[min(len(values) - 1, int(0.95 * len(values)))],
+        "max": values[-1],
+    }
+
+
+class RenderJob:
+    # The id of the next job.
+    ids = itertools.count(1)
+
+    def __init__(self, digest, data, options, image_dir):
+        """
+        Make a RenderJob, which is a request to draw a save, waiting for its turn in a shard's queue.
+
+        :param digest: The SHA-1 hash of the save.
+        :type digest: string.
+
+        :param data: The contents of the save file.
+        :type data: bytes.
+
+        :param options: The render options, from parse_options.
+        :type options: dict.
+
+        :param image_dir: The directory to write the image to, named after the job.
+        :type image_dir: string.
+        """
+
+        self.id = next(RenderJob.ids)
+        self.digest = digest
+        self.data = data
+        self.options = options
+        extension = "png" if options["mode"] == "PNG" else options["mode"].lower()
+        self.image_file_path = os.path.join(image_dir, f"{self.id}.{extension}")
+        self.future = asyncio.get_running_loop().create_future()
+        self.submitted = time.monotonic()
+        self.started = None
+
+
+class RenderShard:
+    def __init__(self, worker_args):
+        """
+        Make a RenderShard, which draws jobs one at a time in its own worker process. Each save always goes to the
+        same shard, so the worker's cache of ingested saves has it the next time. A job that has to be stopped
+        while it is drawn is stopped by replacing the worker process, which empties its cache.
+
+        :param worker_args: The arguments of init_service_worker.
+        :type worker_args: tuple.
+        """
+
+        self.worker_args = worker_args
+        self.queue = collections.deque()
+        self.wakeup = asyncio.Event()
+        self.current = None
+        self.current_result = None
+        self.pool = None
+        self.start_pool()
+
+    def start_pool(self):
+        """Start a new worker process."""
+
+        self.pool = multiprocessing.get_context("spawn").Pool(
+            1, initializer=init_service_worker, initargs=self.worker_args
+        )
+
+    def submit(self, job):
+        """
+        Add a job to the end of the queue.
+
+        :param job: The job.
+        :type job: RenderJob
+        """
+
+        self.queue.append(job)
+        self.wakeup.set()
+
+    async def cancel(self, job):
+        """
+        Stop a job, whether it is waiting or being drawn.
+
+        :param job: The job.
+        :type job: RenderJob
+        """
+
+        if job is self.current:
+            pool = self.pool
+            self.start_pool()
+            if not self.current_result.done():
+                self.current_result.set_result(("cancelled", None))
+            await asyncio.get_running_loop().run_in_executor(None, pool.terminate)
+        elif job in self.queue:
+            self.queue.remove(job)
+        if not job.future.done():
+            job.future.cancel()
+
+    async def run(self):
+        """Draw the jobs in the queue, one at a time, for as long as the service runs."""
+
+        loop = asyncio.get_running_loop()
+
+        def resolve(result, outcome):
+            if not result.done():
+                result.set_result(outcome)
+
+        while True:
+            if not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            job = self.queue.popleft()
+            job.started = time.monotonic()
+            self.current = job
+            self.current_result = result = loop.create_future()
+            self.pool.apply_async(
+                render_job, (job.digest, job.data, job.image_file_path, job.options),
+                callback=lambda value: loop.call_soon_threadsafe(resolve, result, ("ok", value)),
+                error_callback=lambda error: loop.call_soon_threadsafe(
+                    resolve, result, ("failed", f"{type(error).__name__}: {error}")
+                ),
+            )
+            status, value = await result
+            self.current = None
+            if not job.future.done() and status != "cancelled":
+                job.future.set_result((status, value))
+
+    def close(self):
+        """Stop the worker process."""
+
+        self.pool.terminate()
+
+
+class RenderService:
+    def __init__(self, config_file_path, jobs=1, cache_size=4, timeout=300.0, max_queue=64, save_dir=None,
+                 max_upload_bytes=1 << 26):
+        """
+        Make a RenderService, which draws maps of saves for HTTP clients. Saves are uploaded as the body of a POST
+        to /render, or named with a path on the server, and the image is sent back as the response. GET /metrics
+        gives the queue depth, how long jobs wait and take, and how often the ingest cache is used.
+
+        :param config_file_path: The path to the config file, which is loaded once for every job.
+        :type config_file_path: string.
+
+        :param jobs: How many saves to draw at once, each in its own worker process. Defaults to 1.
+        :type jobs: integer.
+
+        :param cache_size: How many ingested saves each worker keeps. Defaults to 4.
+        :type cache_size: integer.
+
+        :param timeout: How long a job can wait and draw for, in seconds, before it is stopped. Defaults to 300.
+        :type timeout: float
+
+        :param max_queue: The most jobs that can wait at once. More are turned away. Defaults to 64.
+        :type max_queue: integer.
+
+        :param save_dir: The directory that saves can be named from, or None to only take uploads. Defaults to None.
+        :type save_dir: string.
+
+        :param max_upload_bytes: The biggest save that can be uploaded, in bytes. Defaults to 64 MiB.
+        :type max_upload_bytes: integer.
+        """
+
+        self.config_file_path = config_file_path
+        self.jobs = jobs
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self.save_dir = os.path.realpath(save_dir) if save_dir else None
+        self.max_upload_bytes = max_upload_bytes
+
+        self.shards = []
+        self.image_dir = None
+        self.counts = collections.Counter()
+        self.waits = collections.deque(maxlen=LATENCY_WINDOW)
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def log_message(self, message):
+        """
+        Send a message to the logger.
+
+        :param message: The message to log.
+        :type message: string.
+        """
+
+        logging.getLogger("RenderService").info(message)
+
+    def get_metrics(self):
+        """
+        Return how busy the service is, and how it has done.
+
+        :return: The metrics.
+        :rtype: dict
+        """
+
+        return {
+            "queue_depth": sum(len(shard.queue) for shard in self.shards),
+            "running": sum(shard.current is not None for shard in self.shards),
+            "workers": len(self.shards),
+            "counts": dict(self.counts),
+            "wait_seconds": get_percentiles(self.waits),
+            "latency_seconds": get_percentiles(self.latencies),
+        }
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        """
+        Start the workers, and answer requests until cancelled.
+
+        :param host: The address to listen on. Defaults to 127.0.0.1.
+        :type host: string.
+
+        :param port: The port to listen on. Defaults to 8000.
+        :type port: integer.
+        """
+
+        settings, settings_rgb_values = batch_render.read_settings(self.config_file_path)
+        threads = max(1, (os.cpu_count() or 1) // self.jobs)
+        worker_args = (settings, settings_rgb_values, threads, self.cache_size)
+        self.shards = [RenderShard(worker_args) for _ in range(self.jobs)]
+        self.image_dir = tempfile.mkdtemp(prefix="render_service_")
+        runners = [asyncio.create_task(shard.run()) for shard in self.shards]
+
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        address = server.sockets[0].getsockname()
+        print(f"Serving on http://{address[0]}:{address[1]}/ with {self.jobs} workers.", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for runner in runners:
+                runner.cancel()
+            for shard in self.shards:
+                shard.close()
+            shutil.rmtree(self.image_dir, ignore_errors=True)
+
+    async def handle_connection(self, reader, writer):
+        """
+        Answer one request, and close the connection.
+
+        :param reader: The stream to read the request from.
+        :type reader: asyncio.StreamReader
+
+        :param writer: The stream to write the response to.
+        :type writer: asyncio.StreamWriter
+        """
+
+        try:
+            try:
+                method, target, headers = await self.read_request(reader)
+                url = urllib.parse.urlsplit(target)
+                if url.path == "/metrics":
+                    if method != "GET":
+                        raise HttpError(405, "Use GET for /metrics.")
+                    await self.send_json(writer, 200, self.get_metrics())
+                elif url.path == "/render":
+                    if method != "POST":
+                        raise HttpError(405, "Use POST for /render.")
+                    await self.render(reader, writer, urllib.parse.parse_qs(url.query), headers)
+                else:
+                    raise HttpError(404, f"Nothing at {url.path}. Use POST /render or GET /metrics.")
+            except HttpError as error:
+                await self.send_json(writer, error.status, {"error": error.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        """
+        Read the request line and headers of a request.
+
+        :param reader: The stream to read the request from.
+        :type reader: asyncio.StreamReader
+
+        :return: The method, the target, and the headers, with lower case names.
+        :rtype: (string, string, dict)
+        """
+
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError as error:
+            raise HttpError(413, "The request headers are too big.") from error
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError as error:
+            raise HttpError(400, f"Bad request line: {lines[0]}") from error
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        return method, target, headers
+
+    async def read_save(self, reader, query, headers):
+        """
+        Read the save a render request is for, either from the body, or from a path under the save directory.
+
+        :param reader: The stream to read the body from.
+        :type reader: asyncio.StreamReader
+
+        :param query: The values of the query string.
+        :type query: dict of lists of strings.
+
+        :param headers: The headers of the request.
+        :type headers: dict.
+
+        :return: The contents of the save file.
+        :rtype: bytes.
+        """
+
+        if "path" in query:
+            if self.save_dir is None:
+                raise HttpError(403, "Saves can only be uploaded, as the service has no save directory.")
+            path = os.path.realpath(os.path.join(self.save_dir, query["path"][-1]))
+            if os.path.commonpath([path, self.save_dir]) != self.save_dir:
+                raise HttpError(403, "Saves can only be named from inside the save directory.")
+            if not os.path.isfile(path):
+                raise HttpError(404, f"No save at {query['path'][-1]}.")
+            with open(path, "rb") as file_handle:
+                return file_handle.read()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError as error:
+            raise HttpError(400, "Bad Content-Length.") from error
+        if not length:
+            raise HttpError(400, "Upload a save as the body, or name one with ?path=.")
+        if length > self.max_upload_bytes:
+            raise HttpError(413, f"Saves can be at most {self.max_upload_bytes} bytes.")
+        return await reader.readexactly(length)
+
+    async def render(self, reader, writer, query, headers):
+        """
+        Queue a job to draw a save, wait for it, and send the image back. The job is stopped if it takes too long,
+        or if the connection to the client is reset or fails. Closing only the client's side of the connection, once
+        the request is sent, does not stop it.
+
+        :param reader: The stream to read the request body from.
+        :type reader: asyncio.StreamReader
+
+        :param writer: The stream to write the response to.
+        :type writer: asyncio.StreamWriter
+
+        :param query: The values of the query string.
+        :type query: dict of lists of strings.
+
+        :param headers: The headers of the request.
+        :type headers: dict.
+        """
+
+        options = parse_options(query)
+        data = await self.read_save(reader, query, headers)
+        if sum(len(shard.queue) for shard in self.shards) >= self.max_queue:
+            self.counts["rejected"] += 1
+            raise HttpError(503, "Too many jobs are waiting. Try again later.")
+
+        digest = hashlib.sha1(data).hexdigest()
+        shard = self.shards[int(digest, 16) % len(self.shards)]
+        job = RenderJob(digest, data, options, self.image_dir)
+        shard.submit(job)
+        self.counts["submitted"] += 1
+
+        # Each connection only gets one response, with "Connection: close", so anything more that the client sends
+        # is never read, and a client that has only closed its side of the connection still gets the image. The
+        # client has gone away if the connection is reset or fails, which closes the transport.
+        deadline = time.monotonic() + self.timeout
+        try:
+            while not job.future.done() and not writer.transport.is_closing():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await asyncio.wait({job.future}, timeout=min(remaining, DISCONNECT_POLL_SECONDS))
+
+            if not job.future.done():
+                await shard.cancel(job)
+                if writer.transport.is_closing():
+                    self.counts["cancelled"] += 1
+                    self.log_message(f"Job {job.id} was cancelled, as the client went away.")
+                    return
+                self.counts["timed_out"] += 1
+                raise HttpError(504, f"The job took longer than {self.timeout:g} seconds.")
+
+            status, value = job.future.result()
+            finished = time.monotonic()
+            self.waits.append(job.started - job.submitted)
+            self.latencies.append(finished - job.submitted)
+            if status != "ok":
+                self.counts["failed"] += 1
+                raise HttpError(500, value)
+
+            self.counts["completed"] += 1
+            self.counts["cache_hits" if value["cached"] else "cache_misses"] += 1
+            self.log_message(
+                f"Job {job.id} drew {digest[:12]} in {finished - job.started:.2f}s, after waiting "
+                f"{job.started - job.submitted:.2f}s{', from the cache' if value['cached'] else ''}."
+            )
+            await self.send_file(writer, job.image_file_path, CONTENT_TYPES[options["mode"]], {
+                "X-Job-Id": job.id,
+                "X-Save-Hash": digest,
+                "X-Ingest-Cached": "yes" if value["cached"] else "no",
+                "X-Render-Seconds": f"{value['ingest_seconds'] + value['render_seconds']:.3f}",
+            })
+        finally:
+            if os.path.exists(job.image_file_path):
+                os.remove(job.image_file_path)
+
+    def send_head(self, writer, status, content_type, length, headers=None):
+        """
+        Send the status line and headers of a response.
+
+        :param writer: The stream to write the response to.
+        :type writer: asyncio.StreamWriter
+
+        :param status: The HTTP status code.
+        :type status: integer.
+
+        :param content_type: The content type of the body.
+        :type content_type: string.
+
+        :param length: The length of the body, in bytes.
+        :type length: integer.
+
+        :param headers: Any other headers. Defaults to None.
+        :type headers: dict.
+        """
+
+        lines = [
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {length}",
+            "Connection: close",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def send_json(self, writer, status, value):
+        """
+        Send a JSON response.
+
+        :param writer: The stream to write the response to.
+        :type writer: asyncio.StreamWriter
+
+        :param status: The HTTP status code.
+        :type status: integer.
+
+        :param value: The value to send.
+        :type value: dict.
+        """
+
+        body = json.dumps(value, indent=2).encode()
+        self.send_head(writer, status, "application/json", len(body))
+        writer.write(body)
+        await writer.drain()
+
+    async def send_file(self, writer, file_path, content_type, headers=None):
+        """
+        Stream a file as the response, a chunk at a time.
+
+        :param writer: The stream to write the response to.
+        :type writer: asyncio.StreamWriter
+
+        :param file_path: The path to the file.
+        :type file_path: string.
+
+        :param content_type: The content type of the file.
+        :type content_type: string.
+
+        :param headers: Any other headers. Defaults to None.
+        :type headers: dict.
+        """
+
+        with open(file_path, "rb") as file_handle:
+            self.send_head(writer, 200, content_type, os.fstat(file_handle.fileno()).st_size, headers)
+            for chunk in iter(lambda: file_handle.read(STREAM_CHUNK_BYTES), b""):
+                writer.write(chunk)
+                await writer.drain()
+
+
+def main():
+    """
+    Run a local HTTP service that draws maps of saves on demand.
+    """
+
+    argparser = argparse.ArgumentParser(description='Draw maps of OpenTTD saves for HTTP clients.')
+    argparser.add_argument(
+        "--host",
+        help="The address to listen on.",
+        default="127.0.0.1",
+        type=str)
+    argparser.add_argument(
+        "--port",
+        help="The port to listen on.",
+        default=8000,
+        type=int)
+    argparser.add_argument(
+        "-c", "--config",
+        help="Path to the config file.",
+        default="config/martin.json",
+        type=str)
+    argparser.add_argument(
+        "-j", "--jobs",
+        help="How many saves to draw at once, each in its own worker process.",
+        default=os.cpu_count() or 1,
+        type=int)
+    argparser.add_argument(
+        "--cache-size",
+        help="How many ingested saves each worker keeps, so saves that are drawn again are not ingested again.",
+        default=4,
+        type=int)
+    argparser.add_argument(
+        "--timeout",
+        help="How long a job can wait and draw for, in seconds, before it is stopped.",
+        default=300.0,
+        type=float)
+    argparser.add_argument(
+        "--max-queue",
+        help="The most jobs that can wait at once. More are turned away.",
+        default=64,
+        type=int)
+    argparser.add_argument(
+        "--save-dir",
+        help="A directory that saves can be named from with ?path=, rather than uploaded. If not set, saves can only "
+             "be uploaded.",
+        default=None,
+        type=str)
+    argparser.add_argument(
+        "-v", "--verbose",
+        help="If set, use verbose logging.",
+        default=False,
+        action="store_true")
+    args = argparser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    service = RenderService(
+        args.config, jobs=max(1, args.jobs), cache_size=args.cache_size, timeout=args.timeout,
+        max_queue=args.max_queue, save_dir=args.save_dir
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Stopped serving.")
+
+
+if __name__ == '__main__':
+    main()
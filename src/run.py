@@ -5,9 +5,49 @@ import logging
 import os
 import random
 
+from level_of_detail import QUALITIES, QUALITY
+from painter_backend import PAINTER_BACKENDS
+from minimap import MAX_PIXELS_PER_TILE
+from png_writer import COMPRESSION_LEVEL
 from surveyor import Surveyor
 
 
+def get_tile_size(tile_size):
+    """
+    Round a tile size to one that can be drawn: an odd number, of at least 5.
+
+    :param tile_size: The tile size asked for.
+    :type tile_size: integer.
+
+    :return: The tile size.
+    :rtype: integer
+    """
+
+    if tile_size % 2 == 0:
+        tile_size = tile_size - 1
+    return max(tile_size, 5)
+
+
+def get_output_filename(save_file_path, mode):
+    """
+    Return the name of the image file to write for a save: the name of the save, with the mode as its extension.
+
+    :param save_file_path: The path to the save file.
+    :type save_file_path: string.
+
+    :param mode: The image mode, such as 'png' or 'svg'.
+    :type mode: string.
+
+    :return: The name of the image file, in lower case.
+    :rtype: string.
+    """
+
+    save_filename = save_file_path.split("/")[-1]
+    output_filename = ".".join(save_filename.split(".")[:-1])
+    output_filename = f"{output_filename}.{mode}"
+    return output_filename.lower()
+
+
 def main():
     """
     Parse a save file and save images to disk.
@@ -41,7 +81,7 @@ def main():
         type=str)
     argparser.add_argument(
         "-m", "--mode",
-        help="Image mode, one of: ['svg', 'png'].",
+        help="Image mode, one of: ['svg', 'svgz', 'png', 'cairo_svg'].",
         default="PNG",
         type=str)
     argparser.add_argument(
@@ -49,6 +89,88 @@ def main():
         help="Size of the tile. Should be an odd integer. May be ignored for very large maps.",
         default=default_tile_size,
         type=int)
+    argparser.add_argument(
+        "-l", "--display-list",
+        help="Path to a display list file (.npz). If it was made from the same save and config, the map is drawn from "
+             "it without reading the tiles, otherwise the map is recorded again and saved there.",
+        default="",
+        type=str)
+    argparser.add_argument(
+        "-b", "--backend",
+        help=f"The backend to draw png images with, one of: {list(PAINTER_BACKENDS)}. The numpy backend is quickest "
+             "at small tile sizes, and only needs Cairo for labels.",
+        default="cairo",
+        choices=list(PAINTER_BACKENDS),
+        type=str)
+    argparser.add_argument(
+        "--layers-dir",
+        help="Directory to also write each layer of a png image to, as a transparent png, for use as overlays.",
+        default=None,
+        type=str)
+    argparser.add_argument(
+        "--themes",
+        help="Comma separated config files. If set, the map is drawn once as colour classes, and a png image is "
+             "written for each config by colouring it in.",
+        default=None,
+        type=str)
+    argparser.add_argument(
+        "--samples",
+        help="With --themes, how many samples to draw for each pixel, across and down, for anti-aliasing.",
+        default=2,
+        type=int)
+    argparser.add_argument(
+        "--compression-level",
+        help="The zlib compression level of png images, from 0 to 9. 1 is quickest, for previews, and 9 makes the "
+             "smallest files, for archives.",
+        default=COMPRESSION_LEVEL,
+        choices=range(10),
+        metavar="{0-9}",
+        type=int)
+    argparser.add_argument(
+        "--indexed",
+        help="If set, write png images with a palette of up to 256 colours, which makes files several times smaller. "
+             "Colours beyond the first 256, which are only ever rare blends at the edges of shapes, are drawn with "
+             "the nearest colour in the palette.",
+        default=False,
+        action="store_true")
+    argparser.add_argument(
+        "--quality",
+        help="How much detail to draw png images with. 'draft' leaves out small details and anti-aliasing, for quick "
+             "previews, 'normal' leaves out details too small to see at small tile sizes, and 'high', the default, "
+             "draws everything.",
+        default=QUALITY,
+        choices=QUALITIES,
+        type=str)
+    argparser.add_argument(
+        "--sizes",
+        help="Comma separated tile sizes. If set, a png image is written for each, by drawing the largest and "
+             "shrinking it to the others, which is much quicker than drawing each one.",
+        default=None,
+        type=str)
+    argparser.add_argument(
+        "--redraw-sizes",
+        help="Comma separated tile sizes from --sizes to draw again rather than shrink, for when details like "
+             "signals need to be sharp.",
+        default="",
+        type=str)
+    argparser.add_argument(
+        "--progressive",
+        help="If set, write a png image in stages: a preview with a pixel for each tile straight away, then a small "
+             "draft, then the full image. 'replace' writes each stage over the one before, and 'numbered' writes each "
+             "to its own file.",
+        default=None,
+        nargs="?",
+        const="replace",
+        choices=("replace", "numbered"),
+        type=str)
+    argparser.add_argument(
+        "--minimap",
+        help=f"If set, write a png minimap with this many pixels per tile, from 1 to {MAX_PIXELS_PER_TILE}, instead. "
+             "The tiles are coloured straight from the save, without Cairo, which takes milliseconds.",
+        default=None,
+        choices=range(1, MAX_PIXELS_PER_TILE + 1),
+        metavar=f"{{1-{MAX_PIXELS_PER_TILE}}}",
+        type=int)
     argparser.add_argument(
         "-v", "--verbose",
         help="If set, use verbose logging.",
@@ -69,26 +191,31 @@ def main():
     if args.verbose:
         logging.basicConfig(level=logging.INFO)
 
-    tile_size = int(args.tile_size)
-    if tile_size % 2 == 0:
-        tile_size = tile_size - 1
-    tile_size = max(tile_size, 5)
+    tile_size = get_tile_size(int(args.tile_size))
     if tile_size == default_tile_size:
         tile_size = None
 
     if args.output_filename:
         output_filename = args.output_filename
     else:
-        save_filename = args.input_path.split("/")[-1]
-        output_filename = ".".join(save_filename.split(".")[:-1])
-        output_filename = f"{output_filename}.{args.mode}"
-        output_filename = output_filename.lower()
+        output_filename = get_output_filename(args.input_path, args.mode)
 
     image_mode = args.mode.upper()
     save_file_path = args.input_path
     config_file_path = args.config
     output_file_path = os.path.join(args.output_dir, output_filename)
     show_progress_bar = args.progress_bar
+    display_list_path = args.display_list
+    layers_dir = args.layers_dir
+    backend = args.backend
+    themes = args.themes.split(",") if args.themes else None
+    compression_level = args.compression_level
+    indexed = args.indexed
+    quality = args.quality
+    minimap = args.minimap
+    progressive = args.progressive
+    sizes = sorted({get_tile_size(int(size)) for size in args.sizes.split(",")}) if args.sizes else None
+    redraw_sizes = {get_tile_size(int(size)) for size in args.redraw_sizes.split(",") if size}
 
     if config_file_path == default_config_path and args.dark_mode:
         config_file_path = 'config/dark_mode.json'
@@ -102,11 +229,59 @@ def main():
     print(f"          verbose: {args.verbose}")
     print(f"show_progress_bar: {show_progress_bar}")
     print(f"        dark_mode: {args.dark_mode}")
+    print(f"     display_list: {display_list_path}")
+    print(f"          backend: {backend}")
+    print(f"       layers_dir: {layers_dir}")
+    print(f"           themes: {themes}")
+    print(f"compression_level: {compression_level}")
+    print(f"          indexed: {indexed}")
+    print(f"          quality: {quality}")
+    print(f"          minimap: {minimap}")
+    print(f"      progressive: {progressive}")
+    print(f"            sizes: {sizes}")
+    print(f"     redraw_sizes: {sorted(redraw_sizes)}")
 
     surveyor = Surveyor(save_file_path, show_progress_bar=show_progress_bar)
-    surveyor.ingest_data()
+    if minimap:
+        surveyor.load_settings(config_file_path, tile_size)
+        surveyor.save_minimap(
+            os.path.splitext(output_file_path)[0] + ".png", pixels_per_tile=minimap,
+            compression_level=compression_level, indexed=indexed
+        )
+        return
+
+    if themes:
+        surveyor.ingest_data()
+        surveyor.load_settings(config_file_path, tile_size)
+        surveyor.save_themed_images(
+            output_file_path, themes, samples=args.samples, compression_level=compression_level, indexed=indexed
+        )
+        return
+
+    if progressive:
+        # The preview is written before the data is ingested, which the surveyor does after it.
+        surveyor.load_settings(config_file_path, tile_size)
+        surveyor.save_progressive_images(
+            os.path.splitext(output_file_path)[0] + ".png", display_list_path=display_list_path, backend=backend,
+            compression_level=compression_level, indexed=indexed, quality=quality,
+            numbered=progressive == "numbered"
+        )
+        return
+
+    if sizes:
+        surveyor.load_settings(config_file_path, sizes[-1])
+        surveyor.save_image_sizes(
+            os.path.splitext(output_file_path)[0] + ".png", sizes, display_list_path=display_list_path,
+            backend=backend, compression_level=compression_level, indexed=indexed, redraw_sizes=redraw_sizes,
+            quality=quality
+        )
+        return
+
     surveyor.load_settings(config_file_path, tile_size)
-    surveyor.save_image(output_file_path, image_mode)
+    surveyor.save_image(
+        output_file_path, image_mode, display_list_path=display_list_path, layers_dir=layers_dir, backend=backend,
+        compression_level=compression_level, indexed=indexed, quality=quality
+    )
 
 
 if __name__ == '__main__':
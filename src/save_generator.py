@@ -0,0 +1,743 @@
+#!/usr/bin/python3
+
+import argparse
+import logging
+import lzma
+import random
+
+from openttd_types import INDUSTRY_TYPES
+
+# Surveyor only reads the low byte of the version, so this shows up as version 34, like the bundled saves.
+SAVEGAME_VERSION = 290
+
+# The map chunks, in the order OpenTTD writes them, with the number of bytes per tile.
+MAP_CHUNKS = [
+    (b'MAPT', 1),
+    (b'MAPH', 1),
+    (b'MAPO', 1),
+    (b'MAP2', 2),
+    (b'M3LO', 1),
+    (b'M3HI', 1),
+    (b'MAP5', 1),
+    (b'MAPE', 1),
+    (b'MAP7', 1),
+    (b'MAP8', 2)
+]
+
+OWNER_TOWN = 0x0F
+OWNER_NONE = 0x10
+OWNER_WATER = 0x11
+
+
+class SaveGenerator:
+    def __init__(
+        self, nrows, ncols, seed=123, max_height=15, sea_level=0.3, terrain_scale=32, tree_density=0.1,
+        rail_density=0.05, road_density=0.02, station_density=0.3, bridge_density=0.01, signal_density=0.2,
+        industry_density=0.01, n_companies=8
+    ):
+        """
+        Create a SaveGenerator, which makes synthetic save files that Surveyor can read.
+
+        :param nrows: The number of rows in the map.
+        :type nrows: integer.
+
+        :param ncols: The number of columns in the map.
+        :type ncols: integer.
+
+        :param seed: The seed for the random number generator. Defaults to 123.
+        :type seed: integer.
+
+        :param max_height: The maximum height of the terrain. Defaults to 15.
+        :type max_height: integer.
+
+        :param sea_level: The fraction of max_height below which tiles are water. Defaults to 0.3.
+        :type sea_level: float.
+
+        :param terrain_scale: The size of the hills, in tiles. Defaults to 32.
+        :type terrain_scale: integer.
+
+        :param tree_density: The probability that a land tile has trees. Defaults to 0.1.
+        :type tree_density: float.
+
+        :param rail_density: The number of railway lines per row and column of the map. Defaults to 0.05.
+        :type rail_density: float.
+
+        :param road_density: The number of towns per 1000 tiles. Defaults to 0.02.
+        :type road_density: float.
+
+        :param station_density: The probability that a railway line or town has a station. Defaults to 0.3.
+        :type station_density: float.
+
+        :param bridge_density: The probability that a railway track tile starts a bridge. Defaults to 0.01.
+        :type bridge_density: float.
+
+        :param signal_density: The probability that a straight railway track tile has signals. Defaults to 0.2.
+        :type signal_density: float.
+
+        :param industry_density: The number of industries per 1000 tiles. Defaults to 0.01.
+        :type industry_density: float.
+
+        :param n_companies: The number of companies that own things. Defaults to 8.
+        :type n_companies: integer.
+        """
+
+        self.logger = logging.getLogger("SaveGenerator")
+        self.nrows = nrows
+        self.ncols = ncols
+        self.rng = random.Random(seed)
+
+        self.max_height = max_height
+        self.sea_level = sea_level
+        self.terrain_scale = terrain_scale
+        self.tree_density = tree_density
+        self.rail_density = rail_density
+        self.road_density = road_density
+        self.station_density = station_density
+        self.bridge_density = bridge_density
+        self.signal_density = signal_density
+        self.industry_density = industry_density
+        self.n_companies = n_companies
+
+        self.next_station_id = 0
+        self.next_industry_id = 0
+
+        n_tiles = nrows * ncols
+        self.layers = {}
+        for map_name, n_bytes in MAP_CHUNKS:
+            self.layers[map_name] = bytearray(n_tiles * n_bytes)
+
+    def set_value(self, map_name, index, value):
+        """
+        Set the value of a layer for a tile.
+
+        :param map_name: The name of the map.
+        :type map_name: bytes.
+
+        :param index: The index of the tile.
+        :type index: integer.
+
+        :param value: The value of the layer for this tile.
+        :type value: integer.
+        """
+
+        layer = self.layers[map_name]
+        if map_name in [b'MAP2', b'MAP8']:
+            layer[2 * index] = (value >> 8) & 0xFF
+            layer[2 * index + 1] = value & 0xFF
+        else:
+            layer[index] = value & 0xFF
+
+    def get_value(self, map_name, index):
+        """
+        Return the value of a layer for a tile.
+
+        :param map_name: The name of the map.
+        :type map_name: bytes.
+
+        :param index: The index of the tile.
+        :type index: integer.
+
+        :return: The value of the layer for this tile.
+        :rtype: integer
+        """
+
+        layer = self.layers[map_name]
+        if map_name in [b'MAP2', b'MAP8']:
+            return (layer[2 * index] << 8) | layer[2 * index + 1]
+        return layer[index]
+
+    def get_kind(self, index):
+        """
+        Return the kind of a tile.
+
+        :param index: The index of the tile.
+        :type index: integer.
+
+        :return: The kind of the tile.
+        :rtype: integer
+        """
+
+        return self.layers[b'MAPT'][index] >> 4
+
+    def set_kind(self, index, kind, owner):
+        """
+        Set the kind and owner of a tile, keeping the zone and bridge bits.
+
+        :param index: The index of the tile.
+        :type index: integer.
+
+        :param kind: The kind of the tile.
+        :type kind: integer.
+
+        :param owner: The owner of the tile.
+        :type owner: integer.
+        """
+
+        mapt = self.layers[b'MAPT']
+        mapt[index] = (kind << 4) | (mapt[index] & 0x0F)
+        self.layers[b'MAPO'][index] = owner
+        self.layers[b'MAP5'][index] = 0
+
+    def is_free(self, index):
+        """
+        Return whether a tile is plain land that something can be built on.
+
+        :param index: The index of the tile.
+        :type index: integer.
+
+        :return: True if the tile is ground or trees without a bridge over it.
+        :rtype: Boolean
+        """
+
+        mapt = self.layers[b'MAPT'][index]
+        return (mapt >> 4) in [0, 4] and not (mapt & 0x0C)
+
+    def is_inside(self, row, col):
+        """
+        Return whether a position is inside the map, excluding the void border.
+
+        :param row: The row of the tile.
+        :type row: integer.
+
+        :param col: The column of the tile.
+        :type col: integer.
+
+        :return: True if the tile is inside the map.
+        :rtype: Boolean
+        """
+
+        return 0 < row < self.nrows - 1 and 0 < col < self.ncols - 1
+
+    def make_terrain(self):
+        """Make the heights, water, trees and the void border."""
+
+        self.logger.info("Making terrain...")
+
+        rng = self.rng
+        scale = self.terrain_scale
+        crows = self.nrows // scale + 2
+        ccols = self.ncols // scale + 2
+        coarse = [[rng.random() for _ in range(ccols)] for _ in range(crows)]
+
+        sea_level = self.sea_level
+        height_scale = self.max_height / (1.0 - sea_level) if sea_level < 1 else 0
+        tree_density = self.tree_density
+
+        mapt = self.layers[b'MAPT']
+        maph = self.layers[b'MAPH']
+        mapo = self.layers[b'MAPO']
+
+        col_weights = [(col // scale, (col % scale) / scale) for col in range(self.ncols)]
+
+        for row in range(self.nrows):
+            crow = row // scale
+            trow = (row % scale) / scale
+            upper = coarse[crow]
+            lower = coarse[crow + 1]
+            left_right = [
+                (upper[i] + trow * (lower[i] - upper[i]), upper[i + 1] + trow * (lower[i + 1] - upper[i + 1]))
+                for i in range(ccols - 1)
+            ]
+
+            start = row * self.ncols
+            for col, (ccol, tcol) in enumerate(col_weights):
+                left, right = left_right[ccol]
+                noise = left + tcol * (right - left)
+                index = start + col
+                if noise <= sea_level:
+                    mapt[index] = 0x60
+                    mapo[index] = OWNER_WATER
+                else:
+                    maph[index] = min(255, int((noise - sea_level) * height_scale))
+                    mapt[index] = 0x40 if rng.random() < tree_density else 0x00
+                    mapo[index] = OWNER_NONE
+
+        # OpenTTD surrounds the map with void tiles.
+        for col in range(self.ncols):
+            for row in [0, self.nrows - 1]:
+                mapt[row * self.ncols + col] = 0x70
+                maph[row * self.ncols + col] = 0
+        for row in range(self.nrows):
+            for col in [0, self.ncols - 1]:
+                mapt[row * self.ncols + col] = 0x70
+                maph[row * self.ncols + col] = 0
+
+    def make_towns(self):
+        """Make towns, which are grids of roads with buildings, bus stops and truck stops in between."""
+
+        n_towns = int(self.road_density * self.nrows * self.ncols / 1000)
+        self.logger.info(f"Making {n_towns} towns...")
+
+        rng = self.rng
+        for _ in range(n_towns):
+            size = rng.randint(8, 32)
+            row0 = rng.randint(1, max(1, self.nrows - size - 1))
+            col0 = rng.randint(1, max(1, self.ncols - size - 1))
+            spacing = rng.choice([3, 4, 5])
+
+            road_indices = []
+            for row in range(row0, row0 + size):
+                for col in range(col0, col0 + size):
+                    if not self.is_inside(row, col):
+                        continue
+                    index = row * self.ncols + col
+                    if not self.is_free(index):
+                        continue
+                    if (row - row0) % spacing == 0 or (col - col0) % spacing == 0:
+                        self.set_kind(index, 2, OWNER_TOWN)
+                        road_indices.append(index)
+                    elif rng.random() < 0.7:
+                        self.set_kind(index, 3, OWNER_TOWN)
+
+            for index in road_indices:
+                self.connect_road(index)
+
+            if road_indices and rng.random() < self.station_density:
+                self.make_road_stop(rng.choice(road_indices))
+
+    def connect_road(self, index):
+        """
+        Set the road bits of a road tile to connect to the neighbouring road tiles.
+
+        :param index: The index of the tile.
+        :type index: integer.
+        """
+
+        ncols = self.ncols
+        road_bits = 0
+        for bit, offset in [(0, -ncols), (1, 1), (2, ncols), (3, -1)]:
+            other = index + offset
+            if 0 <= other < self.nrows * ncols and self.get_kind(other) == 2:
+                road_bits |= 1 << bit
+        self.layers[b'MAP5'][index] = road_bits
+
+    def make_road_stop(self, index):
+        """
+        Turn a straight road tile into a bus or truck stop.
+
+        :param index: The index of the tile.
+        :type index: integer.
+        """
+
+        road_bits = self.layers[b'MAP5'][index]
+        if road_bits == 0b1010:
+            direction = 4
+        elif road_bits == 0b0101:
+            direction = 5
+        else:
+            return
+
+        owner = self.rng.randrange(self.n_companies)
+        self.set_kind(index, 5, owner)
+        self.set_value(b'MAPE', index, self.rng.choice([2, 3]) << 3)
+        self.set_value(b'MAP2', index, self.next_station_id)
+        self.layers[b'MAP5'][index] = direction
+        self.next_station_id += 1
+
+    def make_industries(self):
+        """Make rectangular industries."""
+
+        n_industries = int(self.industry_density * self.nrows * self.ncols / 1000)
+        self.logger.info(f"Making {n_industries} industries...")
+
+        rng = self.rng
+        for _ in range(n_industries):
+            height = rng.randint(2, 5)
+            width = rng.randint(2, 5)
+            row0 = rng.randint(1, max(1, self.nrows - height - 1))
+            col0 = rng.randint(1, max(1, self.ncols - width - 1))
+            indices = [
+                row * self.ncols + col
+                for row in range(row0, row0 + height)
+                for col in range(col0, col0 + width)
+                if self.is_inside(row, col)
+            ]
+            if not indices or not all(self.is_free(index) for index in indices):
+                continue
+
+            industry_gfx = rng.randrange(len(INDUSTRY_TYPES))
+            for index in indices:
+                self.set_kind(index, 8, OWNER_NONE)
+                self.set_value(b'MAP2', index, self.next_industry_id)
+                self.layers[b'MAP5'][index] = industry_gfx
+            self.next_industry_id += 1
+
+    def make_railways(self):
+        """Make straight and diagonal railway lines, with bridges, signals and stations."""
+
+        n_lines = int(self.rail_density * (self.nrows + self.ncols))
+        self.logger.info(f"Making {n_lines} railway lines...")
+
+        rng = self.rng
+        for _ in range(n_lines):
+            track_type = rng.randrange(4)
+            owner = rng.randrange(self.n_companies)
+            length = rng.randint(16, max(16, max(self.nrows, self.ncols) // 2))
+            row = rng.randint(1, self.nrows - 2)
+            col = rng.randint(1, self.ncols - 2)
+
+            if rng.random() < 0.25:
+                self.make_diagonal_railway(row, col, length, track_type, owner)
+            else:
+                axis = rng.randrange(2)
+                self.make_straight_railway(row, col, length, axis, track_type, owner)
+
+    def make_straight_railway(self, row, col, length, axis, track_type, owner):
+        """
+        Make a straight railway line, stopping at the first tile it cannot be built on.
+
+        :param row: The row of the first tile.
+        :type row: integer.
+
+        :param col: The column of the first tile.
+        :type col: integer.
+
+        :param length: The maximum number of tiles in the line.
+        :type length: integer.
+
+        :param axis: 0 for a line along the X axis (along a row), 1 for the Y axis (along a column).
+        :type axis: integer.
+
+        :param track_type: The type of track.
+        :type track_type: integer.
+
+        :param owner: The owner of the line.
+        :type owner: integer.
+        """
+
+        rng = self.rng
+        drow, dcol = (0, 1) if axis == 0 else (1, 0)
+        track_bit = 1 << axis
+        line = []
+
+        step = 0
+        while step < length and self.is_inside(row, col):
+            index = row * self.ncols + col
+            kind = self.get_kind(index)
+
+            needs_bridge = kind in [3, 5, 6, 8]
+            if needs_bridge or (self.is_free(index) and rng.random() < self.bridge_density):
+                bridge_length = self.make_bridge(row, col, axis, track_type, owner, needs_bridge)
+                if not bridge_length:
+                    break
+                row += bridge_length * drow
+                col += bridge_length * dcol
+                step += bridge_length
+                continue
+
+            if self.is_free(index):
+                self.set_kind(index, 1, owner)
+                self.set_value(b'MAP8', index, track_type)
+                self.layers[b'MAP5'][index] = track_bit
+                line.append(index)
+            elif kind == 1 and self.layers[b'MAP5'][index] in [1, 2] and self.layers[b'MAP5'][index] != track_bit:
+                self.layers[b'MAP5'][index] = 0b11
+            elif kind == 2 and self.layers[b'MAP5'][index] == (0b0101 if axis == 0 else 0b1010):
+                # A road crossing the railway at right angles becomes a level crossing.
+                self.layers[b'MAP5'][index] = 0x40 | (1 - axis)
+                self.set_value(b'MAP8', index, track_type)
+            else:
+                break
+
+            row += drow
+            col += dcol
+            step += 1
+
+        for index in line:
+            if rng.random() < self.signal_density:
+                self.add_signals(index)
+
+        if len(line) > 8 and rng.random() < self.station_density:
+            start = rng.randrange(len(line) - 6)
+            for index in line[start:start + rng.randint(3, 6)]:
+                self.make_rail_station(index, axis, track_type, owner)
+            self.next_station_id += 1
+
+    def make_diagonal_railway(self, row, col, length, track_type, owner):
+        """
+        Make a diagonal railway line, stopping at the first tile it cannot be built on.
+
+        :param row: The row of the first tile.
+        :type row: integer.
+
+        :param col: The column of the first tile.
+        :type col: integer.
+
+        :param length: The maximum number of tiles in the line.
+        :type length: integer.
+
+        :param track_type: The type of track.
+        :type track_type: integer.
+
+        :param owner: The owner of the line.
+        :type owner: integer.
+        """
+
+        # Alternate N and S pieces (heading towards increasing row and decreasing column),
+        # or W and E pieces (heading towards increasing row and increasing column).
+        if self.rng.random() < 0.5:
+            pieces = [(1 << 2, 0, -1), (1 << 3, 1, 0)]
+        else:
+            pieces = [(1 << 4, 0, 1), (1 << 5, 1, 0)]
+
+        for step in range(length):
+            if not self.is_inside(row, col):
+                break
+            index = row * self.ncols + col
+            if not self.is_free(index):
+                break
+
+            track_bit, drow, dcol = pieces[step % 2]
+            self.set_kind(index, 1, owner)
+            self.set_value(b'MAP8', index, track_type)
+            self.layers[b'MAP5'][index] = track_bit
+
+            row += drow
+            col += dcol
+
+    def make_bridge(self, row, col, axis, track_type, owner, required):
+        """
+        Make a railway bridge starting at a tile, if there is room for one.
+
+        :param row: The row of the first bridge ramp.
+        :type row: integer.
+
+        :param col: The column of the first bridge ramp.
+        :type col: integer.
+
+        :param axis: 0 for a bridge along the X axis, 1 for the Y axis.
+        :type axis: integer.
+
+        :param track_type: The type of track.
+        :type track_type: integer.
+
+        :param owner: The owner of the bridge.
+        :type owner: integer.
+
+        :param required: If True, the bridge has to span whatever is at this tile, so the ramp goes on the tile before.
+        :type required: Boolean.
+
+        :return: The number of tiles covered by the bridge, or 0 if it could not be built.
+        :rtype: integer
+        """
+
+        drow, dcol = (0, 1) if axis == 0 else (1, 0)
+
+        if required:
+            row -= drow
+            col -= dcol
+            start = row * self.ncols + col
+            if not self.is_inside(row, col) or self.get_kind(start) != 1:
+                return 0
+            if self.layers[b'MAP5'][start] != 1 << axis:
+                return 0
+        else:
+            start = row * self.ncols + col
+
+        for span in range(2, 16):
+            end_row = row + span * drow
+            end_col = col + span * dcol
+            if not self.is_inside(end_row, end_col):
+                return 0
+            end = end_row * self.ncols + end_col
+            if self.is_free(end):
+                break
+        else:
+            return 0
+
+        for step in range(1, span):
+            index = start + step * (drow * self.ncols + dcol)
+            if self.layers[b'MAPT'][index] & 0x0C or self.get_kind(index) == 9:
+                return 0
+
+        for step in range(1, span):
+            index = start + step * (drow * self.ncols + dcol)
+            self.layers[b'MAPT'][index] |= (axis + 1) << 2
+
+        # The ramp at the start faces along the bridge, the ramp at the end faces back.
+        for index, direction in [(start, 2 + axis), (end, axis)]:
+            self.set_kind(index, 9, owner)
+            self.layers[b'MAP5'][index] = 0x80 | (direction % 4)
+            self.set_value(b'MAP8', index, track_type)
+
+        return span + (0 if required else 1)
+
+    def add_signals(self, index):
+        """
+        Add signals to a straight railway track tile.
+
+        :param index: The index of the tile.
+        :type index: integer.
+        """
+
+        map5 = self.layers[b'MAP5'][index]
+        if map5 not in [1, 2]:
+            return
+
+        rng = self.rng
+        signal_type = rng.randrange(6)
+        signal_era = rng.randrange(2)
+        signals_present = rng.choice([1, 2, 3])
+
+        self.layers[b'MAP5'][index] = map5 | 0x40
+        self.set_value(b'MAP2', index, (signal_era << 3) | signal_type)
+        self.layers[b'M3LO'][index] = signals_present << 6
+
+    def make_rail_station(self, index, axis, track_type, owner):
+        """
+        Turn a straight railway track tile into a railway station tile.
+
+        :param index: The index of the tile.
+        :type index: integer.
+
+        :param axis: The axis of the track.
+        :type axis: integer.
+
+        :param track_type: The type of track.
+        :type track_type: integer.
+
+        :param owner: The owner of the station.
+        :type owner: integer.
+        """
+
+        if self.get_kind(index) != 1:
+            return
+
+        self.set_kind(index, 5, owner)
+        self.set_value(b'MAPE', index, 0)
+        self.set_value(b'MAP2', index, self.next_station_id)
+        self.set_value(b'MAP8', index, track_type)
+        self.layers[b'M3LO'][index] = 0
+        self.layers[b'MAP5'][index] = axis
+
+    def generate(self):
+        """Make the whole map."""
+
+        self.make_terrain()
+        self.make_towns()
+        self.make_industries()
+        self.make_railways()
+
+    def make_chunk(self, map_name, payload):
+        """
+        Return a RIFF chunk with its header.
+
+        :param map_name: The name of the chunk.
+        :type map_name: bytes.
+
+        :param payload: The contents of the chunk.
+        :type payload: bytes.
+
+        :return: The chunk.
+        :rtype: bytes
+        """
+
+        length = len(payload)
+        if length >= 1 << 28:
+            raise ValueError(f"Chunk {map_name} is too large for a RIFF chunk: {length} bytes.")
+
+        # Lengths above 24 bits spill into the top half of the chunk type byte.
+        header = map_name + bytes([(length >> 24) << 4]) + (length & 0xFFFFFF).to_bytes(3, "big")
+        return header + bytes(payload)
+
+    def get_data(self):
+        """
+        Return the uncompressed save data.
+
+        :return: The chunks of the save file.
+        :rtype: bytes
+        """
+
+        dimensions = self.ncols.to_bytes(4, "big") + self.nrows.to_bytes(4, "big")
+        chunks = [self.make_chunk(b'MAPS', dimensions)]
+        for map_name, _ in MAP_CHUNKS:
+            chunks.append(self.make_chunk(map_name, self.layers[map_name]))
+        chunks.append(bytes(4))
+
+        data = b"".join(chunks)
+
+        # Surveyor finds each chunk by searching for its name, so the names must not appear any earlier.
+        offset = 0
+        for chunk in chunks[:-1]:
+            map_name = chunk[0:4]
+            if data.find(map_name) != offset:
+                raise ValueError(f"The name of chunk {map_name} appears in the data before the chunk.")
+            offset += len(chunk)
+
+        return data
+
+    def write(self, file_path, preset=2):
+        """
+        Write the save file to disk.
+
+        :param file_path: The path to the save file.
+        :type file_path: string.
+
+        :param preset: The LZMA compression preset. Defaults to 2, the same as OpenTTD.
+        :type preset: integer.
+        """
+
+        header = b"OTTX" + SAVEGAME_VERSION.to_bytes(2, "big") + bytes(2)
+        data = lzma.compress(self.get_data(), format=lzma.FORMAT_XZ, preset=preset)
+
+        with open(file_path, "wb") as file_out_handle:
+            file_out_handle.write(header)
+            file_out_handle.write(data)
+
+        self.logger.info(f"Wrote {self.nrows} x {self.ncols} map to {file_path}")
+
+
+def main():
+    """
+    Generate a synthetic save file.
+    """
+
+    argparser = argparse.ArgumentParser(description='Make a synthetic OpenTTD save for scaling tests.')
+    argparser.add_argument(
+        "-o", "--output-path",
+        help="Path to the output save file.",
+        default="synthetic.sav",
+        type=str)
+    argparser.add_argument("--rows", help="Number of rows in the map.", default=256, type=int)
+    argparser.add_argument("--cols", help="Number of columns in the map.", default=256, type=int)
+    argparser.add_argument("--seed", help="Seed for the random number generator.", default=123, type=int)
+    argparser.add_argument("--max-height", help="Maximum terrain height.", default=15, type=int)
+    argparser.add_argument("--sea-level", help="Fraction of the terrain that is under water.", default=0.3, type=float)
+    argparser.add_argument("--terrain-scale", help="Size of the hills, in tiles.", default=32, type=int)
+    argparser.add_argument("--tree-density", help="Probability of trees on land.", default=0.1, type=float)
+    argparser.add_argument("--rail-density", help="Railway lines per row and column.", default=0.05, type=float)
+    argparser.add_argument("--road-density", help="Towns per 1000 tiles.", default=0.02, type=float)
+    argparser.add_argument("--station-density", help="Probability of stations.", default=0.3, type=float)
+    argparser.add_argument("--bridge-density", help="Probability of bridges.", default=0.01, type=float)
+    argparser.add_argument("--signal-density", help="Probability of signals.", default=0.2, type=float)
+    argparser.add_argument("--industry-density", help="Industries per 1000 tiles.", default=0.01, type=float)
+    argparser.add_argument(
+        "-v", "--verbose",
+        help="If set, use verbose logging.",
+        default=False,
+        action="store_true")
+    args = argparser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    generator = SaveGenerator(
+        args.rows, args.cols,
+        seed=args.seed,
+        max_height=args.max_height,
+        sea_level=args.sea_level,
+        terrain_scale=args.terrain_scale,
+        tree_density=args.tree_density,
+        rail_density=args.rail_density,
+        road_density=args.road_density,
+        station_density=args.station_density,
+        bridge_density=args.bridge_density,
+        signal_density=args.signal_density,
+        industry_density=args.industry_density
+    )
+    generator.generate()
+    generator.write(args.output_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/python3
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from save_generator import SaveGenerator
+from surveyor import Surveyor
+
+
+def measure(phases, name, function, trace_memory):
+    """
+    Run a function and record how long it took and how much memory it used.
+
+    :param phases: The dictionary to store the results in, keyed by phase name.
+    :type phases: dict.
+
+    :param name: The name of the phase.
+    :type name: string.
+
+    :param function: The function to run.
+    :type function: callable.
+
+    :param trace_memory: If True, record the peak and retained memory of the phase.
+    :type trace_memory: Boolean.
+    """
+
+    if trace_memory:
+        tracemalloc.reset_peak()
+        start_memory, _ = tracemalloc.get_traced_memory()
+
+    start_time = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start_time
+
+    result = {"seconds": seconds}
+    if trace_memory:
+        end_memory, peak_memory = tracemalloc.get_traced_memory()
+        result["retained_bytes"] = end_memory - start_memory
+        result["peak_bytes"] = peak_memory - start_memory
+    phases[name] = result
+
+
+def benchmark_save(save_file_path, config_file_path, tile_size, render, trace_memory):
+    """
+    Ingest (and optionally render) a save file, timing each phase.
+
+    :param save_file_path: The path to the save file.
+    :type save_file_path: string.
+
+    :param config_file_path: The path to the config file.
+    :type config_file_path: string.
+
+    :param tile_size: The tile size to render with.
+    :type tile_size: integer.
+
+    :param render: If True, also load the settings and render a PNG.
+    :type render: Boolean.
+
+    :param trace_memory: If True, record the memory used by each phase.
+    :type trace_memory: Boolean.
+
+    :return: The number of tiles and the measurements for each phase.
+    :rtype: (integer, dict)
+    """
+
+    random.seed(123)
+    phases = {}
+    holder = {}
+
+    if trace_memory:
+        tracemalloc.start()
+
+    def read():
+        holder["surveyor"] = Surveyor(save_file_path)
+
+    measure(phases, "read", read, trace_memory)
+    surveyor = holder["surveyor"]
+
+    measure(phases, "parse_size", surveyor.parse_size, trace_memory)
+    measure(phases, "make_tiles", surveyor.make_tiles, trace_memory)
+    measure(phases, "set_map_bytes", surveyor.set_map_bytes, trace_memory)
+    measure(phases, "make_tile_grid", surveyor.make_tile_grid, trace_memory)
+
+    if render:
+        with tempfile.TemporaryDirectory() as output_dir:
+            image_file_path = os.path.join(output_dir, "benchmark.png")
+            measure(phases, "load_settings", lambda: surveyor.load_settings(config_file_path, tile_size), trace_memory)
+            measure(phases, "save_image", lambda: surveyor.save_image(image_file_path), trace_memory)
+
+    if trace_memory:
+        tracemalloc.stop()
+
+    return surveyor.nrows * surveyor.ncols, phases
+
+
+def print_results(results, trace_memory):
+    """
+    Print a table of the timings, and how each phase scales with the number of tiles.
+
+    :param results: A list of (label, number of tiles, phases) tuples.
+    :type results: list.
+
+    :param trace_memory: If True, print the memory per tile as well.
+    :type trace_memory: Boolean.
+    """
+
+    phase_names = list(results[0][2].keys())
+
+    print(f"{'save':>30} {'tiles':>10} " + " ".join(f"{name:>15}" for name in phase_names))
+    for label, n_tiles, phases in results:
+        print(f"{label:>30} {n_tiles:>10} " + " ".join(f"{phases[name]['seconds']:>14.3f}s" for name in phase_names))
+
+    print()
+    print("Microseconds per tile:")
+    for label, n_tiles, phases in results:
+        per_tile = [1e6 * phases[name]["seconds"] / n_tiles for name in phase_names]
+        print(f"{label:>30} {n_tiles:>10} " + " ".join(f"{value:>15.3f}" for value in per_tile))
+
+    if trace_memory:
+        print()
+        print("Retained bytes per tile (peak bytes per tile):")
+        for label, n_tiles, phases in results:
+            per_tile = [
+                f"{phases[name]['retained_bytes'] / n_tiles:.0f} ({phases[name]['peak_bytes'] / n_tiles:.0f})"
+                for name in phase_names
+            ]
+            print(f"{label:>30} {n_tiles:>10} " + " ".join(f"{value:>15}" for value in per_tile))
+            total = sum(phases[name]["retained_bytes"] for name in phase_names)
+            print(f"{'':>30} {'':>10} total retained: {total / n_tiles:.0f} bytes per tile")
+
+    # A phase that scales linearly has a constant time per tile.
+    results = sorted(results, key=lambda result: result[1])
+    _, small_tiles, small_phases = results[0]
+    _, large_tiles, large_phases = results[-1]
+    if small_tiles == large_tiles:
+        return
+
+    print()
+    print(f"Growth of time per tile from {small_tiles} to {large_tiles} tiles (1.0 is linear):")
+    for name in phase_names:
+        small = small_phases[name]["seconds"] / small_tiles
+        large = large_phases[name]["seconds"] / large_tiles
+        ratio = large / small if small > 0 else float("inf")
+        flag = "  <-- superlinear" if ratio > 2 else ""
+        print(f"{name:>15}: {ratio:6.2f}{flag}")
+
+
+def main():
+    """
+    Measure how ingest and rendering scale with the size of the map.
+    """
+
+    argparser = argparse.ArgumentParser(description='Measure how Surveyor scales with the size of the map.')
+    argparser.add_argument(
+        "--sizes",
+        help="Comma separated list of map sizes to generate, e.g. '256,512,1024'.",
+        default="128,256,512",
+        type=str)
+    argparser.add_argument(
+        "--save",
+        help="Benchmark an existing save file instead of generated ones. Can be given more than once.",
+        action="append",
+        default=[])
+    argparser.add_argument(
+        "-c", "--config",
+        help="Path to the config file.",
+        default="config/main.json",
+        type=str)
+    argparser.add_argument(
+        "-s", "--tile_size",
+        help="Size of the tile to render with.",
+        default=5,
+        type=int)
+    argparser.add_argument(
+        "--render",
+        help="If set, render a PNG as well as ingesting the save.",
+        default=False,
+        action="store_true")
+    argparser.add_argument(
+        "--memory",
+        help="If set, trace memory use. This slows everything down.",
+        default=False,
+        action="store_true")
+    argparser.add_argument(
+        "--seed",
+        help="Seed for the generated saves.",
+        default=123,
+        type=int)
+    argparser.add_argument(
+        "-v", "--verbose",
+        help="If set, use verbose logging.",
+        default=False,
+        action="store_true")
+    args = argparser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    results = []
+    if args.save:
+        for save_file_path in args.save:
+            n_tiles, phases = benchmark_save(save_file_path, args.config, args.tile_size, args.render, args.memory)
+            results.append((os.path.basename(save_file_path), n_tiles, phases))
+    else:
+        with tempfile.TemporaryDirectory() as save_dir:
+            for size in [int(size) for size in args.sizes.split(",")]:
+                save_file_path = os.path.join(save_dir, f"synthetic_{size}.sav")
+                generator = SaveGenerator(size, size, seed=args.seed)
+                generator.generate()
+                generator.write(save_file_path)
+
+                n_tiles, phases = benchmark_save(save_file_path, args.config, args.tile_size, args.render, args.memory)
+                results.append((f"synthetic_{size}", n_tiles, phases))
+
+    print_results(results, args.memory)
+
+
+if __name__ == '__main__':
+    main()
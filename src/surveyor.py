@@ -1,12 +1,27 @@
+import array
 import datetime
 import logging
 import lzma
+import os
+import sys
 
+import numpy as np
 from alive_progress import alive_bar
 
 from tile import TileObject
+from tile_occupant import MAP_OFFSETS
 from tile_grid import TileGrid
+from tile_index import TileIndex
 from cairo_painter import CairoPainter
+from level_of_detail import QUALITY
+from minimap import MINIMAP_LAYERS, make_minimap
+from png_writer import COMPRESSION_LEVEL, write_atomically, write_png
+
+# The stages of a progressive image, each of which refines the one before.
+PROGRESSIVE_STAGES = ("preview", "draft", "full")
+
+# The zlib compression level of the stages of a progressive image before the last, which are soon replaced.
+PREVIEW_COMPRESSION_LEVEL = 1
 
 
 class Surveyor:
@@ -134,26 +149,43 @@ class Surveyor:
             b'MAP8': [2, 8]
         }
 
+        n_tiles = len(self.tiles)
+        raws = [0] * n_tiles
+
         for map_name in maps_info:
             self.log_message(f"Reading {map_name}...")
             start = self.data.find(map_name)
             m = maps_info[map_name][0]
-            n_tiles = len(self.tiles)
             offset = start + maps_info[map_name][1]
 
             tbs = self.data[offset:offset + self.ncols * self.nrows * m]
-            [self.tiles[i].set_map_bytes(map_name, tbs[i * m:(i + 1) * m]) for i in range(n_tiles)]
+            if m == 2:
+                tbs = array.array("H", tbs[:len(tbs) - len(tbs) % 2])
+                if sys.byteorder == "little":
+                    tbs.byteswap()
+
+            # Pack every map layer of a tile into one integer, at the offset shared by all tiles.
+            shift = MAP_OFFSETS[map_name]
+            raws = [raw | (value << shift) for raw, value in zip(raws, tbs)] + raws[len(tbs):]
+
+        for tile, raw in zip(self.tiles, raws):
+            tile.raw = raw
 
         self.log_message("Parsing tile bits...")
 
+        # Index the tiles by kind as they are parsed, so the painter does not have to search the whole map.
+        self.tile_index = TileIndex(self.tiles)
+
         if self.show_progress_bar:
             with alive_bar(len(self.tiles)) as abar:
-                for tile in self.tiles:
+                for index, tile in enumerate(self.tiles):
                     tile.parse_all()
+                    self.tile_index.add(index, tile)
                     abar()
         else:
-            for tile in self.tiles:
+            for index, tile in enumerate(self.tiles):
                 tile.parse_all()
+                self.tile_index.add(index, tile)
         self.log_message("All done!")
 
         heights = [tile.height for tile in self.tiles]
@@ -174,6 +206,23 @@ class Surveyor:
         self.set_map_bytes()
         self.make_tile_grid()
 
+    def read_map_layer(self, map_name):
+        """
+        Read one of the maps of the save that has a byte for each tile, straight into an array, without making the
+        tiles.
+
+        :param map_name: The name of the map, such as b'MAPT'.
+        :type map_name: bytes.
+
+        :return: The value of each tile.
+        :rtype: numpy array of uint8, of shape (nrows, ncols).
+        """
+
+        start = self.data.find(map_name) + 8
+        return np.frombuffer(self.data, dtype=np.uint8, count=self.nrows * self.ncols, offset=start).reshape(
+            self.nrows, self.ncols
+        )
+
     def load_settings(self, settings_file_path, tile_size):
         """
         Load settings from file.
@@ -187,21 +236,235 @@ class Surveyor:
 
         self.painter.load_settings(settings_file_path, tile_size)
 
-    def save_image(self, image_file_path, filetype="PNG", settings_file_path=None):
+    def set_settings(self, settings, settings_rgb_values, tile_size):
+        """
+        Use settings that have already been loaded from file.
+
+        :param settings: The settings loaded from the settings file.
+        :type settings: dict.
+
+        :param settings_rgb_values: The named colours loaded from config/rgb_values.json.
+        :type settings_rgb_values: dict.
+
+        :param tile_size: The tile size to use.
+        :type tile_size: integer.
+        """
+
+        self.painter.set_settings(settings, settings_rgb_values, tile_size)
+
+    def save_image(self, image_file_path, filetype="PNG", settings_file_path=None, display_list_path=None,
+                   layers_dir=None, backend="cairo", compression_level=COMPRESSION_LEVEL, indexed=False,
+                   quality=QUALITY):
         """
         Make a nice image and save it to file.
 
         :param image_file_path: The path to the output file. It should not include an extension.
         :type image_file_path: string.
 
-        :param filetype: The type of file to save to. Supports PNG and SVG. Defaults to PNG.
+        :param filetype: The type of file to save to. Supports PNG, SVG, SVGZ and CAIRO_SVG. Defaults to PNG.
         :type filetype: string.
 
         :param settings_file_path: The path to the settings file. Defaults to None.
         :type settings_file_path: string.
+
+        :param display_list_path: The path to a display list file to load the drawing from, or to save it to. If the
+            file was saved from the same save and config, the data does not need to be ingested first. Defaults to
+            None.
+        :type display_list_path: string.
+
+        :param layers_dir: For PNG images, a directory to also write each layer to, as a transparent PNG. Defaults to
+            None.
+        :type layers_dir: string.
+
+        :param backend: The painter backend to draw PNG images with, 'cairo' or 'numpy'. Defaults to 'cairo'.
+        :type backend: string.
+
+        :param compression_level: The zlib compression level of PNG images, from 0 to 9. 1 is quickest, and 9 makes
+            the smallest files. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write PNG images with a palette of up to 256 colours, which makes much smaller
+            files. Colours beyond the first 256 are drawn with the nearest colour in the palette. Defaults to False.
+        :type indexed: boolean.
+
+        :param quality: The quality to draw PNG images at: 'draft' leaves out small details and anti-aliasing for
+            quick previews, 'normal' leaves out details too small to see at small tile sizes, and 'high' draws
+            everything. Defaults to QUALITY.
+        :type quality: string.
         """
 
         if settings_file_path:
             self.load_settings(settings_file_path)
 
-        self.painter.save_image(image_file_path, filetype=filetype)
+        self.painter.save_image(
+            image_file_path, filetype=filetype, display_list_path=display_list_path, layers_dir=layers_dir,
+            backend=backend, compression_level=compression_level, indexed=indexed, quality=quality
+        )
+
+    def save_minimap(self, image_file_path, pixels_per_tile=1, compression_level=COMPRESSION_LEVEL, indexed=False):
+        """
+        Make a small PNG image with a few pixels for each tile, coloured like the backgrounds of the tiles. The
+        colours are worked out straight from the maps of the save, so the tiles do not need to be made, and nothing
+        is drawn. The settings should be loaded first.
+
+        :param image_file_path: The path to the output file.
+        :type image_file_path: string.
+
+        :param pixels_per_tile: The width and height of each tile, from 1 to 4. Defaults to 1.
+        :type pixels_per_tile: integer.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write an image with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+        """
+
+        self.parse_size()
+        layers = {map_name: self.read_map_layer(map_name) for map_name in MINIMAP_LAYERS}
+        image = make_minimap(layers, self.painter.style, pixels_per_tile=pixels_per_tile)
+        write_png(image_file_path, image, compression_level=compression_level, indexed=indexed)
+        self.log_message(f"Wrote a {image.shape[1]} x {image.shape[0]} minimap to {image_file_path}")
+
+    def save_progressive_images(self, image_file_path, display_list_path=None, backend="cairo",
+                                compression_level=COMPRESSION_LEVEL, indexed=False, quality=QUALITY, numbered=False,
+                                callback=None):
+        """
+        Make a PNG image in stages, each of which refines the one before, so there is something to look at straight
+        away. The preview has a pixel for each tile, coloured straight from the save before the tiles are made, the
+        draft is drawn small and with little detail once the display list is made, and then the full image is drawn.
+        The settings should be loaded first. The data is ingested if it needs to be.
+
+        :param image_file_path: The path to the output file.
+        :type image_file_path: string.
+
+        :param display_list_path: The path to a display list file to load the drawing from, or to save it to.
+            Defaults to None.
+        :type display_list_path: string.
+
+        :param backend: The painter backend to draw with, 'cairo' or 'numpy'. Defaults to 'cairo'.
+        :type backend: string.
+
+        :param compression_level: The zlib compression level of the full image, from 0 to 9. Defaults to
+            COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write images with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+
+        :param quality: The quality to draw the full image at, one of 'draft', 'normal' or 'high'. Defaults to
+            QUALITY.
+        :type quality: string.
+
+        :param numbered: If True, write each stage to its own file, numbered from 1. Otherwise each stage replaces
+            the one before in the output file, which only ever holds a whole image. Defaults to False.
+        :type numbered: Boolean
+
+        :param callback: A function called with the name of each stage, one of PROGRESSIVE_STAGES, and the path to
+            its image, as soon as it is written. Defaults to None.
+        :type callback: callable.
+
+        :return: The paths to the images, keyed by stage.
+        :rtype: dict
+        """
+
+        root, extension = os.path.splitext(image_file_path)
+        extension = extension or ".png"
+        paths = {}
+
+        def write_stage(stage, write):
+            if numbered:
+                path = f"{root}_{len(paths) + 1}{extension}"
+                write(path)
+            else:
+                path = root + extension
+                write_atomically(path, write)
+            paths[stage] = path
+            self.log_message(f"Wrote the {stage} image to {path}")
+            if callback is not None:
+                callback(stage, path)
+
+        write_stage("preview", lambda path: self.save_minimap(
+            path, compression_level=PREVIEW_COMPRESSION_LEVEL, indexed=indexed
+        ))
+
+        display_list = self.painter.get_display_list(display_list_path=display_list_path)
+
+        write_stage("draft", lambda path: self.painter.write_draft_png(
+            display_list, path, backend=backend, compression_level=PREVIEW_COMPRESSION_LEVEL, indexed=indexed
+        ))
+        write_stage("full", lambda path: self.painter.write_display_list(
+            display_list, path, backend=backend, compression_level=compression_level, indexed=indexed,
+            quality=quality
+        ))
+        return paths
+
+    def save_image_sizes(self, image_file_path, tile_sizes, display_list_path=None, backend="cairo",
+                         compression_level=COMPRESSION_LEVEL, indexed=False, redraw_sizes=(), quality=QUALITY):
+        """
+        Make a PNG image at each of several tile sizes, drawing the map once at the largest, and shrinking it to the
+        others. The settings should be loaded with the largest tile size first.
+
+        :param image_file_path: The path to the output file. The tile size is added to it.
+        :type image_file_path: string.
+
+        :param tile_sizes: The tile sizes.
+        :type tile_sizes: list of integers.
+
+        :param display_list_path: The path to a display list file to load the drawing from, or to save it to.
+            Defaults to None.
+        :type display_list_path: string.
+
+        :param backend: The painter backend to draw with, 'cairo' or 'numpy'. Defaults to 'cairo'.
+        :type backend: string.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write images with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+
+        :param redraw_sizes: The tile sizes to draw again rather than shrink, for when details like signals need to
+            be sharp. Defaults to none.
+        :type redraw_sizes: collection of integers.
+
+        :param quality: The quality to draw at, one of 'draft', 'normal' or 'high'. Defaults to QUALITY.
+        :type quality: string.
+
+        :return: The paths to the images, keyed by tile size.
+        :rtype: dict
+        """
+
+        return self.painter.save_image_sizes(
+            image_file_path, tile_sizes, display_list_path=display_list_path, backend=backend,
+            compression_level=compression_level, indexed=indexed, redraw_sizes=redraw_sizes, quality=quality
+        )
+
+    def save_themed_images(self, image_file_path, settings_file_paths, samples=1, compression_level=COMPRESSION_LEVEL,
+                           indexed=False):
+        """
+        Make a PNG image for each of several settings files, drawing the map once and colouring it in for each.
+
+        :param image_file_path: The path to the output file. The name of each settings file is added to it.
+        :type image_file_path: string.
+
+        :param settings_file_paths: The paths to the settings files.
+        :type settings_file_paths: list of strings.
+
+        :param samples: How many samples to draw for each pixel, across and down, for anti-aliasing. Defaults to 1.
+        :type samples: integer.
+
+        :param compression_level: The zlib compression level, from 0 to 9. Defaults to COMPRESSION_LEVEL.
+        :type compression_level: integer.
+
+        :param indexed: If True, write images with a palette of up to 256 colours. Defaults to False.
+        :type indexed: boolean.
+
+        :return: The paths to the images.
+        :rtype: list of strings
+        """
+
+        return self.painter.save_themed_images(
+            image_file_path, settings_file_paths, samples=samples, compression_level=compression_level,
+            indexed=indexed
+        )
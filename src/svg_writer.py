@@ -0,0 +1,333 @@
+#!/usr/bin/python3
+
+import gzip
+import math
+from xml.sax.saxutils import escape
+
+from drawing_context import (
+    PATH_ARC, PATH_CLOSE, PATH_LINE, PATH_MOVE, PATH_RECTANGLE, DrawingContext, DrawingState
+)
+
+# The SVG names of the Cairo line caps and joins, indexed by their Cairo values.
+LINE_CAPS = ["butt", "round", "square"]
+LINE_JOINS = ["miter", "round", "bevel"]
+
+# Styles that apply to every element. Paths are only filled if they have a fill class, like in Cairo, where fill and
+# stroke are separate operations.
+BASE_STYLE = "path{fill:none;stroke-miterlimit:10}use{overflow:visible}"
+
+# The size of the write buffer for the output file.
+BUFFER_SIZE = 1 << 16
+
+
+def format_number(value):
+    """
+    Format a coordinate for the SVG file, with at most 2 decimals.
+
+    :param value: The number to format.
+    :type value: float.
+
+    :return: The shortest text for the rounded number.
+    :rtype: string
+    """
+
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    if text == "-0":
+        return "0"
+    return text
+
+
+def format_color(rgb):
+    """
+    Format a colour for the SVG file.
+
+    :param rgb: The colour, in the range (0-1, 0-1, 0-1).
+    :type rgb: (float, float, float).
+
+    :return: The colour as a hex string.
+    :rtype: string
+    """
+
+    return "#" + "".join(f"{int(round(255 * channel)):02x}" for channel in rgb)
+
+
+def format_path(path):
+    """
+    Format a path for the SVG file.
+
+    :param path: The commands of the path, in the coordinates of the image, as kept by a DrawingContext.
+    :type path: list of tuples.
+
+    :return: The path data.
+    :rtype: string
+    """
+
+    parts = []
+    has_point = False
+    for command in path:
+        kind = command[0]
+        if kind == PATH_MOVE:
+            parts.append(f"M{format_number(command[1])} {format_number(command[2])}")
+        elif kind == PATH_LINE:
+            parts.append(f"L{format_number(command[1])} {format_number(command[2])}")
+        elif kind == PATH_CLOSE:
+            parts.append("Z")
+        elif kind == PATH_RECTANGLE:
+            x, y, width, height = command[1:]
+            parts.append(
+                f"M{format_number(x)} {format_number(y)}"
+                f"h{format_number(width)}v{format_number(height)}h{format_number(-width)}Z"
+            )
+        elif kind == PATH_ARC:
+            # SVG arcs can not be full circles, so split the arc into pieces of at most half a turn.
+            xc, yc, radius, angle1, angle2 = command[1:]
+            r = format_number(radius)
+            x = format_number(xc + radius * math.cos(angle1))
+            y = format_number(yc + radius * math.sin(angle1))
+            parts.append(f"{'L' if has_point else 'M'}{x} {y}")
+            n_pieces = max(1, math.ceil((angle2 - angle1) / math.pi - 1e-9))
+            for piece in range(1, n_pieces + 1):
+                angle = angle1 + (angle2 - angle1) * piece / n_pieces
+                x = format_number(xc + radius * math.cos(angle))
+                y = format_number(yc + radius * math.sin(angle))
+                parts.append(f"A{r} {r} 0 0 1 {x} {y}")
+        has_point = True
+    return "".join(parts)
+
+
+class SvgWriter:
+    def __init__(self, file_path, width, height, compress=False):
+        """
+        Make an SvgWriter, which streams the elements of an SVG document to disk as they are written.
+
+        The elements are grouped into one group per layer. Their styles are CSS classes, which are written the first
+        time they are used, so that the only things kept in memory are the classes and the ids of the symbols.
+
+        :param file_path: The path to the output file.
+        :type file_path: string.
+
+        :param width: The width of the image.
+        :type width: integer.
+
+        :param height: The height of the image.
+        :type height: integer.
+
+        :param compress: If True, gzip the output, as for an .svgz file. Defaults to False.
+        :type compress: Boolean
+        """
+
+        if compress:
+            self.file = gzip.open(file_path, "wt", encoding="utf-8", compresslevel=9)
+        else:
+            self.file = open(file_path, "w", encoding="utf-8", buffering=BUFFER_SIZE)
+
+        self.classes = {}
+        self.layer_open = False
+        self.n_elements = 0
+
+        self.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+            f'width="{width}" height="{height}" viewBox="0 0 {width} {height}">\n'
+            f'<style>{BASE_STYLE}</style>\n'
+        )
+
+        self.context = SvgContext(self)
+
+    def write(self, text):
+        """
+        Write text to the output file.
+
+        :param text: The text to write.
+        :type text: string.
+        """
+
+        self.file.write(text)
+
+    def write_element(self, element):
+        """
+        Write an element to the output file, on its own line.
+
+        :param element: The element.
+        :type element: string.
+        """
+
+        self.n_elements += 1
+        self.file.write(element)
+        self.file.write("\n")
+
+    def get_class(self, style):
+        """
+        Return the CSS class for a style, writing its definition the first time it is used.
+
+        :param style: The CSS declarations of the style.
+        :type style: string.
+
+        :return: The name of the class.
+        :rtype: string
+        """
+
+        name = self.classes.get(style)
+        if name is None:
+            name = f"c{len(self.classes)}"
+            self.classes[style] = name
+            self.write(f"<style>.{name}{{{style}}}</style>\n")
+        return name
+
+    def begin_layer(self, name):
+        """
+        Start a new layer. Everything written until the next layer is grouped together.
+
+        :param name: The name of the layer, which is used as the id of its group.
+        :type name: string.
+        """
+
+        self.context.flush()
+        if self.layer_open:
+            self.write("</g>\n")
+        self.write(f'<g id="{escape(name)}">\n')
+        self.layer_open = True
+
+    def close(self):
+        """Finish the document and close the output file."""
+
+        self.context.flush()
+        if self.layer_open:
+            self.write("</g>\n")
+            self.layer_open = False
+        self.write("</svg>\n")
+        self.file.close()
+
+
+class SvgContext(DrawingContext):
+    def __init__(self, writer):
+        """
+        Make an SvgContext, which writes each filled or stroked path to an SvgWriter.
+
+        A path that is filled and then stroked again straight away is written as one element.
+
+        :param writer: The writer to send the elements to.
+        :type writer: SvgWriter
+        """
+
+        super().__init__()
+        self.writer = writer
+        self.pending = None
+        self.symbols = {}
+
+    def fill(self):
+        """Fill the current path and clear it."""
+
+        if self.path:
+            red, green, blue, alpha = self.state.rgba
+            style = f"fill:{format_color((red, green, blue))}"
+            if alpha < 1:
+                style += f";fill-opacity:{format_number(alpha)}"
+
+            self.flush()
+            self.pending = (format_path(self.path), self.writer.get_class(style))
+
+        self.new_path()
+
+    def stroke(self):
+        """Stroke the current path and clear it."""
+
+        if self.path:
+            state = self.state
+            style = (
+                f"stroke:{format_color(state.rgba[:3])};"
+                f"stroke-width:{format_number(state.line_width * self.get_scale())}"
+            )
+            if state.rgba[3] < 1:
+                style += f";stroke-opacity:{format_number(state.rgba[3])}"
+            if state.line_cap:
+                style += f";stroke-linecap:{LINE_CAPS[state.line_cap]}"
+            if state.line_join:
+                style += f";stroke-linejoin:{LINE_JOINS[state.line_join]}"
+
+            data = format_path(self.path)
+            class_name = self.writer.get_class(style)
+            if self.pending is not None and self.pending[0] == data:
+                class_name = f"{self.pending[1]} {class_name}"
+                self.pending = None
+
+            self.flush()
+            self.writer.write_element(f'<path class="{class_name}" d="{data}"/>')
+
+        self.new_path()
+
+    def flush(self):
+        """Write a fill that is waiting to see if the same path is stroked next."""
+
+        if self.pending is not None:
+            data, class_name = self.pending
+            self.pending = None
+            self.writer.write_element(f'<path class="{class_name}" d="{data}"/>')
+
+    # Text.
+
+    def show_text(self, text):
+        """Draw text, with its baseline starting at the current point."""
+
+        state = self.state
+        style = (
+            f"fill:{format_color(state.rgba[:3])};"
+            f"font-family:{state.font_family};font-size:{format_number(state.font_size * self.get_scale())}px"
+        )
+        class_name = self.writer.get_class(style)
+        x, y = self.current_point or self.to_device(0, 0)
+
+        self.flush()
+        self.writer.write_element(
+            f'<text class="{class_name}" x="{format_number(x)}" y="{format_number(y)}">{escape(text)}</text>'
+        )
+
+    # Symbols.
+
+    def use_symbol(self, key, draw_function, x=0, y=0):
+        """
+        Place a copy of a symbol at (x, y) in user space. The first time a key is used, its symbol is defined by
+        calling draw_function(0, 0) with a fresh drawing state.
+
+        :param key: The key of the symbol. Everything that changes how the symbol looks should be part of it.
+        :type key: tuple.
+
+        :param draw_function: A function that draws the symbol at a given point.
+        :type draw_function: callable.
+
+        :param x: The x coordinate to place the symbol at. Defaults to 0.
+        :type x: float
+
+        :param y: The y coordinate to place the symbol at. Defaults to 0.
+        :type y: float
+        """
+
+        self.flush()
+
+        symbol_id = self.symbols.get(key)
+        if symbol_id is None:
+            symbol_id = f"s{len(self.symbols)}"
+            self.symbols[key] = symbol_id
+
+            saved = (self.state, self.stack, self.path, self.current_point, self.subpath_start)
+            self.state = DrawingState()
+            self.stack = []
+            self.new_path()
+
+            self.writer.write(f'<defs><g id="{symbol_id}">\n')
+            draw_function(0, 0)
+            self.flush()
+            self.writer.write("</g></defs>\n")
+
+            (self.state, self.stack, self.path, self.current_point, self.subpath_start) = saved
+
+        xx, yx, xy, yy, x0, y0 = self.state.matrix
+        tx, ty = self.to_device(x, y)
+        transform = f"translate({format_number(tx)} {format_number(ty)})"
+        if (xx, yx, xy, yy) != (1, 0, 0, 1):
+            if xx == yy and xy == -yx and abs(xx * xx + yx * yx - 1) < 1e-9:
+                transform += f"rotate({format_number(math.degrees(math.atan2(yx, xx)))})"
+            else:
+                transform += f"matrix({' '.join(format_number(value) for value in (xx, yx, xy, yy))} 0 0)"
+
+        self.writer.write_element(f'<use xlink:href="#{symbol_id}" transform="{transform}"/>')
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+
+import array
+
+
+class TileIndex:
+    def __init__(self, tiles):
+        """
+        Make a TileIndex, which partitions the tiles of a map by kind so that each painter pass only visits its own
+        tiles. The index arrays hold positions in the list of tiles, in increasing order.
+
+        :param tiles: The array of map tiles.
+        :type tiles: list of TileObject.
+        """
+
+        self.tiles = tiles
+        self.kinds = {kind: array.array("L") for kind in range(16)}
+        self.signals = array.array("L")
+        self.bridged = array.array("L")
+        self.station_types = {station_type: array.array("L") for station_type in range(8)}
+
+    def add(self, index, tile):
+        """
+        Add a tile to the index. Tiles must be added in order, after they have been parsed.
+
+        :param index: The position of the tile in the list of tiles.
+        :type index: integer.
+
+        :param tile: The tile to add.
+        :type tile: TileObject.
+        """
+
+        kind = tile.kind
+        self.kinds[kind].append(index)
+
+        if tile.bridge:
+            self.bridged.append(index)
+
+        if kind == 1:
+            if tile.occupant.has_signals:
+                self.signals.append(index)
+        elif kind == 5:
+            self.station_types[tile.occupant.station_type].append(index)
+
+    def get_tiles(self, indices):
+        """
+        Return the tiles at the given positions.
+
+        :param indices: The positions of the tiles.
+        :type indices: array of integers.
+
+        :return: The tiles.
+        :rtype: list of TileObject
+        """
+
+        tiles = self.tiles
+        return [tiles[index] for index in indices]
+
+    def get_kind(self, kind):
+        """
+        Return all the tiles of a given kind.
+
+        :param kind: The kind of the tiles.
+        :type kind: integer.
+
+        :return: The tiles.
+        :rtype: list of TileObject
+        """
+
+        return self.get_tiles(self.kinds[kind])
+
+    def get_station_types(self, station_types):
+        """
+        Return all the station tiles of the given station types, in map order.
+
+        :param station_types: The station types.
+        :type station_types: list of integers.
+
+        :return: The tiles.
+        :rtype: list of TileObject
+        """
+
+        indices = sorted(index for station_type in station_types for index in self.station_types[station_type])
+        return self.get_tiles(indices)
@@ -1,22 +1,64 @@
 #!/usr/bin/python3
 
-from openttd_types import INDUSTRY_TYPES
+from openttd_types import INDUSTRY_TYPES, MAP_LAYERS
+
+# The bit offset of each map layer in the packed integer that holds the raw values of a tile.
+MAP_OFFSETS = {}
+_offset = 0
+for _map_name, _n_bits in MAP_LAYERS:
+    MAP_OFFSETS[_map_name] = _offset
+    _offset += _n_bits
+
+
+class MapBits:
+    def __init__(self, map_name, start, end):
+        """
+        Make a field that is decoded from the packed bits of a tile whenever it is read.
+
+        :param map_name: The name of the map.
+        :type map_name: string.
+
+        :param start: The start of the bits string.
+        :type start: integer.
+
+        :param end: The end of the bits string. The final bit is not included.
+        :type end: integer.
+        """
+
+        self.map_name = map_name
+        self.start = start
+        self.end = end
+        self.shift = MAP_OFFSETS[map_name] + start
+        self.mask = (1 << (end - start)) - 1
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        return (instance.raw >> self.shift) & self.mask
 
 
 class TileOccupant:
+    __slots__ = ("parent", "raw")
+
     def __init__(self, parent):
         """
         Make a TileOccupant for a tile.
 
+        The properties of the occupant are decoded from the packed bits of the parent when they are read,
+        so that fields which are never drawn are never parsed. The occupant keeps a copy of the packed bits, which
+        both the fields and parse_map_bits read, so it should be made after the map layers of the parent are set.
+
         :param parent: The tile where the occupant lives. The occupant sits "on" the tile.
         :type parent: TileObject.
         """
 
         self.parent = parent
+        self.raw = parent.raw
 
     def parse_map_bits(self, map_name, start, end):
         """
-        Parse and return the bits of the parent for a given map.
+        Parse and return the bits for a given map, from the packed bits that the fields are decoded from.
 
         :param map_name: The name of the map.
         :type map_name: string.
@@ -31,94 +73,64 @@ class TileOccupant:
         :rtype: integer
         """
 
-        return self.parent.parse_map_bits(map_name, start, end)
+        return (self.raw >> (MAP_OFFSETS[map_name] + start)) & ((1 << (end - start)) - 1)
 
     def parse_all(self):
-        """Parse the various properties of the TileOccupant."""
-        pass
-
-
-class TileOccupantRailwayTrack(TileOccupant):
-    def __init__(self, parent):
         """
-        Make a TileOccupantRailwayTrack for a tile.
+        Parse all the properties of the TileOccupant.
 
-        :param parent: The tile where the occupant lives. The occupant sits "on" the tile.
-        :type parent: TileObject.
+        :return: The values of the properties, keyed by name.
+        :rtype: dict
         """
 
-        super().__init__(parent)
+        values = {}
+        for cls in reversed(type(self).__mro__):
+            for name, value in vars(cls).items():
+                if isinstance(value, (MapBits, property)):
+                    values[name] = getattr(self, name)
+        return values
 
-        self.track_type = None
-        self.ground_type = None
-        self.signal_type = None
-        self.has_signals = None
-
-        self.track_X = None
-        self.track_Y = None
-        self.track_N = None
-        self.track_S = None
-        self.track_W = None
-        self.track_E = None
-
-        self.is_depot = None
-        self.depot_direction = None
-
-        self.signal_0_present = None
-        self.signal_1_present = None
-        self.signal_2_present = None
-        self.signal_3_present = None
-        self.signal_01_type = None
-        self.signal_23_type = None
-        self.signal_23_era = None
-        self.signal_23_era = None
 
-    def parse_all(self):
-        """Parse the various properties of the TileOccupant."""
-
-        self.ship_docking_state = self.parse_map_bits(b'MAPO', 7, 8)
+class TileOccupantRailwayTrack(TileOccupant):
+    __slots__ = ()
 
-        self.signal_23_type = self.parse_map_bits(b'MAP2', 0, 3)
-        self.signal_23_era = self.parse_map_bits(b'MAP2', 3, 4)
-        self.signal_01_type = self.parse_map_bits(b'MAP2', 4, 7)
-        self.signal_01_era = self.parse_map_bits(b'MAP2', 7, 8)
+    ground_type = None
+    signal_type = None
 
-        self.signal_0_present = self.parse_map_bits(b'M3LO', 4, 5)
-        self.signal_1_present = self.parse_map_bits(b'M3LO', 5, 6)
-        self.signal_2_present = self.parse_map_bits(b'M3LO', 6, 7)
-        self.signal_3_present = self.parse_map_bits(b'M3LO', 7, 8)
+    ship_docking_state = MapBits(b'MAPO', 7, 8)
 
-        self.signal_0_red = self.parse_map_bits(b'M3HI', 4, 5)
-        self.signal_1_red = self.parse_map_bits(b'M3HI', 5, 6)
-        self.signal_2_red = self.parse_map_bits(b'M3HI', 6, 7)
-        self.signal_3_red = self.parse_map_bits(b'M3HI', 7, 8)
+    signal_23_type = MapBits(b'MAP2', 0, 3)
+    signal_23_era = MapBits(b'MAP2', 3, 4)
+    signal_01_type = MapBits(b'MAP2', 4, 7)
+    signal_01_era = MapBits(b'MAP2', 7, 8)
 
-        self.has_signals = self.parse_map_bits(b'MAP5', 6, 7)
+    signal_0_present = MapBits(b'M3LO', 4, 5)
+    signal_1_present = MapBits(b'M3LO', 5, 6)
+    signal_2_present = MapBits(b'M3LO', 6, 7)
+    signal_3_present = MapBits(b'M3LO', 7, 8)
 
-        self.is_depot = self.parse_map_bits(b'MAP5', 6, 8) == 3
-        self.is_bridge = self.parse_map_bits(b'MAPT', 7, 8)
-        self.is_tunnel = self.is_bridge and self.parse_map_bits(b'MAPT', 0, 1)
-        self.entrance_direction = self.parse_map_bits(b'MAP5', 0, 2)
+    signal_0_red = MapBits(b'M3HI', 4, 5)
+    signal_1_red = MapBits(b'M3HI', 5, 6)
+    signal_2_red = MapBits(b'M3HI', 6, 7)
+    signal_3_red = MapBits(b'M3HI', 7, 8)
 
-        if self.is_depot:
-            self.depot_direction = self.parse_map_bits(b'MAP5', 0, 2)
-        elif self.is_bridge:
-            self.entrance_direction = self.parse_map_bits(b'MAP5', 0, 2)
+    has_signals = MapBits(b'MAP5', 6, 7)
 
-        self.track_X = self.parse_map_bits(b'MAP5', 0, 1)
-        self.track_Y = self.parse_map_bits(b'MAP5', 1, 2)
-        self.track_N = self.parse_map_bits(b'MAP5', 2, 3)
-        self.track_S = self.parse_map_bits(b'MAP5', 3, 4)
-        self.track_W = self.parse_map_bits(b'MAP5', 4, 5)
-        self.track_E = self.parse_map_bits(b'MAP5', 5, 6)
+    is_bridge = MapBits(b'MAPT', 7, 8)
+    entrance_direction = MapBits(b'MAP5', 0, 2)
 
-        self.track_type = self.parse_map_bits(b'MAP8', 0, 2)
+    track_X = MapBits(b'MAP5', 0, 1)
+    track_Y = MapBits(b'MAP5', 1, 2)
+    track_N = MapBits(b'MAP5', 2, 3)
+    track_S = MapBits(b'MAP5', 3, 4)
+    track_W = MapBits(b'MAP5', 4, 5)
+    track_E = MapBits(b'MAP5', 5, 6)
 
+    track_type = MapBits(b'MAP8', 0, 2)
 
-class TileOccupantRoad(TileOccupant):
     def __init__(self, parent):
         """
-        Make a TileOccupantRoad for a tile.
+        Make a TileOccupantRailwayTrack for a tile.
 
         :param parent: The tile where the occupant lives. The occupant sits "on" the tile.
         :type parent: TileObject.
@@ -126,46 +138,44 @@ class TileOccupantRoad(TileOccupant):
 
         super().__init__(parent)
 
-        self.ground_type = None
-
-        self.road_NW = None
-        self.road_SW = None
-        self.road_SE = None
-        self.road_NE = None
+    @property
+    def is_depot(self):
+        return self.parse_map_bits(b'MAP5', 6, 8) == 3
 
-        self.is_level_crossing = None
-        self.has_signals = False
+    @property
+    def is_tunnel(self):
+        return self.is_bridge and self.parse_map_bits(b'MAPT', 0, 1)
 
-    def parse_all(self):
-        """Parse the various properties of the TileOccupant."""
+    @property
+    def depot_direction(self):
+        if not self.is_depot:
+            return None
+        return self.parse_map_bits(b'MAP5', 0, 2)
 
-        self.is_level_crossing = self.parse_map_bits(b'MAP5', 6, 7)
-        self.is_depot = self.parse_map_bits(b'MAP5', 6, 8) == 2
 
-        self.road_NW = self.parse_map_bits(b'MAP5', 0, 1)
-        self.road_SW = self.parse_map_bits(b'MAP5', 1, 2)
-        self.road_SE = self.parse_map_bits(b'MAP5', 2, 3)
-        self.road_NE = self.parse_map_bits(b'MAP5', 3, 4)
+class TileOccupantRoad(TileOccupant):
+    __slots__ = ()
 
-        self.tram_NW = self.parse_map_bits(b'M3LO', 0, 1)
-        self.tram_SW = self.parse_map_bits(b'M3LO', 1, 2)
-        self.tram_SE = self.parse_map_bits(b'M3LO', 2, 3)
-        self.tram_NE = self.parse_map_bits(b'M3LO', 3, 4)
+    ground_type = None
+    has_signals = False
 
-        if self.is_depot:
-            self.depot_direction = self.parse_map_bits(b'MAP5', 0, 2)
+    is_level_crossing = MapBits(b'MAP5', 6, 7)
 
-        if self.is_level_crossing:
-            self.level_crossing_direction = self.parse_map_bits(b'MAP5', 0, 1)
-            self.track_type = self.parse_map_bits(b'MAP8', 0, 2)
+    road_NW = MapBits(b'MAP5', 0, 1)
+    road_SW = MapBits(b'MAP5', 1, 2)
+    road_SE = MapBits(b'MAP5', 2, 3)
+    road_NE = MapBits(b'MAP5', 3, 4)
 
-        self.tram_type = self.parse_map_bits(b'MAP8', 6, 11)
+    tram_NW = MapBits(b'M3LO', 0, 1)
+    tram_SW = MapBits(b'M3LO', 1, 2)
+    tram_SE = MapBits(b'M3LO', 2, 3)
+    tram_NE = MapBits(b'M3LO', 3, 4)
 
+    tram_type = MapBits(b'MAP8', 6, 11)
 
-class TileOccupantStation(TileOccupant):
     def __init__(self, parent):
         """
-        Make a TileOccupantStation for a tile.
+        Make a TileOccupantRoad for a tile.
 
         :param parent: The tile where the occupant lives. The occupant sits "on" the tile.
         :type parent: TileObject.
@@ -173,62 +183,41 @@ class TileOccupantStation(TileOccupant):
 
         super().__init__(parent)
 
-        self.road_NW = None
-        self.road_SW = None
-        self.road_SE = None
-        self.road_NE = None
-        self.track_direction = None
-        self.has_signals = False
+    @property
+    def is_depot(self):
+        return self.parse_map_bits(b'MAP5', 6, 8) == 2
 
-    def parse_all(self):
-        """Parse the various properties of the TileOccupant."""
-
-        self.station_type = self.parse_map_bits(b'MAPE', 3, 6)
-        self.station_id = self.parse_map_bits(b'MAP2', 0, 8)
-
-        if self.station_type == 0:
-            self.track_direction = self.parse_map_bits(b'MAP5', 0, 1)
-            self.track_type = self.parse_map_bits(b'MAP8', 0, 2)
-
-        elif self.station_type in [2, 3]:
-            road_directions = self.parse_map_bits(b'MAP5', 0, 3)
-
-            self.road_NW = False
-            self.road_SW = False
-            self.road_SE = False
-            self.road_NE = False
-
-            if road_directions == 0:
-                self.road_NE = True
-            if road_directions == 1:
-                self.road_SE = True
-            if road_directions == 2:
-                self.road_SW = True
-            if road_directions == 3:
-                self.road_NW = True
-            if road_directions == 4:
-                self.road_NE = True
-                self.road_SW = True
-            if road_directions == 5:
-                self.road_NW = True
-                self.road_SE = True
-
-            self.tram_NW = self.parse_map_bits(b'M3LO', 0, 1)
-            self.tram_SW = self.parse_map_bits(b'M3LO', 1, 2)
-            self.tram_SE = self.parse_map_bits(b'M3LO', 2, 3)
-            self.tram_NE = self.parse_map_bits(b'M3LO', 3, 4)
-
-        if self.station_type == 7:
-            self.track_direction = self.parse_map_bits(b'MAP5', 0, 1)
-            self.track_type = self.parse_map_bits(b'MAP8', 0, 2)
-
-        self.tram_type = self.parse_map_bits(b'MAP8', 6, 11)
+    @property
+    def depot_direction(self):
+        if not self.is_depot:
+            return None
+        return self.parse_map_bits(b'MAP5', 0, 2)
 
+    @property
+    def level_crossing_direction(self):
+        if not self.is_level_crossing:
+            return None
+        return self.parse_map_bits(b'MAP5', 0, 1)
+
+    @property
+    def track_type(self):
+        if not self.is_level_crossing:
+            return None
+        return self.parse_map_bits(b'MAP8', 0, 2)
+
+
+class TileOccupantStation(TileOccupant):
+    __slots__ = ()
+
+    has_signals = False
+
+    station_type = MapBits(b'MAPE', 3, 6)
+    station_id = MapBits(b'MAP2', 0, 8)
+    tram_type = MapBits(b'MAP8', 6, 11)
 
-class TileOccupantIndustry(TileOccupant):
     def __init__(self, parent):
         """
-        Make a TileOccupantIndustry for a tile.
+        Make a TileOccupantStation for a tile.
 
         :param parent: The tile where the occupant lives. The occupant sits "on" the tile.
         :type parent: TileObject.
@@ -236,20 +225,105 @@ class TileOccupantIndustry(TileOccupant):
 
         super().__init__(parent)
 
-        self.industry_type = None
+    @property
+    def has_track(self):
+        return self.station_type in [0, 7]
+
+    @property
+    def has_road(self):
+        return self.station_type in [2, 3]
+
+    @property
+    def track_direction(self):
+        if not self.has_track:
+            return None
+        return self.parse_map_bits(b'MAP5', 0, 1)
+
+    @property
+    def track_type(self):
+        if not self.has_track:
+            return None
+        return self.parse_map_bits(b'MAP8', 0, 2)
+
+    @property
+    def road_directions(self):
+        if not self.has_road:
+            return None
+        return self.parse_map_bits(b'MAP5', 0, 3)
+
+    @property
+    def road_NW(self):
+        if not self.has_road:
+            return None
+        return self.road_directions in [3, 5]
+
+    @property
+    def road_SW(self):
+        if not self.has_road:
+            return None
+        return self.road_directions in [2, 4]
+
+    @property
+    def road_SE(self):
+        if not self.has_road:
+            return None
+        return self.road_directions in [1, 5]
+
+    @property
+    def road_NE(self):
+        if not self.has_road:
+            return None
+        return self.road_directions in [0, 4]
+
+    @property
+    def tram_NW(self):
+        if not self.has_road:
+            return None
+        return self.parse_map_bits(b'M3LO', 0, 1)
+
+    @property
+    def tram_SW(self):
+        if not self.has_road:
+            return None
+        return self.parse_map_bits(b'M3LO', 1, 2)
+
+    @property
+    def tram_SE(self):
+        if not self.has_road:
+            return None
+        return self.parse_map_bits(b'M3LO', 2, 3)
+
+    @property
+    def tram_NE(self):
+        if not self.has_road:
+            return None
+        return self.parse_map_bits(b'M3LO', 3, 4)
 
-    def parse_all(self):
-        """Parse the various properties of the TileOccupant."""
 
+class TileOccupantIndustry(TileOccupant):
+    __slots__ = ()
+
+    industry_id = MapBits(b'MAP2', 0, 8)
+
+    @property
+    def industry_type(self):
         try:
-            self.industry_type = INDUSTRY_TYPES[self.parse_map_bits(b'MAP5', 0, 8)]
+            return INDUSTRY_TYPES[self.parse_map_bits(b'MAP5', 0, 8)]
         except IndexError:
-            self.industry_type = "OTHER_INDUSTRY"
-
-        self.industry_id = self.parse_map_bits(b'MAP2', 0, 8)
+            return "OTHER_INDUSTRY"
 
 
 class TileOccupantBridgeOrTunnel(TileOccupant):
+    __slots__ = ()
+
+    ground_type = None
+    has_signals = False
+
+    entrance_direction = MapBits(b'MAP5', 0, 2)
+    payload_kind = MapBits(b'MAP5', 2, 4)
+    is_bridge = MapBits(b'MAP5', 7, 8)
+    tram_type = MapBits(b'MAP8', 6, 11)
+
     def __init__(self, parent):
         """
         Make a TileOccupantBridgeOrTunnel for a tile.
@@ -260,21 +334,12 @@ class TileOccupantBridgeOrTunnel(TileOccupant):
 
         super().__init__(parent)
 
-        self.ground_type = None
-        self.entrance_direction = None
-        self.payload_kind = None
-        self.is_bridge = self.parse_map_bits(b'MAP5', 7, 8)
-        self.has_signals = False
-
-    def parse_all(self):
-        """Parse the various properties of the TileOccupant."""
-
-        self.entrance_direction = self.parse_map_bits(b'MAP5', 0, 2)
-        self.payload_kind = self.parse_map_bits(b'MAP5', 2, 4)
-        self.is_bridge = self.parse_map_bits(b'MAP5', 7, 8)
-        self.is_tunnel = not self.is_bridge
-
-        if self.payload_kind == 0:
-            self.track_type = self.parse_map_bits(b'MAP8', 0, 2)
+    @property
+    def is_tunnel(self):
+        return not self.is_bridge
 
-        self.tram_type = self.parse_map_bits(b'MAP8', 6, 11)
+    @property
+    def track_type(self):
+        if self.payload_kind != 0:
+            return None
+        return self.parse_map_bits(b'MAP8', 0, 2)
@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+
+import bisect
+
+from alive_progress import alive_bar
+
+# The number of rows of tiles in each band of the walk over the map.
+BAND_ROWS = 16
+
+
+class TileScheduler:
+    def __init__(self, painter):
+        """
+        Make a TileScheduler, which draws every pass of the painter that goes tile by tile in one walk over the map.
+
+        The map is walked in bands of rows, and each pass draws its tiles in the band while they are fresh. Each pass
+        says which layer, and which part of it, it draws into, and the recording context keeps a queue for each, so
+        the layers come out the same as if each pass had walked the whole map on its own.
+
+        :param painter: The painter to draw with.
+        :type painter: CairoPainter
+        """
+
+        self.painter = painter
+        self.passes = []
+
+    def add_pass(self, layer, process_tile, indices=None, part=0, args=()):
+        """
+        Add a pass, which draws some of the tiles into part of a layer.
+
+        :param layer: The name of the layer to draw into.
+        :type layer: string.
+
+        :param process_tile: The function that draws a tile, called as process_tile(tile, *args).
+        :type process_tile: callable.
+
+        :param indices: The positions of the tiles to draw, in map order, such as the arrays of the TileIndex. If
+            None, draw every tile. Defaults to None.
+        :type indices: array of integers.
+
+        :param part: The part of the layer to draw into. Defaults to 0.
+        :type part: integer.
+
+        :param args: More arguments to pass to process_tile after the tile. Defaults to none.
+        :type args: tuple.
+        """
+
+        self.passes.append((layer, part, process_tile, indices, args))
+
+    def run(self, tiles, nrows, ncols, band_rows=BAND_ROWS):
+        """
+        Walk the map once, band by band, and draw the tiles of each pass in each band.
+
+        :param tiles: The list of all TileObjects in the map, in map order.
+        :type tiles: list of TileObject.
+
+        :param nrows: The number of rows of tiles.
+        :type nrows: integer.
+
+        :param ncols: The number of columns of tiles.
+        :type ncols: integer.
+
+        :param band_rows: The number of rows of tiles in each band. Defaults to BAND_ROWS.
+        :type band_rows: integer.
+        """
+
+        painter = self.painter
+        passes = self.passes
+
+        # Where each list of tiles is up to. Passes often share a list, such as the roads, so the tiles of each list
+        # in a band are only looked up once.
+        positions = {}
+
+        def process_band(start, end):
+            band_tiles = {}
+            for layer, part, process_tile, indices, args in passes:
+                key = id(indices)
+                if key not in band_tiles:
+                    if indices is None:
+                        band_tiles[key] = tiles[start:end]
+                    else:
+                        position = positions.get(key, 0)
+                        positions[key] = bisect.bisect_left(indices, end, position)
+                        band_tiles[key] = [tiles[index] for index in indices[position:positions[key]]]
+
+                if band_tiles[key]:
+                    painter.begin_layer(layer, part)
+                    for tile in band_tiles[key]:
+                        process_tile(tile, *args)
+
+        painter.log_message(f"Drawing {len(passes)} passes over the tiles in one walk.")
+
+        bands = [(row * ncols, min(row + band_rows, nrows) * ncols) for row in range(0, nrows, band_rows)]
+        if painter.parent.show_progress_bar:
+            with alive_bar(len(bands)) as abar:
+                for start, end in bands:
+                    process_band(start, end)
+                    abar()
+        else:
+            for start, end in bands:
+                process_band(start, end)
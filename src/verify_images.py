@@ -0,0 +1,710 @@
+#!/usr/bin/python3
+
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import zlib
+
+import numpy as np
+
+from area_resampler import AreaResampler
+from painter_backend import PAINTER_BACKENDS
+from palette_quantizer import PALETTE_SIZE
+from png_writer import BLOCK_BYTES, PNG_SIGNATURE, PngWriter, combine_adler32, write_png
+from surveyor import Surveyor
+
+DEFAULT_CONFIGS = ["config/main.json", "config/dark_mode.json", "config/martin.json"]
+
+# The first revision of the tool, which the bundled Cairo reference images are drawn with, so that renders are
+# compared to what the tool drew before any of the changes since.
+BASELINE_REVISION = "3bf5f15126d8cc958e6b5f65c29f54f47eacc66c"
+
+# The number of channels in each PNG colour type that can be loaded. Palette images have one, an index.
+PNG_CHANNELS = {2: 3, 3: 1, 6: 4}
+
+# The zlib compression levels that the PNG round trip checks write with.
+CHECK_COMPRESSION_LEVELS = [0, 1, 6, 9]
+
+
+def unfilter_rows(filtered, filter_types, channels):
+    """
+    Undo the filters that PNG applies to each row before compressing it.
+
+    :param filtered: The filtered rows, without their filter type bytes.
+    :type filtered: numpy array of uint8, of shape (height, width * channels).
+
+    :param filter_types: The filter type of each row.
+    :type filter_types: numpy array of uint8.
+
+    :param channels: The number of bytes in each pixel.
+    :type channels: integer.
+
+    :return: The rows.
+    :rtype: numpy array of uint8, of shape (height, width * channels).
+    """
+
+    # Images written by png_writer never filter their rows.
+    if not filter_types.any():
+        return filtered
+
+    rows = np.empty_like(filtered)
+    previous = np.zeros(filtered.shape[1], dtype=np.uint8)
+    for y, filter_type in enumerate(filter_types):
+        row = filtered[y]
+        if filter_type == 0:
+            rows[y] = row
+        elif filter_type == 1:
+            rows[y] = row.reshape(-1, channels).cumsum(axis=0, dtype=np.uint8).reshape(-1)
+        elif filter_type == 2:
+            rows[y] = row + previous
+        elif filter_type in (3, 4):
+            # Each byte depends on the one to its left, so these are undone a byte at a time.
+            line = row.tolist()
+            up = previous.tolist()
+            for i in range(len(line)):
+                left = line[i - channels] if i >= channels else 0
+                if filter_type == 3:
+                    line[i] = (line[i] + (left + up[i]) // 2) & 255
+                    continue
+                upper_left = up[i - channels] if i >= channels else 0
+                estimate = left + up[i] - upper_left
+                distances = abs(estimate - left), abs(estimate - up[i]), abs(estimate - upper_left)
+                if distances[0] <= distances[1] and distances[0] <= distances[2]:
+                    line[i] = (line[i] + left) & 255
+                elif distances[1] <= distances[2]:
+                    line[i] = (line[i] + up[i]) & 255
+                else:
+                    line[i] = (line[i] + upper_left) & 255
+            rows[y] = line
+        else:
+            raise ValueError(f"Unknown PNG filter type: {filter_type}")
+        previous = rows[y]
+
+    return rows
+
+
+def load_png(file_path):
+    """
+    Load a PNG file as an array, without needing Cairo. It should have 8 bits per channel and not be interlaced, like
+    the files written by png_writer and Cairo.
+
+    :param file_path: The path to the PNG file.
+    :type file_path: string.
+
+    :return: The pixels, as RGBA that is not premultiplied by alpha, with shape (height, width, 4).
+    :rtype: numpy.ndarray
+    """
+
+    with open(file_path, "rb") as file_handle:
+        data = file_handle.read()
+
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError(f"{file_path} is not a PNG file")
+
+    header = None
+    palette = None
+    transparency = b""
+    compressed = []
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[position:position + 8])
+        chunk = data[position + 8:position + 8 + length]
+        position += length + 12
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"PLTE":
+            palette = chunk
+        elif chunk_type == b"tRNS":
+            transparency = chunk
+        elif chunk_type == b"IDAT":
+            compressed.append(chunk)
+        elif chunk_type == b"IEND":
+            break
+
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if bit_depth != 8 or interlace or color_type not in PNG_CHANNELS:
+        raise ValueError(
+            f"{file_path} has {bit_depth} bit colour type {color_type}, and interlace method {interlace}, which can't "
+            f"be loaded"
+        )
+
+    channels = PNG_CHANNELS[color_type]
+    raw = np.frombuffer(zlib.decompress(b"".join(compressed)), dtype=np.uint8).reshape(height, width * channels + 1)
+    pixels = unfilter_rows(raw[:, 1:], raw[:, 0], channels).reshape(height, width, channels)
+
+    if color_type == 3:
+        colors = np.full((256, 4), 255, dtype=np.uint8)
+        palette = np.frombuffer(palette, dtype=np.uint8).reshape(-1, 3)
+        colors[:len(palette), :3] = palette
+        colors[:len(transparency), 3] = np.frombuffer(transparency, dtype=np.uint8)
+        return colors[pixels[:, :, 0]]
+
+    if color_type == 2:
+        return np.dstack([pixels, np.full((height, width), 255, dtype=np.uint8)])
+
+    return pixels.copy()
+
+
+def find_bounding_boxes(mask, block_size=16):
+    """
+    Return the bounding boxes of the clusters of mismatched pixels.
+
+    The mask is reduced to blocks first, so that nearby mismatches are merged into one box.
+
+    :param mask: True where the pixels do not match, with shape (height, width).
+    :type mask: numpy.ndarray.
+
+    :param block_size: The size of the blocks, in pixels. Defaults to 16.
+    :type block_size: integer.
+
+    :return: A list of (x0, y0, x1, y1, n_pixels) boxes, largest first. x1 and y1 are exclusive.
+    :rtype: list of tuples
+    """
+
+    height, width = mask.shape
+    brows = -(-height // block_size)
+    bcols = -(-width // block_size)
+    padded = np.zeros((brows * block_size, bcols * block_size), dtype=bool)
+    padded[:height, :width] = mask
+    block_counts = padded.reshape(brows, block_size, bcols, block_size).sum(axis=(1, 3))
+
+    remaining = set(zip(*np.nonzero(block_counts)))
+    boxes = []
+    while remaining:
+        seed = remaining.pop()
+        stack = [seed]
+        rows = [seed[0]]
+        cols = [seed[1]]
+        n_pixels = 0
+        while stack:
+            brow, bcol = stack.pop()
+            n_pixels += int(block_counts[brow, bcol])
+            for drow in [-1, 0, 1]:
+                for dcol in [-1, 0, 1]:
+                    neighbour = (brow + drow, bcol + dcol)
+                    if neighbour in remaining:
+                        remaining.remove(neighbour)
+                        stack.append(neighbour)
+                        rows.append(neighbour[0])
+                        cols.append(neighbour[1])
+
+        x0 = min(cols) * block_size
+        y0 = min(rows) * block_size
+        x1 = min(width, (max(cols) + 1) * block_size)
+        y1 = min(height, (max(rows) + 1) * block_size)
+        boxes.append((x0, y0, x1, y1, n_pixels))
+
+    boxes.sort(key=lambda box: -(box[2] - box[0]) * (box[3] - box[1]))
+    return boxes
+
+
+def compare_images(reference, candidate, tolerance):
+    """
+    Compare two images pixel by pixel.
+
+    :param reference: The reference pixels, with shape (height, width, 4).
+    :type reference: numpy.ndarray.
+
+    :param candidate: The candidate pixels, with shape (height, width, 4).
+    :type candidate: numpy.ndarray.
+
+    :param tolerance: The largest difference in any channel that still counts as a match.
+    :type tolerance: integer.
+
+    :return: The mask of mismatched pixels, and the largest difference in any channel.
+    :rtype: (numpy.ndarray, integer)
+    """
+
+    difference = np.abs(reference.astype(np.int16) - candidate.astype(np.int16)).max(axis=2)
+    return difference > tolerance, int(difference.max(initial=0))
+
+
+def make_diff_image(reference, mask):
+    """
+    Make an image that shows the mismatched pixels in red over a faded copy of the reference.
+
+    :param reference: The reference pixels, with shape (height, width, 4).
+    :type reference: numpy.ndarray.
+
+    :param mask: True where the pixels do not match, with shape (height, width).
+    :type mask: numpy.ndarray.
+
+    :return: The diff pixels, as RGBA with shape (height, width, 4).
+    :rtype: numpy.ndarray
+    """
+
+    faded = (reference[:, :, :3].mean(axis=2) * 0.25 + 191).astype(np.uint8)
+    diff = np.empty(reference.shape, dtype=np.uint8)
+    diff[:, :, 0] = faded
+    diff[:, :, 1] = faded
+    diff[:, :, 2] = faded
+    diff[:, :, 3] = 255
+    diff[mask] = (255, 0, 0, 255)
+    return diff
+
+
+def check_png_writer(output_dir):
+    """
+    Write some images with png_writer and load them back, to check that the blocks it compresses in parallel join
+    into a stream that decompresses to the same pixels, with the right checksum. The checks cover each of
+    CHECK_COMPRESSION_LEVELS, images of a single pixel, and images of several blocks, with and without worker threads.
+
+    :param output_dir: The directory to write the images in.
+    :type output_dir: string.
+
+    :return: The name of each check, and what went wrong, or None if it passed.
+    :rtype: list of (string, string)
+    """
+
+    results = []
+
+    # The checksum of data joined together, split at the ends, in the middle, and after more than ADLER_BASE bytes.
+    data = np.random.default_rng(1).integers(0, 256, 200000, dtype=np.uint8).tobytes()
+    errors = [
+        split for split in [0, 1, 1000, 65521, 65522, 100000, len(data)]
+        if combine_adler32(zlib.adler32(data[:split]), zlib.adler32(data[split:]), len(data) - split)
+        != zlib.adler32(data)
+    ]
+    results.append(("round trip adler32", f"wrong checksum when split at {errors}" if errors else None))
+
+    rng = np.random.default_rng(2)
+    small = rng.integers(0, 256, (37, 61, 4), dtype=np.uint8)
+
+    # Few enough colours that the image compresses, and wide enough that it takes several blocks.
+    n_rows = 3 * BLOCK_BYTES // (1 + 1000 * 4) + 1
+    large = (rng.integers(0, 4, (n_rows, 1000, 4), dtype=np.uint8) * 85).astype(np.uint8)
+
+    images = [("1x1 rgba", small[:1, :1], 6, 1), ("1x1 rgb", small[:1, :1, :3], 6, 1)]
+    images += [(f"level {level}", small, level, 1) for level in CHECK_COMPRESSION_LEVELS]
+    images += [(f"{n_rows} rows in blocks, {threads} thread(s)", large, 1, threads) for threads in [1, 3]]
+
+    for name, image, level, threads in images:
+        path = os.path.join(output_dir, "round_trip.png")
+        write_png(path, image, compression_level=level, threads=threads)
+        try:
+            loaded = load_png(path)
+        except (ValueError, zlib.error) as error:
+            results.append((f"round trip {name}", str(error)))
+            continue
+
+        expected = image
+        if image.shape[2] == 3:
+            expected = np.dstack([image, np.full(image.shape[:2], 255, dtype=np.uint8)])
+        error = None
+        if loaded.shape != expected.shape:
+            error = f"loaded shape {loaded.shape} instead of {expected.shape}"
+        elif not np.array_equal(loaded, expected):
+            error = f"{np.count_nonzero((loaded != expected).any(axis=2))} pixels changed"
+        results.append((f"round trip {name}", error))
+
+    os.remove(os.path.join(output_dir, "round_trip.png"))
+    return results
+
+
+def check_indexed_png(output_dir):
+    """
+    Write some indexed images with png_writer and load them back. Images with no more colours than fit in the palette
+    should come back exactly, and in images with more, each pixel should have the nearest colour in the palette.
+
+    :param output_dir: The directory to write the images in.
+    :type output_dir: string.
+
+    :return: The name of each check, and what went wrong, or None if it passed.
+    :rtype: list of (string, string)
+    """
+
+    results = []
+    rng = np.random.default_rng(3)
+    path = os.path.join(output_dir, "round_trip.png")
+
+    for n_colors, height, band_rows in [(1, 1, 1), (PALETTE_SIZE, 64, 16), (PALETTE_SIZE + 200, 96, 8)]:
+        name = f"round trip indexed, {n_colors} colour(s)"
+        colors = rng.integers(0, 256, (n_colors, 4), dtype=np.uint8)
+        colors[:n_colors // 2, 3] = 255
+        image = colors[rng.integers(0, n_colors, (height, 64))]
+
+        # The rows arrive in bands, as they do from a render, so that later bands bring new colours.
+        with PngWriter(path, image.shape[1], height, compression_level=6, threads=1, indexed=True) as writer:
+            for start in range(0, height, band_rows):
+                writer.write_rows(image[start:start + band_rows])
+        palette = writer.quantizer.get_palette().astype(np.int32)
+
+        try:
+            loaded = load_png(path)
+        except (ValueError, zlib.error) as error:
+            results.append((name, str(error)))
+            continue
+
+        distances = ((image.reshape(-1, 1, 4).astype(np.int32) - palette[None, :, :]) ** 2).sum(axis=2)
+        nearest = distances.min(axis=1)
+        loaded_distances = ((image.reshape(-1, 4).astype(np.int32) - loaded.reshape(-1, 4)) ** 2).sum(axis=1)
+        in_palette = (loaded.reshape(-1, 1, 4).astype(np.int32) == palette[None, :, :]).all(axis=2).any(axis=1)
+
+        error = None
+        if loaded.shape != image.shape:
+            error = f"loaded shape {loaded.shape} instead of {image.shape}"
+        elif len(palette) > PALETTE_SIZE:
+            error = f"{len(palette)} colours in the palette"
+        elif n_colors <= PALETTE_SIZE and not np.array_equal(loaded, image):
+            error = f"{np.count_nonzero((loaded != image).any(axis=2))} pixels changed"
+        elif not in_palette.all() or (loaded_distances != nearest).any():
+            error = f"{np.count_nonzero(loaded_distances != nearest)} pixels do not have the nearest palette colour"
+        results.append((name, error))
+
+    os.remove(path)
+    return results
+
+
+def get_area_weights(size, out_size):
+    """
+    Work out how much of each pixel of a row of an image falls in each pixel of a shorter row, the slow way, to check
+    AreaResampler against.
+
+    :param size: The length of the row.
+    :type size: integer.
+
+    :param out_size: The length of the shorter row.
+    :type out_size: integer.
+
+    :return: The weights, which add up to 1 for each pixel of the shorter row.
+    :rtype: numpy array of float64, of shape (out_size, size).
+    """
+
+    ratio = size / out_size
+    starts = np.arange(out_size)[:, None] * ratio
+    pixels = np.arange(size)[None, :]
+    overlap = np.minimum(starts + ratio, pixels + 1) - np.maximum(starts, pixels)
+    return np.maximum(overlap, 0) / ratio
+
+
+def check_area_resampler():
+    """
+    Shrink some images premultiplied by alpha with AreaResampler, a band of rows at a time, and check that each pixel
+    is the average of the area it covers, and still premultiplied, with no colour brighter than its alpha.
+
+    :return: The name of each check, and what went wrong, or None if it passed.
+    :rtype: list of (string, string)
+    """
+
+    results = []
+    rng = np.random.default_rng(4)
+
+    for width, height, out_width, out_height, band_rows in [
+        (63, 42, 21, 14, 5), (100, 77, 33, 20, 9), (50, 31, 1, 1, 31), (40, 40, 39, 13, 1)
+    ]:
+        name = f"area average {width}x{height} to {out_width}x{out_height}"
+        image = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+        image[rng.random((height, width)) < 0.2, 3] = 0
+        image[:, :, :3] = (image[:, :, :3].astype(np.uint32) * image[:, :, 3:] // 255).astype(np.uint8)
+
+        resampler = AreaResampler(width, height, out_width, out_height)
+        result = np.concatenate([
+            resampler.add_rows(image[start:start + band_rows]) for start in range(0, height, band_rows)
+        ])
+
+        expected = np.einsum(
+            "ay,yxc,bx->abc", get_area_weights(height, out_height), image.astype(np.float64),
+            get_area_weights(width, out_width)
+        )
+        error = None
+        if result.shape != expected.shape:
+            error = f"shape {result.shape} instead of {expected.shape}"
+        elif np.abs(result - expected).max() > 0.5 + 1e-6:
+            error = f"differs from the average by up to {np.abs(result - expected).max():.2f}"
+        elif (result[:, :, :3] > result[:, :, 3:]).any():
+            error = "some colours are brighter than their alpha"
+        results.append((name, error))
+
+    return results
+
+
+def reference_name(save_file_path, config_file_path):
+    """
+    Return the file name of the reference image for a save file and config.
+
+    :param save_file_path: The path to the save file.
+    :type save_file_path: string.
+
+    :param config_file_path: The path to the config file.
+    :type config_file_path: string.
+
+    :return: The file name of the reference image.
+    :rtype: string
+    """
+
+    save_name = os.path.splitext(os.path.basename(save_file_path))[0].lower()
+    config_name = os.path.splitext(os.path.basename(config_file_path))[0]
+    return f"{save_name}_{config_name}.png"
+
+
+def render(surveyor, config_file_path, tile_size, image_file_path, backend="cairo"):
+    """
+    Render a save file with a config, in the same way that run.py does.
+
+    :param surveyor: The Surveyor, with its data already ingested.
+    :type surveyor: Surveyor.
+
+    :param config_file_path: The path to the config file.
+    :type config_file_path: string.
+
+    :param tile_size: The size of the tiles.
+    :type tile_size: integer.
+
+    :param image_file_path: The path to the output PNG file.
+    :type image_file_path: string.
+
+    :param backend: The painter backend to draw with, one of PAINTER_BACKENDS. Defaults to 'cairo'.
+    :type backend: string.
+    """
+
+    random.seed(123)
+    surveyor.load_settings(config_file_path, tile_size)
+    if backend == "numpy":
+        # The NumPy backend draws labels with Cairo's fonts if it is installed, so they are left out to make the
+        # images the same either way.
+        surveyor.painter.set_layer_visible("labels", False)
+    surveyor.save_image(image_file_path, "PNG", backend=backend)
+
+
+def export_revision(revision):
+    """
+    Copy the tree of a git revision into a temporary directory, to render reference images with.
+
+    :param revision: The git revision.
+    :type revision: string.
+
+    :return: The path to the directory.
+    :rtype: string
+    """
+
+    source_dir = tempfile.mkdtemp(prefix="surveyor_revision_")
+    archive = subprocess.run(["git", "archive", revision], check=True, stdout=subprocess.PIPE).stdout
+    subprocess.run(["tar", "-x", "-C", source_dir], input=archive, check=True)
+    return source_dir
+
+
+def render_revision(source_dir, save_file_path, config_file_path, tile_size, image_file_path, backend="cairo"):
+    """
+    Render a save file with a config using run.py from another revision, as render does with this one.
+
+    :param source_dir: The tree of the revision, from export_revision.
+    :type source_dir: string.
+
+    :param save_file_path: The path to the save file.
+    :type save_file_path: string.
+
+    :param config_file_path: The path to the config file, in the tree of the revision.
+    :type config_file_path: string.
+
+    :param tile_size: The size of the tiles.
+    :type tile_size: integer.
+
+    :param image_file_path: The path to the output PNG file.
+    :type image_file_path: string.
+
+    :param backend: The painter backend to draw with. Revisions from before there were backends only have 'cairo'.
+        Defaults to 'cairo'.
+    :type backend: string.
+    """
+
+    arguments = []
+    if backend != "cairo":
+        arguments = ["-b", backend]
+
+    if backend == "numpy":
+        # Left out for the same reason as in render. Older revisions can only hide them in the config.
+        with open(os.path.join(source_dir, config_file_path)) as file_handle:
+            settings = json.load(file_handle)
+        settings["show_labels"] = False
+        config_file_path = os.path.join(source_dir, "config", "verify_images.json")
+        with open(config_file_path, "w") as file_handle:
+            json.dump(settings, file_handle)
+
+    image_file_path = os.path.abspath(image_file_path)
+    subprocess.run(
+        [
+            sys.executable, os.path.join("src", "run.py"), "-i", os.path.abspath(save_file_path),
+            "-c", config_file_path, "-s", str(tile_size), "-m", "png", "-o", os.path.dirname(image_file_path),
+            "-f", os.path.basename(image_file_path)
+        ] + arguments,
+        cwd=source_dir, check=True, stdout=subprocess.DEVNULL
+    )
+
+
+def main():
+    """
+    Render the example saves with the bundled configs, and compare them to the reference images.
+    """
+
+    argparser = argparse.ArgumentParser(description='Compare renders of the example saves to reference images.')
+    argparser.add_argument(
+        "--saves",
+        help="Glob for the save files to render.",
+        default="example_saves/*.sav",
+        type=str)
+    argparser.add_argument(
+        "--configs",
+        help="Comma separated list of config files to render with.",
+        default=",".join(DEFAULT_CONFIGS),
+        type=str)
+    argparser.add_argument(
+        "-b", "--backend",
+        help=f"The backend to draw the images with, one of: {list(PAINTER_BACKENDS)}. Each has its own reference "
+             "images. Defaults to cairo, which the bundled reference images are for.",
+        default="cairo",
+        type=str)
+    argparser.add_argument(
+        "-r", "--reference-dir",
+        help="Path to the directory of reference images. The images for each backend are in a directory named after "
+             "it.",
+        default="reference_images",
+        type=str)
+    argparser.add_argument(
+        "-o", "--output-dir",
+        help="Path to the directory for the renders and diff images. Defaults to a temporary directory.",
+        default="",
+        type=str)
+    argparser.add_argument(
+        "-s", "--tile_size",
+        help="Size of the tile. Should be an odd integer.",
+        default=7,
+        type=int)
+    argparser.add_argument(
+        "-t", "--tolerance",
+        help="The largest difference in a colour channel (0-255) that still counts as a match.",
+        default=2,
+        type=int)
+    argparser.add_argument(
+        "--max-mismatch",
+        help="The largest percentage of mismatched pixels that still counts as a pass.",
+        default=0.0,
+        type=float)
+    argparser.add_argument(
+        "-u", "--update",
+        help="If set, overwrite the reference images with the new renders instead of comparing.",
+        default=False,
+        action="store_true")
+    argparser.add_argument(
+        "--revision",
+        help="With --update, render the reference images with this git revision, or with the working tree if it is "
+             "empty. Defaults to the first revision of the tool for cairo, and the working tree for other backends, "
+             "which it did not have.",
+        default=None,
+        type=str)
+    argparser.add_argument(
+        "-v", "--verbose",
+        help="If set, use verbose logging.",
+        default=False,
+        action="store_true")
+    args = argparser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    save_file_paths = sorted(glob.glob(args.saves))
+    config_file_paths = [path for path in args.configs.split(",") if path]
+
+    output_dir = args.output_dir
+    is_temporary = not output_dir
+    if is_temporary:
+        output_dir = tempfile.mkdtemp(prefix="surveyor_verify_")
+    os.makedirs(output_dir, exist_ok=True)
+    reference_dir = os.path.join(args.reference_dir, args.backend)
+    os.makedirs(reference_dir, exist_ok=True)
+
+    revision = args.revision
+    if revision is None:
+        revision = BASELINE_REVISION if args.backend == "cairo" else ""
+    source_dir = None
+    if args.update and revision:
+        source_dir = export_revision(revision)
+
+    n_failures = 0
+    if not args.update:
+        checks = check_png_writer(output_dir) + check_indexed_png(output_dir) + check_area_resampler()
+        for name, error in checks:
+            print(f"{name}: pass" if error is None else f"{name}: FAIL, {error}")
+            if error is not None:
+                n_failures += 1
+
+    for save_file_path in save_file_paths:
+        surveyor = None
+        if source_dir is None:
+            surveyor = Surveyor(save_file_path)
+            surveyor.ingest_data()
+
+        for config_file_path in config_file_paths:
+            name = reference_name(save_file_path, config_file_path)
+            reference_path = os.path.join(reference_dir, name)
+
+            if source_dir is not None:
+                render_revision(
+                    source_dir, save_file_path, config_file_path, args.tile_size, reference_path, backend=args.backend
+                )
+                print(f"{name}: updated reference from {revision}")
+                continue
+
+            if args.update:
+                render(surveyor, config_file_path, args.tile_size, reference_path, backend=args.backend)
+                print(f"{name}: updated reference")
+                continue
+
+            candidate_path = os.path.join(output_dir, name)
+            render(surveyor, config_file_path, args.tile_size, candidate_path, backend=args.backend)
+
+            if not os.path.exists(reference_path):
+                print(f"{name}: FAIL, no reference image at {reference_path}")
+                n_failures += 1
+                continue
+
+            reference = load_png(reference_path)
+            candidate = load_png(candidate_path)
+            if reference.shape != candidate.shape:
+                print(f"{name}: FAIL, size {candidate.shape[1]} x {candidate.shape[0]} "
+                      f"does not match reference size {reference.shape[1]} x {reference.shape[0]}")
+                n_failures += 1
+                continue
+
+            mask, max_difference = compare_images(reference, candidate, args.tolerance)
+            mismatch = 100.0 * np.count_nonzero(mask) / mask.size
+            passed = mismatch <= args.max_mismatch
+            status = "pass" if passed else "FAIL"
+            print(f"{name}: {status}, {mismatch:.4f}% of pixels mismatched, largest difference {max_difference}")
+
+            if not np.any(mask):
+                continue
+
+            for (x0, y0, x1, y1, n_pixels) in find_bounding_boxes(mask)[:10]:
+                print(f"    {n_pixels} pixels in x: {x0}-{x1}, y: {y0}-{y1}")
+
+            diff_path = os.path.join(output_dir, name.replace(".png", "_diff.png"))
+            write_png(diff_path, make_diff_image(reference, mask))
+            print(f"    diff image: {diff_path}")
+
+            if not passed:
+                n_failures += 1
+
+    if source_dir is not None:
+        shutil.rmtree(source_dir)
+
+    if is_temporary and n_failures:
+        # Keep the renders and diffs around so that they can be inspected.
+        print(f"Renders and diff images are in {output_dir}")
+    elif is_temporary:
+        shutil.rmtree(output_dir)
+
+    if n_failures:
+        print(f"{n_failures} comparison(s) failed.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
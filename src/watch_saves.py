@@ -0,0 +1,356 @@
+#!/usr/bin/python3
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_render import init_worker, read_settings, render_save
+from level_of_detail import QUALITIES, QUALITY
+from painter_backend import PAINTER_BACKENDS
+from png_writer import COMPRESSION_LEVEL
+from run import get_output_filename, get_tile_size
+
+# How many bytes of a save to hash at a time.
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def hash_file(file_path):
+    """
+    Work out the SHA-1 hash of the contents of a file.
+
+    :param file_path: The path to the file.
+    :type file_path: string.
+
+    :return: The hash, in hex.
+    :rtype: string.
+    """
+
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as file_handle:
+        for chunk in iter(lambda: file_handle.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_render_options(config_file_path, mode, options):
+    """
+    Work out a hash of everything that changes how a save is drawn: the contents of the config file, the image mode
+    and the other options of render_save.
+
+    :param config_file_path: The path to the config file.
+    :type config_file_path: string.
+
+    :param mode: The image mode.
+    :type mode: string.
+
+    :param options: The other options of render_save, such as the tile size and backend.
+    :type options: dict.
+
+    :return: The hash, in hex.
+    :rtype: string.
+    """
+
+    values = {"config": hash_file(config_file_path), "mode": mode, "options": options}
+    return hashlib.sha1(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+
+class SaveWatcher:
+    def __init__(self, watch_dir, settle_seconds=2.0, state_path=None, render_digest=""):
+        """
+        Make a SaveWatcher, which polls a directory for save files that are new or have changed. A save is only
+        ready once its size and modification time have not changed for a while, so files that are still being
+        written are left alone, and saves whose contents are the same as the last time they were drawn are skipped.
+
+        :param watch_dir: The directory to watch.
+        :type watch_dir: string.
+
+        :param settle_seconds: How long a save has to stay the same before it is ready. Defaults to 2 seconds.
+        :type settle_seconds: float
+
+        :param state_path: The path to a JSON file to keep the hashes of the saves that have been drawn in, so they
+            are not drawn again when the watcher restarts. Defaults to None.
+        :type state_path: string.
+
+        :param render_digest: A hash of how the saves are drawn, from hash_render_options, which is kept with the
+            hash of each save, so that saves are drawn again when the config or options change. Defaults to "".
+        :type render_digest: string.
+        """
+
+        self.watch_dir = watch_dir
+        self.settle_seconds = settle_seconds
+        self.state_path = state_path
+        self.render_digest = render_digest
+
+        # The size and modification time of each save, and when they were first seen.
+        self.seen = {}
+
+        # The size and modification time of each save that has been dealt with.
+        self.handled = {}
+
+        # The size and modification time of each save when it was last hashed, and the hash of its contents.
+        self.digests = {}
+
+        # The hash of each save when it was last drawn, with the hash of how it was drawn.
+        self.drawn = {}
+        if state_path and os.path.exists(state_path):
+            with open(state_path) as file_handle:
+                self.drawn = json.load(file_handle)
+
+    def find_ready_saves(self, busy=()):
+        """
+        Look for saves that are ready to draw.
+
+        :param busy: The paths to the saves that are being drawn, which are not ready again until they are done.
+            Defaults to none.
+        :type busy: collection of strings.
+
+        :return: The path to each save that is ready, its size and modification time in nanoseconds, and the hash
+            of its contents, the oldest first.
+        :rtype: list of (string, (integer, integer), string)
+        """
+
+        now = time.time()
+        ready = []
+        paths = set()
+        for entry in os.scandir(self.watch_dir):
+            if not entry.name.endswith(".sav") or not entry.is_file():
+                continue
+
+            path = entry.path
+            paths.add(path)
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if path not in self.seen or self.seen[path][0] != signature:
+                self.seen[path] = (signature, now)
+                continue
+
+            settled = now - self.seen[path][1] >= self.settle_seconds
+            if not settled or path in busy or self.handled.get(path) == signature:
+                continue
+
+            if path not in self.digests or self.digests[path][0] != signature:
+                self.digests[path] = (signature, hash_file(path))
+            digest = self.digests[path][1]
+            if self.drawn.get(path) == f"{digest}:{self.render_digest}":
+                self.handled[path] = signature
+                continue
+            ready.append((path, signature, digest))
+
+        # Saves that have gone are forgotten.
+        for path in set(self.seen) - paths:
+            del self.seen[path]
+            self.handled.pop(path, None)
+            self.digests.pop(path, None)
+
+        return sorted(ready, key=lambda item: item[1][1])
+
+    def is_idle(self):
+        """
+        Return whether every save has been dealt with.
+
+        :return: True if there are no saves waiting to settle or be drawn.
+        :rtype: Boolean
+        """
+
+        return all(self.handled.get(path) == signature for path, (signature, first_seen) in self.seen.items())
+
+    def mark_handled(self, path, signature, digest, drawn=True):
+        """
+        Record that a save has been dealt with, so it is left alone until it changes.
+
+        :param path: The path to the save.
+        :type path: string.
+
+        :param signature: The size and modification time of the save when it was dealt with.
+        :type signature: (integer, integer)
+
+        :param digest: The hash of the contents of the save when it was dealt with.
+        :type digest: string.
+
+        :param drawn: If True, the save was drawn, and the hash is kept in the state file. If False, drawing it
+            failed, and it is tried again when it changes. Defaults to True.
+        :type drawn: Boolean
+        """
+
+        self.handled[path] = signature
+        if drawn:
+            self.drawn[path] = f"{digest}:{self.render_digest}"
+            if self.state_path:
+                with open(self.state_path, "w") as file_handle:
+                    json.dump(self.drawn, file_handle, indent=2)
+
+
+def watch_saves(watch_dir, output_dir, config_file_path, jobs=1, interval=1.0, settle_seconds=2.0, once=False,
+                mode="PNG", **options):
+    """
+    Draw the saves in a directory as they are written, until interrupted. The config is loaded, and Cairo imported,
+    once for each worker process, which stay running, and at most one save is drawn by each at a time.
+
+    :param watch_dir: The directory to watch.
+    :type watch_dir: string.
+
+    :param output_dir: The directory to write the images to.
+    :type output_dir: string.
+
+    :param config_file_path: The path to the config file.
+    :type config_file_path: string.
+
+    :param jobs: How many saves to draw at once. Defaults to 1.
+    :type jobs: integer.
+
+    :param interval: How long to wait between looks at the directory, in seconds. Defaults to 1.
+    :type interval: float
+
+    :param settle_seconds: How long a save has to stay the same before it is drawn. Defaults to 2 seconds.
+    :type settle_seconds: float
+
+    :param once: If True, stop once every save in the directory has been dealt with, rather than keep watching.
+        Defaults to False.
+    :type once: Boolean
+
+    :param mode: The image mode, one of 'PNG', 'SVG', 'SVGZ' or 'CAIRO_SVG'. Defaults to 'PNG'.
+    :type mode: string.
+
+    :param options: The other options of render_save, such as the tile size and backend.
+    :type options: dict.
+    """
+
+    settings, settings_rgb_values = read_settings(config_file_path)
+    watcher = SaveWatcher(
+        watch_dir, settle_seconds, state_path=os.path.join(output_dir, "watch_state.json"),
+        render_digest=hash_render_options(config_file_path, mode, options)
+    )
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+
+    # The saves being drawn, keyed by their futures.
+    running = {}
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=init_worker, initargs=(settings, settings_rgb_values, threads)
+    ) as executor:
+        while True:
+            for future in [future for future in running if future.done()]:
+                path, signature, digest = running.pop(future)
+                result = future.result()
+                watcher.mark_handled(path, signature, digest, drawn=result["status"] == "ok")
+                if result["status"] == "ok":
+                    latency = time.time() - signature[1] / 1e9
+                    print(f"{path}: drawn in {result['seconds']:.2f}s, {latency:.1f}s after it was saved")
+                else:
+                    print(f"{path}: failed, {result['error']}")
+
+            # Saves that are ready while every worker is busy are found again on a later look.
+            ready = watcher.find_ready_saves(busy={item[0] for item in running.values()})
+            for path, signature, digest in ready[:jobs - len(running)]:
+                output_file_path = os.path.join(output_dir, get_output_filename(path, mode))
+                future = executor.submit(render_save, path, output_file_path, mode=mode, **options)
+                running[future] = (path, signature, digest)
+
+            if once and not running and watcher.is_idle():
+                return
+            time.sleep(interval)
+
+
+def main():
+    """
+    Watch a directory for new and changed saves, such as autosaves, and draw each one as soon as it is written.
+    """
+
+    argparser = argparse.ArgumentParser(description='Draw maps of OpenTTD saves as they are written to a directory.')
+    argparser.add_argument(
+        "watch_dir",
+        help="The directory to watch for save files.",
+        type=str)
+    argparser.add_argument(
+        "-o", "--output-dir",
+        help="Path to the output directory.",
+        default="example_images",
+        type=str)
+    argparser.add_argument(
+        "-c", "--config",
+        help="Path to the config file.",
+        default="config/martin.json",
+        type=str)
+    argparser.add_argument(
+        "-m", "--mode",
+        help="Image mode, one of: ['svg', 'svgz', 'png', 'cairo_svg'].",
+        default="PNG",
+        type=str)
+    argparser.add_argument(
+        "-s", "--tile_size",
+        help="Size of the tile. Should be an odd integer. Defaults to the one in the config.",
+        default=None,
+        type=int)
+    argparser.add_argument(
+        "-j", "--jobs",
+        help="How many saves to draw at once.",
+        default=1,
+        type=int)
+    argparser.add_argument(
+        "-b", "--backend",
+        help=f"The backend to draw png images with, one of: {list(PAINTER_BACKENDS)}.",
+        default="cairo",
+        choices=list(PAINTER_BACKENDS),
+        type=str)
+    argparser.add_argument(
+        "--compression-level",
+        help="The zlib compression level of png images, from 0 to 9.",
+        default=COMPRESSION_LEVEL,
+        choices=range(10),
+        metavar="{0-9}",
+        type=int)
+    argparser.add_argument(
+        "--indexed",
+        help="If set, write png images with a palette of up to 256 colours.",
+        default=False,
+        action="store_true")
+    argparser.add_argument(
+        "--quality",
+        help="How much detail to draw png images with.",
+        default=QUALITY,
+        choices=QUALITIES,
+        type=str)
+    argparser.add_argument(
+        "--interval",
+        help="How long to wait between looks at the directory, in seconds.",
+        default=1.0,
+        type=float)
+    argparser.add_argument(
+        "--settle",
+        help="How long a save has to stay the same before it is drawn, in seconds, so saves that are still being "
+             "written are left alone.",
+        default=2.0,
+        type=float)
+    argparser.add_argument(
+        "--once",
+        help="If set, stop once every save in the directory has been dealt with, rather than keep watching.",
+        default=False,
+        action="store_true")
+    argparser.add_argument(
+        "-v", "--verbose",
+        help="If set, use verbose logging.",
+        default=False,
+        action="store_true")
+    args = argparser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f"Watching {args.watch_dir} for saves, and drawing them to {args.output_dir}.")
+    try:
+        watch_saves(
+            args.watch_dir, args.output_dir, args.config, jobs=max(1, args.jobs), interval=args.interval,
+            settle_seconds=args.settle, once=args.once, mode=args.mode.upper(),
+            tile_size=get_tile_size(args.tile_size) if args.tile_size else None, backend=args.backend,
+            compression_level=args.compression_level, indexed=args.indexed, quality=args.quality
+        )
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+if __name__ == '__main__':
+    main()